@@ -0,0 +1,106 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the per window usage aggregation backends on synthetic per pod
+frames: wall time (best of --repeat runs), peak traced memory and size of
+the aggregated frame.
+
+    python benchmarks/benchmark_aggregation.py --days 14 --pods 50
+"""
+import argparse
+import time as perftime
+import tracemalloc
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.read_workload_timeseries import _aggregate_usage
+from hpaconfigrecommender.timeseries_aggregation import AGGREGATION_BACKENDS
+from hpaconfigrecommender.utils.config import Config
+
+
+def _pod_frames(days: int, pods: int, seed: int = 0):
+    """Per pod memory and CPU usage as decoded from the Monitoring API."""
+    rng = np.random.default_rng(seed)
+    windows = days * 24 * 60
+    window_begin = pd.date_range(
+        "2024-11-01", periods=windows, freq="60s", tz="UTC"
+    )
+    labels = {
+        "window_begin": np.repeat(window_begin, pods),
+        "resource.labels.container_name": pd.Categorical(
+            np.zeros(windows * pods, dtype=np.int32).astype(str)
+        ).rename_categories(["server"]),
+        "resource.labels.pod_name": pd.Categorical.from_codes(
+            np.tile(np.arange(pods, dtype=np.int32), windows),
+            categories=[f"pod-{p}" for p in range(pods)],
+        ),
+    }
+    mem = pd.DataFrame({
+        **labels,
+        "value.int64Value": rng.integers(
+            100 * 1024**2, 2 * 1024**3, size=windows * pods
+        ),
+    })
+    cpu = pd.DataFrame({
+        **labels,
+        "value.doubleValue": rng.gamma(
+            2.0, 0.2, size=windows * pods
+        ).astype(np.float32),
+    })
+    return mem, cpu
+
+
+def _run(config: Config, backend: str, mem, cpu, repeat: int) -> dict:
+    config.set_value("TIMESERIES_AGGREGATION_BACKEND", backend)
+    best = float("inf")
+    for _ in range(repeat):
+        started = perftime.perf_counter()
+        _aggregate_usage(config, mem, cpu, 0.5, 512 * 1024**2)
+        best = min(best, perftime.perf_counter() - started)
+    tracemalloc.start()
+    df = _aggregate_usage(config, mem, cpu, 0.5, 512 * 1024**2)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "backend": backend,
+        "seconds": best,
+        "peak_mib": peak / 1024**2,
+        "result_mib": df.memory_usage(deep=True).sum() / 1024**2,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--pods", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    config = Config()
+    mem, cpu = _pod_frames(args.days, args.pods)
+    print(
+        f"{len(mem):,} rows per metric "
+        f"({args.days} days, {args.pods} pods, 60s points)"
+    )
+    print(f"{'backend':<10}{'seconds':>10}{'peak MiB':>12}{'result MiB':>12}")
+    for backend in AGGREGATION_BACKENDS:
+        result = _run(config, backend, mem, cpu, args.repeat)
+        print(
+            f"{result['backend']:<10}{result['seconds']:>10.3f}"
+            f"{result['peak_mib']:>12.1f}{result['result_mib']:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
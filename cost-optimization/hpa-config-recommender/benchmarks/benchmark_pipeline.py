@@ -0,0 +1,339 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Times planning, simulation and savings scoring on synthetic workloads and
+compares them with a JSON baseline to detect regressions.
+
+Every case (pattern x days x replicas) runs in its own process, which
+reports the wall time of each stage (best of --repeat runs) and its peak
+RSS. Stages: prepare_workload, get_simulation_plans,
+_analyze_configuration_plans (replays and savings of all plans) and
+_calculate_savings (the savings of the simulated plans alone).
+
+    python benchmarks/benchmark_pipeline.py --days 1 7 --replicas 1 50
+    python benchmarks/benchmark_pipeline.py --baseline baseline.json --update
+
+Without --update, a case slower than its baseline by more than
+--max-slowdown, or using more than --max-rss-growth more memory, is a
+regression and the script exits with status 1. The baseline is written
+when it does not exist yet. No Google Cloud access is needed.
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time as perftime
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import (
+    get_simulation_plans,
+    prepare_workload,
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    _analyze_configuration_plans,
+    _calculate_savings,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails
+
+BASELINE_VERSION = 1
+# Timed functions, and their column in the printed table
+STAGES = {
+    "prepare_workload": "prepare",
+    "get_simulation_plans": "plan",
+    "_analyze_configuration_plans": "simulate",
+    "_calculate_savings": "savings",
+}
+# Stage time differences under this many seconds are noise
+_MIN_SLOWDOWN_SECONDS = 0.02
+_ROWS_PER_DAY = 24 * 60
+
+
+def _diurnal(rng, rows: int, replicas: int):
+    """Daily sine of the per replica CPU on a fixed number of replicas."""
+    minutes = np.arange(rows)
+    cpu = (
+        0.3 + 0.2 * np.sin(2 * np.pi * minutes / _ROWS_PER_DAY)
+        + rng.gamma(2.0, 0.02, size=rows)
+    )
+    return cpu, np.full(rows, replicas)
+
+
+def _spiky(rng, rows: int, replicas: int):
+    """Low CPU with a few short bursts up to 5x per day."""
+    cpu = 0.15 + rng.gamma(2.0, 0.02, size=rows)
+    starts = rng.choice(rows, size=max(1, rows // 240), replace=False)
+    for start, length, height in zip(
+        starts,
+        rng.integers(2, 10, size=len(starts)),
+        rng.uniform(2.0, 5.0, size=len(starts)),
+    ):
+        cpu[start:start + length] *= height
+    return cpu, np.full(rows, replicas)
+
+
+def _step(rng, rows: int, replicas: int):
+    """CPU levels held for hours, e.g. batches or releases."""
+    levels = rng.choice([0.15, 0.3, 0.5, 0.8], size=rows // 180 + 1)
+    cpu = np.repeat(levels, 180)[:rows] + rng.normal(0, 0.01, size=rows)
+    return np.clip(cpu, 0.01, None), np.full(rows, replicas)
+
+
+def _noisy(rng, rows: int, replicas: int):
+    """Noisy CPU on a number of replicas wandering around replicas."""
+    cpu = rng.lognormal(np.log(0.3), 0.4, size=rows)
+    walk = np.tanh(np.cumsum(rng.normal(0, 0.02, size=rows)))
+    n_replicas = np.ceil(replicas * (1 + 0.3 * walk)).astype(int)
+    return cpu, np.maximum(n_replicas, 1)
+
+
+GENERATORS = {
+    "diurnal": _diurnal,
+    "spiky": _spiky,
+    "step": _step,
+    "noisy": _noisy,
+}
+
+
+def workload_frame(
+    pattern: str, days: int, replicas: int, seed: int = 0
+) -> pd.DataFrame:
+    """Aggregated usage of a synthetic workload, one row per minute."""
+    rng = np.random.default_rng(seed)
+    rows = days * _ROWS_PER_DAY
+    cpu, n_replicas = GENERATORS[pattern](rng, rows, replicas)
+    mem = 250.0 + 100.0 * cpu + rng.normal(0, 5, size=rows)
+    return pd.DataFrame({
+        "window_begin": pd.date_range(
+            "2024-11-01", periods=rows, freq="60s"
+        ),
+        "num_replicas_at_usage_window": n_replicas,
+        "avg_container_cpu_usage": cpu,
+        "avg_container_mem_usage_mi": mem,
+        "max_containers_mem_usage_mi": mem * 1.1,
+        "stddev_containers_cpu_usage": cpu * 0.1,
+        "sum_containers_cpu_request": n_replicas * 1.0,
+        "sum_containers_cpu_usage": cpu * n_replicas,
+        "sum_containers_mem_request_mi": n_replicas * 1024.0,
+        "sum_containers_mem_usage_mi": mem * 1.1 * n_replicas,
+    })
+
+
+def _best_of(repeat: int, func, *args):
+    """Best wall time of repeat calls, and the result of the last one."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = perftime.perf_counter()
+        result = func(*args)
+        best = min(best, perftime.perf_counter() - started)
+    return best, result
+
+
+def _peak_rss_mib() -> float:
+    """Peak resident memory of the current process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(
+    pattern: str, days: int, replicas: int, mode: str, repeat: int
+) -> dict:
+    """Times the stages of one case, run in a fresh process."""
+    config = Config()
+    config.set_value("SIMULATION_MODE", mode)
+    workload_details = WorkloadDetails(
+        config=config,
+        project_id="project",
+        cluster_name="cluster",
+        location="location",
+        namespace="namespace",
+        controller_name="controller",
+        controller_type="Deployment",
+        container_name="container",
+    )
+    workload_df = workload_frame(pattern, days, replicas)
+
+    # Warm up imports and compiled kernels outside of the timings
+    warm_up = prepare_workload(workload_details, workload_df.iloc[:2000])
+    _analyze_configuration_plans(
+        config,
+        get_simulation_plans(workload_details, warm_up)[0],
+        workload_details,
+        warm_up,
+    )
+
+    seconds = {}
+    seconds["prepare_workload"], prepared = _best_of(
+        repeat, prepare_workload, workload_details, workload_df
+    )
+    seconds["get_simulation_plans"], (plans, _) = _best_of(
+        repeat, get_simulation_plans, workload_details, prepared
+    )
+    seconds["_analyze_configuration_plans"], analysis = _best_of(
+        repeat, _analyze_configuration_plans,
+        config, plans, workload_details, prepared
+    )
+    _, best_rec, _, simulation_dfs = analysis
+    plans_by_method = {plan.method: plan for plan in plans}
+
+    def calculate_savings():
+        for df in simulation_dfs:
+            _calculate_savings(
+                prepared, plans_by_method[df["method"].iloc[0]], df, config
+            )
+
+    seconds["_calculate_savings"], _ = _best_of(repeat, calculate_savings)
+    return {
+        "rows": len(workload_df),
+        "plans": len(plans),
+        "simulated_plans": len(simulation_dfs),
+        "best_plan": best_rec.plan.method if best_rec else None,
+        "seconds": seconds,
+        "peak_rss_mib": _peak_rss_mib(),
+    }
+
+
+def regressions(
+    results: dict,
+    baseline: dict,
+    max_slowdown: float,
+    max_rss_growth: float,
+) -> list:
+    """Messages of the cases slower or bigger than in the baseline."""
+    found = []
+    for case, result in results.items():
+        expected = baseline.get(case)
+        if expected is None:
+            continue
+        for stage, seconds in result["seconds"].items():
+            before = expected["seconds"].get(stage)
+            if (
+                before is not None
+                and seconds > before * (1 + max_slowdown)
+                and seconds - before > _MIN_SLOWDOWN_SECONDS
+            ):
+                found.append(
+                    f"{case} {stage}: {seconds:.3f}s, "
+                    f"baseline {before:.3f}s"
+                )
+        before = expected["peak_rss_mib"]
+        if result["peak_rss_mib"] > before * (1 + max_rss_growth):
+            found.append(
+                f"{case} peak RSS: {result['peak_rss_mib']:.0f} MiB, "
+                f"baseline {before:.0f} MiB"
+            )
+    return found
+
+
+def _environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--patterns", nargs="+", default=list(GENERATORS),
+        choices=list(GENERATORS)
+    )
+    parser.add_argument("--days", nargs="+", type=int, default=[1, 7, 42])
+    parser.add_argument(
+        "--replicas", nargs="+", type=int, default=[1, 50, 500]
+    )
+    parser.add_argument("--mode", default="matrix", choices=["matrix", "pool"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--baseline", type=Path,
+        default=Path(__file__).parent / "pipeline_baseline.json"
+    )
+    parser.add_argument(
+        "--update", action="store_true",
+        help="Write the results to the baseline instead of comparing."
+    )
+    parser.add_argument("--max-slowdown", type=float, default=0.25)
+    parser.add_argument("--max-rss-growth", type=float, default=0.15)
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("version") != BASELINE_VERSION:
+            sys.exit(f"{args.baseline} is not a version {BASELINE_VERSION} "
+                     "baseline, rerun with --update")
+        if baseline.get("environment") != _environment():
+            print(f"warning: {args.baseline} was recorded in another "
+                  "environment, timings may not compare")
+
+    print(f"{'case':<22}{'rows':>8}{'plans':>7}"
+          + "".join(f"{label + ' s':>11}" for label in STAGES.values())
+          + f"{'peak MiB':>10}")
+    results = {}
+    spawn = get_context("spawn")
+    for pattern in args.patterns:
+        for days in args.days:
+            for replicas in args.replicas:
+                case = f"{pattern}-{days}d-{replicas}r"
+                # A fresh process per case, so its peak RSS is its own
+                with ProcessPoolExecutor(1, mp_context=spawn) as executor:
+                    result = executor.submit(
+                        run_case, pattern, days, replicas, args.mode,
+                        args.repeat
+                    ).result()
+                results[case] = result
+                print(f"{case:<22}{result['rows']:>8}{result['plans']:>7}"
+                      + "".join(f"{result['seconds'][stage]:>11.3f}"
+                                for stage in STAGES)
+                      + f"{result['peak_rss_mib']:>10.0f}")
+
+    if args.update or not baseline:
+        cases = dict(baseline.get("cases", {}), **results)
+        args.baseline.write_text(json.dumps({
+            "version": BASELINE_VERSION,
+            "environment": _environment(),
+            "mode": args.mode,
+            "cases": cases,
+        }, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+
+    if baseline.get("mode") != args.mode:
+        print(f"warning: the baseline was recorded in "
+              f"{baseline.get('mode')!r} mode")
+    found = regressions(
+        results, baseline["cases"], args.max_slowdown, args.max_rss_growth
+    )
+    missing = sorted(set(results) - set(baseline["cases"]))
+    if missing:
+        print(f"not in the baseline: {', '.join(missing)}")
+    if found:
+        print("regressions:")
+        for message in found:
+            print(f"  {message}")
+        sys.exit(1)
+    print("no regression")
+
+
+if __name__ == "__main__":
+    main()
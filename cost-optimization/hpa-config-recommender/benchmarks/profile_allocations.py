@@ -0,0 +1,133 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Allocation profile of planning and simulating one synthetic workload:
+wall time, peak traced memory, memory retained by the results and the
+lines of the package that allocated it.
+
+    python benchmarks/profile_allocations.py --days 14 --top 10
+"""
+import argparse
+import time as perftime
+import tracemalloc
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.run_workload_simulation import (
+    plan_and_run_simulation
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails
+
+_TRACEBACK_FRAMES = 25
+
+
+def _workload_frame(days: int, seed: int = 0) -> pd.DataFrame:
+    """Aggregated diurnal workload usage, one row per minute."""
+    rng = np.random.default_rng(seed)
+    rows = days * 24 * 60
+    minutes = np.arange(rows)
+    replicas = np.full(rows, 10)
+    cpu = (
+        0.3 + 0.2 * np.sin(2 * np.pi * minutes / (24 * 60))
+        + rng.gamma(2.0, 0.02, size=rows)
+    )
+    mem = 300.0 + rng.normal(0, 5, size=rows)
+    return pd.DataFrame({
+        "window_begin": pd.date_range(
+            "2024-11-01", periods=rows, freq="60s"
+        ),
+        "num_replicas_at_usage_window": replicas,
+        "avg_container_cpu_usage": cpu,
+        "avg_container_mem_usage_mi": mem,
+        "max_containers_mem_usage_mi": mem * 1.1,
+        "stddev_containers_cpu_usage": cpu * 0.1,
+        "sum_containers_cpu_request": replicas * 1.0,
+        "sum_containers_cpu_usage": cpu * replicas,
+        "sum_containers_mem_request_mi": replicas * 1024.0,
+        "sum_containers_mem_usage_mi": mem * 1.1 * replicas,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--mode", default="matrix", choices=["matrix", "pool"])
+    args = parser.parse_args()
+
+    config = Config()
+    config.set_value("SIMULATION_MODE", args.mode)
+    workload_details = WorkloadDetails(
+        config=config,
+        project_id="project",
+        cluster_name="cluster",
+        location="location",
+        namespace="namespace",
+        controller_name="controller",
+        controller_type="Deployment",
+        container_name="container",
+    )
+    workload_df = _workload_frame(args.days)
+
+    # Warm up imports and compiled kernels outside of the profile
+    plan_and_run_simulation(workload_details, workload_df.iloc[:2000].copy())
+
+    started = perftime.perf_counter()
+    _, rec, _, simulations = plan_and_run_simulation(
+        workload_details, workload_df.copy()
+    )
+    elapsed = perftime.perf_counter() - started
+
+    tracemalloc.start(_TRACEBACK_FRAMES)
+    # Keep the results alive, their frames are part of the profile
+    results = plan_and_run_simulation(workload_details, workload_df.copy())
+    snapshot = tracemalloc.take_snapshot()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+
+    print(
+        f"{len(workload_df):,} rows, {len(simulations)} simulated plans, "
+        f"best {rec.plan.method if rec else None}"
+    )
+    print(
+        f"time {elapsed:.3f}s, peak traced memory {peak / 1024**2:.1f} MiB, "
+        f"retained by the results {retained / 1024**2:.1f} MiB"
+    )
+    print("retained memory by allocating line of the package:")
+    for line, size in _package_lines(snapshot)[:args.top]:
+        print(f"{size / 1024**2:8.2f} MiB  {line}")
+
+
+def _package_lines(snapshot: tracemalloc.Snapshot):
+    """Traced sizes grouped by their innermost frame in the package."""
+    sizes = {}
+    for stat in snapshot.statistics("traceback"):
+        frame = next(
+            (
+                frame for frame in reversed(stat.traceback)
+                if "hpaconfigrecommender" in frame.filename
+            ),
+            None,
+        )
+        if frame is None:
+            continue
+        line = f"{frame.filename.rsplit('/', 1)[-1]}:{frame.lineno}"
+        sizes[line] = sizes.get(line, 0) + stat.size
+    return sorted(sizes.items(), key=lambda item: -item[1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Monitoring Client - Shared HTTP client of the Cloud Monitoring API '''
+import asyncio
+import datetime
+import logging
+import os
+import threading
+import weakref
+from typing import Optional
+import httpx
+from google.auth import default
+from google.auth.transport.requests import Request
+from hpaconfigrecommender.utils.config import Config, USER_AGENT
+
+try:
+    import h2  # pylint: disable=unused-import
+    HTTP2_AVAILABLE = True
+except ImportError:  # HTTP/2 needs the httpx[http2] extra
+    HTTP2_AVAILABLE = False
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+MONITORING_API_URL = 'https://monitoring.googleapis.com/v3'
+
+
+def _close_client(
+    loop: asyncio.AbstractEventLoop,
+    thread: threading.Thread,
+    client: httpx.AsyncClient,
+    pid: int,
+):
+    '''Closes the connections of a client and stops its loop.'''
+    if not loop.is_running():
+        return
+    if threading.current_thread() is thread:
+        # Collected on its own loop, which cannot wait for itself
+        loop.create_task(client.aclose()).add_done_callback(
+            lambda _: loop.stop()
+        )
+        return
+    if os.getpid() == pid:
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+class MonitoringClient:
+    '''
+    Process wide client of the Monitoring API.
+
+    Requests run on an event loop owned by the client, in a daemon
+    thread, so one connection pool (and HTTP/2 connection when available)
+    is shared by every caller whatever event loop it runs on, e.g. the
+    `asyncio.run` of each workload of a fleet run. The access token is
+    cached and refreshed in a worker thread when it is about to expire,
+    and max_concurrent_requests bounds the requests in flight. The client
+    is closed by `close`, once garbage collected or at interpreter exit.
+    '''
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_concurrent_requests: int = 16,
+        http2: bool = True,
+        timeout_seconds: float = 60,
+        token_refresh_margin_seconds: int = 300,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if http2 and not HTTP2_AVAILABLE:
+            logger.warning(
+                'HTTP/2 needs the h2 package (pip install httpx[http2]), '
+                'falling back to HTTP/1.1.'
+            )
+            http2 = False
+        self.max_connections = max_connections
+        self.max_concurrent_requests = max_concurrent_requests
+        self.http2 = http2
+        self.timeout_seconds = timeout_seconds
+        self.token_refresh_margin_seconds = token_refresh_margin_seconds
+        self.token_refreshes = 0
+        self._transport = transport
+        self._credentials = None
+        self._pid = os.getpid()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever,
+            name='monitoring-client',
+            daemon=True,
+        )
+        self._thread.start()
+        # Created on the client loop, the objects bind to it
+        self._client, self._semaphore, self._token_lock = (
+            asyncio.run_coroutine_threadsafe(
+                self._create(), self._loop
+            ).result()
+        )
+        self._finalizer = weakref.finalize(
+            self, _close_client,
+            self._loop, self._thread, self._client, self._pid
+        )
+
+    async def _create(self):
+        client = httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+            ),
+            timeout=httpx.Timeout(self.timeout_seconds),
+            headers={'User-Agent': USER_AGENT},
+            transport=self._transport,
+        )
+        return (
+            client,
+            asyncio.Semaphore(self.max_concurrent_requests),
+            asyncio.Lock(),
+        )
+
+    def _token_is_fresh(self) -> bool:
+        credentials = self._credentials
+        if credentials is None or not credentials.token:
+            return False
+        if credentials.expiry is None:
+            return True
+        # google.auth expiries are naive UTC datetimes
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - now > datetime.timedelta(
+            seconds=self.token_refresh_margin_seconds
+        )
+
+    def _refresh_credentials(self):
+        '''Blocking: loads the default credentials and refreshes them.'''
+        if self._credentials is None:
+            self._credentials, _ = default()
+        self._credentials.refresh(Request())
+
+    async def _token(self, force_refresh: bool = False) -> str:
+        async with self._token_lock:
+            if force_refresh or not self._token_is_fresh():
+                await self._loop.run_in_executor(
+                    None, self._refresh_credentials
+                )
+                self.token_refreshes += 1
+                logger.debug(
+                    'Monitoring access token refreshed, expires %s.',
+                    self._credentials.expiry
+                )
+            token = self._credentials.token
+        if not token:
+            raise RuntimeError('Access token is empty or None!')
+        return token
+
+    async def _get(self, path: str, params: dict) -> httpx.Response:
+        async with self._semaphore:
+            response = None
+            for force_refresh in (False, True):
+                token = await self._token(force_refresh)
+                response = await self._client.get(
+                    f'{MONITORING_API_URL}/{path}',
+                    params=params,
+                    headers={'Authorization': f'Bearer {token}'},
+                )
+                # A revoked or clock skewed token is refreshed once
+                if response.status_code != 401:
+                    break
+            logger.debug('Request URL: %s', response.request.url)
+            logger.debug('Response Status: %s', response.status_code)
+            return response
+
+    async def get(self, path: str, params: dict) -> httpx.Response:
+        '''
+        Sends a GET request to the Monitoring API.
+
+        Args:
+            path (str): Path below the v3 API, e.g.
+                'projects/my-project/timeSeries'.
+            params (dict): Query parameters.
+
+        Returns:
+            httpx.Response: The response, whatever its status code.
+        '''
+        coro = self._get(path, dict(params))
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is self._loop:
+            return await coro
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(coro, self._loop)
+        )
+
+    @property
+    def closed(self) -> bool:
+        '''True once the client was closed or the process forked.'''
+        return self._pid != os.getpid() or not self._loop.is_running()
+
+    def close(self):
+        '''Closes the connections and stops the client loop.'''
+        self._finalizer()
+
+
+_monitoring_client: Optional[MonitoringClient] = None
+_monitoring_client_lock = threading.Lock()
+
+
+def get_monitoring_client(config: Config) -> MonitoringClient:
+    '''
+    Returns the process wide client configured by config.MONITORING_*.
+    The client is replaced when these settings change, once closed or
+    after a fork. A client replaced while open is not closed here: the
+    callers still holding it finish their requests, and it closes once
+    unused or at interpreter exit.
+    '''
+    global _monitoring_client
+    settings = (
+        config.MONITORING_MAX_CONNECTIONS,
+        config.MONITORING_MAX_CONCURRENT_REQUESTS,
+        config.MONITORING_HTTP2,
+        config.MONITORING_TIMEOUT_SECONDS,
+        config.MONITORING_TOKEN_REFRESH_MARGIN_SECONDS,
+    )
+    with _monitoring_client_lock:
+        client = _monitoring_client
+        if client is not None and not client.closed and (
+            client.max_connections, client.max_concurrent_requests,
+            client.http2, client.timeout_seconds,
+            client.token_refresh_margin_seconds,
+        ) == (
+            settings[0], settings[1], settings[2] and HTTP2_AVAILABLE,
+            *settings[3:]
+        ):
+            return client
+        client = MonitoringClient(*settings)
+        _monitoring_client = client
+        return client
@@ -0,0 +1,429 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Plan Search - Joint grid search of the HPA plan space '''
+import itertools
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple, Union
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import (
+    _RowsAboveRequest,
+    _calculate_recommended_max_cpu_capacity,
+    _get_proposed_memory_recommendation,
+    get_min_replicas,
+    prepare_workload,
+)
+from hpaconfigrecommender.quantile_index import QuantileIndex
+from hpaconfigrecommender.savings_scoring import (
+    forecast_savings,
+    savings_in_cpus,
+)
+from hpaconfigrecommender.simulation_kernel import (
+    CLASH_NONE,
+    replay_behavior,
+    replay_hpa,
+    replay_metrics,
+    resolve_backend,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.log import log_exec_time
+from hpaconfigrecommender.utils.models import (
+    HPABehavior,
+    HPAMetric,
+    PreparedWorkload,
+    WorkloadDetails,
+    WorkloadPlan,
+)
+from hpaconfigrecommender.workload_dtypes import usage_matrix
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Values of config.PLAN_SEARCH_MODE
+PLAN_SEARCH_MODES = ('heuristic', 'grid')
+
+
+@dataclass
+class SearchPoint:
+    '''
+    A replayed point of the plan space.
+
+    Attributes:
+        plan (WorkloadPlan): The plan, with its scale down window.
+        avg_saving_in_cpus (float): Mean saving per row, as the
+            simulation reports it.
+        clash_rate (float): Share of the rows where the forecast capacity
+            is below the CPU or memory usage.
+        cpu_clashes (int): Rows where the forecast CPU is below the usage.
+    '''
+    plan: WorkloadPlan
+    avg_saving_in_cpus: float
+    clash_rate: float
+    cpu_clashes: int
+
+
+@dataclass
+class PlanSearchResult:
+    '''
+    Outcome of `search_plan_space`.
+
+    Attributes:
+        frontier (List[SearchPoint]): Pareto frontier of savings against
+            clash rate, by increasing clash rate.
+        grid_size (int): Points of the grid.
+        simulations (int): Points replayed.
+        pruned (int): Points skipped because a point they are dominated by
+            clashed, or their CPU request cannot fit the usage.
+        budget_exhausted (bool): The search stopped at
+            PLAN_SEARCH_MAX_SIMULATIONS before the end of the grid.
+    '''
+    frontier: List[SearchPoint] = field(default_factory=list)
+    grid_size: int = 0
+    simulations: int = 0
+    pruned: int = 0
+    budget_exhausted: bool = False
+
+
+def _cpu_request_axis(
+    config: Config, quantiles: Dict[str, QuantileIndex]
+) -> List[Tuple[int, float]]:
+    '''
+    (percentile, CPU request) pairs at PLAN_SEARCH_CPU_REQUEST_POINTS
+    percentiles of the average container CPU usage, rounded as the DCR
+    requests and without duplicated requests.
+    '''
+    percentiles = np.linspace(
+        config.MIN_DCR_PERCENTILE_VALUE,
+        config.MAX_DCR_PERCENTILE_VALUE,
+        config.PLAN_SEARCH_CPU_REQUEST_POINTS,
+    )
+    usage = quantiles['avg_container_cpu_usage'].percentile(percentiles)
+    axis = []
+    seen = set()
+    for p, q in zip(percentiles, np.atleast_1d(usage)):
+        if np.isnan(q):
+            continue
+        cpu_request = max(
+            round(float(q), config.MCPU_ROUNDING),
+            config.MIN_CPU_CORE_PROPOSED_VALUE
+        )
+        if cpu_request not in seen:
+            seen.add(cpu_request)
+            axis.append((int(round(p)), cpu_request))
+    return axis
+
+
+def _min_replicas_axis(
+    config: Config,
+    cpu_request: float,
+    max_replicas: int,
+    max_sum_cpu_usage: float,
+) -> List[int]:
+    '''
+    Min replicas from MIN_REC_REPLICAS up to the replicas covering the
+    max usage, as the DMR candidates, largest first.
+    '''
+    upper = min(
+        max_replicas,
+        max(
+            config.MIN_REC_REPLICAS,
+            int(np.floor(max_sum_cpu_usage / cpu_request))
+        ),
+    )
+    if upper < config.MIN_REC_REPLICAS:
+        return []
+    axis = np.unique(np.round(np.linspace(
+        config.MIN_REC_REPLICAS, upper,
+        config.PLAN_SEARCH_MIN_REPLICAS_POINTS
+    )).astype(int))
+    return axis[::-1].tolist()
+
+
+def _target_cpu_axis(config: Config) -> List[float]:
+    '''Targets from MIN_HPA_TARGET_CPU to MAX_HPA_TARGET_CPU, increasing.'''
+    step = config.PLAN_SEARCH_TARGET_CPU_STEP
+    targets = np.round(np.arange(
+        config.MIN_HPA_TARGET_CPU,
+        config.MAX_HPA_TARGET_CPU + step / 2,
+        step,
+    ), 2)
+    return targets[targets <= config.MAX_HPA_TARGET_CPU].tolist()
+
+
+def _is_dominated(
+    clashed: List[Tuple[int, int, float]],
+    min_replicas: int,
+    scale_down_steps: int,
+    target_cpu: float,
+) -> bool:
+    '''
+    True when a clashed point of the same CPU request had as many min
+    replicas, as long a scale down window and as low a target: fewer
+    replicas, a shorter window or a higher target only keep fewer
+    replicas up, so the point would clash as well.
+    '''
+    return any(
+        m >= min_replicas and w >= scale_down_steps and t <= target_cpu
+        for m, w, t in clashed
+    )
+
+
+def _score_point(
+    config: Config,
+    prepared: PreparedWorkload,
+    plan: WorkloadPlan,
+    forecast_replicas: np.ndarray,
+) -> SearchPoint:
+    '''
+    Savings and clashes of a replay, with the arithmetic of the
+    simulation, see `savings_scoring`.
+    '''
+    forecast_sum_cpu = forecast_replicas * plan.recommended_cpu_request
+    forecast_sum_mem = (
+        forecast_replicas * plan.recommended_mem_request_and_limits_mi
+    )
+    avg_saving_in_cpus = savings_in_cpus(
+        *forecast_savings(
+            prepared,
+            plan.recommended_cpu_request,
+            plan.recommended_mem_request_and_limits_mi,
+            forecast_replicas,
+        ),
+        config.COST_OF_GB_IN_CPUS
+    )
+    cpu_clash = prepared.sum_cpu_usage > forecast_sum_cpu
+    clash = cpu_clash | (prepared.sum_mem_usage_mi > forecast_sum_mem)
+    return SearchPoint(
+        plan=plan,
+        # Same as the pandas mean, missing rows are skipped
+        avg_saving_in_cpus=float(
+            pd.Series(avg_saving_in_cpus, copy=False).mean()
+        ),
+        clash_rate=float(np.count_nonzero(clash)) / len(prepared),
+        cpu_clashes=int(np.count_nonzero(cpu_clash)),
+    )
+
+
+def pareto_frontier(points: List[SearchPoint]) -> List[SearchPoint]:
+    '''
+    The points no other point beats on both savings and clash rate, by
+    increasing clash rate.
+    '''
+    ordered = sorted(
+        points, key=lambda point: (point.clash_rate, -point.avg_saving_in_cpus)
+    )
+    frontier = []
+    best_saving = -np.inf
+    for point in ordered:
+        if point.avg_saving_in_cpus > best_saving:
+            frontier.append(point)
+            best_saving = point.avg_saving_in_cpus
+    return frontier
+
+
+@log_exec_time(logger)
+def search_plan_space(
+    workload_details: WorkloadDetails,
+    workload_df: Union[pd.DataFrame, PreparedWorkload],
+) -> PlanSearchResult:
+    '''
+    Searches CPU request x min replicas x target CPU x scale down window
+    jointly with the replay kernel.
+
+    Every CPU request shares the memory request of the DCR plans and the
+    max replicas of its DCR plan. Requests whose max replicas cannot fit
+    the usage peaks are skipped as a whole. Within a request, points are
+    replayed from the most to the least provisioned (more min replicas,
+    longer window, lower target first) and a point is skipped when a
+    point it is dominated by clashed, see `_is_dominated`. Replays stop
+    once PLAN_SEARCH_MAX_CLASH_RATE of the rows clashed, and the search
+    stops after PLAN_SEARCH_MAX_SIMULATIONS replays.
+
+    Args:
+        workload_details (WorkloadDetails): Details of the workload.
+        workload_df: Workload frame, or the workload prepared by
+            `prepare_workload`.
+
+    Returns:
+        PlanSearchResult: The Pareto frontier and the search counters.
+    '''
+    config = workload_details.config
+    result = PlanSearchResult()
+    if len(workload_df) == 0:
+        return result
+
+    prepared = prepare_workload(workload_details, workload_df)
+    frame = prepared.frame
+    max_cpu_capacity = _calculate_recommended_max_cpu_capacity(
+        config, frame, prepared.quantiles
+    )
+    if max_cpu_capacity == 0:
+        return result
+
+    backend = resolve_backend(config.SIMULATION_BACKEND)
+    # The reference loop needs a recommendation, the kernel is identical
+    backend = 'kernel' if backend == 'python' else backend
+    max_cpu_clashes = int(config.PLAN_SEARCH_MAX_CLASH_RATE * len(prepared))
+    behavior = replay_behavior(
+        HPABehavior.from_config(config), config.DISTANCE_BETWEEN_POINTS_SECONDS
+    )
+    metrics = replay_metrics([
+        HPAMetric.from_spec(spec) for spec in config.HPA_METRICS
+    ])
+    metric_values = usage_matrix(frame, metrics.columns)
+    startup_latency = prepared.workload_e2e_startup_latency_rows
+    startup_cpu_usage = prepared.running_max_sum_cpu_usage[
+        min(startup_latency, len(prepared) - 1)
+    ]
+    sum_cpu_usage = prepared.quantiles['sum_containers_cpu_usage']
+    max_mem_usage_mi = float(np.nanmax(prepared.sum_mem_usage_mi))
+    mem_request_mi = _get_proposed_memory_recommendation(
+        config,
+        frame,
+        max(
+            get_min_replicas(frame, config, prepared.quantiles),
+            config.MIN_REC_REPLICAS
+        ),
+    )
+    rows_above = _RowsAboveRequest(prepared)
+    targets = _target_cpu_axis(config)
+    windows = sorted(set(config.PLAN_SEARCH_SCALE_DOWN_STEPS), reverse=True)
+
+    points = []
+    for percentile, cpu_request in _cpu_request_axis(
+        config, prepared.quantiles
+    ):
+        max_replicas = int(np.ceil(max_cpu_capacity / cpu_request))
+        min_replicas_axis = _min_replicas_axis(
+            config, cpu_request, max_replicas, sum_cpu_usage.max()
+        )
+        group_size = len(min_replicas_axis) * len(windows) * len(targets)
+        result.grid_size += group_size
+
+        maxima = rows_above.maxima(cpu_request)
+        if (
+            maxima is None
+            or round(maxima[0], 2) > config.HPA_SCALE_LIMIT
+            or max_replicas * mem_request_mi < max_mem_usage_mi
+            or sum_cpu_usage.count_above(max_replicas * cpu_request)
+            > max_cpu_clashes
+        ):
+            result.pruned += group_size
+            continue
+        max_slope_ratio, max_startup_cpu_usage = maxima
+
+        clashed = []
+        # Most provisioned points first, their clashes prune the others
+        for min_replicas, scale_down_steps, target_cpu in itertools.product(
+            min_replicas_axis, windows, targets
+        ):
+            if _is_dominated(
+                clashed, min_replicas, scale_down_steps, target_cpu
+            ):
+                result.pruned += 1
+                continue
+            if result.simulations >= config.PLAN_SEARCH_MAX_SIMULATIONS:
+                result.budget_exhausted = True
+                break
+            result.simulations += 1
+            starting_replica = int(np.clip(
+                np.ceil(startup_cpu_usage / cpu_request),
+                min_replicas,
+                max_replicas
+            ))
+            forecast_replicas, _, _, _, clash_kind = replay_hpa(
+                backend,
+                prepared.sum_cpu_usage,
+                prepared.sum_mem_usage_mi,
+                min_replicas,
+                max_replicas,
+                cpu_request,
+                mem_request_mi,
+                target_cpu,
+                startup_latency,
+                scale_down_steps,
+                starting_replica,
+                max_cpu_clashes,
+                behavior,
+                metrics,
+                metric_values,
+            )
+            if clash_kind != CLASH_NONE:
+                clashed.append((min_replicas, scale_down_steps, target_cpu))
+                continue
+            plan = WorkloadPlan(
+                recommended_cpu_request=cpu_request,
+                recommended_mem_request_and_limits_mi=mem_request_mi,
+                recommended_cpu_limit_or_unbounded=np.ceil(
+                    cpu_request + max_startup_cpu_usage / max_replicas
+                ),
+                recommended_min_replicas=min_replicas,
+                recommended_max_replicas=max_replicas,
+                recommended_hpa_target_cpu=target_cpu,
+                max_usage_slope_up_ratio=round(max_slope_ratio, 2),
+                workload_e2e_startup_latency_rows=startup_latency,
+                method=(
+                    f"GRID-{percentile}_min{min_replicas}"
+                    f"_t{target_cpu:.2f}_sd{scale_down_steps}"
+                ),
+                hpa_scale_down_steps=scale_down_steps,
+            )
+            points.append(
+                _score_point(config, prepared, plan, forecast_replicas)
+            )
+        if result.budget_exhausted:
+            break
+
+    result.frontier = pareto_frontier(points)
+    logger.info(
+        'Plan search replayed %d of %d points (%d pruned%s), %d on the '
+        'Pareto frontier.',
+        result.simulations,
+        result.grid_size,
+        result.pruned,
+        ', budget exhausted' if result.budget_exhausted else '',
+        len(result.frontier),
+    )
+    return result
+
+
+def get_search_plans(
+    workload_details: WorkloadDetails,
+    workload_df: Union[pd.DataFrame, PreparedWorkload],
+) -> List[WorkloadPlan]:
+    '''
+    Plans of the Pareto frontier within CPU_CLASH_COUNT_THRESHOLD, to be
+    simulated with the other plans when config.PLAN_SEARCH_MODE is 'grid'.
+
+    Returns:
+        List[WorkloadPlan]: The plans, empty with the 'heuristic' mode.
+
+    Raises:
+        ValueError: If config.PLAN_SEARCH_MODE is not a known mode.
+    '''
+    config = workload_details.config
+    if config.PLAN_SEARCH_MODE not in PLAN_SEARCH_MODES:
+        raise ValueError(
+            f'Unknown PLAN_SEARCH_MODE {config.PLAN_SEARCH_MODE!r}, '
+            f'expected one of {PLAN_SEARCH_MODES}'
+        )
+    if config.PLAN_SEARCH_MODE == 'heuristic':
+        return []
+    result = search_plan_space(workload_details, workload_df)
+    return [
+        point.plan for point in result.frontier
+        if point.cpu_clashes <= config.CPU_CLASH_COUNT_THRESHOLD
+    ]
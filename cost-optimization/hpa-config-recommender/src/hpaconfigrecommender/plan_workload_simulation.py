@@ -14,23 +14,55 @@
 
 """ HPA Simulation Plan """
 import logging
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Union
 import pandas as pd
 import numpy as np
 from .utils.config import Config
 from .utils.models import (
+    PreparedWorkload,
     WorkloadDetails,
     WorkloadPlan,
 )
 from .utils.log import (
     log_exec_time
 )
+from .quantile_index import (
+    QuantileIndex,
+    build_quantile_indexes,
+)
+from .sliding_window import forward_window_max, running_max
+from .workload_dtypes import (
+    compact_usage_columns,
+    frame_memory_report,
+    usage_series,
+    usage_values,
+)
 
 # Configure logger
 logger = logging.getLogger(__name__)
 # Configure pandas to copy on writing in a view
 pd.options.mode.copy_on_write = True
 
+# Columns added by `_calculate_max_usage_slope_up_ratio`
+SLOPE_COLUMNS = [
+    "max_cpu_usage_in_workload_e2e_startup_latency",
+    "max_mem_usage_mi_in_workload_e2_startup_latency",
+    "max_usage_slope_up_ratio",
+]
+
+def _column_index(
+    workload_df: pd.DataFrame,
+    col: str,
+    quantiles: Optional[Dict[str, QuantileIndex]] = None,
+) -> QuantileIndex:
+    """
+    The quantile index of a column, from the indexes of the prepared
+    workload when given, built from the frame otherwise.
+    """
+    if quantiles is not None and col in quantiles:
+        return quantiles[col]
+    return QuantileIndex(usage_values(workload_df, col))
+
 def _get_proposed_memory_recommendation(
         config: Config,
         workload_df:pd.DataFrame,
@@ -54,7 +86,7 @@ def _get_proposed_memory_recommendation(
     """
 
     total_memory_capacity= (
-        workload_df["sum_containers_mem_usage_mi"].max()
+        usage_series(workload_df, "sum_containers_mem_usage_mi").max()
     )
     proposed_min_replicas = max(
         proposed_min_replicas, config.MIN_REC_REPLICAS
@@ -135,8 +167,12 @@ def _is_workload_balanced(workload_df: pd.DataFrame) -> bool:
         return None
 
     try:
-        avg_cpu_usage = workload_df["avg_container_cpu_usage"].mean()
-        stddev_cpu_usage = workload_df["stddev_containers_cpu_usage"].mean()
+        avg_cpu_usage = (
+            usage_series(workload_df, "avg_container_cpu_usage").mean()
+        )
+        stddev_cpu_usage = (
+            usage_series(workload_df, "stddev_containers_cpu_usage").mean()
+        )
 
         if avg_cpu_usage == 0:
             logger.info("Division by zero in workload balancing calculation.")
@@ -154,7 +190,8 @@ def _is_workload_balanced(workload_df: pd.DataFrame) -> bool:
         return True
 
 def _is_cpu_under_provisioned(config: Config,
-        workload_df: pd.DataFrame) -> bool:
+        workload_df: pd.DataFrame,
+        quantiles: Optional[Dict[str, QuantileIndex]] = None) -> bool:
     """
     Determines if the CPU is under-provisioned by comparing the
     maximum CPU request with the 90th percentile of CPU usage.
@@ -162,6 +199,7 @@ def _is_cpu_under_provisioned(config: Config,
     Args:
         df (pd.DataFrame): DataFrame containing the columns.
         config (Config): Run configurations.
+        quantiles: Quantile indexes of the prepared workload, if any.
 
     Returns:
         bool: True if CPU is under-provisioned, otherwise False.
@@ -178,17 +216,16 @@ def _is_cpu_under_provisioned(config: Config,
     max_cpu_request = (
         workload_df.get("avg_container_cpu_request", pd.Series(0)).max()
     )
-    cpu_usage_percentile = (
-        workload_df["avg_container_cpu_usage"].quantile(
-        underprovisioned_cpu_usage_threshold
-        )
-    )
+    cpu_usage_percentile = _column_index(
+        workload_df, "avg_container_cpu_usage", quantiles
+    ).quantile(underprovisioned_cpu_usage_threshold)
 
     return max_cpu_request < cpu_usage_percentile
 
 
 def _calculate_recommended_max_cpu_capacity(
-        config: Config,workload_df: pd.DataFrame) -> int:
+        config: Config,workload_df: pd.DataFrame,
+        quantiles: Optional[Dict[str, QuantileIndex]] = None) -> int:
     """
     Calculate the recommended maximum HPA capacity based on container
     CPU usage and requests.
@@ -197,20 +234,23 @@ def _calculate_recommended_max_cpu_capacity(
         df (pd.DataFrame): DataFrame containing 'sum_containers_cpu_request'
                            and 'sum_containers_cpu_usage' columns.
         config (Config): Run configurations.
+        quantiles: Quantile indexes of the prepared workload, if any.
 
     Returns:
         float: Recommended HPA max capacity for the workload.
     """
 
-    if _is_cpu_under_provisioned(config,workload_df):
+    if _is_cpu_under_provisioned(config, workload_df, quantiles):
         sum_original_cpu_capacity = (
-            workload_df["sum_containers_cpu_usage"].max() *
+            _column_index(
+                workload_df, "sum_containers_cpu_usage", quantiles
+            ).max() *
             config.EXTRA_HPA_BUFFER_FOR_CPU_USAGE_CAPACITY
         )
         logger.info("The CPU is under-provisioned.")
     else:
         sum_original_cpu_capacity = (
-            workload_df["sum_containers_cpu_request"].max()
+            usage_series(workload_df, "sum_containers_cpu_request").max()
         )
         logger.info("The CPU is not under-provisioned.")
 
@@ -220,37 +260,47 @@ def _calculate_recommended_max_cpu_capacity(
 
 def _vpa_recommendation(
         config: Config,
-        workload_df: pd.DataFrame) -> WorkloadPlan:
+        workload_df: pd.DataFrame,
+        quantiles: Optional[Dict[str, QuantileIndex]] = None
+        ) -> WorkloadPlan:
     """
     Static workload recommendation
 
     Args:
         config (Config): _description_
         workload_df (pd.DataFrame): _description_
+        quantiles: Quantile indexes of the prepared workload, if any.
 
     Returns:
         WorkloadPlan
     """
+    sum_cpu_usage = _column_index(
+        workload_df, "sum_containers_cpu_usage", quantiles
+    )
     num_of_replicas = max(
-        workload_df["num_replicas_at_usage_window"].min(),
+        int(_column_index(
+            workload_df, "num_replicas_at_usage_window", quantiles
+        ).min()),
           config.MIN_REC_REPLICAS
           )
     vpa_plan = WorkloadPlan(
         method= "VPA",
         recommended_cpu_request = round(
            (
-               workload_df["sum_containers_cpu_usage"].quantile(0.98)/num_of_replicas
+               sum_cpu_usage.quantile(0.98)/num_of_replicas
             ) * config.EXTRA_HPA_BUFFER_FOR_CPU_USAGE_CAPACITY
 
         ,3),
         recommended_cpu_limit_or_unbounded = np.ceil(
             (
-                workload_df['sum_containers_cpu_usage'].max()/ num_of_replicas
+                sum_cpu_usage.max()
+                / num_of_replicas
             ) * config.EXTRA_HPA_BUFFER_FOR_CPU_USAGE_CAPACITY
         ),
         recommended_mem_request_and_limits_mi = np.ceil(
             (
-            workload_df["sum_containers_mem_usage_mi"].max()/num_of_replicas
+            usage_series(workload_df, "sum_containers_mem_usage_mi").max()
+            / num_of_replicas
             ) * config.EXTRA_VPA_BUFFER_FOR_MEMORY_RECOMMENDATION
         ),
         recommended_min_replicas = num_of_replicas,
@@ -263,7 +313,8 @@ def _vpa_recommendation(
 def _dynamic_cpu_request(
     config: Config,
     max_cpu_capacity: float,
-    workload_df: pd.DataFrame
+    workload_df: pd.DataFrame,
+    quantiles: Optional[Dict[str, QuantileIndex]] = None
 ) -> List[WorkloadPlan]:
     """
 
@@ -278,6 +329,7 @@ def _dynamic_cpu_request(
         max_cpu_capacity (float): Maximum CPU capacity observed in the workload.
         workload_df (pd.DataFrame): DataFrame containing workload CPU and memory
          metrics.
+        quantiles: Quantile indexes of the prepared workload, if any.
 
     Returns:
         List[WorkloadPlan]: List of recommended HPA configurations based on
@@ -286,7 +338,7 @@ def _dynamic_cpu_request(
     """
      # Calculate minimum replicas and memory request
     min_replicas = max(
-        get_min_replicas(workload_df, config),
+        get_min_replicas(workload_df, config, quantiles),
         config.MIN_REC_REPLICAS
     )
     proposed_mem_request_mi = _get_proposed_memory_recommendation(
@@ -300,15 +352,15 @@ def _dynamic_cpu_request(
     )
 
     # Calculate CPU requests for all percentiles at once
-    quantiles = np.percentile(
-        workload_df["avg_container_cpu_usage"], percentiles
-    )
+    cpu_usage_percentiles = _column_index(
+        workload_df, "avg_container_cpu_usage", quantiles
+    ).percentile(percentiles)
 
     # Round and enforce minimum CPU core value constraint
     cpu_request_percentiles = [
         (p, max(round(q, config.MCPU_ROUNDING),
                 config.MIN_CPU_CORE_PROPOSED_VALUE))
-        for p, q in zip(percentiles, quantiles)
+        for p, q in zip(percentiles, cpu_usage_percentiles)
     ]
 
     proposed_cpu_requests = []
@@ -341,7 +393,8 @@ def _dynamic_cpu_request(
 def _dynamic_min_replicas(
     config: Config,
     max_cpu_capacity: float,
-    workload_df: pd.DataFrame
+    workload_df: pd.DataFrame,
+    quantiles: Optional[Dict[str, QuantileIndex]] = None
 ) -> List[WorkloadPlan]:
     """
     Generate dynamic minimum replicas (DMR) options based on workload metrics.
@@ -354,18 +407,14 @@ def _dynamic_min_replicas(
         max_cpu_capacity (float): Maximum CPU capacity observed in the workload.
         workload_df (pd.DataFrame): DataFrame containing workload CPU and memory
          metrics.
+        quantiles: Quantile indexes of the prepared workload, if any.
 
     Returns:
         List[WorkloadPlan]: List of recommended HPA configurations.
     """
-    min_replicas_options = []
-    seen_combinations = set()
-
-    # Determine if workload is balanced and compute the proposed CPU request
-
-    scaling_method = "mean" 
+    scaling_method = "mean"
     proposed_cpu_request = round(
-        workload_df["avg_container_cpu_usage"].mean(),
+        usage_series(workload_df, "avg_container_cpu_usage").mean(),
         config.MCPU_ROUNDING
     )
 
@@ -374,46 +423,44 @@ def _dynamic_min_replicas(
             "Proposed CPU request is 0. No replicas can be recommended.")
         return []
 
-    # Initialize loop variables
-    min_replicas = config.MIN_REC_REPLICAS
-    max_replicas = int(np.ceil(max_cpu_capacity / proposed_cpu_request))
-
-    # Iterate using a while loop to handle dynamic recalculations
-    while min_replicas < max_replicas:
-
-        # Calculate CPU request per replica
-        cpu_request = max(
-            round(proposed_cpu_request, 3),
-            config.MIN_CPU_CORE_PROPOSED_VALUE
+    # Every candidate shares the CPU request, the max replicas and so the
+    # memory request, only the min replicas change
+    cpu_request = max(
+        round(proposed_cpu_request, 3),
+        config.MIN_CPU_CORE_PROPOSED_VALUE
+    )
+    first_min_replicas = config.MIN_REC_REPLICAS
+    if first_min_replicas >= int(
+        np.ceil(max_cpu_capacity / proposed_cpu_request)
+    ):
+        return []
+    max_replicas = int(np.ceil(max_cpu_capacity / cpu_request))
+    max_sum_cpu_usage = _column_index(
+        workload_df, "sum_containers_cpu_usage", quantiles
+    ).max()
+
+    # Min replicas up to max replicas, as long as the min replicas capacity
+    # is not above the max usage
+    candidates = np.arange(
+        first_min_replicas, max(max_replicas, first_min_replicas + 1)
+    )
+    above_usage = np.flatnonzero(candidates * cpu_request > max_sum_cpu_usage)
+    if len(above_usage):
+        candidates = candidates[:above_usage[0]]
+
+    proposed_mem_request_mi = np.ceil(_get_proposed_memory_recommendation(
+        config, workload_df, max_replicas
+    ))
+    min_replicas_options = [
+        WorkloadPlan(
+            recommended_cpu_request=cpu_request,
+            recommended_mem_request_and_limits_mi=proposed_mem_request_mi,
+            recommended_min_replicas=min_replicas,
+            recommended_max_replicas=max_replicas,
+            method=f"DMR_{scaling_method}-loop_{min_replicas}",
         )
-        if (min_replicas * cpu_request) > (
-            workload_df["sum_containers_cpu_usage"].max()):
-            break
-
-        # Recalculate max replicas based on updated CPU request
-        max_replicas = int(np.ceil(max_cpu_capacity / cpu_request))
-        # Calculate memory request per replica
-        proposed_mem_request_mi = _get_proposed_memory_recommendation(
-            config, workload_df, max_replicas
-            )
-
-        # Avoid duplicate combinations
-        combination = (cpu_request, min_replicas, max_replicas)
-        if combination not in seen_combinations:
-            seen_combinations.add(combination)
-            min_replicas_options.append(
-                WorkloadPlan(
-                    recommended_cpu_request=cpu_request,
-                    recommended_mem_request_and_limits_mi=np.ceil(
-                        proposed_mem_request_mi),
-                    recommended_min_replicas=min_replicas,
-                    recommended_max_replicas=max_replicas,
-                    method=f"DMR_{scaling_method}-loop_{min_replicas}",
-                )
-            )
-
-        # Increment min_replicas
-        min_replicas += 1
+        for min_replicas in candidates.tolist()
+    ]
 
     logger.info(
         "Generated %d Dynamic Minimum Replicas (DMR-%s) "
@@ -431,7 +478,8 @@ def _calculate_max_usage_slope_up_ratio(
     """
     Updates the input DataFrame in place by calculating the
     'max_usage_slope_up_ratio' column while preserving the intermediate
-    columns for CPU and memory usage during startup latency.
+    columns for CPU and memory usage during startup latency. The window
+    maxima are computed by `sliding_window.forward_window_max`.
 
     Args:
         workload_df (pd.DataFrame): DataFrame containing workload metrics
@@ -450,46 +498,97 @@ def _calculate_max_usage_slope_up_ratio(
             "workload_e2e_startup_latency_rows must be greater than 0."
         )
 
-    # Create a rolling window indexer
-    forward_looking = pd.api.indexers.FixedForwardWindowIndexer(
-        window_size=workload_e2e_startup_latency_rows
-    )
+    avg_cpu_usage = usage_values(workload_df, "avg_container_cpu_usage")
+    max_mem_usage_mi = usage_values(workload_df, "max_containers_mem_usage_mi")
 
-    # Compute rolling max for CPU and memory usage, and keep the columns
-    workload_df["max_cpu_usage_in_workload_e2e_startup_latency"] = (
-        workload_df["avg_container_cpu_usage"]
-        .rolling(window=forward_looking)
-        .max()
+    # Compute the forward rolling max for CPU and memory usage, and keep
+    # the columns
+    max_cpu_usage_in_latency = forward_window_max(
+        avg_cpu_usage, workload_e2e_startup_latency_rows
     )
-
-    workload_df["max_mem_usage_mi_in_workload_e2_startup_latency"] = (
-        workload_df["max_containers_mem_usage_mi"]
-        .rolling(window=forward_looking)
-        .max()
+    max_mem_usage_mi_in_latency = forward_window_max(
+        max_mem_usage_mi, workload_e2e_startup_latency_rows
     )
 
     # Compute CPU and memory ratios safely (avoiding division by zero)
-    cpu_ratio = (
-        workload_df["max_cpu_usage_in_workload_e2e_startup_latency"]
-        / workload_df["avg_container_cpu_usage"].replace(0, np.nan)
+    with np.errstate(invalid="ignore"):
+        cpu_ratio = max_cpu_usage_in_latency / np.where(
+            avg_cpu_usage == 0, np.nan, avg_cpu_usage
+        )
+        mem_ratio = max_mem_usage_mi_in_latency / np.where(
+            max_mem_usage_mi == 0, np.nan, max_mem_usage_mi
+        )
+
+    workload_df["max_cpu_usage_in_workload_e2e_startup_latency"] = (
+        max_cpu_usage_in_latency
     )
-    mem_ratio = (
-        workload_df["max_mem_usage_mi_in_workload_e2_startup_latency"]
-        / workload_df["max_containers_mem_usage_mi"].replace(0, np.nan)
+    workload_df["max_mem_usage_mi_in_workload_e2_startup_latency"] = (
+        max_mem_usage_mi_in_latency
     )
-
     # Compute the max usage slope-up ratio as the element-wise maximum
     workload_df["max_usage_slope_up_ratio"] = np.maximum(
-        cpu_ratio.fillna(0), mem_ratio.fillna(0)
+        np.nan_to_num(cpu_ratio, nan=0.0), np.nan_to_num(mem_ratio, nan=0.0)
     )
 
     return workload_df
 
 
+class _RowsAboveRequest:
+    """
+    Rows of a workload frame sorted by average CPU usage, with the max
+    slope ratio and startup CPU usage of every suffix. The maxima over
+    the rows at or above a CPU request are read with one binary search,
+    instead of filtering the frame for every plan.
+    """
+
+    def __init__(self, workload: Union[pd.DataFrame, PreparedWorkload]):
+        if isinstance(workload, PreparedWorkload):
+            max_usage_slope_up_ratio = workload.max_usage_slope_up_ratio
+            max_cpu_usage_in_startup_latency = (
+                workload.max_cpu_usage_in_startup_latency
+            )
+            workload = workload.frame
+        else:
+            max_usage_slope_up_ratio = usage_values(
+                workload, "max_usage_slope_up_ratio"
+            )
+            max_cpu_usage_in_startup_latency = usage_values(
+                workload, "max_cpu_usage_in_workload_e2e_startup_latency"
+            )
+        avg_cpu_usage = usage_values(workload, "avg_container_cpu_usage")
+        valid = np.flatnonzero(~np.isnan(avg_cpu_usage))
+        order = valid[np.argsort(avg_cpu_usage[valid], kind="stable")]
+        self.avg_cpu_usage = avg_cpu_usage[order]
+        self.max_usage_slope_up_ratio = self._suffix_max(
+            max_usage_slope_up_ratio[order]
+        )
+        self.max_cpu_usage_in_startup_latency = self._suffix_max(
+            max_cpu_usage_in_startup_latency[order]
+        )
+
+    @staticmethod
+    def _suffix_max(values: np.ndarray) -> np.ndarray:
+        # fmax skips missing values, as pandas max does
+        return np.fmax.accumulate(values[::-1])[::-1]
+
+    def maxima(self, cpu_request: float) -> Optional[Tuple[float, float]]:
+        """
+        Max slope ratio and startup CPU usage of the rows with an average
+        CPU usage at or above cpu_request, None when there are none.
+        """
+        start = np.searchsorted(self.avg_cpu_usage, cpu_request, side="left")
+        if start == len(self.avg_cpu_usage):
+            return None
+        return (
+            self.max_usage_slope_up_ratio[start],
+            self.max_cpu_usage_in_startup_latency[start],
+        )
+
 def _get_recommended_configs(
     config: Config,
     plan: WorkloadPlan,
-    workload_df: pd.DataFrame
+    workload_df: pd.DataFrame,
+    rows_above: Optional[_RowsAboveRequest] = None
     ) -> Tuple[Optional[WorkloadPlan], Optional[str]]:
     """
     Calculates the recommended HPA configurations based on the workload
@@ -501,6 +600,8 @@ def _get_recommended_configs(
         plan (WorkloadPlan): The HPA plan with initial
             recommendations.
         config (Config): Run configurations.
+        rows_above (_RowsAboveRequest): The index of workload_df shared by
+            the plans, built when None.
 
     Returns:
         Tuple[WorkloadPlan,str]: The updated HPA plan
@@ -508,12 +609,12 @@ def _get_recommended_configs(
         is skipped or invalid.
     """
     reason = {}
-    # Filter only the points above what is recommended as baseline requests
+    if rows_above is None:
+        rows_above = _RowsAboveRequest(workload_df)
+    # Only the points above what is recommended as baseline requests
     plan_request_baseline = plan.recommended_cpu_request
-    filtered_df = workload_df[
-        workload_df["avg_container_cpu_usage"] >= plan_request_baseline
-    ]
-    if filtered_df.empty:
+    maxima = rows_above.maxima(plan_request_baseline)
+    if maxima is None:
         reason = (
             f"Skip HPA Plan {plan.method}. "
             f"No usage above CPU baseline requests:{plan_request_baseline:.2f}."
@@ -521,10 +622,10 @@ def _get_recommended_configs(
         logger.info(reason)
         return None, reason
 
+    max_slope_ratio, max_startup_cpu_usage = maxima
+
     # Check if slopes are too big
-    max_usage_slope_up_ratio = round(
-        filtered_df["max_usage_slope_up_ratio"].max(), 2
-    )
+    max_usage_slope_up_ratio = round(max_slope_ratio, 2)
     if max_usage_slope_up_ratio > config.HPA_SCALE_LIMIT:
         reason = (
             f"Skip HPA Plan {plan.method}. Slope ratio "
@@ -535,12 +636,11 @@ def _get_recommended_configs(
         return None, reason
 
     plan.max_usage_slope_up_ratio = max_usage_slope_up_ratio
-    plan.recommended_hpa_target_cpu = round(
-        (
-            (1 - config.HPA_TARGET_BUFFER) /
-            filtered_df["max_usage_slope_up_ratio"]
-        ).min(), 2
-    )
+    # The min target over the rows is the one of the max slope
+    with np.errstate(divide="ignore"):
+        plan.recommended_hpa_target_cpu = round(
+            (1 - config.HPA_TARGET_BUFFER) / max_slope_ratio, 2
+        )
     min_hpa_target_cpu = config.MIN_HPA_TARGET_CPU
     max_hpa_target_cpu = config.MAX_HPA_TARGET_CPU
     if plan.recommended_hpa_target_cpu < min_hpa_target_cpu or \
@@ -555,27 +655,30 @@ def _get_recommended_configs(
 
     plan.recommended_cpu_limit_or_unbounded = np.ceil(
         plan.recommended_cpu_request + (
-            filtered_df[
-                "max_cpu_usage_in_workload_e2e_startup_latency"
-            ].max() / plan.recommended_max_replicas
+            max_startup_cpu_usage / plan.recommended_max_replicas
         )
     )
     return plan, None
 
-def convert_data_types(workload_df: pd.DataFrame) -> pd.DataFrame:
+def convert_data_types(
+    workload_df: pd.DataFrame, config: Optional[Config] = None
+) -> pd.DataFrame:
     """
     Converts data types of specific columns in a workload DataFrame for
     memory efficiency and optimized performance.
 
     - Converts 'window_begin' to datetime64 format.
     - Converts 'num_replicas_at_usage_window' to Int16 (nullable).
-    - Converts CPU-related columns to float16 for reduced memory usage.
-    - Converts memory-related columns to Int64 (nullable) for larger
-      integer capacity.
+    - Converts the CPU and memory columns to the compact representation
+      of config.WORKLOAD_COLUMN_DTYPES: by default CPU in int32 millicores
+      and memory in uint32 MiB (KiB for the usage), nullable when values
+      are missing. Read them with `workload_dtypes.usage_series` or
+      `usage_values`.
 
     Parameters:
         workload_df (pd.DataFrame): The DataFrame containing workload data
                                     with specific columns for conversion.
+        config (Config): Run configurations, the class defaults when None.
 
     Returns:
         pd.DataFrame: DataFrame with columns converted to optimized data types.
@@ -583,6 +686,7 @@ def convert_data_types(workload_df: pd.DataFrame) -> pd.DataFrame:
     Raises:
         KeyError: If any required column is missing from the input DataFrame.
     """
+    config = config or Config
     # Convert to datetime[s] and remove timezone awareness
     workload_df["window_begin"] = pd.to_datetime(
         workload_df["window_begin"], errors="coerce"
@@ -595,31 +699,17 @@ def convert_data_types(workload_df: pd.DataFrame) -> pd.DataFrame:
         .astype("Int16")
     )
 
-    # Convert metrics to appropriate numeric types
-    float16_columns = [
-        "avg_container_cpu_usage",
-        "stddev_containers_cpu_usage",
-        "sum_containers_cpu_request",
-        "sum_containers_cpu_usage"
-    ]
-
-    float32_columns = [
-        "sum_containers_mem_request_mi",
-        "sum_containers_mem_usage_mi"
-    ]
-
-    for col in float16_columns:
-        workload_df[col] = (
-            pd.to_numeric(workload_df[col], errors="coerce").astype("float16")
-            )
-
-    for col in float32_columns:
-        workload_df[col] = (
-            pd.to_numeric(workload_df[col], errors="coerce").astype("float32")
-            )
+    workload_df = compact_usage_columns(
+        workload_df, config.WORKLOAD_COLUMN_DTYPES
+    )
+    frame_memory_report(workload_df, "workload frame")
     return workload_df
 
-def get_min_replicas(workload_df: pd.DataFrame, config: Config)-> int:
+def get_min_replicas(
+    workload_df: pd.DataFrame,
+    config: Config,
+    quantiles: Optional[Dict[str, QuantileIndex]] = None
+)-> int:
     """
     Due to node autoscaling, workloads can be evicted and, during a small
     portion of the time, they can get to a smaller than desired number of
@@ -628,22 +718,103 @@ def get_min_replicas(workload_df: pd.DataFrame, config: Config)-> int:
     Because of such a situation, we return the number of replicas at 10th
     percentile. The 0.1 was arbritary and may be revisited in the future.
     """
-    df = workload_df[workload_df["num_replicas_at_usage_window"] > 0]
-    if df.empty:
+    replicas = _column_index(
+        workload_df, "num_replicas_at_usage_window", quantiles
+    ).above(0)
+    if not len(replicas):
         return config.MIN_REC_REPLICAS
-    min_replicas_at_10p = df["num_replicas_at_usage_window"].quantile(0.1)
+    min_replicas_at_10p = replicas.quantile(0.1)
     return int(min_replicas_at_10p)
 
+def _read_only(values: np.ndarray) -> np.ndarray:
+    """Marks an array shared by the consumers of a workload read only."""
+    values.flags.writeable = False
+    return values
+
+def prepare_workload(
+    workload_details: WorkloadDetails,
+    workload: Union[pd.DataFrame, PreparedWorkload],
+    quantiles: Optional[Dict[str, QuantileIndex]] = None
+) -> PreparedWorkload:
+    """
+    Prepares a workload frame once for planning, simulation and savings.
+
+    The frame is converted by `convert_data_types`, sorted by window_begin
+    with a RangeIndex, and extended with the startup latency columns of
+    `_calculate_max_usage_slope_up_ratio`. The replay and savings columns
+    and the window maxima are decoded once to read only float64 arrays, and the columns queried
+    by planning are indexed by `quantile_index.build_quantile_indexes`.
+    The input frame is not modified, and a workload already prepared is
+    returned as is.
+
+    Args:
+        workload_details (WorkloadDetails): Details of the workload.
+        workload: Workload frame or prepared workload.
+        quantiles: Quantile indexes of the frame rows, e.g. kept up to
+            date by a refresh, built when None.
+
+    Returns:
+        PreparedWorkload: The prepared workload.
+    """
+    if isinstance(workload, PreparedWorkload):
+        return workload
+
+    # Shallow copy, copy on write keeps the caller frame untouched
+    workload_df = convert_data_types(
+        workload.copy(deep=False), workload_details.config
+    )
+    if not workload_df["window_begin"].is_monotonic_increasing:
+        workload_df = workload_df.sort_values("window_begin", kind="stable")
+    workload_df = workload_df.reset_index(drop=True)
+
+    startup_latency_rows = workload_details.workload_e2e_startup_latency_rows
+    workload_df = _calculate_max_usage_slope_up_ratio(
+        workload_df, startup_latency_rows
+    )
+    sum_cpu_usage = _read_only(
+        usage_values(workload_df, "sum_containers_cpu_usage")
+    )
+    return PreparedWorkload(
+        frame=workload_df,
+        window_index=pd.DatetimeIndex(workload_df["window_begin"]),
+        sum_cpu_usage=sum_cpu_usage,
+        sum_mem_usage_mi=_read_only(
+            usage_values(workload_df, "sum_containers_mem_usage_mi")
+        ),
+        sum_cpu_request=_read_only(
+            usage_values(workload_df, "sum_containers_cpu_request")
+        ),
+        sum_mem_request_mi=_read_only(
+            usage_values(workload_df, "sum_containers_mem_request_mi")
+        ),
+        max_cpu_usage_in_startup_latency=_read_only(usage_values(
+            workload_df, "max_cpu_usage_in_workload_e2e_startup_latency"
+        )),
+        max_mem_usage_mi_in_startup_latency=_read_only(usage_values(
+            workload_df, "max_mem_usage_mi_in_workload_e2_startup_latency"
+        )),
+        max_usage_slope_up_ratio=_read_only(
+            usage_values(workload_df, "max_usage_slope_up_ratio")
+        ),
+        running_max_sum_cpu_usage=_read_only(running_max(sum_cpu_usage)),
+        workload_e2e_startup_latency_rows=startup_latency_rows,
+        quantiles=(
+            build_quantile_indexes(workload_df)
+            if quantiles is None else quantiles
+        ),
+    )
+
 @log_exec_time(logger)
 def get_simulation_plans(
     workload_details: WorkloadDetails,
-    workload_df: pd.DataFrame
+    workload_df: Union[pd.DataFrame, PreparedWorkload]
 ) -> Tuple[List[WorkloadPlan], Dict[str,str]]:
     """
     Returns a list of all recommendations from the DMR and DCR Algorithms.
 
     Args:
-        workload_df (pd.DataFrame): DataFrame with workload metrics.
+        workload_df: DataFrame with workload metrics, or the workload
+            prepared by `prepare_workload`.
         workload_details: Workload details.
 
     Returns:
@@ -652,17 +823,18 @@ def get_simulation_plans(
     """
     logger.info("Starting HPA simulation plan %s.", workload_details)
     reasons = {}
-    if workload_df.empty:
+    if len(workload_df) == 0:
         logger.warning(
             "The workload dataframe is empty, exiting simulation plan."
         )
         reasons["general"] = "Workload dataframe is empty."
         return [], reasons
 
-    workload_df = convert_data_types(workload_df)
+    prepared = prepare_workload(workload_details, workload_df)
+    workload_df = prepared.frame
 
     max_cpu_capacity = _calculate_recommended_max_cpu_capacity(
-        workload_details.config, workload_df)
+        workload_details.config, workload_df, prepared.quantiles)
 
     if max_cpu_capacity == 0:
         logger.warning("CPU Max Capacity is 0, exiting simulation plan.")
@@ -672,13 +844,15 @@ def get_simulation_plans(
     dcr = _dynamic_cpu_request(
         workload_details.config,
         max_cpu_capacity,
-        workload_df
+        workload_df,
+        prepared.quantiles
     )
 
     dmr = _dynamic_min_replicas(
             workload_details.config,
             max_cpu_capacity,
-            workload_df
+            workload_df,
+            prepared.quantiles
     )
 
     combinations = dcr + dmr
@@ -691,29 +865,25 @@ def get_simulation_plans(
         reasons["general"] = "No valid recommendations generated."
         return [], reasons
 
-    workload_e2e_startup_latency_rows = (
-        workload_details.workload_e2e_startup_latency_rows
-        )
-
-    workload_df = _calculate_max_usage_slope_up_ratio(
-        workload_df, workload_e2e_startup_latency_rows
-        )
-
+    rows_above = _RowsAboveRequest(prepared)
     plans = []
     for plan in proposed_hpa_resources:
         plan.workload_e2e_startup_latency_rows = (
-            workload_e2e_startup_latency_rows
+            prepared.workload_e2e_startup_latency_rows
         )
         config_vals, reason = _get_recommended_configs(
                 workload_details.config,
                 plan,
-                workload_df
+                workload_df,
+                rows_above
             )
         if config_vals is None:
             reasons[plan.method] = reason
             continue
         plans.append(plan)
-    plans.append(_vpa_recommendation(workload_details.config, workload_df))
+    plans.append(_vpa_recommendation(
+        workload_details.config, workload_df, prepared.quantiles
+    ))
     logger.info(
         "HPA simulation plan completed successfully with %d plans for %s.",
         len(plans),
@@ -0,0 +1,210 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Quantile Index - Sorted samples answering the planning quantiles '''
+from typing import Dict, Iterable, Optional, Union
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.workload_dtypes import usage_values
+
+# Columns of the workload frame indexed by `build_quantile_indexes`
+QUANTILE_COLUMNS = [
+    'avg_container_cpu_usage',
+    'num_replicas_at_usage_window',
+    'sum_containers_cpu_usage',
+]
+
+ArrayLike = Union[float, np.ndarray, Iterable[float]]
+
+
+class QuantileIndex:
+    '''
+    Sorted samples of one column, missing values dropped.
+
+    Built once per workload, it answers quantiles by position in O(1) per
+    query and counts by binary search in O(log n). The interpolation is
+    numpy's default 'linear' one, the results are the same as
+    `np.percentile` and `pd.Series.quantile` on the column.
+
+    An index is immutable. `merge` and `remove` return a new index in
+    linear time, without sorting the samples already indexed again, so an
+    index can follow a sliding window of time chunks.
+    '''
+
+    def __init__(self, values: Optional[ArrayLike] = None):
+        values = np.asarray(
+            [] if values is None else values, dtype=np.float64
+        )
+        values = np.sort(values[~np.isnan(values)])
+        values.flags.writeable = False
+        self._values = values
+
+    @classmethod
+    def from_sorted(cls, values: np.ndarray) -> 'QuantileIndex':
+        '''An index over float64 samples already sorted, without NaN.'''
+        index = cls.__new__(cls)
+        if values.flags.writeable:
+            values = values.copy()
+            values.flags.writeable = False
+        index._values = values
+        return index
+
+    @property
+    def values(self) -> np.ndarray:
+        '''The sorted samples, read only.'''
+        return self._values
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __reduce__(self):
+        return (QuantileIndex.from_sorted, (self._values,))
+
+    def min(self) -> float:
+        '''Smallest sample, NaN when empty.'''
+        return float(self._values[0]) if len(self) else np.nan
+
+    def max(self) -> float:
+        '''Largest sample, NaN when empty.'''
+        return float(self._values[-1]) if len(self) else np.nan
+
+    def percentile(self, p: ArrayLike) -> Union[float, np.ndarray]:
+        '''
+        Percentiles of the samples, as `np.percentile(values, p)`.
+
+        Args:
+            p: Percentile or array of percentiles, between 0 and 100.
+
+        Returns:
+            The percentile, an array for an array of percentiles, NaN when
+            the index is empty.
+        '''
+        return self._quantile(np.true_divide(p, 100))
+
+    def quantile(self, q: ArrayLike) -> Union[float, np.ndarray]:
+        '''
+        Quantiles of the samples, as `pd.Series.quantile(q)`.
+
+        Args:
+            q: Quantile or array of quantiles, between 0 and 1.
+        '''
+        # pandas goes through np.percentile, keep its rounding of q
+        return self.percentile(np.multiply(q, 100.0))
+
+    def _quantile(self, q: ArrayLike) -> Union[float, np.ndarray]:
+        q = np.asarray(q, dtype=np.float64)
+        n = len(self)
+        if n == 0:
+            result = np.full(q.shape, np.nan)
+            return float(result) if result.ndim == 0 else result
+        # Same virtual index and interpolation as numpy's 'linear' method
+        virtual = (n - 1) * q
+        previous = np.floor(virtual)
+        gamma = virtual - previous
+        previous = np.clip(previous, 0, n - 1).astype(np.intp)
+        following = np.where(virtual >= n - 1, n - 1, previous + 1)
+        a = self._values[previous]
+        b = self._values[following]
+        diff = b - a
+        result = np.where(
+            gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma
+        )
+        return float(result) if result.ndim == 0 else result
+
+    def count_above(self, value: float) -> int:
+        '''Number of samples strictly greater than value.'''
+        return len(self) - int(
+            np.searchsorted(self._values, value, side='right')
+        )
+
+    def above(self, value: float) -> 'QuantileIndex':
+        '''Index of the samples strictly greater than value, a view.'''
+        start = np.searchsorted(self._values, value, side='right')
+        return QuantileIndex.from_sorted(self._values[start:])
+
+    def merge(self, other: 'QuantileIndex') -> 'QuantileIndex':
+        '''Index of the samples of both indexes.'''
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        # Timsort merges the two sorted runs in linear time
+        values = np.concatenate([self._values, other.values])
+        values.sort(kind='stable')
+        return QuantileIndex.from_sorted(values)
+
+    def remove(self, other: 'QuantileIndex') -> 'QuantileIndex':
+        '''
+        Index of the samples left once the samples of other are removed,
+        e.g. the rows that left an analysis window.
+
+        Raises:
+            ValueError: If other holds samples missing from the index.
+        '''
+        removed = other.values
+        if not len(removed):
+            return self
+        # Position of every removed sample, repeated values take the
+        # following positions of their run
+        run_offsets = (
+            np.arange(len(removed))
+            - np.searchsorted(removed, removed, side='left')
+        )
+        positions = (
+            np.searchsorted(self._values, removed, side='left') + run_offsets
+        )
+        if (
+            positions[-1] >= len(self)
+            or not np.array_equal(self._values[positions], removed)
+        ):
+            raise ValueError('Removed samples are missing from the index')
+        return QuantileIndex.from_sorted(np.delete(self._values, positions))
+
+
+def build_quantile_indexes(
+    workload_df: pd.DataFrame,
+    columns: Iterable[str] = QUANTILE_COLUMNS,
+) -> Dict[str, QuantileIndex]:
+    '''
+    Indexes columns of a workload frame, usage in cores and MiB.
+
+    Args:
+        workload_df (pd.DataFrame): Workload frame, converted or not.
+        columns (Iterable[str]): The columns to index.
+
+    Returns:
+        Dict[str, QuantileIndex]: One index per column.
+    '''
+    return {
+        col: QuantileIndex(usage_values(workload_df, col)) for col in columns
+    }
+
+
+def merge_quantile_indexes(
+    indexes: Dict[str, QuantileIndex],
+    added: Optional[Dict[str, QuantileIndex]] = None,
+    removed: Optional[Dict[str, QuantileIndex]] = None,
+) -> Dict[str, QuantileIndex]:
+    '''
+    Updates per column indexes with the indexes of added and removed
+    rows, see `QuantileIndex.merge` and `QuantileIndex.remove`.
+    '''
+    merged = {}
+    for col, index in indexes.items():
+        if added is not None:
+            index = index.merge(added[col])
+        if removed is not None:
+            index = index.remove(removed[col])
+        merged[col] = index
+    return merged
@@ -14,31 +14,85 @@
 
 '''Reading GKE metric data from Cloud monitoring'''
 from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
 from aiohttp import ClientResponseError
 import logging
 import pandas as pd
+from pandas.api.types import union_categoricals
 import numpy as np
 import asyncio
+import time as perftime
 import pytz
-from google.auth.transport.requests import Request
-from google.auth import default
 import httpx
 
 from hpaconfigrecommender.utils.models import (
     MetricRequestParameter,
     WorkloadDetails,
 )
-from hpaconfigrecommender.utils.config import (
-    Config,
-    USER_AGENT
-)
+from hpaconfigrecommender.utils.config import Config
 from hpaconfigrecommender.utils.log import (
     log_exec_time
 )
+from hpaconfigrecommender.monitoring_client import (
+    get_monitoring_client,
+    MonitoringClient,
+)
+from hpaconfigrecommender.timeseries_decoder import (
+    CONTAINER_COLUMN,
+    CONTROLLER_COLUMN,
+    NAMESPACE_COLUMN,
+    POD_COLUMN,
+    TimeseriesPageDecoder,
+    WORKLOAD_LABEL_COLUMNS,
+)
+from hpaconfigrecommender.timeseries_aggregation import (
+    AGGREGATION_BACKENDS,
+    aggregate_usage_columnar,
+)
+from hpaconfigrecommender.timeseries_cache import (
+    get_timeseries_cache,
+    query_key
+)
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Throttled and transient server errors
+_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Usage metrics a workload needs to be analysed
+REQUIRED_USAGE_METRICS = (
+    MetricRequestParameter(
+        metric='kubernetes.io/container/memory/used_bytes',
+        per_series_aligner='ALIGN_MAX',
+        cross_series_reducer='REDUCE_MAX',
+    ),
+    MetricRequestParameter(
+        metric='kubernetes.io/container/cpu/core_usage_time',
+        per_series_aligner='ALIGN_RATE',
+        cross_series_reducer='REDUCE_MEAN',
+    ),
+)
+# Request metrics, 0 when missing
+OPTIONAL_REQUEST_METRICS = (
+    MetricRequestParameter(
+        metric='kubernetes.io/container/cpu/request_cores',
+        per_series_aligner='ALIGN_MEAN',
+        cross_series_reducer='REDUCE_MEAN',
+        latest_value=True,
+    ),
+    MetricRequestParameter(
+        metric='kubernetes.io/container/memory/request_bytes',
+        per_series_aligner='ALIGN_MEAN',
+        cross_series_reducer='REDUCE_MEAN',
+        latest_value=True,
+    ),
+)
+
+# Batched queries split the series per workload with these labels
+WORKLOAD_KEY_COLUMNS = (NAMESPACE_COLUMN, CONTROLLER_COLUMN, CONTAINER_COLUMN)
+BATCH_LABEL_COLUMNS = WORKLOAD_KEY_COLUMNS + (POD_COLUMN,)
+
 def _build_workload_filter_query(
     config: Config,
     metric_param: MetricRequestParameter,
@@ -96,123 +150,233 @@ def _build_workload_filter_query(
     logger.debug('Filter query built: %s', ' AND '.join(filter_conditions))
     return ' AND '.join(filter_conditions)
 
+def _shard_intervals(
+    start: int,
+    end: int,
+    shard_seconds: int,
+    alignment_period: int
+) -> List[Tuple[int, int]]:
+    '''
+    Splits the (start, end] query interval, in epoch seconds, on a grid of
+    shard_seconds rounded up to a multiple of the alignment period, so
+    every shard boundary is also a point boundary.
+    '''
+    shard_seconds = max(
+        -(-shard_seconds // alignment_period) * alignment_period,
+        alignment_period
+    )
+    bounds = [start]
+    bound = (start // shard_seconds + 1) * shard_seconds
+    while bound < end:
+        bounds.append(bound)
+        bound += shard_seconds
+    bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _merge_shards(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    '''Concatenates shard results, unioning their label categories.'''
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+    categoricals = {
+        col: union_categoricals([df[col] for df in frames])
+        for col in frames[0].columns
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype)
+    }
+    df = pd.concat(frames, ignore_index=True)
+    for col, values in categoricals.items():
+        df[col] = values
+    return df
+
+
+def _retry_delay(
+    response: Optional[httpx.Response],
+    backoff_seconds: float,
+    attempt: int
+) -> float:
+    '''Exponential backoff, or the Retry-After of a throttled response.'''
+    delay = backoff_seconds * 2 ** attempt
+    retry_after = response.headers.get('Retry-After') if response else None
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+
 async def _fetch_timeseries_data(
     config: Config,
     metric_param: MetricRequestParameter,
     workload_details: WorkloadDetails,
     start_datetime: datetime,
     end_datetime: datetime,
-    alignment_period: int
+    alignment_period: int,
+    group_by_fields: Sequence[str] = WORKLOAD_LABEL_COLUMNS
 ) -> pd.DataFrame:
     '''
     Fetch time-series data for the specified workload_details and
-    metric parameter.
+    metric parameter, one series per group_by_fields values.
+
+    When config.TIMESERIES_CACHE_DIR is set the query results are served
+    from the on-disk cache, see `timeseries_cache.TimeseriesCache`.
     '''
     logger.info('Fetching time-series metric: %s', metric_param.metric)
 
-    # Base URL for the Monitoring API
-    base_url = f'https://monitoring.googleapis.com/v3/projects/{workload_details.project_id}/timeSeries'
-
-    # Convert start and end datetime to UTC and ISO 8601 format
-    utc_start_datetime = start_datetime.replace(second=0, microsecond=0).astimezone(pytz.UTC).isoformat()
-    utc_end_datetime = end_datetime.replace(second=0, microsecond=0).astimezone(pytz.UTC).isoformat()
+    # Convert start and end datetime to UTC, the query is minute aligned
+    utc_start_datetime = start_datetime.replace(second=0, microsecond=0).astimezone(pytz.UTC)
+    utc_end_datetime = end_datetime.replace(second=0, microsecond=0).astimezone(pytz.UTC)
 
     filter_string = _build_workload_filter_query(config, metric_param, workload_details)
 
+    client = get_monitoring_client(config)
+    semaphore = asyncio.Semaphore(config.TIMESERIES_MAX_CONCURRENT_SHARDS)
+
+    async def _query_shard(start: int, end: int) -> pd.DataFrame:
+        async with semaphore:
+            return await _query_timeseries_data(
+                client,
+                workload_details.project_id,
+                metric_param,
+                filter_string,
+                datetime.fromtimestamp(start, pytz.UTC),
+                datetime.fromtimestamp(end, pytz.UTC),
+                alignment_period,
+                group_by_fields=group_by_fields,
+                max_retries=config.TIMESERIES_FETCH_MAX_RETRIES,
+                backoff_seconds=config.TIMESERIES_FETCH_BACKOFF_SECONDS,
+            )
+
+    async def _query(start: int, end: int) -> pd.DataFrame:
+        # Long windows are fetched as concurrent shards, merged in order
+        tasks = [
+            asyncio.ensure_future(_query_shard(shard_start, shard_end))
+            for shard_start, shard_end in _shard_intervals(
+                start, end, config.TIMESERIES_SHARD_SECONDS, alignment_period
+            )
+        ]
+        try:
+            frames = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return _merge_shards(frames)
+
+    start = int(utc_start_datetime.timestamp())
+    end = int(utc_end_datetime.timestamp())
+    cache = get_timeseries_cache(config)
+    if cache is None:
+        df = await _query(start, end)
+    else:
+        df = await cache.fetch(
+            query_key(
+                metric_param.metric,
+                filter_string,
+                metric_param.per_series_aligner,
+                metric_param.cross_series_reducer,
+                alignment_period,
+                group_by_fields=(
+                    group_by_fields
+                    if tuple(group_by_fields) != WORKLOAD_LABEL_COLUMNS else ()
+                ),
+            ),
+            start,
+            end,
+            alignment_period,
+            _query,
+        )
+
+    if df.empty:
+        logger.warning('No time-series data fetched for the specified parameters.')
+        return pd.DataFrame()
+
+    # Convert to the original timezone
+    target_timezone = start_datetime.tzinfo
+    df['window_begin'] = df['window_begin'].dt.tz_convert(target_timezone)
+    return df
+
+
+async def _query_timeseries_data(
+    client: MonitoringClient,
+    project_id: str,
+    metric_param: MetricRequestParameter,
+    filter_string: str,
+    utc_start_datetime: datetime,
+    utc_end_datetime: datetime,
+    alignment_period: int,
+    group_by_fields: Sequence[str] = WORKLOAD_LABEL_COLUMNS,
+    max_retries: int = 0,
+    backoff_seconds: float = 1.0
+) -> pd.DataFrame:
+    '''
+    Query the Monitoring API through the shared client, following
+    pagination. Pages failing with a transport error, 429 or 5xx status
+    are retried up to max_retries times with exponential backoff.
+
+    Returns:
+        pd.DataFrame: One row per point with a UTC window_begin, the point
+            value and the container and pod names.
+    '''
     # Query parameters
     params = {
         'aggregation.alignmentPeriod': f'{alignment_period}s',
         'aggregation.crossSeriesReducer': metric_param.cross_series_reducer,
         'aggregation.perSeriesAligner': metric_param.per_series_aligner,
-        'aggregation.groupByFields': [
-            'resource.labels.container_name',
-            'resource.labels.pod_name',
-        ],
+        'aggregation.groupByFields': list(group_by_fields),
         'filter': filter_string,
-        'interval.startTime': utc_start_datetime,
-        'interval.endTime': utc_end_datetime,
+        'interval.startTime': utc_start_datetime.isoformat(),
+        'interval.endTime': utc_end_datetime.isoformat(),
         'view': 'FULL',
     }
 
-    # Obtain the access token using the default credentials
-    credentials, _ = default()
-    credentials.refresh(Request())
-    access_token = credentials.token
-    if not access_token:
-        logger.error('Access token is empty or None!')
-        return pd.DataFrame()
-
-    # Authorization header
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'User-Agent': USER_AGENT
-    }
-    logger.debug('Sending request with headers: %s', headers)
-
-    all_time_series = []
-
-    # Make the requests using httpx and handle pagination
-    async with httpx.AsyncClient() as client:
-        while True:
-            response = await client.get(base_url, headers=headers, params=params)
-
-            # Log request and response details
-            logger.debug('Request URL: %s', response.request.url)
-            logger.debug('Request Headers: %s', response.request.headers)
-            logger.debug('Response Status: %s', response.status_code)
-
-            if response.status_code == 200:
-                logger.debug('Request successful: %s', response.url)
-                data = response.json()
-                all_time_series.extend(data.get('timeSeries', []))
-
-                # Check for a nextPageToken
-                next_page_token = data.get('nextPageToken')
-                if not next_page_token:
-                    break  # Exit loop if no more pages
-                params['pageToken'] = next_page_token  # Update params for next request
-            else:
-                logger.error('Request failed: %s, Status: %s', response.url, response.status_code)
-                raise httpx.HTTPStatusError(
-                    f'API call failed with status {response.status_code}',
-                    request=response.request,
-                    response=response,
-                )
-
-    # Normalize the JSON to extract 'container_name' and 'points'
-    if not all_time_series:
-        logger.warning('No time-series data fetched for the specified parameters.')
-        return pd.DataFrame()
-
-    df = pd.json_normalize(
-        all_time_series,
-        record_path='points',
-        meta=[
-            ['resource', 'labels', 'container_name'],
-            ['resource', 'labels', 'pod_name'],
-        ],
-        errors='ignore',
-    )
-
-    # Drop the 'interval.endTime' column
-    df.drop(columns=['interval.endTime'], errors='ignore', inplace=True)
-
-    # Convert to the original timezone
-    target_timezone = start_datetime.tzinfo
-    df['interval.startTime'] = pd.to_datetime(df['interval.startTime']).dt.tz_convert(target_timezone)
-
-    # Rename 'interval.startTime' to 'window_begin'
-    df.rename(columns={'interval.startTime': 'window_begin'}, inplace=True)
+    # Pages are decoded as they arrive, only the typed columns are kept
+    decoder = TimeseriesPageDecoder(group_by_fields)
+    path = f'projects/{project_id}/timeSeries'
 
-    # Adjust data types
-    if 'value.int64Value' in df.columns:
-        df['value.int64Value'] = df['value.int64Value'].astype('int32')
-    if 'value.doubleValue' in df.columns:
-        df['value.doubleValue'] = df['value.doubleValue'].astype('float32')
-    df['resource.labels.container_name'] = df['resource.labels.container_name'].astype('category')
-    df['resource.labels.pod_name'] = df['resource.labels.pod_name'].astype('category')
+    # Handle pagination, throttled or failed pages are retried
+    attempt = 0
+    while True:
+        try:
+            response = await client.get(path, params)
+        except httpx.TransportError as e:
+            if attempt >= max_retries:
+                raise
+            logger.warning('Request error: %s, retrying.', e)
+            response = None
+
+        if response is not None and response.status_code == 200:
+            logger.debug('Request successful: %s', response.url)
+            data = response.json()
+            decoder.add_page(data.get('timeSeries', []))
+            attempt = 0
+
+            # Check for a nextPageToken
+            next_page_token = data.get('nextPageToken')
+            if not next_page_token:
+                break  # Exit loop if no more pages
+            params['pageToken'] = next_page_token  # Update params for next request
+        elif attempt < max_retries and (
+            response is None or response.status_code in _RETRY_STATUS_CODES
+        ):
+            delay = _retry_delay(response, backoff_seconds, attempt)
+            attempt += 1
+            logger.warning(
+                'Retrying %s (%s) in %.1fs, attempt %d of %d.',
+                metric_param.metric,
+                response.status_code if response is not None else 'error',
+                delay, attempt, max_retries
+            )
+            await asyncio.sleep(delay)
+        else:
+            logger.error('Request failed: %s, Status: %s', response.url, response.status_code)
+            raise httpx.HTTPStatusError(
+                f'API call failed with status {response.status_code}',
+                request=response.request,
+                response=response,
+            )
 
-    return df
+    return decoder.to_frame()
 
 
 def _aggregate_data(merged_df: pd.DataFrame)-> pd.DataFrame:
@@ -283,10 +447,85 @@ def _aggregate_data(merged_df: pd.DataFrame)-> pd.DataFrame:
     merged_df = merged_df[necessary_columns]
     return merged_df
 
+def _aggregate_usage(
+    config: Config,
+    mem_usage_df: pd.DataFrame,
+    cpu_usage_df: pd.DataFrame,
+    latest_cpu_request: float,
+    latest_mem_request: float
+) -> pd.DataFrame:
+    '''
+    Aggregates the per pod memory and CPU usage of one workload by
+    window and container with config.TIMESERIES_AGGREGATION_BACKEND.
+
+    Raises:
+        ValueError: If the backend is not a known aggregation backend.
+    '''
+    backend = config.TIMESERIES_AGGREGATION_BACKEND
+    if backend not in AGGREGATION_BACKENDS:
+        raise ValueError(
+            f'Unknown TIMESERIES_AGGREGATION_BACKEND {backend!r}, '
+            f'expected one of {AGGREGATION_BACKENDS}'
+        )
+    if backend == 'columnar':
+        return aggregate_usage_columnar(
+            mem_usage_df, cpu_usage_df, latest_cpu_request, latest_mem_request
+        )
+    return _aggregate_usage_groupby(
+        mem_usage_df, cpu_usage_df, latest_cpu_request, latest_mem_request
+    )
+
+def _aggregate_usage_groupby(
+    mem_usage_df: pd.DataFrame,
+    cpu_usage_df: pd.DataFrame,
+    latest_cpu_request: float,
+    latest_mem_request: float
+) -> pd.DataFrame:
+    '''
+    Reference aggregation with pandas groupby and merge, see
+    `_aggregate_data`.
+    '''
+    mem_usage_grouped = mem_usage_df.groupby(
+        ['window_begin', 'resource.labels.container_name'], observed=True
+    ).agg(
+        max_containers_mem_usage_mi=('value.int64Value','max'),
+        avg_container_mem_usage_mi = ('value.int64Value','mean')
+    ).reset_index()
+
+    # Decoded CPU values are float32, aggregate them in float64 as the
+    # columnar backend does
+    cpu_usage_grouped = cpu_usage_df.astype(
+        {'value.doubleValue': 'float64'}
+    ).groupby(
+        ['window_begin', 'resource.labels.container_name'], observed=True
+    ).agg(
+        avg_container_cpu_usage=('value.doubleValue', 'mean'),
+        stddev_containers_cpu_usage=('value.doubleValue', 'std'),
+        num_replicas_at_usage_window=('value.doubleValue', 'count')
+    ).reset_index()
+    # Ensure NaNs are replaced with 0 for std deviation
+    cpu_usage_grouped['stddev_containers_cpu_usage'] = (
+        cpu_usage_grouped['stddev_containers_cpu_usage'].replace(np.nan, 0)
+    )
+
+    merged_df = cpu_usage_grouped.merge(
+        mem_usage_grouped,
+        on=['window_begin', 'resource.labels.container_name'], how='inner'
+    )
+
+    # Assign request values to merged DataFrame
+    merged_df['avg_container_cpu_request'] = latest_cpu_request
+    merged_df['avg_container_mem_request_mi'] = latest_mem_request
+
+    return _aggregate_data(merged_df)
+
 def _get_latest_request_value(request_df, resource_type):
     '''
     Returns the latest request value from the DataFrame or 0.0 if the
     DataFrame is empty. Logs an appropriate message based on the resource type.
+
+    The value of the point with the largest window_begin is returned, the
+    order of the rows depends on the shards and on the cache.
     '''
     if request_df.empty:
         logger.info(
@@ -294,7 +533,28 @@ def _get_latest_request_value(request_df, resource_type):
             resource_type
         )
         return 0.0
-    return request_df['value.doubleValue'].iloc[0]
+    return request_df.loc[
+        request_df['window_begin'].idxmax(), 'value.doubleValue'
+    ]
+
+def _log_fetch_latencies(
+    workload_details: WorkloadDetails,
+    metric_requests: Sequence[MetricRequestParameter],
+    latencies: dict
+):
+    '''Logs the fetch time of every metric, "cancelled" when not fetched.'''
+    logger.info(
+        'Fetch latency for %s: %s',
+        workload_details.controller_name,
+        ', '.join(
+            f'{metric_request.metric}='
+            + (
+                f'{latencies[metric_request.metric]:.2f}s'
+                if metric_request.metric in latencies else 'cancelled'
+            )
+            for metric_request in metric_requests
+        )
+    )
 
 @log_exec_time(logger)
 def get_workload_agg_timeseries(
@@ -359,58 +619,64 @@ def get_workload_agg_timeseries(
                           'got %s', type(end_datetime).__name__)
             return pd.DataFrame()
 
-        # Define required metrics
-        required_metrics = [
-            MetricRequestParameter(
-                metric='kubernetes.io/container/memory/used_bytes',
-                per_series_aligner='ALIGN_MAX',
-                cross_series_reducer='REDUCE_MAX',
-            ),
-            MetricRequestParameter(
-                metric='kubernetes.io/container/cpu/core_usage_time',
-                per_series_aligner='ALIGN_RATE',
-                cross_series_reducer='REDUCE_MEAN',
-            )
-        ]
-        # Define optional request metrics (if missing, default to 0)
-        optional_request_metrics = [
-            MetricRequestParameter(
-                metric='kubernetes.io/container/cpu/request_cores',
-                per_series_aligner='ALIGN_MEAN',
-                cross_series_reducer='REDUCE_MEAN',
-                latest_value=True,
-            ),
-            MetricRequestParameter(
-                metric='kubernetes.io/container/memory/request_bytes',
-                per_series_aligner='ALIGN_MEAN',
-                cross_series_reducer='REDUCE_MEAN',
-                latest_value=True,
-            )
-        ]
+        required_metrics = REQUIRED_USAGE_METRICS
+        # Optional request metrics (if missing, default to 0)
+        optional_request_metrics = OPTIONAL_REQUEST_METRICS
 
-        # Fetch time-series data for all required metrics
-        metric_response_df = await asyncio.gather(
-            *[
-                _fetch_timeseries_data(
-                    config,
-                    metric_request,
-                    workload_details,
-                    start_datetime,
-                    end_datetime,
-                    config.DISTANCE_BETWEEN_POINTS_SECONDS
-                )
-                for metric_request in required_metrics
-            ]
-        )
+        latencies = {}
 
-        # Check if any required metric is missing
-        missing_metrics = [
-            required_metrics[i].metric for i, df in enumerate(
-                metric_response_df) if df.empty
+        async def _timed_fetch(metric_request):
+            started = perftime.perf_counter()
+            df = await _fetch_timeseries_data(
+                config,
+                metric_request,
+                workload_details,
+                start_datetime,
+                end_datetime,
+                config.DISTANCE_BETWEEN_POINTS_SECONDS
+            )
+            latencies[metric_request.metric] = perftime.perf_counter() - started
+            return df
+
+        async def _cancel(tasks):
+            cancelled = [task for task in tasks if task.cancel()]
+            await asyncio.gather(*cancelled, return_exceptions=True)
+
+        # Speculatively fetch the optional metrics with the required ones,
+        # they are cancelled if the workload turns out to have no data
+        required_tasks = [
+            asyncio.ensure_future(_timed_fetch(metric_request))
+            for metric_request in required_metrics
         ]
-        # Define optional request metrics (if missing, default to 0)
+        optional_tasks = [
+            asyncio.ensure_future(_timed_fetch(metric_request))
+            for metric_request in optional_request_metrics
+        ] if config.TIMESERIES_SPECULATIVE_FETCH else []
+
+        # Fetch time-series data for all required metrics, stopping at the
+        # first one missing
+        missing_metrics = []
+        try:
+            pending = set(required_tasks)
+            while pending and not missing_metrics:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                missing_metrics = [
+                    required_metrics[i].metric
+                    for i, task in enumerate(required_tasks)
+                    if task in done and task.result().empty
+                ]
+        except BaseException:
+            await _cancel(required_tasks + optional_tasks)
+            raise
 
         if missing_metrics:
+            await _cancel(required_tasks + optional_tasks)
+            _log_fetch_latencies(
+                workload_details, required_metrics + optional_request_metrics,
+                latencies
+            )
             logger.warning(
                 'Required metrics missing for workload: %s. '
                 'The following metrics were not found: %s. '
@@ -420,20 +686,18 @@ def get_workload_agg_timeseries(
                 ', '.join(missing_metrics)
             )
             return pd.DataFrame()
+        metric_response_df = [task.result() for task in required_tasks]
 
         # Fetch optional request metrics
-        optional_response_df = await asyncio.gather(
-            *[
-                _fetch_timeseries_data(
-                    config,
-                    metric_request,
-                    workload_details,
-                    start_datetime,
-                    end_datetime,
-                    config.DISTANCE_BETWEEN_POINTS_SECONDS
-                )
+        if not optional_tasks:
+            optional_tasks = [
+                asyncio.ensure_future(_timed_fetch(metric_request))
                 for metric_request in optional_request_metrics
             ]
+        optional_response_df = await asyncio.gather(*optional_tasks)
+        _log_fetch_latencies(
+            workload_details, required_metrics + optional_request_metrics,
+            latencies
         )
 
         # Assign request metrics (set default 0 if missing)
@@ -454,36 +718,157 @@ def get_workload_agg_timeseries(
             latest_cpu_request, latest_mem_request
         )
 
-        # Process and aggregate data
-        mem_usage_grouped = metric_response_df[0].groupby(
-            ['window_begin', 'resource.labels.container_name'], observed=True
-        ).agg(
-            max_containers_mem_usage_mi=('value.int64Value','max'),
-            avg_container_mem_usage_mi = ('value.int64Value','mean')
-        ).reset_index()
-
-        cpu_usage_grouped = metric_response_df[1].groupby(
-            ['window_begin', 'resource.labels.container_name'], observed=True
-        ).agg(
-            avg_container_cpu_usage=('value.doubleValue', 'mean'),
-            stddev_containers_cpu_usage=('value.doubleValue', 'std'),
-            num_replicas_at_usage_window=('value.doubleValue', 'count')
-        ).reset_index()
-        # Ensure NaNs are replaced with 0 for std deviation
-        cpu_usage_grouped['stddev_containers_cpu_usage'] = (
-            cpu_usage_grouped['stddev_containers_cpu_usage'].replace(np.nan, 0)
+        return _aggregate_usage(
+            config, metric_response_df[0], metric_response_df[1],
+            latest_cpu_request, latest_mem_request
+        )
+
+    # Use asyncio.run to execute the internal async function
+    return asyncio.run(_async_get_workload_agg_timeseries())
+
+
+def get_batched_agg_timeseries(
+    config: Config,
+    scope: WorkloadDetails,
+    start_datetime: datetime,
+    end_datetime: datetime
+) -> Dict[Tuple[str, str, str], pd.DataFrame]:
+    '''
+    Retrieve the aggregated time-series of every workload of a namespace
+    or cluster with one query per metric.
+
+    The series are grouped by namespace, top level controller, container
+    and pod, then split locally into one frame per workload, aggregated as
+    `get_workload_agg_timeseries` does. Fleet runs issue four queries per
+    scope instead of four per workload, and the keys double as the list of
+    workloads reporting data.
+
+    Args:
+        config (Config): Run configurations.
+        scope (WorkloadDetails): Project, location and cluster to query,
+            the namespace and controller type narrow the query when set,
+            the controller and container names must be empty.
+        start_datetime (datetime): The start time of the data query.
+        end_datetime (datetime): The end time of the data query.
+
+    Returns:
+        Dict[Tuple[str, str, str], pd.DataFrame]: The aggregated frame of
+            each (namespace, controller name, container name), empty when
+            the usage metrics are missing.
+    '''
+    if scope.controller_name.strip() or scope.container_name.strip():
+        raise ValueError(
+            'A batched query scope cannot pin a controller or container.'
         )
 
-        merged_df = cpu_usage_grouped.merge(
-            mem_usage_grouped,
-            on=['window_begin', 'resource.labels.container_name'], how='inner'
+    async def _async_get_batched_agg_timeseries():
+        missing_fields = [
+            field for field in ('project_id', 'location', 'cluster_name')
+            if not getattr(scope, field, '').strip()
+        ]
+        if missing_fields:
+            logger.warning(
+                'Missing scope details: %s. Cannot fetch time-series data.',
+                ', '.join(missing_fields)
+            )
+            return {}
+
+        metric_requests = REQUIRED_USAGE_METRICS + OPTIONAL_REQUEST_METRICS
+        responses = await asyncio.gather(*[
+            _fetch_timeseries_data(
+                config,
+                metric_request,
+                scope,
+                start_datetime,
+                end_datetime,
+                config.DISTANCE_BETWEEN_POINTS_SECONDS,
+                group_by_fields=BATCH_LABEL_COLUMNS,
+            )
+            for metric_request in metric_requests
+        ])
+        mem_usage_df, cpu_usage_df, cpu_request_df, mem_request_df = responses
+        if mem_usage_df.empty or cpu_usage_df.empty:
+            logger.warning(
+                'Required metrics missing for scope: %s.', scope
+            )
+            return {}
+
+        def _latest_requests(request_df):
+            # Latest point of each workload, as `_get_latest_request_value`
+            if request_df.empty:
+                return {}
+            latest = request_df.groupby(
+                list(WORKLOAD_KEY_COLUMNS), observed=True, sort=False
+            )['window_begin'].idxmax()
+            return dict(zip(
+                latest.index, request_df.loc[latest, 'value.doubleValue']
+            ))
+
+        latest_cpu_requests = _latest_requests(cpu_request_df)
+        latest_mem_requests = _latest_requests(mem_request_df)
+        cpu_usage_groups = dict(iter(cpu_usage_df.groupby(
+            list(WORKLOAD_KEY_COLUMNS), observed=True, sort=False
+        )))
+
+        workload_dfs = {}
+        for key, workload_mem_df in mem_usage_df.groupby(
+            list(WORKLOAD_KEY_COLUMNS), observed=True, sort=False
+        ):
+            workload_cpu_df = cpu_usage_groups.get(key)
+            if workload_cpu_df is None:
+                continue
+            workload_dfs[key] = _aggregate_usage(
+                config,
+                workload_mem_df,
+                workload_cpu_df,
+                latest_cpu_requests.get(key, 0.0),
+                latest_mem_requests.get(key, 0.0),
+            )
+        logger.info(
+            'Batched query returned %d workloads for scope: %s',
+            len(workload_dfs), scope
         )
+        return workload_dfs
 
-        # Assign request values to merged DataFrame
-        merged_df['avg_container_cpu_request'] = latest_cpu_request
-        merged_df['avg_container_mem_request_mi'] = latest_mem_request
+    return asyncio.run(_async_get_batched_agg_timeseries())
 
-        return _aggregate_data(merged_df)
-    
-    # Use asyncio.run to execute the internal async function
-    return asyncio.run(_async_get_workload_agg_timeseries())
+
+def get_reporting_workloads(
+    config: Config,
+    scope: WorkloadDetails,
+    start_datetime: datetime,
+    end_datetime: datetime
+) -> List[Tuple[str, str, str]]:
+    '''
+    Lists the workloads of a namespace or cluster reporting memory usage,
+    with one query grouped by namespace, controller and container.
+
+    Args:
+        config (Config): Run configurations.
+        scope (WorkloadDetails): See `get_batched_agg_timeseries`.
+        start_datetime (datetime): The start time of the data query.
+        end_datetime (datetime): The end time of the data query.
+
+    Returns:
+        List[Tuple[str, str, str]]: (namespace, controller name, container
+            name) of every workload.
+    '''
+    df = asyncio.run(_fetch_timeseries_data(
+        config,
+        REQUIRED_USAGE_METRICS[0],
+        scope,
+        start_datetime,
+        end_datetime,
+        # One point per series is enough to list them
+        max(
+            int((end_datetime - start_datetime).total_seconds()),
+            config.DISTANCE_BETWEEN_POINTS_SECONDS
+        ),
+        group_by_fields=WORKLOAD_KEY_COLUMNS,
+    ))
+    if df.empty:
+        return []
+    return sorted(
+        df[list(WORKLOAD_KEY_COLUMNS)].drop_duplicates()
+        .astype(str).itertuples(index=False, name=None)
+    )
@@ -0,0 +1,564 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Refresh Simulation - Incremental recommendations from persisted state '''
+import hashlib
+import logging
+import os
+import pickle
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pytz
+from hpaconfigrecommender.utils.models import (
+    WorkloadDetails,
+    WorkloadPlan,
+    WorkloadRecommendation,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.read_workload_timeseries import (
+    get_workload_agg_timeseries
+)
+from hpaconfigrecommender.plan_workload_simulation import (
+    SLOPE_COLUMNS,
+    get_simulation_plans,
+    convert_data_types,
+    prepare_workload,
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    _calculate_starting_replicas,
+    _clash_validation_msg,
+    _finalize_recommendation,
+    _get_workload_plans,
+    _hpa_metrics,
+    _is_plan_valid,
+    _prefilter_plan,
+    _process_plan,
+    _replay_behavior,
+    _replay_result,
+    _scale_down_steps,
+    _select_best_plan,
+    _usage_clash_bounds,
+)
+from hpaconfigrecommender.quantile_index import (
+    QuantileIndex,
+    build_quantile_indexes,
+    merge_quantile_indexes,
+)
+from hpaconfigrecommender.simulation_kernel import (
+    CLASH_NONE,
+    ReplayState,
+    resolve_backend,
+    replay_metrics,
+    resume_hpa,
+)
+from hpaconfigrecommender.workload_dtypes import usage_matrix, usage_values
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Bump when the persisted layout changes, older states are recomputed
+STATE_VERSION = 4
+
+# Settings that change how a simulation runs but not its results
+_EXECUTION_ONLY_SETTINGS = (
+    'SIMULATION_BACKEND',
+    'SIMULATION_MODE',
+    'SIMULATION_POOL_MAX_WORKERS',
+    'SIMULATION_PREFILTER',
+    'SIMULATION_CACHE_DIR',
+    'SIMULATION_CACHE_MAX_BYTES',
+    'FLEET_MAX_CONCURRENT_FETCHES',
+    'FLEET_MAX_PENDING_SIMULATIONS',
+    'FLEET_BATCHED_FETCH',
+    'TIMESERIES_CACHE_DIR',
+    'TIMESERIES_CACHE_MAX_BYTES',
+    'TIMESERIES_CACHE_BUCKET_SECONDS',
+    'TIMESERIES_CACHE_SETTLE_SECONDS',
+    'TIMESERIES_SHARD_SECONDS',
+    'TIMESERIES_MAX_CONCURRENT_SHARDS',
+    'TIMESERIES_FETCH_MAX_RETRIES',
+    'TIMESERIES_FETCH_BACKOFF_SECONDS',
+    'TIMESERIES_SPECULATIVE_FETCH',
+    'MONITORING_MAX_CONNECTIONS',
+    'MONITORING_MAX_CONCURRENT_REQUESTS',
+    'MONITORING_HTTP2',
+    'MONITORING_TIMEOUT_SECONDS',
+    'MONITORING_TOKEN_REFRESH_MARGIN_SECONDS',
+)
+
+
+@dataclass
+class PlanReplay:
+    """
+    Persisted simulation of one plan.
+
+    Attributes:
+        state (Optional[ReplayState]): Replay tail state, None for VPA
+            plans and plans that failed validation or clashed.
+        forecast_replicas (np.ndarray): Replicas trace over the window.
+        forecast_replicas_desired (np.ndarray): Desired replicas trace.
+        scale_up_behaviour (np.ndarray): Scale up behaviour trace.
+        validation_msg (Optional[str]): Why the plan was rejected.
+    """
+    state: Optional[ReplayState] = None
+    forecast_replicas: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    forecast_replicas_desired: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    scale_up_behaviour: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.float64)
+    )
+    validation_msg: Optional[str] = None
+
+
+@dataclass
+class WorkloadRefreshState:
+    """
+    Persisted simulation state of one workload.
+
+    Attributes:
+        config_fingerprint (str): See `config_fingerprint`.
+        analysis_window (pd.Timedelta): Length of the analysis window.
+        end_datetime (datetime): End of the last fetched period.
+        workload_df (pd.DataFrame): Aggregated frame of the window, with
+            the data types of `convert_data_types`.
+        plans (List[WorkloadPlan]): The plans being simulated.
+        replays (List[PlanReplay]): One replay per plan.
+        skipped_simulations (int): Plans rejected by the prefilter.
+        quantiles (Dict[str, QuantileIndex]): Quantile indexes of the
+            frame rows, updated with the new and dropped rows so the
+            history is not sorted again.
+        version (int): STATE_VERSION the state was written with.
+    """
+    config_fingerprint: str
+    analysis_window: pd.Timedelta
+    end_datetime: datetime
+    workload_df: pd.DataFrame
+    plans: List[WorkloadPlan]
+    replays: List[PlanReplay]
+    skipped_simulations: int = 0
+    quantiles: Dict[str, QuantileIndex] = field(default_factory=dict)
+    version: int = STATE_VERSION
+
+
+def config_fingerprint(config: Config) -> str:
+    """
+    Hashes the config values that affect planning and simulation results.
+
+    Args:
+        config (Config): Run configurations.
+
+    Returns:
+        str: Hex digest, equal for configs giving the same results.
+    """
+    values = config.snapshot()
+    relevant = sorted(
+        (name, repr(value)) for name, value in values.items()
+        if name not in _EXECUTION_ONLY_SETTINGS
+    )
+    return hashlib.sha256(repr(relevant).encode()).hexdigest()
+
+
+def _state_path(state_dir: str, workload_details: WorkloadDetails) -> Path:
+    """Returns the state file of a workload."""
+    key = '/'.join([
+        workload_details.project_id,
+        workload_details.location,
+        workload_details.cluster_name,
+        workload_details.namespace,
+        workload_details.controller_type,
+        workload_details.controller_name,
+        workload_details.container_name,
+    ])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return Path(state_dir) / f'{digest}.pkl'
+
+
+def load_refresh_state(
+    state_dir: str, workload_details: WorkloadDetails
+) -> Optional[WorkloadRefreshState]:
+    """
+    Reads the persisted state of a workload.
+
+    Returns:
+        Optional[WorkloadRefreshState]: The state, None when missing or
+            unreadable.
+    """
+    path = _state_path(state_dir, workload_details)
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        logger.warning('Ignoring unreadable refresh state %s: %s', path, e)
+        return None
+    return state
+
+
+def save_refresh_state(
+    state_dir: str,
+    workload_details: WorkloadDetails,
+    state: WorkloadRefreshState,
+):
+    """Writes the state of a workload, replacing the previous one."""
+    path = _state_path(state_dir, workload_details)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _window_wall_time(value: datetime) -> pd.Timestamp:
+    """
+    Converts a query datetime to the naive wall time used by window_begin
+    after `convert_data_types`: the timezone of the query, or UTC when the
+    query datetime is naive.
+    """
+    if value.tzinfo is not None:
+        return pd.Timestamp(value.replace(tzinfo=None))
+    return pd.Timestamp(value.astimezone(pytz.UTC).replace(tzinfo=None))
+
+
+def _replay_backend(config: Config) -> str:
+    """The reference loop cannot resume, it is served by the kernel."""
+    backend = resolve_backend(config.SIMULATION_BACKEND)
+    return 'kernel' if backend == 'python' else backend
+
+
+def _resume_plan(
+    config: Config,
+    backend: str,
+    plan: WorkloadPlan,
+    replay: PlanReplay,
+    new_df: pd.DataFrame,
+    first_index: int,
+) -> PlanReplay:
+    """
+    Replays a plan over new rows from its persisted state.
+
+    Args:
+        first_index (int): Index of the first new row in the whole frame,
+            used in clash messages.
+    """
+    sum_cpu_usage = usage_values(new_df, 'sum_containers_cpu_usage')
+    sum_mem_usage_mi = usage_values(new_df, 'sum_containers_mem_usage_mi')
+    metrics = replay_metrics(_hpa_metrics(config, plan))
+    (
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        clash_index,
+        clash_kind,
+        state,
+    ) = resume_hpa(
+        backend,
+        sum_cpu_usage,
+        sum_mem_usage_mi,
+        plan.recommended_min_replicas,
+        plan.recommended_max_replicas,
+        plan.recommended_cpu_request,
+        plan.recommended_mem_request_and_limits_mi,
+        plan.recommended_hpa_target_cpu,
+        plan.workload_e2e_startup_latency_rows,
+        _scale_down_steps(config, plan),
+        config.CPU_CLASH_COUNT_THRESHOLD,
+        replay.state,
+        _replay_behavior(config, plan),
+        metrics,
+        usage_matrix(new_df, metrics.columns),
+    )
+    if clash_kind != CLASH_NONE:
+        return PlanReplay(
+            validation_msg=_clash_validation_msg(
+                config,
+                clash_kind,
+                first_index + clash_index,
+                forecast_replicas[clash_index] * plan.recommended_cpu_request,
+                sum_cpu_usage[clash_index],
+                sum_mem_usage_mi[clash_index],
+            )
+        )
+    return PlanReplay(
+        state=state,
+        forecast_replicas=np.concatenate(
+            [replay.forecast_replicas, forecast_replicas]
+        ),
+        forecast_replicas_desired=np.concatenate(
+            [replay.forecast_replicas_desired, forecast_replicas_desired]
+        ),
+        scale_up_behaviour=np.concatenate(
+            [replay.scale_up_behaviour, scale_up_behaviour]
+        ),
+    )
+
+
+def _build_state(
+    config: Config,
+    workload_details: WorkloadDetails,
+    workload_df: pd.DataFrame,
+    start_datetime: datetime,
+    end_datetime: datetime,
+) -> Tuple[Optional[WorkloadRefreshState], Optional[str]]:
+    """
+    Plans and replays the whole window from scratch.
+
+    Returns:
+        Tuple[Optional[WorkloadRefreshState], Optional[str]]: The new
+            state, or None and the reason no plans exist.
+    """
+    if workload_df.empty:
+        _, reason = get_simulation_plans(workload_details, workload_df)
+        return None, reason
+    prepared = prepare_workload(workload_details, workload_df)
+    plans, reason = _get_workload_plans(workload_details, prepared)
+    if not plans:
+        return None, reason
+    # Planning adds derived columns, keep the persisted frame to the
+    # fetched ones so new rows can be appended
+    workload_df = prepared.frame.drop(columns=SLOPE_COLUMNS)
+    backend = _replay_backend(config)
+    bounds = (
+        _usage_clash_bounds(prepared)
+        if config.SIMULATION_PREFILTER else None
+    )
+    replays = []
+    skipped_simulations = 0
+    for plan in plans:
+        if plan.method == 'VPA':
+            replays.append(PlanReplay())
+            continue
+        valid, msg = _is_plan_valid(config, plan)
+        if valid and bounds is not None:
+            msg = _prefilter_plan(config, plan, bounds)
+            valid = msg is None
+            skipped_simulations += not valid
+        if not valid:
+            replays.append(PlanReplay(validation_msg=msg))
+            continue
+        initial = PlanReplay(state=ReplayState(
+            starting_replica=int(
+                _calculate_starting_replicas(prepared, plan)
+            )
+        ))
+        replays.append(
+            _resume_plan(config, backend, plan, initial, workload_df, 0)
+        )
+    state = WorkloadRefreshState(
+        config_fingerprint=config_fingerprint(config),
+        analysis_window=pd.Timedelta(end_datetime - start_datetime),
+        end_datetime=end_datetime,
+        workload_df=workload_df,
+        plans=plans,
+        replays=replays,
+        skipped_simulations=skipped_simulations,
+        quantiles=prepared.quantiles,
+    )
+    return state, None
+
+
+def _extend_state(
+    config: Config,
+    state: WorkloadRefreshState,
+    new_df: pd.DataFrame,
+    start_datetime: datetime,
+    end_datetime: datetime,
+) -> Optional[str]:
+    """
+    Appends new rows to the state, replays them for every live plan and
+    drops the rows that left the analysis window.
+
+    Returns:
+        Optional[str]: Why a full recompute is needed instead, None when
+            the state was extended.
+    """
+    old_df = state.workload_df
+    added = None
+    if not new_df.empty:
+        if list(new_df.columns) != list(old_df.columns):
+            return 'timeseries columns changed'
+        new_df = convert_data_types(new_df.copy(), config)
+        last_window = old_df['window_begin'].iloc[-1]
+        new_df = (
+            new_df[new_df['window_begin'] > last_window]
+            .sort_values('window_begin')
+            .reset_index(drop=True)
+        )
+
+    if not new_df.empty:
+        backend = _replay_backend(config)
+        for idx, (plan, replay) in enumerate(zip(state.plans, state.replays)):
+            if replay.state is not None:
+                state.replays[idx] = _resume_plan(
+                    config, backend, plan, replay, new_df, len(old_df)
+                )
+        old_df = pd.concat([old_df, new_df], ignore_index=True)
+        added = build_quantile_indexes(new_df, state.quantiles.keys())
+        logger.info('Replayed %d new rows.', len(new_df))
+
+    dropped = int(
+        (old_df['window_begin'] < _window_wall_time(start_datetime)).sum()
+    )
+    if dropped >= len(old_df):
+        return 'no data left in the analysis window'
+    removed = None
+    if dropped:
+        removed = build_quantile_indexes(
+            old_df.iloc[:dropped], state.quantiles.keys()
+        )
+        old_df = old_df.iloc[dropped:].reset_index(drop=True)
+        for replay in state.replays:
+            if replay.state is not None:
+                replay.forecast_replicas = replay.forecast_replicas[dropped:]
+                replay.forecast_replicas_desired = (
+                    replay.forecast_replicas_desired[dropped:]
+                )
+                replay.scale_up_behaviour = replay.scale_up_behaviour[dropped:]
+    state.workload_df = old_df
+    state.quantiles = merge_quantile_indexes(state.quantiles, added, removed)
+    state.end_datetime = end_datetime
+    return None
+
+
+def _state_results(
+    config: Config,
+    workload_details: WorkloadDetails,
+    state: WorkloadRefreshState,
+) -> Tuple[pd.DataFrame, Optional[WorkloadRecommendation],
+           Dict[str, str], List[pd.DataFrame]]:
+    """Scores the persisted replays like `run_simulation_plans` does."""
+    prepared = prepare_workload(
+        workload_details, state.workload_df, state.quantiles
+    )
+    results = []
+    for plan, replay in zip(state.plans, state.replays):
+        if plan.method == 'VPA':
+            results.append(_process_plan(
+                plan, workload_details, prepared,
+                config, _calculate_starting_replicas
+            ))
+            continue
+        rec = WorkloadRecommendation(
+            workload_details=workload_details,
+            plan=plan,
+        )
+        if replay.state is None:
+            rec.valid, rec.validation_msg = False, replay.validation_msg
+            results.append((None, rec, rec.validation_msg))
+            continue
+        rec.valid = True
+        results.append(_replay_result(
+            config, rec, prepared,
+            (
+                replay.forecast_replicas,
+                replay.forecast_replicas_desired,
+                replay.scale_up_behaviour,
+                -1,
+                CLASH_NONE,
+            )
+        ))
+    reasons = {}
+    analysis_df, best_rec, all_simulation_df = _select_best_plan(
+        results, reasons
+    )
+    if best_rec is not None:
+        best_rec.skipped_simulations = state.skipped_simulations
+    return _finalize_recommendation(
+        analysis_df, best_rec, reasons, all_simulation_df
+    )
+
+
+def refresh_workload_simulation(
+    workload_details: WorkloadDetails,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    state_dir: str,
+) -> Tuple[pd.DataFrame, Optional[WorkloadRecommendation],
+           Dict[str, str], List[pd.DataFrame]]:
+    """
+    Refreshes the recommendation of a workload, fetching and replaying only
+    the points added since the previous refresh.
+
+    The aggregated frame, the plans and the tail state of every plan replay
+    are persisted per workload in state_dir. A refresh keeps the plans of
+    the state, fetches the timeseries after the last persisted point,
+    resumes every live replay on them and drops the rows older than
+    start_datetime. Plans and replays are recomputed from scratch when
+    there is no state yet, when the config fingerprint or the length of the
+    analysis window changed, or when the new points cannot be appended.
+
+    Since the replays carry their state over, the simulated HPA keeps the
+    history of rows that already left the window. Plans are only revised
+    on a full recompute.
+
+    Args:
+        workload_details (WorkloadDetails): Workload's characteristics.
+        start_datetime (datetime): The start time of the analysis.
+        end_datetime (datetime): The end time of the analysis.
+        state_dir (str): Directory of the persisted states.
+
+    Returns:
+        Same as `run_workload_simulation.plan_and_run_simulation`.
+    """
+    config = workload_details.config
+    state = load_refresh_state(state_dir, workload_details)
+    window = pd.Timedelta(end_datetime - start_datetime)
+
+    if state is None:
+        reason = 'no persisted state'
+    elif state.version != STATE_VERSION:
+        reason = 'persisted state version changed'
+    elif state.config_fingerprint != config_fingerprint(config):
+        reason = 'config changed'
+    elif state.analysis_window != window:
+        reason = 'analysis window changed'
+    else:
+        # Overlap one point, rows already replayed are filtered out
+        new_df = get_workload_agg_timeseries(
+            config, workload_details,
+            state.end_datetime - timedelta(
+                seconds=config.DISTANCE_BETWEEN_POINTS_SECONDS
+            ),
+            end_datetime
+        )
+        reason = _extend_state(
+            config, state, new_df, start_datetime, end_datetime
+        )
+
+    if reason is not None:
+        logger.info('Full recompute for %s: %s', workload_details, reason)
+        workload_df = get_workload_agg_timeseries(
+            config, workload_details, start_datetime, end_datetime
+        )
+        if workload_df.empty:
+            return pd.DataFrame(), None, {'No data': 'Empty timeseries'}, []
+        state, reason = _build_state(
+            config, workload_details, workload_df,
+            start_datetime, end_datetime
+        )
+        if state is None:
+            logger.info('No plans exists for workload %s', workload_details)
+            return pd.DataFrame(), None, {'No plans exists': reason}, []
+    else:
+        logger.info('Incremental refresh for %s', workload_details)
+
+    save_refresh_state(state_dir, workload_details, state)
+    return _state_results(config, workload_details, state)
@@ -0,0 +1,449 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Fleet Run - Recommendations for many workloads in one process '''
+import logging
+import time as perftime
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+)
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+import google.auth
+from google.cloud import asset_v1
+from google.api_core.gapic_v1.client_info import ClientInfo
+from google.api_core.exceptions import GoogleAPIError
+from hpaconfigrecommender.utils.models import (
+    WorkloadDetails,
+    WorkloadRecommendation,
+)
+from hpaconfigrecommender.utils.config import (
+    Config, USER_AGENT
+)
+from hpaconfigrecommender.read_workload_timeseries import (
+    get_batched_agg_timeseries,
+    get_reporting_workloads,
+    get_workload_agg_timeseries,
+)
+from hpaconfigrecommender.read_workload_startuptime import (
+    get_workload_startup_time
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    plan_and_run_simulation
+)
+from hpaconfigrecommender.simulation_pool import get_simulation_pool
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FleetRecommendation:
+    """
+    Outcome of the recommendation run of one workload of the fleet.
+
+    Attributes:
+        workload_details (WorkloadDetails): The workload.
+        analysis_df (pd.DataFrame): Simulation analysis of the best plan,
+            empty when no recommendation was found.
+        recommendation (Optional[WorkloadRecommendation]): Best plan.
+        reasons (Dict[str, str]): Why plans were skipped.
+        error (Optional[str]): Error raised while processing the workload.
+    """
+    workload_details: WorkloadDetails
+    analysis_df: pd.DataFrame = field(default_factory=pd.DataFrame)
+    recommendation: Optional[WorkloadRecommendation] = None
+    reasons: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class FleetRunStats:
+    """
+    Throughput counters of a fleet run.
+
+    Attributes:
+        workloads (int): Workloads processed.
+        recommended (int): Workloads with a recommendation.
+        failed (int): Workloads that raised an error.
+        elapsed_seconds (float): Wall time of the run.
+    """
+    workloads: int = 0
+    recommended: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def workloads_per_minute(self) -> float:
+        """Processed workloads per minute of wall time."""
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.workloads * 60 / self.elapsed_seconds
+
+
+def discover_workloads(
+    config: Config,
+    project_id: str,
+    location: str,
+    cluster_name: str,
+    namespace: str = "",
+) -> List[WorkloadDetails]:
+    """
+    Lists the Deployments of a cluster from Cloud Asset Inventory, one
+    WorkloadDetails per container. Namespaces in
+    config.EXCLUDED_NAMESPACES are skipped.
+
+    Args:
+        config (Config): Run configurations.
+        project_id (str): GCP project ID.
+        location (str): Cluster location.
+        cluster_name (str): Cluster name.
+        namespace (str): Only list this namespace, all when empty.
+
+    Returns:
+        List[WorkloadDetails]: The discovered workloads.
+    """
+    credentials, _ = google.auth.default()
+    client = asset_v1.AssetServiceClient(
+        credentials=credentials, client_info=ClientInfo(user_agent=USER_AGENT)
+    )
+    query = (
+        f"//container.googleapis.com/projects/{project_id}/locations/"
+        f"{location}/clusters/{cluster_name}/k8s/namespaces/"
+    )
+    if namespace:
+        query += f"{namespace}/"
+    try:
+        api_response = client.search_all_resources(
+            request={
+                "scope": f"projects/{project_id}",
+                "query": query,
+                "asset_types": ["apps.k8s.io/Deployment"],
+                "read_mask": "versionedResources",
+            }
+        )
+        results = list(api_response)
+    except GoogleAPIError as e:
+        logger.error("Failed to discover workloads: %s", e)
+        raise
+
+    workloads = []
+    for result in results:
+        for versioned_resource in result.versioned_resources:
+            resource_data = versioned_resource.resource
+            metadata = resource_data.get("metadata", {})
+            if metadata.get("namespace") in config.EXCLUDED_NAMESPACES:
+                continue
+            containers = (
+                resource_data.get("spec", {}).get("template", {})
+                .get("spec", {}).get("containers", [])
+            )
+            for container in containers:
+                workloads.append(
+                    WorkloadDetails(
+                        config=config,
+                        project_id=project_id,
+                        cluster_name=cluster_name,
+                        location=location,
+                        namespace=metadata.get("namespace", ""),
+                        controller_name=metadata.get("name", ""),
+                        controller_type="Deployment",
+                        container_name=container.get("name", ""),
+                    )
+                )
+    logger.info(
+        "Discovered %d workloads in cluster %s.", len(workloads), cluster_name
+    )
+    return workloads
+
+
+def discover_workloads_from_metrics(
+    config: Config,
+    project_id: str,
+    location: str,
+    cluster_name: str,
+    start_datetime: datetime,
+    end_datetime: datetime,
+    namespace: str = "",
+) -> List[WorkloadDetails]:
+    """
+    Lists the Deployment containers of a cluster that reported memory
+    usage between start_datetime and end_datetime, with a single
+    Monitoring query. Namespaces in config.EXCLUDED_NAMESPACES are skipped.
+
+    Args:
+        config (Config): Run configurations.
+        project_id (str): GCP project ID.
+        location (str): Cluster location.
+        cluster_name (str): Cluster name.
+        start_datetime (datetime): Start of the lookup period.
+        end_datetime (datetime): End of the lookup period.
+        namespace (str): Only list this namespace, all when empty.
+
+    Returns:
+        List[WorkloadDetails]: The discovered workloads.
+    """
+    scope = _batch_scope(config, WorkloadDetails(
+        config=config,
+        project_id=project_id,
+        cluster_name=cluster_name,
+        location=location,
+        namespace=namespace,
+        controller_name="",
+        controller_type="Deployment",
+        container_name="",
+    ))
+    workloads = [
+        WorkloadDetails(
+            config=config,
+            project_id=project_id,
+            cluster_name=cluster_name,
+            location=location,
+            namespace=workload_namespace,
+            controller_name=controller_name,
+            controller_type="Deployment",
+            container_name=container_name,
+        )
+        for workload_namespace, controller_name, container_name
+        in get_reporting_workloads(config, scope, start_datetime, end_datetime)
+    ]
+    logger.info(
+        "Discovered %d workloads reporting metrics in cluster %s.",
+        len(workloads), cluster_name
+    )
+    return workloads
+
+
+def _batch_scope(
+    config: Config, workload_details: WorkloadDetails
+) -> WorkloadDetails:
+    """The namespace of a workload, as a batched query scope."""
+    return WorkloadDetails(
+        config=config,
+        project_id=workload_details.project_id,
+        cluster_name=workload_details.cluster_name,
+        location=workload_details.location,
+        namespace=workload_details.namespace,
+        controller_name="",
+        controller_type=workload_details.controller_type,
+        container_name="",
+    )
+
+
+def _batch_key(workload_details: WorkloadDetails) -> Tuple[str, ...]:
+    return (
+        workload_details.project_id,
+        workload_details.location,
+        workload_details.cluster_name,
+        workload_details.namespace,
+        workload_details.controller_type,
+    )
+
+
+def _fetch_workloads(
+    config: Config,
+    workloads: List[WorkloadDetails],
+    start_datetime: datetime,
+    end_datetime: datetime,
+    fetch_startup_time: bool,
+) -> List[Tuple[WorkloadDetails, pd.DataFrame]]:
+    """
+    Thread task: reads the timeseries (and startup time) of one workload,
+    or of a namespace of workloads with batched queries.
+    """
+    if fetch_startup_time:
+        workloads = [
+            get_workload_startup_time(config, workload_details)
+            for workload_details in workloads
+        ]
+    if len(workloads) == 1 and not config.FLEET_BATCHED_FETCH:
+        return [(workloads[0], get_workload_agg_timeseries(
+            config, workloads[0], start_datetime, end_datetime
+        ))]
+    batch = get_batched_agg_timeseries(
+        config, _batch_scope(config, workloads[0]),
+        start_datetime, end_datetime
+    )
+    return [
+        (workload_details, batch.get((
+            workload_details.namespace,
+            workload_details.controller_name,
+            workload_details.container_name,
+        ), pd.DataFrame()))
+        for workload_details in workloads
+    ]
+
+
+def _recommend_workload(
+    config_values: dict,
+    workload_details: WorkloadDetails,
+    workload_df: pd.DataFrame,
+) -> Tuple[pd.DataFrame, Optional[WorkloadRecommendation], Dict[str, str]]:
+    """
+    Pool task: plans and simulates one workload.
+
+    The worker applies the caller's config values first, and replays the
+    plans in matrix mode since it already runs inside the pool. Its own
+    values are restored afterwards, the pool is shared with other tasks.
+    """
+    worker_values = Config.snapshot()
+    Config.restore(config_values)
+    Config.set_value("SIMULATION_MODE", "matrix")
+    try:
+        analysis_df, rec, reasons, _ = plan_and_run_simulation(
+            workload_details, workload_df
+        )
+    finally:
+        Config.restore(worker_values)
+    return analysis_df, rec, reasons
+
+
+def run_fleet_recommendations(
+    config: Config,
+    workloads: Iterable[WorkloadDetails],
+    start_datetime: datetime,
+    end_datetime: datetime,
+    fetch_startup_time: bool = False,
+    stats: Optional[FleetRunStats] = None,
+) -> Iterator[FleetRecommendation]:
+    """
+    Recommends HPA/VPA configurations for a fleet of workloads.
+
+    Timeseries are fetched on up to config.FLEET_MAX_CONCURRENT_FETCHES
+    threads, planning and simulation run on the shared simulation process
+    pool. Recommendations are yielded as soon as each workload completes,
+    in completion order. The number of workloads in flight is bounded so
+    fetched frames do not pile up when simulation is the bottleneck.
+
+    Args:
+        config (Config): Run configurations.
+        workloads (Iterable[WorkloadDetails]): Workloads to analyse, see
+            `discover_workloads`.
+        start_datetime (datetime): The start time of the analysis.
+        end_datetime (datetime): The end time of the analysis.
+        fetch_startup_time (bool): Read the workload startup time from
+            Cloud Asset Inventory before fetching the timeseries.
+        stats (Optional[FleetRunStats]): Filled with the run throughput.
+
+    With config.FLEET_BATCHED_FETCH the workloads are grouped by
+    namespace and every namespace is read with one query per metric, see
+    `get_batched_agg_timeseries`.
+
+    Yields:
+        FleetRecommendation: The outcome of each workload.
+    """
+    stats = stats if stats is not None else FleetRunStats()
+    max_fetches = config.FLEET_MAX_CONCURRENT_FETCHES
+    pool = get_simulation_pool(config.SIMULATION_POOL_MAX_WORKERS)
+    max_in_flight = max_fetches + config.FLEET_MAX_PENDING_SIMULATIONS
+    config_values = config.snapshot()
+
+    if config.FLEET_BATCHED_FETCH:
+        batches: Dict[Tuple[str, ...], List[WorkloadDetails]] = {}
+        for workload_details in workloads:
+            batches.setdefault(
+                _batch_key(workload_details), []
+            ).append(workload_details)
+        fetch_units = iter(batches.values())
+    else:
+        fetch_units = ([workload_details] for workload_details in workloads)
+    fetches: Dict[Future, List[WorkloadDetails]] = {}
+    simulations: Dict[Future, WorkloadDetails] = {}
+    start_time = perftime.perf_counter()
+
+    def _finish(result: FleetRecommendation) -> FleetRecommendation:
+        stats.workloads += 1
+        if result.error is not None:
+            stats.failed += 1
+        elif result.recommendation is not None:
+            stats.recommended += 1
+        stats.elapsed_seconds = perftime.perf_counter() - start_time
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_fetches) as fetch_executor:
+        while True:
+            while (
+                len(fetches) < max_fetches
+                and len(fetches) + len(simulations) < max_in_flight
+            ):
+                fetch_unit = next(fetch_units, None)
+                if fetch_unit is None:
+                    break
+                future = fetch_executor.submit(
+                    _fetch_workloads, config, fetch_unit,
+                    start_datetime, end_datetime, fetch_startup_time
+                )
+                fetches[future] = fetch_unit
+
+            if not fetches and not simulations:
+                break
+
+            done, _ = wait(
+                list(fetches) + list(simulations),
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future in fetches:
+                    fetch_unit = fetches.pop(future)
+                    try:
+                        fetched = future.result()
+                    except Exception as e:  # pylint: disable=broad-except
+                        for workload_details in fetch_unit:
+                            logger.error(
+                                "Failed to fetch %s: %s", workload_details, e
+                            )
+                            yield _finish(FleetRecommendation(
+                                workload_details=workload_details,
+                                error=str(e)
+                            ))
+                        continue
+                    for workload_details, workload_df in fetched:
+                        if workload_df.empty:
+                            yield _finish(FleetRecommendation(
+                                workload_details=workload_details,
+                                reasons={"general": "No timeseries data."},
+                            ))
+                            continue
+                        simulations[pool.submit(
+                            _recommend_workload, config_values,
+                            workload_details, workload_df
+                        )] = workload_details
+                else:
+                    workload_details = simulations.pop(future)
+                    try:
+                        analysis_df, rec, reasons = future.result()
+                    except Exception as e:  # pylint: disable=broad-except
+                        logger.error(
+                            "Failed to simulate %s: %s", workload_details, e
+                        )
+                        yield _finish(FleetRecommendation(
+                            workload_details=workload_details, error=str(e)
+                        ))
+                        continue
+                    yield _finish(FleetRecommendation(
+                        workload_details=workload_details,
+                        analysis_df=analysis_df,
+                        recommendation=rec,
+                        reasons=reasons,
+                    ))
+
+    stats.elapsed_seconds = perftime.perf_counter() - start_time
+    logger.info(
+        "Fleet run processed %d workloads (%d recommended, %d failed) "
+        "in %.1f seconds: %.1f workloads/min.",
+        stats.workloads, stats.recommended, stats.failed,
+        stats.elapsed_seconds, stats.workloads_per_minute
+    )
@@ -13,21 +13,42 @@
 # limitations under the License.
 
 ''' Simulation Run - Code to Run recommendations plans and simulations'''
-from multiprocessing import Pool
+import functools
 import logging
 from google.cloud import bigquery
 from google.api_core.gapic_v1.client_info import ClientInfo
-from typing import List, Tuple, Optional, Dict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Tuple, Optional, Dict, Union
 import pandas as pd
 import numpy as np
 from hpaconfigrecommender.utils.models import (
+    HPABehavior,
+    HPAMetric,
+    PreparedWorkload,
     WorkloadPlan,
     WorkloadRecommendation,
     WorkloadDetails,
 )
 from hpaconfigrecommender.plan_workload_simulation import (
-    get_simulation_plans, convert_data_types
+    get_simulation_plans, prepare_workload
+)
+from hpaconfigrecommender.plan_search import get_search_plans
+from hpaconfigrecommender.simulation_kernel import (
+    CLASH_CPU, CLASH_MEM, CLASH_NONE, ReplayBehavior, ReplayMetrics,
+    desired_replicas, metric_replicas, policy_limit, replay_behavior,
+    replay_hpa, replay_hpa_matrix, replay_metrics, resolve_backend,
+    trace_dtype
+)
+from hpaconfigrecommender.savings_scoring import (
+    CostModel, PlanTrace, forecast_savings, savings_in_cpus, score_traces
+)
+from hpaconfigrecommender.simulation_cache import (
+    data_fingerprint, get_simulation_cache, replay_key
+)
+from hpaconfigrecommender.simulation_pool import (
+    replay_plans_in_pool,
+)
+from hpaconfigrecommender.workload_dtypes import (
+    decode_usage_columns, usage_matrix
 )
 from .utils.config import (
     Config, USER_AGENT
@@ -40,14 +61,33 @@ from .utils.log import (
 logger = logging.getLogger(__name__)
 
 
+def _with_columns(
+        workload_df: pd.DataFrame, columns: Dict[str, np.ndarray]
+) -> pd.DataFrame:
+    '''
+    A new frame with the columns of workload_df followed by the given
+    columns. The existing columns are shared, not copied.
+    '''
+    return pd.concat(
+        [workload_df, pd.DataFrame(columns, index=workload_df.index)],
+        axis=1,
+        copy=False,
+    )
+
 def _calculate_savings(
-        analysis_df: pd.DataFrame, config: Config) -> pd.DataFrame:
+        prepared: PreparedWorkload,
+        plan: WorkloadPlan,
+        analysis_df: pd.DataFrame,
+        config: Config) -> pd.DataFrame:
     '''
-    Calculates the CPU and memory savings based on recommendations forecasts.
+    Calculates the CPU and memory savings based on recommendations forecasts,
+    see `savings_scoring.forecast_savings`.
 
     Args:
-        analysis_df (pd.DataFrame): The DataFrame containing workload
-        data to analyze.
+        prepared (PreparedWorkload): The workload the forecasts replayed.
+        plan (WorkloadPlan): The plan of the forecasts.
+        analysis_df (pd.DataFrame): The prepared frame with the forecast
+            columns of a plan, see `_assign_forecast`.
         config (Config): Run configurations.
 
     Returns:
@@ -57,82 +97,221 @@ def _calculate_savings(
         logger.info('The analysis dataframe is empty')
         return pd.DataFrame()
 
-    # Convert 'window_begin' to datetime if it's not already
-    analysis_df['window_begin'] = pd.to_datetime(analysis_df['window_begin'])
-
-    # Ensure the DataFrame is sorted by 'window_begin'
-    analysis_df = analysis_df.sort_values('window_begin')
-
-    # Set 'window_begin' as the index
-    analysis_df.set_index('window_begin', inplace=True)
+    forecast_sum_cpu = analysis_df['forecast_sum_cpu_up_and_running'].to_numpy()
+    forecast_sum_mem = analysis_df['forecast_sum_mem_up_and_running'].to_numpy()
 
     # Calculate CPU and memory savings
-    analysis_df['forecast_cpu_saving'] = (
-        analysis_df.get('sum_containers_cpu_request', np.inf)
-        - analysis_df['forecast_sum_cpu_up_and_running']
-    ).round(3)
-
-    analysis_df['forecast_mem_saving_mi'] = np.ceil(
-        analysis_df.get('sum_containers_mem_request_mi', np.inf)
-        - analysis_df['forecast_sum_mem_up_and_running']
-    )
-    analysis_df['avg_saving_in_cpus'] = (
-        analysis_df['forecast_cpu_saving']
-        + (
-            (analysis_df['forecast_mem_saving_mi'] / 1024)
-            / config.COST_OF_GB_IN_CPUS
-        )
-    ).round(2)
+    forecast_cpu_saving, forecast_mem_saving_mi = forecast_savings(
+        prepared,
+        plan.recommended_cpu_request,
+        plan.recommended_mem_request_and_limits_mi,
+        analysis_df['forecast_replicas_up_and_running'].to_numpy(),
+    )
+    avg_saving_in_cpus = savings_in_cpus(
+        forecast_cpu_saving,
+        forecast_mem_saving_mi,
+        config.COST_OF_GB_IN_CPUS
+    )
 
     # Calculate line clash as a boolean
-    analysis_df['forecast_clash'] = (
-        analysis_df['sum_containers_cpu_usage']
-        > analysis_df['forecast_sum_cpu_up_and_running']
-    ) | (
-        analysis_df['sum_containers_mem_usage_mi']
-        > analysis_df['forecast_sum_mem_up_and_running']
+    forecast_clash = (
+        (prepared.sum_cpu_usage > forecast_sum_cpu)
+        | (prepared.sum_mem_usage_mi > forecast_sum_mem)
     )
     # Apply rolling mean over a 1-day (24-hour)
-    # window using time-based rolling
-    analysis_df['avg_saving_in_cpus_1d_mean'] = (
-        analysis_df['avg_saving_in_cpus']
+    # window using time-based rolling, the prepared rows are sorted
+    avg_saving_in_cpus_1d_mean = (
+        pd.Series(avg_saving_in_cpus, index=prepared.window_index, copy=False)
         .rolling(window='1D', min_periods=1)
         .mean()
         .round(2)
+        .to_numpy()
+    )
+    return _with_columns(analysis_df, {
+        'forecast_cpu_saving': forecast_cpu_saving,
+        'forecast_mem_saving_mi': forecast_mem_saving_mi,
+        'avg_saving_in_cpus': avg_saving_in_cpus,
+        'forecast_clash': forecast_clash,
+        'avg_saving_in_cpus_1d_mean': avg_saving_in_cpus_1d_mean,
+    })
+
+def _scale_down_steps(config: Config, plan: WorkloadPlan) -> int:
+    '''Scale down stabilization window of a plan, in rows.'''
+    if plan.hpa_scale_down_steps is None:
+        return config.HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS
+    return plan.hpa_scale_down_steps
+
+def _hpa_behavior(config: Config, plan: WorkloadPlan) -> HPABehavior:
+    '''Behavior of the HPA of a plan.'''
+    if plan.hpa_behavior is None:
+        return HPABehavior.from_config(config)
+    return plan.hpa_behavior
+
+def _replay_behavior(config: Config, plan: WorkloadPlan) -> ReplayBehavior:
+    '''Behavior of the HPA of a plan, as read by the replay kernels.'''
+    return replay_behavior(
+        _hpa_behavior(config, plan), config.DISTANCE_BETWEEN_POINTS_SECONDS
     )
-    # Reset the index if needed
-    analysis_df.reset_index(inplace=True)
 
-    return analysis_df
+def _hpa_metrics(config: Config, plan: WorkloadPlan) -> Tuple[HPAMetric, ...]:
+    '''Metrics of the HPA of a plan besides the CPU utilization.'''
+    if plan.hpa_metrics is None:
+        return tuple(HPAMetric.from_spec(spec) for spec in config.HPA_METRICS)
+    return plan.hpa_metrics
 
 def _simulate_behaviour(
     config: Config,
     rec: WorkloadRecommendation,
-    workload_df: pd.DataFrame,
+    prepared: PreparedWorkload,
     starting_replica: int
 ) -> pd.DataFrame:
     """
     Simulates recommendations behavior for a workload.
+
+    The HPA replay runs on the backend selected by
+    config.SIMULATION_BACKEND, see `simulation_kernel.resolve_backend`.
     """
     if rec.plan.method == 'VPA':
         plan = rec.plan
-        # Update the DataFrame in a single operation
-        workload_df['forecast_replicas_up_and_running'] = (
-            plan.recommended_max_replicas
+        forecast_replicas = np.full(
+            len(prepared),
+            plan.recommended_max_replicas,
+            dtype=trace_dtype(plan.recommended_max_replicas)
         )
-        workload_df['forecast_sum_cpu_up_and_running'] = (
-            plan.recommended_max_replicas * plan.recommended_cpu_request
+        return _assign_forecast(
+            prepared,
+            plan,
+            forecast_replicas,
+            forecast_replicas,
+            np.zeros(len(prepared), dtype=np.int64),
         )
-        workload_df['forecast_sum_mem_up_and_running'] = (
-            plan.recommended_max_replicas *
-            plan.recommended_mem_request_and_limits_mi
+
+    backend = resolve_backend(config.SIMULATION_BACKEND)
+    if backend == 'python':
+        return _simulate_behaviour_reference(
+            config, rec, prepared, starting_replica
         )
-        workload_df['scale_up_behaviour_to_x_times'] = 0
-        workload_df['forecast_replicas_desired'] = (
-            plan.recommended_max_replicas
-            )
-        return workload_df
 
+    plan = rec.plan
+    metrics = replay_metrics(_hpa_metrics(config, plan))
+    (
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        clash_index,
+        clash_kind,
+    ) = replay_hpa(
+        backend,
+        prepared.sum_cpu_usage,
+        prepared.sum_mem_usage_mi,
+        plan.recommended_min_replicas,
+        plan.recommended_max_replicas,
+        plan.recommended_cpu_request,
+        plan.recommended_mem_request_and_limits_mi,
+        plan.recommended_hpa_target_cpu,
+        plan.workload_e2e_startup_latency_rows,
+        _scale_down_steps(config, plan),
+        starting_replica,
+        config.CPU_CLASH_COUNT_THRESHOLD,
+        _replay_behavior(config, plan),
+        metrics,
+        usage_matrix(prepared.frame, metrics.columns),
+    )
+
+    if clash_kind != CLASH_NONE:
+        rec.valid = False
+        rec.validation_msg = _clash_validation_msg(
+            config,
+            clash_kind,
+            clash_index,
+            forecast_replicas[clash_index] * plan.recommended_cpu_request,
+            prepared.sum_cpu_usage[clash_index],
+            prepared.sum_mem_usage_mi[clash_index],
+        )
+        return pd.DataFrame()  # Exit early if forecast is invalid
+
+    return _assign_forecast(
+        prepared,
+        plan,
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour
+    )
+
+def _assign_forecast(
+    prepared: PreparedWorkload,
+    plan: WorkloadPlan,
+    forecast_replicas: np.ndarray,
+    forecast_replicas_desired: np.ndarray,
+    scale_up_behaviour: np.ndarray,
+) -> pd.DataFrame:
+    '''
+    The prepared frame with the forecast columns of a replayed plan. The
+    prepared columns are shared by the frames of all plans.
+    '''
+    return _with_columns(prepared.frame, {
+        'forecast_replicas_up_and_running': forecast_replicas,
+        'forecast_sum_cpu_up_and_running': (
+            forecast_replicas * plan.recommended_cpu_request
+        ),
+        'forecast_sum_mem_up_and_running': (
+            forecast_replicas * plan.recommended_mem_request_and_limits_mi
+        ),
+        'scale_up_behaviour_to_x_times': scale_up_behaviour,
+        'forecast_replicas_desired': forecast_replicas_desired,
+    })
+
+def _clash_validation_msg(
+    config: Config,
+    clash_kind: int,
+    index: int,
+    forecast_sum_cpu: float,
+    sum_cpu_usage: float,
+    sum_mem_usage_mi: float,
+) -> str:
+    '''Builds the validation message for a simulation clash.'''
+    if clash_kind == CLASH_CPU:
+        return (
+            f'Index: {index} '
+            f'Clash exists '
+            f'recommendations forecast sum cpu: {forecast_sum_cpu:.3f} is < '
+            f'sum cpu usage: {sum_cpu_usage:.3f} '
+            'This exceeds the CPU_CLASH_COUNT_THRESHOLD: '
+            f'{config.CPU_CLASH_COUNT_THRESHOLD}'
+        )
+    return (
+        f'Index: {index} '
+        f'Clash exists '
+        f'recommendations forecast sum mem: {forecast_sum_cpu:.3f} is < '
+        f'sum mem usage: {sum_mem_usage_mi:.3f}'
+    )
+
+def _replicas_changed(
+    forecast_replicas: np.ndarray,
+    row: int,
+    period_rows: int,
+    sign: int,
+) -> int:
+    '''
+    Replicas added (sign 1) or removed (sign -1) by the replica changes of
+    the rows [row - period_rows, row - 1].
+    '''
+    changes = sign * np.diff(
+        forecast_replicas[max(row - period_rows - 1, 0):row]
+    )
+    return int(changes[changes > 0].sum())
+
+def _simulate_behaviour_reference(
+    config: Config,
+    rec: WorkloadRecommendation,
+    prepared: PreparedWorkload,
+    starting_replica: int
+) -> pd.DataFrame:
+    """
+    Reference row by row implementation of the HPA replay. Kept to validate
+    the compiled kernels in `simulation_kernel`, select it with
+    SIMULATION_BACKEND = 'python'.
+    """
     cpu_clash_counter = 0
 
     # Extract constants
@@ -144,10 +323,16 @@ def _simulate_behaviour(
     )
     target_cpu = rec.plan.recommended_hpa_target_cpu
     startup_latency = rec.plan.workload_e2e_startup_latency_rows
-    scale_down_steps = config.HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS
+    scale_down_steps = _scale_down_steps(config, rec.plan)
+    behavior = _replay_behavior(config, rec.plan)
+    scale_up_rules = behavior.scale_up
+    scale_down_rules = behavior.scale_down
+    initialization = behavior.cpu_initialization_rows
+    metrics = replay_metrics(_hpa_metrics(config, rec.plan))
+    metric_values = usage_matrix(prepared.frame, metrics.columns)
 
     # Initialize arrays
-    n_rows = len(workload_df)
+    n_rows = len(prepared)
     forecast_replicas = np.empty(n_rows, dtype=int)
     forecast_replicas[:] = min_replicas
     forecast_sum_cpu = np.zeros(n_rows)
@@ -155,9 +340,8 @@ def _simulate_behaviour(
     scale_up_behaviour = np.zeros(n_rows)
     forecast_replicas_desired = np.zeros(n_rows, dtype=int)
 
-    # Extract necessary columns as numpy arrays
-    sum_cpu_usage = workload_df['sum_containers_cpu_usage'].to_numpy()
-    sum_mem_usage_mi = workload_df['sum_containers_mem_usage_mi'].to_numpy()
+    sum_cpu_usage = prepared.sum_cpu_usage
+    sum_mem_usage_mi = prepared.sum_mem_usage_mi
     # Iterate through rows to simulate recommendations behavior
     for i in range(n_rows):
         if i < startup_latency:
@@ -191,6 +375,29 @@ def _simulate_behaviour(
                 max(replicas_up, replicas_down), min_replicas, max_replicas
             )
 
+            # Rate limits of the behavior policies
+            if i >= 1:
+                current = int(forecast_replicas[i - 1])
+                if forecast_replicas[i] > current:
+                    rules, sign = scale_up_rules, 1
+                else:
+                    rules, sign = scale_down_rules, -1
+                if forecast_replicas[i] != current and len(rules.policies):
+                    changed = np.array([
+                        _replicas_changed(
+                            forecast_replicas, i, int(period), sign
+                        )
+                        for _, _, period in rules.policies
+                    ])
+                    limit = policy_limit(
+                        current, rules.policies, rules.select_policy,
+                        changed, sign > 0
+                    )
+                    forecast_replicas[i] = (
+                        min(forecast_replicas[i], limit) if sign > 0
+                        else max(forecast_replicas[i], limit)
+                    )
+
         # Forecast CPU and memory usage
         forecast_sum_cpu[i] = (
             forecast_replicas[i] * recommended_cpu_request
@@ -205,24 +412,18 @@ def _simulate_behaviour(
 
             if cpu_clash_counter > config.CPU_CLASH_COUNT_THRESHOLD:
                 rec.valid = False
-                rec.validation_msg = (
-                    f'Index: {i} '
-                    f'Clash exists '
-                    f'recommendations forecast sum cpu: {forecast_sum_cpu[i]:.3f} is < '
-                    f'sum cpu usage: {sum_cpu_usage[i]:.3f} '
-                    'This exceeds the CPU_CLASH_COUNT_THRESHOLD: '
-                    f'{config.CPU_CLASH_COUNT_THRESHOLD}'
+                rec.validation_msg = _clash_validation_msg(
+                    config, CLASH_CPU, i, forecast_sum_cpu[i],
+                    sum_cpu_usage[i], sum_mem_usage_mi[i]
                 )
                 return pd.DataFrame()  # Exit early if forecast is invalid
 
         # Validate forecasted memory usage against actual usage
         if forecast_sum_mem[i] < sum_mem_usage_mi[i]:
             rec.valid = False
-            rec.validation_msg = (
-                f'Index: {i} '
-                f'Clash exists '
-                f'recommendations forecast sum mem: {forecast_sum_cpu[i]:.3f} is < '
-                f'sum mem usage: {sum_mem_usage_mi[i]:.3f}'
+            rec.validation_msg = _clash_validation_msg(
+                config, CLASH_MEM, i, forecast_sum_cpu[i],
+                sum_cpu_usage[i], sum_mem_usage_mi[i]
             )
             return pd.DataFrame()  # Exit early if forecast is invalid
         # Compute current metric value
@@ -237,29 +438,35 @@ def _simulate_behaviour(
         if i < startup_latency:
             forecast_replicas_desired[i]=starting_replica
         else:
+            # Replicas up and running for the whole CPU initialization
+            ready = forecast_replicas[max(i - initialization, 0):i + 1].min()
+            desired = desired_replicas(
+                int(forecast_replicas[i]),
+                int(ready),
+                current_metric_value / target_cpu,
+                behavior.tolerance,
+            )
+            # The most replicas asked by any metric
+            for k in range(len(metrics)):
+                desired = max(desired, metric_replicas(
+                    int(forecast_replicas[i]),
+                    metric_values[k, i],
+                    metrics.kinds[k],
+                    metrics.targets[k],
+                    recommended_mem_request,
+                    behavior.tolerance,
+                ))
             forecast_replicas_desired[i] = max(
-                min_replicas,
-                min(
-                    max_replicas,
-                    int(
-                        np.ceil(
-                            forecast_replicas[i] * (
-                                current_metric_value / target_cpu
-                                )
-                        )
-                    )
-                )
+                min_replicas, min(max_replicas, desired)
             )
 
-
-    # Update the DataFrame in a single operation
-    workload_df['forecast_replicas_up_and_running'] = forecast_replicas
-    workload_df['forecast_sum_cpu_up_and_running'] = forecast_sum_cpu
-    workload_df['forecast_sum_mem_up_and_running'] = forecast_sum_mem
-    workload_df['scale_up_behaviour_to_x_times'] = scale_up_behaviour
-    workload_df['forecast_replicas_desired'] = forecast_replicas_desired
-
-    return workload_df
+    return _assign_forecast(
+        prepared,
+        rec.plan,
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour
+    )
 
 def _is_plan_valid(
         config: Config, plan: WorkloadPlan
@@ -309,7 +516,7 @@ def _is_plan_valid(
 def _process_plan(
     plan: WorkloadPlan,
     workload_details: WorkloadDetails,
-    workload_df: pd.DataFrame,
+    prepared: PreparedWorkload,
     config: Config,
     calculate_inital_replicas: callable,
 ) -> Tuple[Optional[pd.DataFrame],
@@ -321,7 +528,7 @@ def _process_plan(
     Args:
         plan (WorkloadPlan): The recommendations plan to process.
         workload_details (WorkloadDetails): Details of the workload.
-        workload_df (pd.DataFrame): DataFrame containing workload data.
+        prepared (PreparedWorkload): The workload data.
         config (Config): Configuration for recommendations processing.
         calculate_starting_replicas (callable): Function to calculate starting
         replicas.
@@ -352,22 +559,47 @@ def _process_plan(
         return None, rec, rec.validation_msg
 
     # Calculate starting replicas
-    starting_replicas = calculate_inital_replicas(workload_df, plan)
+    starting_replicas = calculate_inital_replicas(prepared, plan)
     logger.info('Starting replicas: %s', starting_replicas)
 
     # Simulate recommendations behavior
 
     analysis_df = _simulate_behaviour(
-        config, rec, workload_df, starting_replicas
+        config, rec, prepared, starting_replicas
     )
 
+    return _summarize_plan_savings(config, rec, prepared, analysis_df)
+
+def _summarize_plan_savings(
+    config: Config,
+    rec: WorkloadRecommendation,
+    prepared: PreparedWorkload,
+    analysis_df: pd.DataFrame,
+) -> Tuple[Optional[pd.DataFrame],
+           WorkloadRecommendation, Optional[str]]:
+    '''
+    Calculates the savings of a simulated plan and stores them in the
+    recommendation.
+
+    Args:
+        config (Config): Configuration for recommendations processing.
+        rec (WorkloadRecommendation): The recommendation of the plan.
+        prepared (PreparedWorkload): The workload the plan replayed.
+        analysis_df (pd.DataFrame): Simulation results of the plan, empty
+            when the simulation clashed.
+
+    Returns:
+        Tuple[Optional[pd.DataFrame], WorkloadRecommendation, Optional[str]]:
+            Same as `_process_plan`.
+    '''
+    plan = rec.plan
     if analysis_df.empty:
         logger.info('Empty simulation results. Skipping.')
         rec.valid = False
         return None, rec, rec.validation_msg
 
     # Calculate savings and analyze clashes
-    analysis_df = _calculate_savings(analysis_df, config)
+    analysis_df = _calculate_savings(prepared, plan, analysis_df, config)
     rec.forecast_cpu_saving = (
         analysis_df['forecast_cpu_saving'].mean().round(3)
     )
@@ -384,62 +616,496 @@ def _process_plan(
     return analysis_df, rec, None
 
 def _calculate_starting_replicas(
-        workload_df:pd.DataFrame, plan: WorkloadPlan):
+        prepared: PreparedWorkload, plan: WorkloadPlan):
     '''Calcuate the number of replicas needed during initial startup'''
 
-    max_cpu = workload_df.loc[0:plan.workload_e2e_startup_latency_rows, 'sum_containers_cpu_usage'].max()
+    # Max usage of the first startup latency rows, read from the running max
+    max_cpu = prepared.running_max_sum_cpu_usage[
+        min(plan.workload_e2e_startup_latency_rows, len(prepared) - 1)
+    ]
     starting_replicas =  int(np.ceil(max_cpu / plan.recommended_cpu_request))
     return np.clip(
         starting_replicas,
         plan.recommended_min_replicas,
         plan.recommended_max_replicas)
 
-def _analyze_configuration_plans(
+def _usage_clash_bounds(
+        prepared: PreparedWorkload) -> Tuple[np.ndarray, float]:
+    '''
+    Precomputes the usage aggregates used by `_prefilter_plan`.
+
+    Returns:
+        Tuple[np.ndarray, float]: The sorted CPU usage without NaNs and the
+            max memory usage in MiB.
+    '''
+    sum_cpu_usage = prepared.quantiles['sum_containers_cpu_usage'].values
+    max_mem_usage_mi = np.nanmax(prepared.sum_mem_usage_mi)
+    return sum_cpu_usage, float(max_mem_usage_mi)
+
+def _prefilter_plan(
     config: Config,
+    plan: WorkloadPlan,
+    bounds: Tuple[np.ndarray, float],
+) -> Optional[str]:
+    '''
+    Rejects plans that are bound to clash before simulating them.
+
+    The replay never runs more than recommended_max_replicas, so a plan
+    clashes whenever its capacity at max replicas is below the memory usage
+    peak, or below the CPU usage in more rows than CPU_CLASH_COUNT_THRESHOLD.
+
+    Args:
+        config (Config): Run configurations.
+        plan (WorkloadPlan): The plan to check.
+        bounds (Tuple[np.ndarray, float]): See `_usage_clash_bounds`.
+
+    Returns:
+        Optional[str]: The reason the plan is rejected, None if it has to
+            be simulated.
+    '''
+    sorted_cpu_usage, max_mem_usage_mi = bounds
+    max_replicas = int(plan.recommended_max_replicas)
+
+    max_sum_mem = max_replicas * float(
+        plan.recommended_mem_request_and_limits_mi
+    )
+    if max_sum_mem < max_mem_usage_mi:
+        return (
+            f'Prefilter: max replicas memory {max_sum_mem:.3f} is < '
+            f'max sum mem usage: {max_mem_usage_mi:.3f}'
+        )
+
+    max_sum_cpu = max_replicas * float(plan.recommended_cpu_request)
+    rows_above = sorted_cpu_usage.shape[0] - np.searchsorted(
+        sorted_cpu_usage, max_sum_cpu, side='right'
+    )
+    if rows_above > config.CPU_CLASH_COUNT_THRESHOLD:
+        return (
+            f'Prefilter: max replicas cpu {max_sum_cpu:.3f} is < '
+            f'sum cpu usage in {rows_above} rows. '
+            'This exceeds the CPU_CLASH_COUNT_THRESHOLD: '
+            f'{config.CPU_CLASH_COUNT_THRESHOLD}'
+        )
+    return None
+
+def _split_plans(
     plans: List[WorkloadPlan],
     workload_details: WorkloadDetails,
-    workload_df: pd.DataFrame,
-) -> Tuple[pd.DataFrame,WorkloadRecommendation, Optional[str]]:
+    prepared: PreparedWorkload,
+    config: Config,
+) -> Tuple[List, List[int], List[WorkloadRecommendation], int]:
     '''
-    Optimized recommendations simulation plans analysis for a given workload using
-    concurrent.futures.
+    Validates the plans and processes the ones that need no HPA replay
+    (invalid, prefiltered and VPA plans).
+
+    Returns:
+        Tuple[List, List[int], List[WorkloadRecommendation], int]:
+            - The results list with one slot per plan, filled for the plans
+              already processed.
+            - The indexes of the HPA plans left to replay.
+            - The recommendations of the HPA plans left to replay.
+            - The number of simulations skipped by `_prefilter_plan`.
     '''
-    reasons = {}
+    results = [None] * len(plans)
+    hpa_indexes = []
+    hpa_recs = []
+    skipped_simulations = 0
+    bounds = (
+        _usage_clash_bounds(prepared)
+        if config.SIMULATION_PREFILTER else None
+    )
+    for idx, plan in enumerate(plans):
+        if plan.method == 'VPA':
+            results[idx] = _process_plan(
+                plan, workload_details, prepared,
+                config, _calculate_starting_replicas
+            )
+            continue
+        rec = WorkloadRecommendation(
+            workload_details=workload_details,
+            plan=plan,
+        )
+        rec.valid, rec.validation_msg = _is_plan_valid(config, plan)
+        if rec.valid and bounds is not None:
+            reason = _prefilter_plan(config, plan, bounds)
+            if reason is not None:
+                rec.valid, rec.validation_msg = False, reason
+                skipped_simulations += 1
+        if not rec.valid:
+            logger.info('Invalid plan: %s', rec.validation_msg)
+            results[idx] = (None, rec, rec.validation_msg)
+            continue
+        hpa_indexes.append(idx)
+        hpa_recs.append(rec)
+    logger.info(
+        'Prefilter skipped %d of %d simulations.',
+        skipped_simulations, len(plans)
+    )
+    return results, hpa_indexes, hpa_recs, skipped_simulations
 
-    workload_df = convert_data_types(workload_df)
+def _replay_result(
+    config: Config,
+    rec: WorkloadRecommendation,
+    prepared: PreparedWorkload,
+    replay: Tuple,
+) -> Tuple[Optional[pd.DataFrame],
+           WorkloadRecommendation, Optional[str]]:
+    '''
+    Turns the output of an HPA replay kernel into a `_process_plan` result.
 
-    # Prepare the function arguments
-    args_list = [
-        (
-            plan, workload_details, workload_df,
-            config, _calculate_starting_replicas
-            )
+    Args:
+        config (Config): Configuration for recommendations processing.
+        rec (WorkloadRecommendation): The recommendation of the plan.
+        prepared (PreparedWorkload): The workload the plan replayed.
+        replay (Tuple): (forecast_replicas, forecast_replicas_desired,
+            scale_up_behaviour, clash_index, clash_kind) of the plan.
+    '''
+    plan = rec.plan
+    (
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        clash_index,
+        clash_kind,
+    ) = replay
+    if clash_kind != CLASH_NONE:
+        rec.valid = False
+        rec.validation_msg = _clash_validation_msg(
+            config,
+            clash_kind,
+            clash_index,
+            forecast_replicas[clash_index] * plan.recommended_cpu_request,
+            prepared.sum_cpu_usage[clash_index],
+            prepared.sum_mem_usage_mi[clash_index],
+        )
+        analysis_df = pd.DataFrame()
+    else:
+        analysis_df = _assign_forecast(
+            prepared,
+            plan,
+            forecast_replicas,
+            forecast_replicas_desired,
+            scale_up_behaviour,
+        )
+    return _summarize_plan_savings(config, rec, prepared, analysis_df)
+
+def _replay_matrix(
+    config: Config,
+    prepared: PreparedWorkload,
+    plans_values: List[Tuple],
+    scale_down_steps: int,
+    behavior: ReplayBehavior,
+    metrics: ReplayMetrics,
+) -> List[Tuple]:
+    '''
+    Replays `_plan_values` sharing a scale down window, a behavior and
+    metrics in a single pass over the time series, see
+    `simulation_kernel.replay_hpa_matrix`.
+    '''
+    columns = list(zip(*plans_values))
+    replays = replay_hpa_matrix(
+        prepared.sum_cpu_usage,
+        prepared.sum_mem_usage_mi,
+        *columns[:6],
+        scale_down_steps,
+        columns[6],
+        config.CPU_CLASH_COUNT_THRESHOLD,
+        behavior,
+        metrics,
+        usage_matrix(prepared.frame, metrics.columns),
+    )
+    logger.info(
+        'Replayed %d plans in a single pass, %d clashed.',
+        len(plans_values),
+        int(np.count_nonzero(replays[4] != CLASH_NONE))
+    )
+    return [
+        tuple(replay[row] for replay in replays)
+        for row in range(len(plans_values))
+    ]
+
+def _process_plans_reference(
+    plans: List[WorkloadPlan],
+    workload_details: WorkloadDetails,
+    prepared: PreparedWorkload,
+    config: Config,
+) -> Tuple[List, int]:
+    '''
+    Processes all recommendations plans one by one with `_process_plan`
+    in the current process, for the reference 'python' backend which has
+    no matrix or pool replay. The prefilter and the simulation cache are
+    not used.
+    '''
+    logger.info(
+        "Simulating %d plans in process with the 'python' backend, "
+        'without the prefilter and the simulation cache.', len(plans)
+    )
+    results = [
+        _process_plan(
+            plan, workload_details, prepared, config,
+            _calculate_starting_replicas
+        )
         for plan in plans
     ]
+    return results, 0
+
+def _process_plans_matrix(
+    plans: List[WorkloadPlan],
+    workload_details: WorkloadDetails,
+    prepared: PreparedWorkload,
+    config: Config,
+) -> Tuple[List, int]:
+    '''
+    Processes all recommendations plans in the current process, replaying
+    every HPA plan together in a single pass over the time series. The
+    reference 'python' backend has no matrix replay, its plans are
+    processed by `_process_plans_reference` instead.
+
+    Args:
+        plans (List[WorkloadPlan]): The recommendations plans to process.
+        workload_details (WorkloadDetails): Details of the workload.
+        prepared (PreparedWorkload): The workload data.
+        config (Config): Configuration for recommendations processing.
+
+    Returns:
+        Tuple[List, int]:
+            - One `_process_plan` result per plan, in the order of `plans`.
+            - The number of simulations skipped by the prefilter.
+    '''
+    if resolve_backend(config.SIMULATION_BACKEND) == 'python':
+        return _process_plans_reference(
+            plans, workload_details, prepared, config
+        )
+
+    results, hpa_indexes, hpa_recs, skipped_simulations = _split_plans(
+        plans, workload_details, prepared, config
+    )
+    if not hpa_recs:
+        return results, skipped_simulations
+
+    replays = _replay_hpa_plans(
+        config, prepared, hpa_recs,
+        functools.partial(_replay_matrix, config, prepared)
+    )
+    for idx, rec, replay in zip(hpa_indexes, hpa_recs, replays):
+        results[idx] = _replay_result(config, rec, prepared, replay)
+    return results, skipped_simulations
+
+def _plan_values(prepared: PreparedWorkload, plan: WorkloadPlan) -> Tuple:
+    '''
+    The plan scalars of an HPA replay, see
+    `simulation_pool._replay_shared_plan`.
+    '''
+    return (
+        plan.recommended_min_replicas,
+        plan.recommended_max_replicas,
+        plan.recommended_cpu_request,
+        plan.recommended_mem_request_and_limits_mi,
+        plan.recommended_hpa_target_cpu,
+        plan.workload_e2e_startup_latency_rows,
+        _calculate_starting_replicas(prepared, plan),
+    )
+
+def _replay_hpa_plans(
+    config: Config,
+    prepared: PreparedWorkload,
+    recs: List[WorkloadRecommendation],
+    replay: callable,
+) -> List[Tuple]:
+    '''
+    Replays the plans of the recommendations, one replay call per scale
+    down window, behavior and metrics, see `_scale_down_steps`,
+    `_hpa_behavior` and `_hpa_metrics`.
 
+    With config.SIMULATION_CACHE_DIR set, replays already on disk are read
+    from the simulation cache and the new ones are stored in it.
+
+    Args:
+        config (Config): Configuration for recommendations processing.
+        prepared (PreparedWorkload): The workload data.
+        recs (List[WorkloadRecommendation]): The HPA plans to replay.
+        replay (callable): Replays a list of `_plan_values` with a scale
+            down window, a `ReplayBehavior` and `ReplayMetrics`, returning
+            one replay tuple per plan.
+
+    Returns:
+        List[Tuple]: (forecast_replicas, forecast_replicas_desired,
+            scale_up_behaviour, clash_index, clash_kind) of every plan.
+    '''
+    cache = get_simulation_cache(config)
+    fingerprints = {}
+    replays = [None] * len(recs)
+    groups = {}
+    for pos, rec in enumerate(recs):
+        plan_values = _plan_values(prepared, rec.plan)
+        scale_down_steps = _scale_down_steps(config, rec.plan)
+        behavior = _hpa_behavior(config, rec.plan)
+        metrics = _hpa_metrics(config, rec.plan)
+        key = None
+        if cache is not None:
+            replayed_metrics = replay_metrics(metrics)
+            if replayed_metrics.columns not in fingerprints:
+                fingerprints[replayed_metrics.columns] = data_fingerprint(
+                    prepared.sum_cpu_usage,
+                    prepared.sum_mem_usage_mi,
+                    *usage_matrix(prepared.frame, replayed_metrics.columns)
+                )
+            key = replay_key(
+                fingerprints[replayed_metrics.columns], plan_values,
+                scale_down_steps, _replay_behavior(config, rec.plan),
+                replayed_metrics, config
+            )
+            replays[pos] = cache.get(key)
+            if replays[pos] is not None:
+                continue
+        groups.setdefault((scale_down_steps, behavior, metrics), []).append(
+            (pos, plan_values, key)
+        )
+
+    for (scale_down_steps, behavior, metrics), group in groups.items():
+        group_replays = replay(
+            [plan_values for _, plan_values, _ in group],
+            scale_down_steps,
+            replay_behavior(behavior, config.DISTANCE_BETWEEN_POINTS_SECONDS),
+            replay_metrics(metrics),
+        )
+        for (pos, _, key), plan_replay in zip(group, group_replays):
+            replays[pos] = plan_replay
+            if cache is not None:
+                cache.put(key, plan_replay)
+    if cache is not None:
+        simulated = sum(len(group) for group in groups.values())
+        logger.info(
+            'Simulation cache: %d replays hit, %d simulated.',
+            len(recs) - simulated, simulated
+        )
+        if simulated:
+            cache.evict()
+    return replays
+
+def _process_plans_pool(
+    plans: List[WorkloadPlan],
+    workload_details: WorkloadDetails,
+    prepared: PreparedWorkload,
+    config: Config,
+) -> Tuple[List, int]:
+    '''
+    Processes all recommendations plans replaying the HPA plans on the
+    shared simulation process pool.
+
+    The replay columns are published once in shared memory and the tasks
+    only carry the plan scalars, see `simulation_pool`. The reference
+    'python' backend needs the whole frame and config, its plans are
+    processed in the current process by `_process_plans_reference`.
+
+    Args:
+        plans (List[WorkloadPlan]): The recommendations plans to process.
+        workload_details (WorkloadDetails): Details of the workload.
+        prepared (PreparedWorkload): The workload data.
+        config (Config): Configuration for recommendations processing.
+
+    Returns:
+        Tuple[List, int]:
+            - One `_process_plan` result per plan, in the order of `plans`.
+            - The number of simulations skipped by the prefilter.
+    '''
+    pool_workers = config.SIMULATION_POOL_MAX_WORKERS
+    backend = resolve_backend(config.SIMULATION_BACKEND)
+    if backend == 'python':
+        return _process_plans_reference(
+            plans, workload_details, prepared, config
+        )
+
+    results, hpa_indexes, hpa_recs, skipped_simulations = _split_plans(
+        plans, workload_details, prepared, config
+    )
+    if not hpa_recs:
+        return results, skipped_simulations
+
+    def replay_pool(plans_values, scale_down_steps, behavior, metrics):
+        return replay_plans_in_pool(
+            prepared.frame,
+            backend,
+            plans_values,
+            scale_down_steps,
+            config.CPU_CLASH_COUNT_THRESHOLD,
+            pool_workers,
+            behavior,
+            metrics,
+        )
+
+    replays = _replay_hpa_plans(config, prepared, hpa_recs, replay_pool)
+    for idx, rec, replay in zip(hpa_indexes, hpa_recs, replays):
+        results[idx] = _replay_result(config, rec, prepared, replay)
+    return results, skipped_simulations
+
+def _select_best_plan(
+    results,
+    reasons: Dict[str, str],
+) -> Tuple[pd.DataFrame, Optional[WorkloadRecommendation],
+           List[pd.DataFrame]]:
+    '''
+    Picks the plan with the highest average savings from the processed
+    plans results, recording the reason of every skipped plan.
+    '''
     highest_avg_saving = -np.inf
     best_rec = None
     best_analysis_df = pd.DataFrame()
     all_simulation_df = []
 
-    # Use ProcessPoolExecutor for multiprocessing
-    with ProcessPoolExecutor() as executor:
-        # Submit all tasks to the executor
-        results = executor.map(_process_plan, *zip(*args_list)) 
-        for result in results:
-            analysis_df, rec, reason = result  # Unpack the result tuple
-            if analysis_df is None:
-                reasons[rec.plan.method] = reason
-                continue
+    for result in results:
+        analysis_df, rec, reason = result  # Unpack the result tuple
+        if analysis_df is None:
+            reasons[rec.plan.method] = reason
+            continue
+
+        # Evaluate results
+        avg_saving = analysis_df['avg_saving_in_cpus'].mean()
+        all_simulation_df.append(analysis_df)
+        if avg_saving > highest_avg_saving:
+            highest_avg_saving = avg_saving
+            best_rec = rec
+            best_analysis_df = analysis_df
+    return best_analysis_df, best_rec, all_simulation_df
+
+def _analyze_configuration_plans(
+    config: Config,
+    plans: List[WorkloadPlan],
+    workload_details: WorkloadDetails,
+    workload_df: Union[pd.DataFrame, PreparedWorkload],
+) -> Tuple[pd.DataFrame, Optional[WorkloadRecommendation],
+           Dict[str, str], List[pd.DataFrame]]:
+    '''
+    Optimized recommendations simulation plans analysis for a given workload.
+
+    With config.SIMULATION_MODE = 'pool' every plan is replayed in its own
+    task of the shared simulation pool, see `_process_plans_pool`. With
+    'matrix' all plans are replayed together in the current process, see
+    `_process_plans_matrix`. The workload is prepared by
+    `prepare_workload` unless it already is.
+    '''
+    process_plans = {
+        'matrix': _process_plans_matrix,
+        'pool': _process_plans_pool,
+    }.get(config.SIMULATION_MODE)
+    if process_plans is None:
+        raise ValueError(
+            f'Unknown SIMULATION_MODE {config.SIMULATION_MODE!r}, '
+            "expected 'pool' or 'matrix'"
+        )
+    reasons = {}
 
-            # Evaluate results
-            avg_saving = analysis_df['avg_saving_in_cpus'].mean()
-            all_simulation_df.append(analysis_df)
-            if avg_saving > highest_avg_saving:
-                highest_avg_saving = avg_saving
-                best_rec = rec
-                best_analysis_df = analysis_df
+    prepared = prepare_workload(workload_details, workload_df)
 
+    results, skipped_simulations = process_plans(
+        plans, workload_details, prepared, config
+    )
+    best_analysis_df, best_rec, all_simulation_df = _select_best_plan(
+        results, reasons
+    )
+
+    if best_rec is not None:
+        best_rec.skipped_simulations = skipped_simulations
     logger.info(best_rec)
 
     return best_analysis_df, best_rec, reasons, all_simulation_df
@@ -460,6 +1126,9 @@ def write_to_bigquery(analysis_df: pd.DataFrame,
         logger.info("No data to write to BigQuery.")
         return
 
+    # Simulation frames keep the compact usage columns
+    analysis_df = decode_usage_columns(analysis_df)
+
     # Define additional workload details to be added to the DataFrame
     required_columns = {
         "project_id": rec.workload_details.project_id,
@@ -531,13 +1200,14 @@ def write_to_bigquery(analysis_df: pd.DataFrame,
 def run_simulation_plans(
     plans: List[WorkloadPlan],
     workload_details: WorkloadDetails,
-    workload_df: pd.DataFrame,
+    workload_df: Union[pd.DataFrame, PreparedWorkload],
 ) -> Tuple[pd.DataFrame, WorkloadRecommendation, Dict[str,str]]:
     '''
     Runs the recommendations simulation for a given workload and recommendations plans.
 
     Args:
-        workload_df (pd.DataFrame): Workload metrics and data.
+        workload_df: Workload metrics and data, or the workload prepared
+            by `prepare_workload`.
         workload_details (WorkloadDetails): Workload's characteristics.
         plans (List[WorkloadRecommendation]): List of recommendations plans.
 
@@ -546,18 +1216,36 @@ def run_simulation_plans(
             - A DataFrame with simulation analysis.
             - An WorkloadRecommendation or None if no data is found.
     '''
-    reasons = {}
     analysis_df, rec, reason, all_simulations_df = _analyze_configuration_plans(
         workload_details.config,
         plans,
         workload_details,
         workload_df
     )
+    return _finalize_recommendation(
+        analysis_df, rec, reason, all_simulations_df
+    )
 
+def _finalize_recommendation(
+    analysis_df: pd.DataFrame,
+    rec: Optional[WorkloadRecommendation],
+    reason: Dict[str, str],
+    all_simulations_df: List[pd.DataFrame],
+) -> Tuple[pd.DataFrame, Optional[WorkloadRecommendation],
+           Dict[str, str], List[pd.DataFrame]]:
+    '''
+    Completes the best recommendation with the replicas and the period
+    observed in its analysis, see `run_simulation_plans`. The usage
+    columns of every returned simulation are decoded to cores and MiB.
+    '''
+    reasons = {}
     if analysis_df.empty:
         logger.info('No valid analysis data found, returning empty DataFrame.')
         reasons['Empty analysis dataframe'] =  reason
-        return analysis_df, None, reasons
+        return analysis_df, None, reasons, []
+    decode_usage_columns(analysis_df)
+    for simulation_df in all_simulations_df:
+        decode_usage_columns(simulation_df)
     rec.workload_details.min_replicas = int(np.ceil(
         analysis_df['num_replicas_at_usage_window'].min()
     ))
@@ -575,6 +1263,20 @@ def run_simulation_plans(
 
     return analysis_df, rec, reason, all_simulations_df
 
+def _get_workload_plans(
+    workload_details: WorkloadDetails,
+    workload_df: Union[pd.DataFrame, PreparedWorkload],
+) -> Tuple[List[WorkloadPlan], Dict[str, str]]:
+    '''
+    The plans of `get_simulation_plans`, followed by the plans of the
+    grid search when config.PLAN_SEARCH_MODE is 'grid', see
+    `plan_search.get_search_plans`.
+    '''
+    plans, reason = get_simulation_plans(workload_details, workload_df)
+    if plans:
+        plans += get_search_plans(workload_details, workload_df)
+    return plans, reason
+
 @log_exec_time(logger)
 def plan_and_run_simulation(
     workload_details: WorkloadDetails,
@@ -593,14 +1295,17 @@ def plan_and_run_simulation(
             - An WorkloadRecommendation or None if no plans exist.
     '''
     reasons = {}
-    plans, reason = get_simulation_plans(
+    if len(workload_df) > 0:
+        # Planning and simulation share the workload prepared once
+        workload_df = prepare_workload(workload_details, workload_df)
+    plans, reason = _get_workload_plans(
         workload_details,
         workload_df
     )
     if not plans:
         logger.info('No plans exists for workload %s', workload_details)
         reasons['No plans exists'] = reason
-        return pd.DataFrame(), None, reasons
+        return pd.DataFrame(), None, reasons, []
     analysis_df, savings_summary , reason, all_simulation_dfs = run_simulation_plans(
         plans,
         workload_details,
@@ -609,3 +1314,116 @@ def plan_and_run_simulation(
     return analysis_df, savings_summary, reasons, all_simulation_dfs
 
 
+
+def replay_traces(
+    workload_details: WorkloadDetails,
+    prepared: PreparedWorkload,
+    plans: List[WorkloadPlan],
+) -> Tuple[List[PlanTrace], Dict[str, str]]:
+    '''
+    Replica traces of the valid plans, without their savings.
+
+    The HPA plans are replayed in a single pass per scale down window and
+    read from the simulation cache when config.SIMULATION_CACHE_DIR is
+    set, VPA plans run their max replicas throughout.
+
+    Args:
+        workload_details (WorkloadDetails): Workload's characteristics.
+        prepared (PreparedWorkload): The workload data.
+        plans (List[WorkloadPlan]): The plans to replay.
+
+    Returns:
+        Tuple[List[PlanTrace], Dict[str, str]]:
+            - The traces of the plans without clash, in the order of plans.
+            - Why the other plans have no trace, by plan method.
+    '''
+    config = workload_details.config
+    traces = [None] * len(plans)
+    reasons = {}
+    hpa_indexes, hpa_recs = [], []
+    bounds = (
+        _usage_clash_bounds(prepared)
+        if config.SIMULATION_PREFILTER else None
+    )
+    for idx, plan in enumerate(plans):
+        if plan.method == 'VPA':
+            traces[idx] = PlanTrace(plan, np.full(
+                len(prepared),
+                plan.recommended_max_replicas,
+                dtype=trace_dtype(plan.recommended_max_replicas)
+            ))
+            continue
+        valid, msg = _is_plan_valid(config, plan)
+        if valid and bounds is not None:
+            msg = _prefilter_plan(config, plan, bounds)
+            valid = msg is None
+        if not valid:
+            reasons[plan.method] = msg
+            continue
+        hpa_indexes.append(idx)
+        hpa_recs.append(
+            WorkloadRecommendation(workload_details=workload_details,
+                                   plan=plan)
+        )
+
+    if hpa_recs:
+        replays = _replay_hpa_plans(
+            config, prepared, hpa_recs,
+            functools.partial(_replay_matrix, config, prepared)
+        )
+        for idx, rec, replay in zip(hpa_indexes, hpa_recs, replays):
+            forecast_replicas, _, _, clash_index, clash_kind = replay
+            if clash_kind != CLASH_NONE:
+                reasons[rec.plan.method] = _clash_validation_msg(
+                    config,
+                    clash_kind,
+                    clash_index,
+                    forecast_replicas[clash_index]
+                    * rec.plan.recommended_cpu_request,
+                    prepared.sum_cpu_usage[clash_index],
+                    prepared.sum_mem_usage_mi[clash_index],
+                )
+                continue
+            traces[idx] = PlanTrace(rec.plan, forecast_replicas)
+    return [trace for trace in traces if trace is not None], reasons
+
+@log_exec_time(logger)
+def score_cost_models(
+    workload_details: WorkloadDetails,
+    workload_df: pd.DataFrame,
+    cost_models: List[CostModel],
+    plans: Optional[List[WorkloadPlan]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, str]]:
+    '''
+    What-if savings of the workload plans under several cost models.
+
+    The plans are replayed once, see `replay_traces`, and each cost model
+    only prices the replica traces, see `savings_scoring.score_traces`.
+    With config.SIMULATION_CACHE_DIR set, a rerun with other cost models
+    reads the traces from disk instead of replaying the HPA.
+
+    Args:
+        workload_details (WorkloadDetails): Workload's characteristics.
+        workload_df (pd.DataFrame): Workload metrics and data.
+        cost_models (List[CostModel]): The cost models to evaluate.
+        plans (Optional[List[WorkloadPlan]]): The plans to score, the
+            plans of `plan_and_run_simulation` by default.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, str]]:
+            - The mean avg_saving_in_cpus of every plan with a trace
+              (rows, by plan method) under every cost model (columns).
+            - Why the other plans have no score.
+    '''
+    reasons = {}
+    if len(workload_df) == 0:
+        reasons['Empty workload dataframe'] = 'No workload data to score.'
+        return score_traces(None, [], cost_models), reasons
+    prepared = prepare_workload(workload_details, workload_df)
+    if plans is None:
+        plans, reason = _get_workload_plans(workload_details, prepared)
+        if not plans:
+            reasons['No plans exists'] = reason
+            return score_traces(prepared, [], cost_models), reasons
+    traces, reasons = replay_traces(workload_details, prepared, plans)
+    return score_traces(prepared, traces, cost_models), reasons
@@ -0,0 +1,159 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Savings Scoring - Savings of replica traces under cost models '''
+from dataclasses import dataclass
+from typing import Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import PreparedWorkload, WorkloadPlan
+
+ArrayLike = Union[float, np.ndarray]
+
+
+@dataclass(frozen=True)
+class CostModel:
+    '''
+    Price of memory relative to CPU, used to express savings in CPUs.
+
+    Attributes:
+        name (str): Name of the model, e.g. a region.
+        cost_of_gb_in_cpus (float): GiB of memory costing as much as one
+            CPU, see config.COST_OF_GB_IN_CPUS.
+    '''
+    name: str
+    cost_of_gb_in_cpus: float
+
+    @classmethod
+    def from_prices(
+        cls, name: str, cpu_price: float, gb_price: float
+    ) -> 'CostModel':
+        '''A cost model from the price of one CPU and of one GiB.'''
+        return cls(name, cpu_price / gb_price)
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'CostModel':
+        '''The cost model of config.COST_OF_GB_IN_CPUS.'''
+        return cls('config', config.COST_OF_GB_IN_CPUS)
+
+
+@dataclass
+class PlanTrace:
+    '''
+    Replica trace of a simulated plan.
+
+    Attributes:
+        plan (WorkloadPlan): The plan.
+        forecast_replicas (np.ndarray): Replicas up and running per row of
+            the prepared workload, see `simulation_kernel.trace_dtype`.
+    '''
+    plan: WorkloadPlan
+    forecast_replicas: np.ndarray
+
+
+def forecast_savings(
+    prepared: PreparedWorkload,
+    cpu_request: ArrayLike,
+    mem_request_mi: ArrayLike,
+    forecast_replicas: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    '''
+    CPU and memory savings per row of replica traces against the workload
+    requests.
+
+    Args:
+        prepared (PreparedWorkload): The workload the traces replayed.
+        cpu_request, mem_request_mi: Per replica requests, a column of
+            shape (plans, 1) for a (plans, rows) matrix of traces.
+        forecast_replicas (np.ndarray): One trace, or a matrix of traces.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: forecast_cpu_saving rounded to
+            millicores and forecast_mem_saving_mi rounded up, with the
+            shape of forecast_replicas.
+    '''
+    forecast_cpu_saving = np.round(
+        prepared.sum_cpu_request - forecast_replicas * cpu_request, 3
+    )
+    forecast_mem_saving_mi = np.ceil(
+        prepared.sum_mem_request_mi - forecast_replicas * mem_request_mi
+    )
+    return forecast_cpu_saving, forecast_mem_saving_mi
+
+
+def savings_in_cpus(
+    forecast_cpu_saving: np.ndarray,
+    forecast_mem_saving_mi: np.ndarray,
+    cost_of_gb_in_cpus: float,
+) -> np.ndarray:
+    '''Savings per row in CPUs, the memory priced by cost_of_gb_in_cpus.'''
+    return np.round(
+        forecast_cpu_saving
+        + (forecast_mem_saving_mi / 1024) / cost_of_gb_in_cpus,
+        2
+    )
+
+
+def score_traces(
+    prepared: PreparedWorkload,
+    traces: Sequence[PlanTrace],
+    cost_models: Sequence[CostModel],
+) -> pd.DataFrame:
+    '''
+    Mean avg_saving_in_cpus of replica traces under many cost models.
+
+    The traces are stacked in one (plans, rows) matrix and the CPU and
+    memory savings are computed once, each cost model only prices them.
+    Rows with missing usage are skipped, as in the simulation frames.
+
+    Args:
+        prepared (PreparedWorkload): The workload the traces replayed.
+        traces (Sequence[PlanTrace]): The traces to score.
+        cost_models (Sequence[CostModel]): The cost models.
+
+    Returns:
+        pd.DataFrame: One row per trace indexed by plan method, one column
+            per cost model name.
+    '''
+    methods = [trace.plan.method for trace in traces]
+    names = [model.name for model in cost_models]
+    if not traces:
+        return pd.DataFrame(index=methods, columns=names, dtype=np.float64)
+
+    forecast_replicas = np.stack([trace.forecast_replicas for trace in traces])
+    cpu_request = np.array(
+        [[trace.plan.recommended_cpu_request] for trace in traces],
+        dtype=np.float64
+    )
+    mem_request_mi = np.array(
+        [[trace.plan.recommended_mem_request_and_limits_mi]
+         for trace in traces],
+        dtype=np.float64
+    )
+    forecast_cpu_saving, forecast_mem_saving_mi = forecast_savings(
+        prepared, cpu_request, mem_request_mi, forecast_replicas
+    )
+    scores = np.empty((len(traces), len(cost_models)))
+    for col, model in enumerate(cost_models):
+        saving = savings_in_cpus(
+            forecast_cpu_saving,
+            forecast_mem_saving_mi,
+            model.cost_of_gb_in_cpus
+        )
+        rows = np.count_nonzero(~np.isnan(saving), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scores[:, col] = np.nansum(saving, axis=1) / rows
+        scores[rows == 0, col] = np.nan
+    return pd.DataFrame(scores, index=methods, columns=names)
@@ -0,0 +1,218 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Simulation Cache - On-disk cache of HPA replay traces '''
+import hashlib
+import json
+import logging
+import os
+import threading
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+import numpy as np
+from hpaconfigrecommender.simulation_kernel import (
+    ReplayBehavior,
+    ReplayMetrics,
+)
+from hpaconfigrecommender.utils.config import Config
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Bump when the replay kernel or the stored layout changes
+CACHE_VERSION = 4
+
+# Settings read by the replay kernel, besides the plan values and the HPA
+# behavior and metrics. Savings settings such as COST_OF_GB_IN_CPUS are
+# applied to the cached traces.
+SIMULATOR_SETTINGS = (
+    'CPU_CLASH_COUNT_THRESHOLD',
+    'DISTANCE_BETWEEN_POINTS_SECONDS',
+)
+
+_REPLAY_ARRAYS = (
+    'forecast_replicas',
+    'forecast_replicas_desired',
+    'scale_up_behaviour',
+)
+
+
+@dataclass
+class SimulationCacheStats:
+    """
+    Counters of a simulation cache.
+
+    Attributes:
+        hits (int): Replays read from disk.
+        misses (int): Replays simulated.
+        evictions (int): Replays removed to honour the size limit.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of replays served from disk."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def data_fingerprint(*columns: np.ndarray) -> str:
+    '''Hashes the usage columns a replay reads.'''
+    digest = hashlib.sha256()
+    for values in columns:
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        digest.update(str(values.shape).encode())
+        digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def replay_key(
+    fingerprint: str,
+    plan_values: Sequence,
+    scale_down_steps: int,
+    behavior: ReplayBehavior,
+    metrics: ReplayMetrics,
+    config: Config,
+) -> str:
+    '''
+    Hashes what determines a replay: the data (with the metric columns),
+    the plan values passed to the kernel (see
+    `simulation_pool._replay_shared_plan`), the scale down window, the
+    behavior, the metrics and the SIMULATOR_SETTINGS.
+    '''
+    key = [
+        CACHE_VERSION,
+        fingerprint,
+        [float(value) for value in plan_values],
+        int(scale_down_steps),
+        behavior.key(),
+        metrics.key(),
+        [repr(getattr(config, name)) for name in SIMULATOR_SETTINGS],
+    ]
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+class SimulationCache:
+    '''
+    Content-addressed cache of HPA replays on local disk.
+
+    Each replay is one compressed .npz file named after its `replay_key`,
+    holding the replica traces and the clash of the replay. Files are
+    evicted least recently used first when the cache grows over
+    max_bytes.
+    '''
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stats = SimulationCacheStats()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f'{key}.npz'
+
+    def _count(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def get(self, key: str) -> Optional[Tuple]:
+        '''
+        The cached replay, (forecast_replicas, forecast_replicas_desired,
+        scale_up_behaviour, clash_index, clash_kind), None on a miss.
+        '''
+        path = self._path(key)
+        try:
+            with np.load(path) as stored:
+                replay = tuple(
+                    stored[name] for name in _REPLAY_ARRAYS
+                ) + (int(stored['clash_index']), int(stored['clash_kind']))
+        except FileNotFoundError:
+            self._count(misses=1)
+            return None
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning('Dropping unreadable cache file %s: %s', path, e)
+            path.unlink(missing_ok=True)
+            self._count(misses=1)
+            return None
+        try:
+            os.utime(path)  # Last access time for the LRU eviction
+        except FileNotFoundError:
+            pass
+        self._count(hits=1)
+        return replay
+
+    def put(self, key: str, replay: Tuple):
+        '''Stores a replay, see `get`.'''
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp'
+        )
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                **dict(zip(_REPLAY_ARRAYS, replay[:3])),
+                clash_index=replay[3],
+                clash_kind=replay[4],
+            )
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        '''Removes least recently used replays above max_bytes.'''
+        files = []
+        total = 0
+        for path in self.cache_dir.glob('*/*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        files.sort()
+        evicted = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        self._count(evictions=evicted)
+        logger.info('Simulation cache evicted %d replays.', evicted)
+
+
+_simulation_cache: Optional[SimulationCache] = None
+
+
+def get_simulation_cache(config: Config) -> Optional[SimulationCache]:
+    '''
+    Returns the process wide cache configured by config.SIMULATION_CACHE_*,
+    None when config.SIMULATION_CACHE_DIR is not set.
+    '''
+    global _simulation_cache
+    cache_dir = config.SIMULATION_CACHE_DIR
+    if not cache_dir:
+        return None
+    settings = (Path(cache_dir), config.SIMULATION_CACHE_MAX_BYTES)
+    cache = _simulation_cache
+    if cache is None or (cache.cache_dir, cache.max_bytes) != settings:
+        cache = SimulationCache(*settings)
+        _simulation_cache = cache
+    return cache
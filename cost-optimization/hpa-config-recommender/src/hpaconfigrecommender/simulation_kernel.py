@@ -0,0 +1,1370 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Simulation Kernel - HPA replay loop over plain NumPy arrays '''
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Callable, Sequence, Tuple
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is an optional dependency
+    njit = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+SIMULATION_BACKENDS = ('python', 'kernel', 'numba', 'auto')
+
+CLASH_NONE = 0
+CLASH_CPU = 1
+CLASH_MEM = 2
+
+# Replica traces are int16 unless a plan may scale above its range
+REPLICA_TRACE_DTYPE = np.int16
+
+
+def trace_dtype(max_replicas) -> np.dtype:
+    '''
+    Dtype of the replica traces of plans scaling up to max_replicas:
+    REPLICA_TRACE_DTYPE, or int32 when it cannot hold max_replicas.
+    '''
+    if np.max(max_replicas, initial=0) <= np.iinfo(REPLICA_TRACE_DTYPE).max:
+        return np.dtype(REPLICA_TRACE_DTYPE)
+    return np.dtype(np.int32)
+
+
+# Types of the HPA behavior policies
+POLICY_TYPES = ('Pods', 'Percent')
+POLICY_PODS = 0
+POLICY_PERCENT = 1
+
+# selectPolicy of the HPA behavior
+SELECT_POLICIES = ('Max', 'Min', 'Disabled')
+SELECT_MAX = 0
+SELECT_MIN = 1
+SELECT_DISABLED = 2
+
+
+@dataclass(frozen=True, eq=False)
+class ScalingRules:
+    '''
+    Rate limits of one scaling direction, as the scaleUp or scaleDown
+    policies of a HorizontalPodAutoscaler behavior, see `scaling_rules`.
+
+    Attributes:
+        policies (np.ndarray): One (type, value, period_rows) row per
+            policy, type POLICY_PODS or POLICY_PERCENT. Without policies
+            the direction is not rate limited.
+        select_policy (int): SELECT_MAX, SELECT_MIN or SELECT_DISABLED.
+    '''
+    policies: np.ndarray = field(
+        default_factory=lambda: np.zeros((0, 3), dtype=np.float64)
+    )
+    select_policy: int = SELECT_MAX
+
+    @property
+    def max_period(self) -> int:
+        '''Longest policy period in rows, 0 without policies.'''
+        return int(self.policies[:, 2].max(initial=0))
+
+
+NO_SCALING_RULES = ScalingRules()
+
+
+def scaling_rules(
+    policies: Sequence,
+    select_policy: str,
+    seconds_per_row: float,
+) -> ScalingRules:
+    '''
+    Kernel rules of HPA behavior policies, `models.HPAScalingPolicy`
+    values. Periods are rounded up to whole rows.
+
+    Raises:
+        ValueError: If a policy type or the select policy is unknown.
+    '''
+    if select_policy not in SELECT_POLICIES:
+        raise ValueError(
+            f'Unknown HPA selectPolicy {select_policy!r}, '
+            f'expected one of {SELECT_POLICIES}'
+        )
+    rows = []
+    for policy in policies:
+        if policy.type not in POLICY_TYPES:
+            raise ValueError(
+                f'Unknown HPA policy type {policy.type!r}, '
+                f'expected one of {POLICY_TYPES}'
+            )
+        rows.append((
+            POLICY_TYPES.index(policy.type),
+            float(policy.value),
+            max(math.ceil(policy.period_seconds / seconds_per_row), 1),
+        ))
+    return ScalingRules(
+        policies=np.array(rows, dtype=np.float64).reshape(-1, 3),
+        select_policy=SELECT_POLICIES.index(select_policy),
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class ReplayBehavior:
+    '''
+    HPA behavior as read by the replay kernels, see `replay_behavior`.
+
+    Attributes:
+        scale_up, scale_down (ScalingRules): Rate limits of each direction.
+        tolerance (float): Distance of the usage ratio to 1 within which
+            the desired replicas stay the current replicas.
+        cpu_initialization_rows (int): Rows a replica is up and running
+            before its CPU usage is counted. 0 counts every replica.
+    '''
+    scale_up: ScalingRules = NO_SCALING_RULES
+    scale_down: ScalingRules = NO_SCALING_RULES
+    tolerance: float = 0.0
+    cpu_initialization_rows: int = 0
+
+    def key(self) -> list:
+        '''JSON serializable values of the behavior.'''
+        return [
+            self.scale_up.policies.tolist(),
+            self.scale_up.select_policy,
+            self.scale_down.policies.tolist(),
+            self.scale_down.select_policy,
+            float(self.tolerance),
+            int(self.cpu_initialization_rows),
+        ]
+
+
+DEFAULT_BEHAVIOR = ReplayBehavior()
+
+
+def replay_behavior(behavior, seconds_per_row: float) -> ReplayBehavior:
+    '''
+    Kernel behavior of a `models.HPABehavior`. Periods are rounded up to
+    whole rows.
+
+    Raises:
+        ValueError: If a policy type or a select policy is unknown.
+    '''
+    return ReplayBehavior(
+        scale_up=scaling_rules(
+            behavior.scale_up_policies,
+            behavior.scale_up_select_policy,
+            seconds_per_row,
+        ),
+        scale_down=scaling_rules(
+            behavior.scale_down_policies,
+            behavior.scale_down_select_policy,
+            seconds_per_row,
+        ),
+        tolerance=float(behavior.tolerance),
+        cpu_initialization_rows=math.ceil(
+            behavior.cpu_initialization_period_seconds / seconds_per_row
+        ),
+    )
+
+
+def policy_limit(
+    current: int,
+    policies: np.ndarray,
+    select_policy: int,
+    changed: np.ndarray,
+    scale_up: bool,
+) -> int:
+    '''
+    Replicas a direction may reach from current, as the HPA controller
+    computes the scale up and scale down limits of its behavior. The
+    replay kernels inline the same arithmetic.
+
+    Args:
+        current (int): Replicas before the scaling.
+        policies (np.ndarray): The policies, see `ScalingRules`.
+        select_policy (int): The select policy, see `ScalingRules`.
+        changed (np.ndarray): Replicas added (scale up) or removed (scale
+            down) during the period of every policy.
+        scale_up (bool): Whether the limit is a scale up limit.
+
+    Returns:
+        int: The limit, never past current in the other direction.
+    '''
+    if select_policy == SELECT_DISABLED:
+        return current
+    pick_max = (select_policy == SELECT_MAX) == scale_up
+    limit = -1 if pick_max else 2**62
+    for k in range(policies.shape[0]):
+        if scale_up:
+            period_start = current - changed[k]
+            if policies[k, 0] == POLICY_PODS:
+                proposed = period_start + int(policies[k, 1])
+            else:
+                proposed = math.ceil(
+                    period_start * (1.0 + policies[k, 1] / 100.0)
+                )
+        else:
+            period_start = current + changed[k]
+            if policies[k, 0] == POLICY_PODS:
+                proposed = period_start - int(policies[k, 1])
+            else:
+                proposed = int(period_start * (1.0 - policies[k, 1] / 100.0))
+        if pick_max:
+            limit = max(limit, proposed)
+        else:
+            limit = min(limit, proposed)
+    if scale_up:
+        return max(limit, current)
+    return min(limit, current)
+
+
+def desired_replicas(
+    replicas: int,
+    ready: int,
+    usage_ratio: float,
+    tolerance: float,
+) -> int:
+    '''
+    Desired replicas of a CPU utilization metric, as the HPA controller
+    computes them with the usage spread evenly over the replicas. The
+    replay kernels inline the same arithmetic.
+
+    Replicas that are not ready yet do not count. When they would make
+    the HPA scale up, they are counted as idle instead, and the HPA keeps
+    the current replicas unless the ratio still calls for a scale up.
+
+    Args:
+        replicas (int): Current replicas.
+        ready (int): Replicas past their CPU initialization period.
+        usage_ratio (float): Utilization over its target.
+        tolerance (float): See `ReplayBehavior`.
+
+    Returns:
+        int: The desired replicas, before the min and max replicas.
+    '''
+    if ready <= 0:
+        return replicas
+    if ready < replicas and usage_ratio > 1.0:
+        usage_ratio = usage_ratio * ready / replicas
+        if usage_ratio < 1.0 or abs(1.0 - usage_ratio) <= tolerance:
+            return replicas
+        return math.ceil(usage_ratio * replicas)
+    if abs(1.0 - usage_ratio) <= tolerance:
+        return replicas
+    return math.ceil(ready * usage_ratio)
+
+
+# Target types of the HPA metrics besides the CPU utilization
+METRIC_TYPES = ('Utilization', 'AverageValue', 'Value')
+METRIC_UTILIZATION = 0
+METRIC_AVERAGE_VALUE = 1
+METRIC_VALUE = 2
+
+# The one column a Utilization target applies to, over the memory request
+MEMORY_USAGE_COLUMN = 'sum_containers_mem_usage_mi'
+
+
+@dataclass(frozen=True, eq=False)
+class ReplayMetrics:
+    '''
+    Metrics the HPA scales on besides the CPU utilization, as read by the
+    replay kernels, see `replay_metrics`. Their values are passed to the
+    kernels as a (metrics, rows) matrix, one row per column.
+
+    Attributes:
+        columns (Tuple[str, ...]): Workload frame column of every metric.
+        kinds (np.ndarray): METRIC_UTILIZATION, METRIC_AVERAGE_VALUE or
+            METRIC_VALUE per metric.
+        targets (np.ndarray): Target per metric.
+    '''
+    columns: Tuple[str, ...] = ()
+    kinds: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    targets: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.float64)
+    )
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def key(self) -> list:
+        '''JSON serializable values of the metrics.'''
+        return [
+            list(self.columns), self.kinds.tolist(), self.targets.tolist()
+        ]
+
+
+NO_METRICS = ReplayMetrics()
+
+
+def replay_metrics(metrics: Sequence) -> ReplayMetrics:
+    '''
+    Kernel metrics of `models.HPAMetric` values.
+
+    Raises:
+        ValueError: If a target type is unknown, or a Utilization target
+            is not on MEMORY_USAGE_COLUMN.
+    '''
+    for metric in metrics:
+        if metric.target_type not in METRIC_TYPES:
+            raise ValueError(
+                f'Unknown HPA metric target type {metric.target_type!r}, '
+                f'expected one of {METRIC_TYPES}'
+            )
+        if (
+            metric.target_type == 'Utilization'
+            and metric.column != MEMORY_USAGE_COLUMN
+        ):
+            raise ValueError(
+                f'Utilization targets only apply to {MEMORY_USAGE_COLUMN}, '
+                f'not {metric.column!r}'
+            )
+    return ReplayMetrics(
+        columns=tuple(metric.column for metric in metrics),
+        kinds=np.array(
+            [METRIC_TYPES.index(metric.target_type) for metric in metrics],
+            dtype=np.int64
+        ),
+        targets=np.array(
+            [metric.target for metric in metrics], dtype=np.float64
+        ),
+    )
+
+
+def _metric_values(
+    metrics: ReplayMetrics, metric_values, n_rows: int
+) -> np.ndarray:
+    '''The (metrics, rows) float64 values of metrics passed to a replay.'''
+    if len(metrics) == 0:
+        return np.zeros((0, n_rows), dtype=np.float64)
+    if metric_values is None:
+        raise ValueError('metric_values are required with metrics')
+    metric_values = np.ascontiguousarray(metric_values, dtype=np.float64)
+    if metric_values.shape != (len(metrics), n_rows):
+        raise ValueError(
+            f'metric_values of shape {metric_values.shape} for '
+            f'{len(metrics)} metrics over {n_rows} rows'
+        )
+    return metric_values
+
+
+def metric_replicas(
+    replicas: int,
+    value: float,
+    kind: int,
+    target: float,
+    mem_request: float,
+    tolerance: float,
+) -> int:
+    '''
+    Replicas one metric asks for, as the HPA controller computes them.
+    The HPA scales to the most replicas asked by any of its metrics. The
+    replay kernels inline the same arithmetic.
+
+    Args:
+        replicas (int): Current replicas.
+        value (float): The metric: summed over the replicas for
+            Utilization and AverageValue targets.
+        kind (int): See `ReplayMetrics`.
+        target (float): Target of the metric, a utilization for
+            METRIC_UTILIZATION.
+        mem_request (float): Per replica memory request.
+        tolerance (float): See `ReplayBehavior`.
+
+    Returns:
+        int: The replicas, 0 when the metric is missing.
+    '''
+    if value != value or replicas <= 0:
+        return 0
+    if kind == METRIC_UTILIZATION:
+        if mem_request <= 0:
+            return 0
+        # Same rounding as the CPU utilization
+        usage_ratio = (
+            round(value / (replicas * mem_request) * 100.0) / 100.0 / target
+        )
+        proposed = math.ceil(replicas * usage_ratio)
+    elif kind == METRIC_AVERAGE_VALUE:
+        usage_ratio = value / (replicas * target)
+        proposed = math.ceil(value / target)
+    else:
+        usage_ratio = value / target
+        proposed = math.ceil(usage_ratio * replicas)
+    if abs(1.0 - usage_ratio) <= tolerance:
+        return replicas
+    return proposed
+
+
+@dataclass
+class ReplayState:
+    '''
+    Tail state of an HPA replay, enough to resume it on new rows.
+
+    Attributes:
+        rows (int): Rows replayed so far.
+        starting_replica (int): Replicas during the startup rows.
+        cpu_clash_counter (int): CPU clashes seen so far.
+        replicas (int): Replicas of the last replayed row.
+        desired_tail (np.ndarray): Desired replicas of the last
+            `replay_tail_size` rows, oldest first.
+        replicas_tail (np.ndarray): Replicas of the same rows.
+    '''
+    rows: int = 0
+    starting_replica: int = 0
+    cpu_clash_counter: int = 0
+    replicas: int = 0
+    desired_tail: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+    replicas_tail: np.ndarray = field(
+        default_factory=lambda: np.zeros(0, dtype=np.int64)
+    )
+
+
+def replay_tail_size(
+    startup_latency: int,
+    scale_down_steps: int,
+    behavior: ReplayBehavior = DEFAULT_BEHAVIOR,
+) -> int:
+    '''
+    Rows of history a replay reads: the scale down window behind the
+    startup latency, the longest policy period before the last row and
+    the CPU initialization period.
+    '''
+    return max(
+        int(startup_latency) + max(int(scale_down_steps), 0),
+        behavior.scale_up.max_period + 1,
+        behavior.scale_down.max_period + 1,
+        behavior.cpu_initialization_rows,
+        1,
+    )
+
+
+def _replay_hpa(
+    sum_cpu_usage: np.ndarray,
+    sum_mem_usage_mi: np.ndarray,
+    min_replicas: int,
+    max_replicas: int,
+    cpu_request: float,
+    mem_request: float,
+    target_cpu: float,
+    startup_latency: int,
+    scale_down_steps: int,
+    starting_replica: int,
+    cpu_clash_threshold: int,
+    forecast_replicas: np.ndarray,
+    forecast_replicas_desired: np.ndarray,
+    scale_up_behaviour: np.ndarray,
+    first_row: int,
+    row_offset: int,
+    cpu_clash_counter: int,
+    up_policies: np.ndarray,
+    up_select: int,
+    down_policies: np.ndarray,
+    down_select: int,
+    tolerance: float,
+    cpu_initialization_rows: int,
+    metric_values: np.ndarray,
+    metric_kinds: np.ndarray,
+    metric_targets: np.ndarray,
+) -> tuple:
+    '''
+    Replays the HPA decisions row by row using scalar arithmetic only.
+
+    The arithmetic mirrors the reference loop in
+    `run_workload_simulation._simulate_behaviour_reference` operation by
+    operation, so both produce bit-identical replica traces. The function
+    only uses constructs supported by numba's nopython mode.
+
+    The max of the scale down window is read from a monotonic deque of
+    the window rows, amortized O(1) per row whatever the window. The
+    replicas changed during each policy period are running sums over the
+    replica trace, updated as the periods slide. The replicas ready at a
+    row, the fewest replicas over the CPU initialization period, are read
+    from a second monotonic deque. Each metric of metric_values asks for
+    replicas too, the desired replicas are the most asked for.
+
+    Output arrays are filled in place from first_row up to the row where a
+    clash stops the replay. To resume a replay, the rows before first_row
+    hold the desired replicas and replicas history, row_offset is the
+    absolute row of the array's first row and cpu_clash_counter the
+    clashes seen so far.
+
+    Returns:
+        tuple: (clash_index, clash_kind, cpu_clash_counter). clash_index
+            is -1 and clash_kind is CLASH_NONE when the replay completed
+            without clashes.
+    '''
+    n_rows = sum_cpu_usage.shape[0]
+
+    # Ring of the window rows, their desired replicas decreasing
+    window_rows = np.empty(max(scale_down_steps, 1), dtype=np.int64)
+    window_head = 0
+    window_size = 0
+    if scale_down_steps > 0:
+        for j in range(
+            max(first_row - startup_latency - scale_down_steps, 0),
+            first_row - startup_latency - 1
+        ):
+            while (
+                window_size > 0
+                and forecast_replicas_desired[window_rows[
+                    (window_head + window_size - 1) % scale_down_steps
+                ]] <= forecast_replicas_desired[j]
+            ):
+                window_size -= 1
+            window_rows[(window_head + window_size) % scale_down_steps] = j
+            window_size += 1
+
+    # Ring of the CPU initialization rows, their replicas increasing
+    ready_rows = np.empty(cpu_initialization_rows + 1, dtype=np.int64)
+    ready_head = 0
+    ready_size = 0
+    if cpu_initialization_rows > 0:
+        for j in range(max(first_row - cpu_initialization_rows, 0), first_row):
+            while (
+                ready_size > 0
+                and forecast_replicas[ready_rows[
+                    (ready_head + ready_size - 1) % ready_rows.shape[0]
+                ]] >= forecast_replicas[j]
+            ):
+                ready_size -= 1
+            ready_rows[(ready_head + ready_size) % ready_rows.shape[0]] = j
+            ready_size += 1
+
+    # Replicas added and removed during the period of every policy
+    n_up = up_policies.shape[0]
+    n_down = down_policies.shape[0]
+    added = np.zeros(n_up, dtype=np.int64)
+    removed = np.zeros(n_down, dtype=np.int64)
+    for k in range(n_up):
+        period = int(up_policies[k, 2])
+        for j in range(max(first_row - 1 - period, 1), first_row - 1):
+            added[k] += max(
+                forecast_replicas[j] - forecast_replicas[j - 1], 0
+            )
+    for k in range(n_down):
+        period = int(down_policies[k, 2])
+        for j in range(max(first_row - 1 - period, 1), first_row - 1):
+            removed[k] += max(
+                forecast_replicas[j - 1] - forecast_replicas[j], 0
+            )
+
+    for i in range(first_row, n_rows):
+        absolute_row = i + row_offset
+        # Slide the policy periods to the rows [i - period, i - 1]
+        for k in range(n_up):
+            j = i - 1
+            if j >= 1:
+                added[k] += max(
+                    forecast_replicas[j] - forecast_replicas[j - 1], 0
+                )
+            j = i - 1 - int(up_policies[k, 2])
+            if j >= 1:
+                added[k] -= max(
+                    forecast_replicas[j] - forecast_replicas[j - 1], 0
+                )
+        for k in range(n_down):
+            j = i - 1
+            if j >= 1:
+                removed[k] += max(
+                    forecast_replicas[j - 1] - forecast_replicas[j], 0
+                )
+            j = i - 1 - int(down_policies[k, 2])
+            if j >= 1:
+                removed[k] -= max(
+                    forecast_replicas[j - 1] - forecast_replicas[j], 0
+                )
+
+        if absolute_row < startup_latency:
+            replicas = starting_replica
+        else:
+            scale_up_index = i - startup_latency
+            scale_down_start_index = scale_up_index - scale_down_steps
+
+            replicas_up = forecast_replicas_desired[scale_up_index]
+
+            if scale_down_steps > 0:
+                # Slide the window to the rows [start, scale_up_index - 1]
+                while (
+                    window_size > 0
+                    and window_rows[window_head] < scale_down_start_index
+                ):
+                    window_head = (window_head + 1) % scale_down_steps
+                    window_size -= 1
+                j = scale_up_index - 1
+                if j >= 0:
+                    while (
+                        window_size > 0
+                        and forecast_replicas_desired[window_rows[
+                            (window_head + window_size - 1) % scale_down_steps
+                        ]] <= forecast_replicas_desired[j]
+                    ):
+                        window_size -= 1
+                    window_rows[
+                        (window_head + window_size) % scale_down_steps
+                    ] = j
+                    window_size += 1
+
+            if (
+                scale_down_start_index + row_offset <= 0
+                or scale_down_steps <= 0
+            ):
+                replicas_down = min_replicas
+            else:
+                window_max = forecast_replicas_desired[
+                    window_rows[window_head]
+                ]
+                replicas_down = max(window_max, min_replicas)
+
+            replicas = min(
+                max(max(replicas_up, replicas_down), min_replicas),
+                max_replicas
+            )
+
+            # Rate limits of the behavior policies, see `policy_limit`
+            current = replicas
+            if i >= 1 and absolute_row >= 1 and n_up + n_down > 0:
+                current = int(forecast_replicas[i - 1])
+            scale_up = replicas > current
+            policies = up_policies if scale_up else down_policies
+            if replicas != current and policies.shape[0] > 0:
+                changed = added if scale_up else removed
+                select_policy = up_select if scale_up else down_select
+                pick_max = (select_policy == SELECT_MAX) == scale_up
+                limit = -1 if pick_max else 2**62
+                for k in range(policies.shape[0]):
+                    if scale_up:
+                        period_start = current - changed[k]
+                        if policies[k, 0] == POLICY_PODS:
+                            proposed = period_start + int(policies[k, 1])
+                        else:
+                            proposed = math.ceil(
+                                period_start * (1.0 + policies[k, 1] / 100.0)
+                            )
+                    else:
+                        period_start = current + changed[k]
+                        if policies[k, 0] == POLICY_PODS:
+                            proposed = period_start - int(policies[k, 1])
+                        else:
+                            proposed = int(
+                                period_start * (1.0 - policies[k, 1] / 100.0)
+                            )
+                    if pick_max:
+                        limit = max(limit, proposed)
+                    else:
+                        limit = min(limit, proposed)
+                if select_policy == SELECT_DISABLED:
+                    limit = current
+                if scale_up:
+                    replicas = min(replicas, max(limit, current))
+                else:
+                    replicas = max(replicas, min(limit, current))
+        forecast_replicas[i] = replicas
+
+        ready = replicas
+        if cpu_initialization_rows > 0:
+            # Slide the rows to [i - cpu_initialization_rows, i]
+            if ready_size > 0 and (
+                ready_rows[ready_head] < i - cpu_initialization_rows
+            ):
+                ready_head = (ready_head + 1) % ready_rows.shape[0]
+                ready_size -= 1
+            while (
+                ready_size > 0
+                and forecast_replicas[ready_rows[
+                    (ready_head + ready_size - 1) % ready_rows.shape[0]
+                ]] >= replicas
+            ):
+                ready_size -= 1
+            ready_rows[(ready_head + ready_size) % ready_rows.shape[0]] = i
+            ready_size += 1
+            ready = forecast_replicas[ready_rows[ready_head]]
+
+        forecast_sum_cpu = replicas * cpu_request
+        forecast_sum_mem = replicas * mem_request
+
+        if forecast_sum_cpu < sum_cpu_usage[i]:
+            cpu_clash_counter += 1
+            if cpu_clash_counter > cpu_clash_threshold:
+                return i, CLASH_CPU, cpu_clash_counter
+
+        if forecast_sum_mem < sum_mem_usage_mi[i]:
+            return i, CLASH_MEM, cpu_clash_counter
+
+        # Same rounding as numpy's round(x, 2): scale, round half to even
+        if cpu_request > 0 and forecast_sum_cpu != 0:
+            current_metric_value = (
+                round(sum_cpu_usage[i] / forecast_sum_cpu * 100.0) / 100.0
+            )
+        else:
+            current_metric_value = 0.0
+        scale_up_behaviour[i] = current_metric_value
+
+        if absolute_row < startup_latency:
+            forecast_replicas_desired[i] = starting_replica
+        else:
+            # See `desired_replicas`
+            usage_ratio = current_metric_value / target_cpu
+            if ready <= 0:
+                desired = replicas
+            elif ready < replicas and usage_ratio > 1.0:
+                usage_ratio = usage_ratio * ready / replicas
+                if usage_ratio < 1.0 or abs(1.0 - usage_ratio) <= tolerance:
+                    desired = replicas
+                else:
+                    desired = math.ceil(usage_ratio * replicas)
+            elif abs(1.0 - usage_ratio) <= tolerance:
+                desired = replicas
+            else:
+                desired = math.ceil(ready * usage_ratio)
+            # See `metric_replicas`
+            for k in range(metric_kinds.shape[0]):
+                value = metric_values[k, i]
+                if value != value or replicas <= 0:
+                    continue
+                if metric_kinds[k] == METRIC_UTILIZATION:
+                    if mem_request <= 0:
+                        continue
+                    usage_ratio = (
+                        round(value / forecast_sum_mem * 100.0) / 100.0
+                        / metric_targets[k]
+                    )
+                    proposed = math.ceil(replicas * usage_ratio)
+                elif metric_kinds[k] == METRIC_AVERAGE_VALUE:
+                    usage_ratio = value / (replicas * metric_targets[k])
+                    proposed = math.ceil(value / metric_targets[k])
+                else:
+                    usage_ratio = value / metric_targets[k]
+                    proposed = math.ceil(usage_ratio * replicas)
+                if abs(1.0 - usage_ratio) <= tolerance:
+                    proposed = replicas
+                desired = max(desired, proposed)
+            forecast_replicas_desired[i] = max(
+                min_replicas, min(max_replicas, desired)
+            )
+    return -1, CLASH_NONE, cpu_clash_counter
+
+
+_compiled_replay_hpa = None
+
+
+def _get_numba_replay() -> Callable:
+    '''Compiles the replay kernel with numba on first use.'''
+    global _compiled_replay_hpa
+    if _compiled_replay_hpa is None:
+        _compiled_replay_hpa = njit(cache=True, nogil=True)(_replay_hpa)
+    return _compiled_replay_hpa
+
+
+def resolve_backend(backend: str) -> str:
+    '''
+    Resolves the configured SIMULATION_BACKEND into the backend that
+    will actually run.
+
+    Args:
+        backend (str): One of SIMULATION_BACKENDS.
+
+    Returns:
+        str: 'python', 'kernel' or 'numba'.
+
+    Raises:
+        ValueError: If the backend is not a known simulation backend.
+    '''
+    if backend not in SIMULATION_BACKENDS:
+        raise ValueError(
+            f'Unknown SIMULATION_BACKEND {backend!r}, '
+            f'expected one of {SIMULATION_BACKENDS}'
+        )
+    if backend == 'auto':
+        return 'numba' if njit is not None else 'kernel'
+    if backend == 'numba' and njit is None:
+        logger.warning(
+            'SIMULATION_BACKEND is numba but numba is not installed, '
+            'falling back to the interpreted kernel.'
+        )
+        return 'kernel'
+    return backend
+
+
+def replay_hpa(
+    backend: str,
+    sum_cpu_usage: np.ndarray,
+    sum_mem_usage_mi: np.ndarray,
+    min_replicas: int,
+    max_replicas: int,
+    cpu_request: float,
+    mem_request: float,
+    target_cpu: float,
+    startup_latency: int,
+    scale_down_steps: int,
+    starting_replica: int,
+    cpu_clash_threshold: int,
+    behavior: ReplayBehavior = DEFAULT_BEHAVIOR,
+    metrics: ReplayMetrics = NO_METRICS,
+    metric_values: np.ndarray = None,
+) -> tuple:
+    '''
+    Runs the HPA replay kernel for one plan.
+
+    Args:
+        backend (str): 'kernel' or 'numba', see `resolve_backend`.
+        sum_cpu_usage (np.ndarray): Sum of containers CPU usage per row.
+        sum_mem_usage_mi (np.ndarray): Sum of containers memory usage per
+            row in MiB.
+        min_replicas, max_replicas (int): HPA replica bounds.
+        cpu_request, mem_request (float): Per replica requests.
+        target_cpu (float): HPA target CPU utilization.
+        startup_latency (int): Workload e2e startup latency in rows.
+        scale_down_steps (int): Scale down stabilization window in rows.
+        starting_replica (int): Replicas during the startup rows.
+        cpu_clash_threshold (int): Number of CPU clashes tolerated.
+        behavior (ReplayBehavior): Behavior of the HPA, by default
+            without rate limits, tolerance nor CPU initialization period.
+        metrics (ReplayMetrics): Metrics of the HPA besides the CPU
+            utilization, none by default.
+        metric_values (np.ndarray): (metrics, rows) values of the metrics.
+
+    Returns:
+        tuple: (forecast_replicas, forecast_replicas_desired,
+            scale_up_behaviour, clash_index, clash_kind). The replica
+            traces have the dtype of `trace_dtype(max_replicas)`.
+    '''
+    sum_cpu_usage = np.ascontiguousarray(sum_cpu_usage, dtype=np.float64)
+    sum_mem_usage_mi = np.ascontiguousarray(
+        sum_mem_usage_mi, dtype=np.float64
+    )
+    n_rows = sum_cpu_usage.shape[0]
+    metric_values = _metric_values(metrics, metric_values, n_rows)
+    replicas_dtype = trace_dtype(max_replicas)
+    forecast_replicas = np.full(n_rows, min_replicas, dtype=replicas_dtype)
+    forecast_replicas_desired = np.zeros(n_rows, dtype=replicas_dtype)
+    scale_up_behaviour = np.zeros(n_rows, dtype=np.float64)
+
+    kernel = _get_numba_replay() if backend == 'numba' else _replay_hpa
+    clash_index, clash_kind, _ = kernel(
+        sum_cpu_usage,
+        sum_mem_usage_mi,
+        int(min_replicas),
+        int(max_replicas),
+        float(cpu_request),
+        float(mem_request),
+        float(target_cpu),
+        int(startup_latency),
+        int(scale_down_steps),
+        int(starting_replica),
+        int(cpu_clash_threshold),
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        0,
+        0,
+        0,
+        behavior.scale_up.policies,
+        behavior.scale_up.select_policy,
+        behavior.scale_down.policies,
+        behavior.scale_down.select_policy,
+        float(behavior.tolerance),
+        int(behavior.cpu_initialization_rows),
+        metric_values,
+        metrics.kinds,
+        metrics.targets,
+    )
+    return (
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        int(clash_index),
+        int(clash_kind),
+    )
+
+
+def resume_hpa(
+    backend: str,
+    sum_cpu_usage: np.ndarray,
+    sum_mem_usage_mi: np.ndarray,
+    min_replicas: int,
+    max_replicas: int,
+    cpu_request: float,
+    mem_request: float,
+    target_cpu: float,
+    startup_latency: int,
+    scale_down_steps: int,
+    cpu_clash_threshold: int,
+    state: ReplayState,
+    behavior: ReplayBehavior = DEFAULT_BEHAVIOR,
+    metrics: ReplayMetrics = NO_METRICS,
+    metric_values: np.ndarray = None,
+) -> tuple:
+    '''
+    Continues an HPA replay on new rows from its tail state.
+
+    Only the desired replicas and replicas of the last `replay_tail_size`
+    rows and the clash counter are carried over, so resuming a replay on
+    the rows appended to a time series gives the same traces as replaying
+    the whole series.
+    Start a replay with `ReplayState(starting_replica=...)`.
+
+    Args:
+        backend (str): 'kernel' or 'numba', see `resolve_backend`.
+        sum_cpu_usage, sum_mem_usage_mi (np.ndarray): Usage of the new rows.
+        metric_values (np.ndarray): Metrics of the new rows.
+        state (ReplayState): State after the rows already replayed.
+        Other arguments as in `replay_hpa`.
+
+    Returns:
+        tuple: (forecast_replicas, forecast_replicas_desired,
+            scale_up_behaviour, clash_index, clash_kind, state) for the new
+            rows. clash_index is relative to the new rows, the returned
+            state is only meaningful when clash_kind is CLASH_NONE.
+    '''
+    history = state.desired_tail
+    n_history = history.shape[0]
+    n_new = len(sum_cpu_usage)
+    n_rows = n_history + n_new
+
+    cpu = np.zeros(n_rows, dtype=np.float64)
+    cpu[n_history:] = sum_cpu_usage
+    mem = np.zeros(n_rows, dtype=np.float64)
+    mem[n_history:] = sum_mem_usage_mi
+    values = np.zeros((len(metrics), n_rows), dtype=np.float64)
+    values[:, n_history:] = _metric_values(metrics, metric_values, n_new)
+    replicas_dtype = trace_dtype(max_replicas)
+    forecast_replicas = np.full(n_rows, min_replicas, dtype=replicas_dtype)
+    forecast_replicas[:n_history] = state.replicas_tail
+    forecast_replicas_desired = np.zeros(n_rows, dtype=replicas_dtype)
+    forecast_replicas_desired[:n_history] = history
+    scale_up_behaviour = np.zeros(n_rows, dtype=np.float64)
+
+    kernel = _get_numba_replay() if backend == 'numba' else _replay_hpa
+    clash_index, clash_kind, cpu_clash_counter = kernel(
+        cpu,
+        mem,
+        int(min_replicas),
+        int(max_replicas),
+        float(cpu_request),
+        float(mem_request),
+        float(target_cpu),
+        int(startup_latency),
+        int(scale_down_steps),
+        int(state.starting_replica),
+        int(cpu_clash_threshold),
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        n_history,
+        state.rows - n_history,
+        int(state.cpu_clash_counter),
+        behavior.scale_up.policies,
+        behavior.scale_up.select_policy,
+        behavior.scale_down.policies,
+        behavior.scale_down.select_policy,
+        float(behavior.tolerance),
+        int(behavior.cpu_initialization_rows),
+        values,
+        metrics.kinds,
+        metrics.targets,
+    )
+    if clash_index >= 0:
+        clash_index -= n_history
+
+    tail_size = replay_tail_size(startup_latency, scale_down_steps, behavior)
+    replicas = (
+        int(forecast_replicas[-1]) if n_new else state.replicas
+    )
+    new_state = ReplayState(
+        rows=state.rows + n_new,
+        starting_replica=state.starting_replica,
+        cpu_clash_counter=int(cpu_clash_counter),
+        replicas=replicas,
+        desired_tail=forecast_replicas_desired[-tail_size:].copy(),
+        replicas_tail=forecast_replicas[-tail_size:].copy(),
+    )
+    return (
+        forecast_replicas[n_history:],
+        forecast_replicas_desired[n_history:],
+        scale_up_behaviour[n_history:],
+        int(clash_index),
+        int(clash_kind),
+        new_state,
+    )
+
+
+def _slide_periods(
+    changed: np.ndarray,
+    policies: np.ndarray,
+    forecast_replicas: np.ndarray,
+    active: np.ndarray,
+    row: int,
+    sign: int,
+):
+    '''
+    Slides the policy periods of the active plans to the rows
+    [row - period, row - 1]: the replicas changed in the direction of sign
+    at row - 1 enter the periods, the ones of row - 1 - period leave them.
+    '''
+    for k in range(policies.shape[0]):
+        for j, weight in ((row - 1, 1), (row - 1 - int(policies[k, 2]), -1)):
+            if j >= 1:
+                delta = sign * (
+                    forecast_replicas[active, j].astype(np.int64)
+                    - forecast_replicas[active, j - 1]
+                )
+                changed[active, k] += weight * np.maximum(delta, 0)
+
+
+def _policy_limits(
+    current: np.ndarray,
+    rules: ScalingRules,
+    changed: np.ndarray,
+    scale_up: bool,
+) -> np.ndarray:
+    '''`policy_limit` of many plans sharing the same rules.'''
+    if rules.select_policy == SELECT_DISABLED:
+        return current
+    proposals = []
+    for k, (policy_type, value, _) in enumerate(rules.policies):
+        if scale_up:
+            period_start = current - changed[:, k]
+            if policy_type == POLICY_PODS:
+                proposed = period_start + int(value)
+            else:
+                proposed = np.ceil(
+                    period_start * (1.0 + value / 100.0)
+                ).astype(np.int64)
+        else:
+            period_start = current + changed[:, k]
+            if policy_type == POLICY_PODS:
+                proposed = period_start - int(value)
+            else:
+                proposed = (
+                    period_start * (1.0 - value / 100.0)
+                ).astype(np.int64)
+        proposals.append(proposed)
+    if (rules.select_policy == SELECT_MAX) == scale_up:
+        limit = np.max(proposals, axis=0)
+    else:
+        limit = np.min(proposals, axis=0)
+    if scale_up:
+        return np.maximum(limit, current)
+    return np.minimum(limit, current)
+
+
+def replay_hpa_matrix(
+    sum_cpu_usage: np.ndarray,
+    sum_mem_usage_mi: np.ndarray,
+    min_replicas: np.ndarray,
+    max_replicas: np.ndarray,
+    cpu_request: np.ndarray,
+    mem_request: np.ndarray,
+    target_cpu: np.ndarray,
+    startup_latency: np.ndarray,
+    scale_down_steps: int,
+    starting_replica: np.ndarray,
+    cpu_clash_threshold: int,
+    behavior: ReplayBehavior = DEFAULT_BEHAVIOR,
+    metrics: ReplayMetrics = NO_METRICS,
+    metric_values: np.ndarray = None,
+) -> tuple:
+    '''
+    Replays the HPA decisions of many plans at once.
+
+    The plans are stacked into a (plans x rows) state matrix and advanced
+    together one timestep at a time, so the time series is walked only
+    once per workload. Plans are pruned from the active set as soon as
+    they clash, the rest of their rows are left untouched.
+
+    All plan arguments are 1-D arrays with one entry per plan. The
+    arithmetic matches `_replay_hpa`, so traces are bit-identical to the
+    single plan kernels. The replica matrices have the dtype of
+    `trace_dtype` for the largest max replicas.
+
+    The scale down window max of every plan is read from block maxima of
+    the desired replicas (van Herk / Gil-Werman) kept up to date as the
+    columns are filled, O(plans) per row whatever the window. The ready
+    replicas of the CPU initialization period are read from block minima
+    of the replicas the same way. The scale down window, the behavior and
+    the metrics are shared by all plans. The replicas asked by every
+    metric are computed together as a (metrics, plans) matrix, so each
+    metric adds O(plans) per row.
+
+    Returns:
+        tuple: (forecast_replicas, forecast_replicas_desired,
+            scale_up_behaviour, clash_index, clash_kind), the first three
+            with shape (plans, rows) and the last two with shape (plans,).
+    '''
+    sum_cpu_usage = np.asarray(sum_cpu_usage, dtype=np.float64)
+    sum_mem_usage_mi = np.asarray(sum_mem_usage_mi, dtype=np.float64)
+    min_replicas = np.asarray(min_replicas, dtype=np.int64)
+    max_replicas = np.asarray(max_replicas, dtype=np.int64)
+    cpu_request = np.asarray(cpu_request, dtype=np.float64)
+    mem_request = np.asarray(mem_request, dtype=np.float64)
+    target_cpu = np.asarray(target_cpu, dtype=np.float64)
+    startup_latency = np.asarray(startup_latency, dtype=np.int64)
+    starting_replica = np.asarray(starting_replica, dtype=np.int64)
+
+    n_plans = min_replicas.shape[0]
+    n_rows = sum_cpu_usage.shape[0]
+    metric_values = _metric_values(metrics, metric_values, n_rows)
+    metric_kinds = metrics.kinds[:, None]
+    metric_targets = metrics.targets[:, None]
+    replicas_dtype = trace_dtype(max_replicas)
+    forecast_replicas = np.repeat(
+        min_replicas[:, None].astype(replicas_dtype), n_rows, axis=1
+    )
+    forecast_replicas_desired = np.zeros(
+        (n_plans, n_rows), dtype=replicas_dtype
+    )
+    scale_up_behaviour = np.zeros((n_plans, n_rows), dtype=np.float64)
+    clash_index = np.full(n_plans, -1, dtype=np.int64)
+    clash_kind = np.full(n_plans, CLASH_NONE, dtype=np.int64)
+    cpu_clash_counter = np.zeros(n_plans, dtype=np.int64)
+
+    active = np.arange(n_plans)
+    steps = max(scale_down_steps, 0)
+    if steps:
+        # Max of the desired replicas from the start of each block of
+        # steps columns, and to its end once complete. The rings of whole
+        # blocks span the oldest window read, behind the longest latency
+        ring = steps * (int(startup_latency.max(initial=0)) // steps + 3)
+        head_max = np.zeros((n_plans, ring), dtype=np.int64)
+        tail_max = np.zeros((n_plans, ring), dtype=np.int64)
+
+    # Replicas added and removed during the period of every policy
+    scale_up_rules = behavior.scale_up
+    scale_down_rules = behavior.scale_down
+    up_policies = scale_up_rules.policies
+    down_policies = scale_down_rules.policies
+    added = np.zeros((n_plans, up_policies.shape[0]), dtype=np.int64)
+    removed = np.zeros((n_plans, down_policies.shape[0]), dtype=np.int64)
+    has_rules = up_policies.shape[0] + down_policies.shape[0] > 0
+    tolerance = behavior.tolerance
+    initialization = behavior.cpu_initialization_rows
+    if initialization:
+        # Min of the replicas from the start of each block of the
+        # initialization rows plus one, and to its end once complete, so
+        # the window of every row spans at most two blocks
+        ready_block = initialization + 1
+        ready_ring = 2 * ready_block
+        head_min = np.zeros((n_plans, ready_ring), dtype=np.int64)
+        tail_min = np.zeros((n_plans, ready_ring), dtype=np.int64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(n_rows):
+            if active.size == 0:
+                break
+            mn = min_replicas[active]
+            mx = max_replicas[active]
+            latency = startup_latency[active]
+            in_startup = i < latency
+
+            if has_rules:
+                _slide_periods(
+                    added, up_policies, forecast_replicas, active, i, 1
+                )
+                _slide_periods(
+                    removed, down_policies, forecast_replicas, active, i, -1
+                )
+
+            scale_up_index = np.maximum(i - latency, 0)
+            replicas_up = forecast_replicas_desired[active, scale_up_index]
+
+            scale_down_start_index = scale_up_index - steps
+            if steps:
+                start = np.maximum(scale_down_start_index, 0)
+                window_max = np.maximum(
+                    tail_max[active, start % ring],
+                    head_max[active, (start + steps - 1) % ring]
+                )
+                replicas_down = np.where(
+                    scale_down_start_index <= 0,
+                    mn,
+                    np.maximum(window_max, mn)
+                )
+            else:
+                replicas_down = mn
+
+            replicas = np.minimum(
+                np.maximum(np.maximum(replicas_up, replicas_down), mn), mx
+            )
+            if i >= 1 and has_rules:
+                current = forecast_replicas[active, i - 1].astype(np.int64)
+                if up_policies.shape[0]:
+                    limit = _policy_limits(
+                        current, scale_up_rules, added[active], True
+                    )
+                    replicas = np.where(
+                        replicas > current,
+                        np.minimum(replicas, limit),
+                        replicas
+                    )
+                if down_policies.shape[0]:
+                    limit = _policy_limits(
+                        current, scale_down_rules, removed[active], False
+                    )
+                    replicas = np.where(
+                        replicas < current,
+                        np.maximum(replicas, limit),
+                        replicas
+                    )
+            replicas = np.where(
+                in_startup, starting_replica[active], replicas
+            )
+            forecast_replicas[active, i] = replicas
+            if initialization:
+                column = i % ready_ring
+                if column % ready_block == 0:
+                    head_min[active, column] = replicas
+                else:
+                    head_min[active, column] = np.minimum(
+                        head_min[active, column - 1], replicas
+                    )
+                if column % ready_block == ready_block - 1:
+                    block = forecast_replicas[
+                        active, i - ready_block + 1:i + 1
+                    ]
+                    tail_min[active, column - ready_block + 1:column + 1] = (
+                        np.minimum.accumulate(block[:, ::-1], axis=1)[:, ::-1]
+                    )
+                # Min of the replicas in [i - initialization, i]
+                start = i - initialization
+                if start <= 0:
+                    ready = head_min[active, column]
+                else:
+                    ready = np.minimum(
+                        tail_min[active, start % ready_ring],
+                        head_min[active, column]
+                    )
+            else:
+                ready = replicas
+
+            plan_cpu_request = cpu_request[active]
+            forecast_sum_cpu = replicas * plan_cpu_request
+            forecast_sum_mem = replicas * mem_request[active]
+
+            cpu_clash = forecast_sum_cpu < sum_cpu_usage[i]
+            cpu_clash_counter[active] += cpu_clash
+            cpu_failed = cpu_clash & (
+                cpu_clash_counter[active] > cpu_clash_threshold
+            )
+            mem_failed = ~cpu_failed & (forecast_sum_mem < sum_mem_usage_mi[i])
+            failed = cpu_failed | mem_failed
+            if failed.any():
+                clash_index[active[failed]] = i
+                clash_kind[active[cpu_failed]] = CLASH_CPU
+                clash_kind[active[mem_failed]] = CLASH_MEM
+                keep = ~failed
+                active = active[keep]
+                if active.size == 0:
+                    break
+                mn, mx = mn[keep], mx[keep]
+                in_startup = in_startup[keep]
+                replicas = replicas[keep]
+                if initialization:
+                    ready = ready[keep]
+                else:
+                    ready = replicas
+                plan_cpu_request = plan_cpu_request[keep]
+                forecast_sum_cpu = forecast_sum_cpu[keep]
+
+            current_metric_value = np.where(
+                (plan_cpu_request > 0) & (forecast_sum_cpu != 0),
+                np.round(sum_cpu_usage[i] / forecast_sum_cpu, 2),
+                0.0
+            )
+            scale_up_behaviour[active, i] = current_metric_value
+
+            # See `desired_replicas`
+            usage_ratio = current_metric_value / target_cpu[active]
+            desired = np.where(
+                np.abs(1.0 - usage_ratio) <= tolerance,
+                replicas,
+                np.ceil(ready * usage_ratio)
+            )
+            if initialization:
+                idle_ratio = usage_ratio * ready / replicas
+                desired = np.where(
+                    (ready < replicas) & (usage_ratio > 1.0),
+                    np.where(
+                        (idle_ratio < 1.0)
+                        | (np.abs(1.0 - idle_ratio) <= tolerance),
+                        replicas,
+                        np.ceil(idle_ratio * replicas)
+                    ),
+                    desired
+                )
+                desired = np.where(ready <= 0, replicas, desired)
+            if len(metrics):
+                # See `metric_replicas`, one row per metric
+                value = metric_values[:, i][:, None]
+                plan_mem_request = mem_request[active]
+                usage_ratio = np.where(
+                    metric_kinds == METRIC_UTILIZATION,
+                    np.round(value / (replicas * plan_mem_request), 2)
+                    / metric_targets,
+                    np.where(
+                        metric_kinds == METRIC_AVERAGE_VALUE,
+                        value / (replicas * metric_targets),
+                        value / metric_targets
+                    )
+                )
+                proposed = np.where(
+                    np.abs(1.0 - usage_ratio) <= tolerance,
+                    replicas,
+                    np.where(
+                        metric_kinds == METRIC_AVERAGE_VALUE,
+                        np.ceil(value / metric_targets),
+                        np.ceil(replicas * usage_ratio)
+                    )
+                )
+                missing = np.isnan(value) | (replicas <= 0) | (
+                    (metric_kinds == METRIC_UTILIZATION)
+                    & (plan_mem_request <= 0)
+                )
+                desired = np.maximum(
+                    desired, np.where(missing, 0, proposed).max(axis=0)
+                )
+            desired = np.maximum(
+                mn, np.minimum(mx, desired.astype(np.int64))
+            )
+            forecast_replicas_desired[active, i] = np.where(
+                in_startup, starting_replica[active], desired
+            )
+            if steps:
+                column = i % ring
+                if column % steps == 0:
+                    head_max[active, column] = (
+                        forecast_replicas_desired[active, i]
+                    )
+                else:
+                    head_max[active, column] = np.maximum(
+                        head_max[active, column - 1],
+                        forecast_replicas_desired[active, i]
+                    )
+                if column % steps == steps - 1:
+                    block = forecast_replicas_desired[
+                        active, i - steps + 1:i + 1
+                    ]
+                    tail_max[active, column - steps + 1:column + 1] = (
+                        np.maximum.accumulate(block[:, ::-1], axis=1)[:, ::-1]
+                    )
+
+    return (
+        forecast_replicas,
+        forecast_replicas_desired,
+        scale_up_behaviour,
+        clash_index,
+        clash_kind,
+    )
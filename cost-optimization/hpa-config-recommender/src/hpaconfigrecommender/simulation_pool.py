@@ -0,0 +1,246 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Simulation Pool - Persistent process pool and shared workload frames '''
+import atexit
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_all_start_methods, get_context, shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.simulation_kernel import (
+    DEFAULT_BEHAVIOR,
+    NO_METRICS,
+    ReplayBehavior,
+    ReplayMetrics,
+    replay_hpa,
+)
+from hpaconfigrecommender.workload_dtypes import usage_values
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Columns the HPA replay reads from the workload frame
+SIMULATION_COLUMNS = [
+    'sum_containers_cpu_usage',
+    'sum_containers_mem_usage_mi',
+]
+
+# Workers start from a clean process instead of forking the caller, which
+# may already run threads (timeseries fetchers, the Monitoring client loop)
+POOL_START_METHOD = (
+    'forkserver' if 'forkserver' in get_all_start_methods() else 'spawn'
+)
+
+_simulation_pool: Optional[ProcessPoolExecutor] = None
+_simulation_pool_workers: Optional[int] = None
+
+# Shared frame attached in a worker process: (name, shm, arrays)
+_attached_frame = None
+
+
+class SharedWorkloadFrame:
+    '''
+    Publishes numeric columns of a workload frame in a single shared memory
+    block so pool workers can attach to them without copying.
+
+    Use it as a context manager, the block is released on exit. Only the
+    small `descriptor` tuple is sent to the workers.
+    '''
+
+    def __init__(self, workload_df: pd.DataFrame, columns: List[str]):
+        arrays = [usage_values(workload_df, col) for col in columns]
+        n_rows = len(workload_df)
+        size = max(sum(a.nbytes for a in arrays), 1)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        layout = []
+        offset = 0
+        for col, array in zip(columns, arrays):
+            np.ndarray(
+                n_rows, dtype=np.float64, buffer=self._shm.buf, offset=offset
+            )[:] = array
+            layout.append((col, offset))
+            offset += array.nbytes
+        self.descriptor: Tuple = (self._shm.name, n_rows, tuple(layout))
+
+    def close(self):
+        '''Releases and removes the shared memory block.'''
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def attach_shared_frame(descriptor: Tuple) -> Dict[str, np.ndarray]:
+    '''
+    Returns zero-copy arrays over a frame published by
+    `SharedWorkloadFrame`. The last attached block is kept open by the
+    process, so many plans of the same workload attach only once.
+    '''
+    global _attached_frame
+    name, n_rows, layout = descriptor
+    if _attached_frame is not None and _attached_frame[0] == name:
+        return _attached_frame[2]
+    if _attached_frame is not None:
+        shm = _attached_frame[1]
+        _attached_frame = None
+        shm.close()
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {
+        col: np.ndarray(
+            n_rows, dtype=np.float64, buffer=shm.buf, offset=offset
+        )
+        for col, offset in layout
+    }
+    _attached_frame = (name, shm, arrays)
+    return arrays
+
+
+def _replay_shared_plan(
+    descriptor: Tuple,
+    backend: str,
+    plan_values: Tuple,
+    scale_down_steps: int,
+    cpu_clash_threshold: int,
+    behavior: ReplayBehavior,
+    metrics: ReplayMetrics,
+) -> Tuple:
+    '''
+    Pool task: replays one plan over the shared workload frame.
+
+    plan_values holds (min_replicas, max_replicas, cpu_request,
+    mem_request, target_cpu, startup_latency, starting_replica). The
+    metric columns are read from the shared frame too.
+    '''
+    frame = attach_shared_frame(descriptor)
+    (
+        min_replicas, max_replicas, cpu_request, mem_request,
+        target_cpu, startup_latency, starting_replica
+    ) = plan_values
+    return replay_hpa(
+        backend,
+        frame['sum_containers_cpu_usage'],
+        frame['sum_containers_mem_usage_mi'],
+        min_replicas,
+        max_replicas,
+        cpu_request,
+        mem_request,
+        target_cpu,
+        startup_latency,
+        scale_down_steps,
+        starting_replica,
+        cpu_clash_threshold,
+        behavior,
+        metrics,
+        [frame[col] for col in metrics.columns],
+    )
+
+
+def get_simulation_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    '''
+    Returns the process pool shared by all simulations of this process,
+    creating it on first use. The pool lives until
+    `shutdown_simulation_pool` or interpreter exit. Its workers are
+    started with POOL_START_METHOD, they only see the Config class
+    defaults: tasks needing other settings carry a `Config.snapshot`.
+
+    Args:
+        max_workers (Optional[int]): Number of worker processes, defaults
+            to the number of CPUs. A different value recreates the pool.
+    '''
+    global _simulation_pool, _simulation_pool_workers
+    if _simulation_pool is not None and _simulation_pool_workers != max_workers:
+        shutdown_simulation_pool()
+    if _simulation_pool is None:
+        logger.info('Starting simulation process pool.')
+        _simulation_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=get_context(POOL_START_METHOD)
+        )
+        _simulation_pool_workers = max_workers
+    return _simulation_pool
+
+
+def shutdown_simulation_pool():
+    '''Stops the shared simulation process pool, if running.'''
+    global _simulation_pool, _simulation_pool_workers
+    if _simulation_pool is not None:
+        _simulation_pool.shutdown(wait=True)
+        _simulation_pool = None
+        _simulation_pool_workers = None
+
+
+atexit.register(shutdown_simulation_pool)
+
+
+def replay_plans_in_pool(
+    workload_df: pd.DataFrame,
+    backend: str,
+    plans_values: List[Tuple],
+    scale_down_steps: int,
+    cpu_clash_threshold: int,
+    max_workers: Optional[int] = None,
+    behavior: ReplayBehavior = DEFAULT_BEHAVIOR,
+    metrics: ReplayMetrics = NO_METRICS,
+) -> List[Tuple]:
+    '''
+    Replays many plans of one workload on the shared process pool.
+
+    The simulation columns are published once in shared memory, each task
+    only carries the plan scalars and gets the replay arrays back.
+
+    Args:
+        workload_df (pd.DataFrame): Workload frame with SIMULATION_COLUMNS.
+        backend (str): Resolved simulation backend.
+        plans_values (List[Tuple]): Plan scalars, see `_replay_shared_plan`.
+        scale_down_steps (int): Scale down stabilization window in rows.
+        cpu_clash_threshold (int): Number of CPU clashes tolerated.
+        max_workers (Optional[int]): Pool size.
+        behavior (ReplayBehavior): Behavior of the HPA.
+        metrics (ReplayMetrics): Metrics of the HPA, their columns are
+            published with the SIMULATION_COLUMNS.
+
+    Returns:
+        List[Tuple]: One `replay_hpa` result per plan, in order.
+    '''
+    columns = list(dict.fromkeys(SIMULATION_COLUMNS + list(metrics.columns)))
+    with SharedWorkloadFrame(workload_df, columns) as shared:
+        try:
+            pool = get_simulation_pool(max_workers)
+            futures = [
+                pool.submit(
+                    _replay_shared_plan,
+                    shared.descriptor,
+                    backend,
+                    plan_values,
+                    scale_down_steps,
+                    cpu_clash_threshold,
+                    behavior,
+                    metrics,
+                )
+                for plan_values in plans_values
+            ]
+            return [future.result() for future in futures]
+        except BrokenProcessPool:
+            logger.warning('Simulation pool is broken, restarting it.')
+            shutdown_simulation_pool()
+            raise
@@ -0,0 +1,73 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Sliding Window - Window maxima of timeseries columns in O(n) '''
+import numpy as np
+
+
+def _missing_in_window(values: np.ndarray, window: int) -> np.ndarray:
+    '''Missing values in values[i:i + window], for every full window.'''
+    missing = np.concatenate(([0], np.cumsum(np.isnan(values))))
+    return missing[window:] - missing[:-window]
+
+
+def forward_window_max(values: np.ndarray, window: int) -> np.ndarray:
+    '''
+    Max of values[i:i + window] for every row i, as a pandas rolling max
+    with a FixedForwardWindowIndexer: rows whose window is cut by the end
+    of the series or holds a missing value are NaN.
+
+    The blocks of `window` rows are scanned once forward and once backward
+    (van Herk / Gil-Werman), every window spans the tail of one block and
+    the head of the next, so each row costs three maxima whatever the
+    window.
+
+    Args:
+        values (np.ndarray): The column, as float64.
+        window (int): Rows per window, greater than 0.
+
+    Returns:
+        np.ndarray: float64 window maxima, with the length of values.
+    '''
+    if window <= 0:
+        raise ValueError('window must be greater than 0.')
+    values = np.asarray(values, dtype=np.float64)
+    n_rows = len(values)
+    result = np.full(n_rows, np.nan)
+    n_windows = n_rows - window + 1
+    if n_windows <= 0:
+        return result
+
+    padded = np.concatenate(
+        (values, np.full(-n_rows % window, np.nan))
+    ).reshape(-1, window)
+    # fmax skips missing values, windows with any are masked below
+    head_max = np.fmax.accumulate(padded, axis=1).ravel()
+    tail_max = np.fmax.accumulate(
+        padded[:, ::-1], axis=1
+    )[:, ::-1].ravel()
+    window_max = np.fmax(
+        tail_max[:n_windows], head_max[window - 1:window - 1 + n_windows]
+    )
+    window_max[_missing_in_window(values, window) > 0] = np.nan
+    result[:n_windows] = window_max
+    return result
+
+
+def running_max(values: np.ndarray) -> np.ndarray:
+    '''
+    Max of values[:i + 1] for every row i, skipping missing values as
+    np.nanmax does. Rows before the first value are NaN.
+    '''
+    return np.fmax.accumulate(np.asarray(values, dtype=np.float64))
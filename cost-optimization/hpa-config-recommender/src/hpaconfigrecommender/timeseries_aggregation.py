@@ -0,0 +1,196 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Timeseries Aggregation - Single pass per window usage aggregation '''
+from typing import Tuple
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.timeseries_decoder import (
+    CONTAINER_COLUMN,
+    DOUBLE_VALUE_COLUMN,
+    INT_VALUE_COLUMN,
+)
+
+AGGREGATION_BACKENDS = ('groupby', 'columnar')
+
+_BYTES_PER_MI = 1024**2
+
+# Columns of the aggregated workload frame, in order
+AGGREGATED_COLUMNS = [
+    'window_begin',
+    'num_replicas_at_usage_window',
+    'avg_container_cpu_usage',
+    'avg_container_mem_usage_mi',
+    'max_containers_mem_usage_mi',
+    'stddev_containers_cpu_usage',
+    'sum_containers_cpu_request',
+    'sum_containers_cpu_usage',
+    'sum_containers_mem_request_mi',
+    'sum_containers_mem_usage_mi',
+]
+
+
+class _Segments:
+    '''
+    Rows of a per pod frame sorted by (window, container), with the start
+    of every (window, container) segment, ready for `ufunc.reduceat`.
+    '''
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray):
+        valid = ~np.isnan(values) if values.dtype.kind == 'f' else None
+        if valid is not None and not valid.all():
+            keys, values = keys[valid], values[valid]
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.values = values[order]
+        if len(self.keys):
+            self.starts = np.flatnonzero(
+                np.concatenate(([True], self.keys[1:] != self.keys[:-1]))
+            )
+        else:
+            self.starts = np.empty(0, dtype=np.intp)
+        self.counts = np.diff(np.append(self.starts, len(self.keys)))
+
+    @property
+    def segment_keys(self) -> np.ndarray:
+        return self.keys[self.starts]
+
+    def sum(self) -> np.ndarray:
+        return np.add.reduceat(self.values, self.starts)
+
+    def max(self) -> np.ndarray:
+        return np.maximum.reduceat(self.values, self.starts)
+
+    def mean_std(self) -> Tuple[np.ndarray, np.ndarray]:
+        '''Mean and sample standard deviation, 0 for single row segments.'''
+        mean = self.sum() / self.counts
+        deviations = self.values - np.repeat(mean, self.counts)
+        squares = np.add.reduceat(deviations * deviations, self.starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(squares / (self.counts - 1))
+        std[self.counts < 2] = 0.0
+        return mean, std
+
+
+def _window_keys(
+    df: pd.DataFrame, categories: pd.Index
+) -> np.ndarray:
+    '''
+    One int64 per row identifying its (window_begin second, container),
+    containers coded on the shared categories.
+    '''
+    window_begin = df['window_begin']
+    if window_begin.dt.tz is not None:
+        window_begin = window_begin.dt.tz_convert('UTC').dt.tz_localize(None)
+    seconds = window_begin.to_numpy(dtype='datetime64[s]').astype(np.int64)
+    codes = pd.Categorical(
+        df[CONTAINER_COLUMN], categories=categories
+    ).codes.astype(np.int64)
+    return seconds * len(categories) + codes
+
+
+def _container_categories(*frames: pd.DataFrame) -> pd.Index:
+    '''
+    Containers of the frames, in the order groupby sorts them: category
+    order for categorical columns, lexical order otherwise.
+    '''
+    categories = pd.Index([])
+    for df in frames:
+        containers = df[CONTAINER_COLUMN]
+        if isinstance(containers.dtype, pd.CategoricalDtype):
+            containers = containers.cat.remove_unused_categories()
+            frame_categories = containers.cat.categories
+        else:
+            frame_categories = pd.Index(np.sort(containers.unique()))
+        categories = categories.append(
+            frame_categories.difference(categories, sort=False)
+        )
+    return categories
+
+
+def aggregate_usage_columnar(
+    mem_usage_df: pd.DataFrame,
+    cpu_usage_df: pd.DataFrame,
+    latest_cpu_request: float,
+    latest_mem_request: float
+) -> pd.DataFrame:
+    '''
+    Aggregates the per pod memory and CPU usage of one workload by window
+    and container in one sorted pass per metric.
+
+    Rows are sorted by an int64 (window, container) key and every
+    statistic is a segmented `reduceat` over the sorted values, computed
+    in float64. Windows present in both metrics are kept, as the inner
+    merge of the groupby path.
+
+    Args:
+        mem_usage_df (pd.DataFrame): Per pod memory usage bytes.
+        cpu_usage_df (pd.DataFrame): Per pod CPU usage cores.
+        latest_cpu_request (float): Per replica CPU request in cores.
+        latest_mem_request (float): Per replica memory request in bytes.
+
+    Returns:
+        pd.DataFrame: AGGREGATED_COLUMNS, the replica count in int16
+            (int32 above 32767 pods) and the usage in float64. The usage
+            is narrowed by `convert_data_types`, rounding it once from
+            the float64 statistics.
+    '''
+    categories = _container_categories(cpu_usage_df, mem_usage_df)
+    if not len(categories):
+        return pd.DataFrame(columns=AGGREGATED_COLUMNS)
+    mem = _Segments(
+        _window_keys(mem_usage_df, categories),
+        mem_usage_df[INT_VALUE_COLUMN].to_numpy(dtype=np.float64),
+    )
+    cpu = _Segments(
+        _window_keys(cpu_usage_df, categories),
+        cpu_usage_df[DOUBLE_VALUE_COLUMN].to_numpy(dtype=np.float64),
+    )
+    if not len(mem.starts) or not len(cpu.starts):
+        return pd.DataFrame(columns=AGGREGATED_COLUMNS)
+    keys, mem_index, cpu_index = np.intersect1d(
+        mem.segment_keys, cpu.segment_keys,
+        assume_unique=True, return_indices=True
+    )
+
+    mem_mean, _ = mem.mean_std()
+    mem_max = mem.max()
+    cpu_mean, cpu_std = cpu.mean_std()
+    replicas = cpu.counts[cpu_index]
+    avg_cpu = cpu_mean[cpu_index]
+    max_mem_mi = mem_max[mem_index] / _BYTES_PER_MI
+
+    tz = mem_usage_df['window_begin'].dt.tz
+    window_begin = pd.to_datetime(keys // len(categories), unit='s', utc=True)
+    window_begin = (
+        window_begin.tz_convert(tz) if tz is not None
+        else window_begin.tz_localize(None)
+    )
+    return pd.DataFrame({
+        'window_begin': window_begin,
+        'num_replicas_at_usage_window': replicas.astype(
+            np.int16 if replicas.max(initial=0) <= np.iinfo(np.int16).max
+            else np.int32
+        ),
+        'avg_container_cpu_usage': avg_cpu,
+        'avg_container_mem_usage_mi': mem_mean[mem_index] / _BYTES_PER_MI,
+        'max_containers_mem_usage_mi': max_mem_mi,
+        'stddev_containers_cpu_usage': cpu_std[cpu_index],
+        'sum_containers_cpu_request': latest_cpu_request * replicas,
+        'sum_containers_cpu_usage': avg_cpu * replicas,
+        'sum_containers_mem_request_mi': (
+            latest_mem_request / _BYTES_PER_MI * replicas
+        ),
+        'sum_containers_mem_usage_mi': max_mem_mi * replicas,
+    })
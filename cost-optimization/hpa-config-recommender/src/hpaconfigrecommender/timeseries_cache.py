@@ -0,0 +1,317 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Timeseries Cache - On-disk cache of Cloud Monitoring query results '''
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+import pandas as pd
+from hpaconfigrecommender.utils.config import Config
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Fetches the points ending in (start, end], both epoch seconds
+FetchFunction = Callable[[int, int], Awaitable[pd.DataFrame]]
+
+_EPOCH = pd.Timestamp(0, tz='UTC')
+
+# Label columns, stored as categories
+_LABEL_PREFIXES = ('resource.labels.', 'metadata.', 'metric.labels.')
+
+
+def _end_seconds(df: pd.DataFrame, alignment_period: int) -> pd.Series:
+    '''Epoch seconds of the end of every point of a UTC frame.'''
+    return (
+        (df['window_begin'] - _EPOCH) // pd.Timedelta(seconds=1)
+        + alignment_period
+    )
+
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a timeseries cache.
+
+    Attributes:
+        hits (int): Buckets read from disk.
+        misses (int): Buckets fetched from the API.
+        evictions (int): Buckets removed to honour the size limit.
+        fetches (int): API queries issued for missing buckets.
+    """
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    fetches: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of buckets served from disk."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TimeseriesCache:
+    '''
+    Content-addressed cache of Monitoring query results on local disk.
+
+    Results are split in buckets of bucket_seconds aligned on the epoch,
+    holding the points that end in (bucket_start, bucket_end]. Each bucket
+    is one Parquet file named after the hash of the query (metric, filter,
+    aligner, reducer, alignment period, group by) and the bucket start, so
+    overlapping windows only fetch the buckets not on disk yet. Buckets
+    ending less than settle_seconds ago are never stored, their points may
+    still change. Files are evicted least recently used first when the
+    cache grows over max_bytes.
+    '''
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_bytes: int,
+        bucket_seconds: int,
+        settle_seconds: int = 0,
+    ):
+        if bucket_seconds <= 0:
+            raise ValueError(
+                f'bucket_seconds must be positive, got {bucket_seconds}'
+            )
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.bucket_seconds = bucket_seconds
+        self.settle_seconds = settle_seconds
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def _bucket_path(self, query_key: str, bucket_start: int) -> Path:
+        digest = hashlib.sha256(
+            f'{query_key}/{self.bucket_seconds}/{bucket_start}'.encode()
+        ).hexdigest()
+        return self.cache_dir / digest[:2] / f'{digest}.parquet'
+
+    def _count(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def _read_bucket(self, path: Path) -> Optional[pd.DataFrame]:
+        try:
+            df = pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning('Dropping unreadable cache file %s: %s', path, e)
+            path.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(path)  # Last access time for the LRU eviction
+        except FileNotFoundError:
+            pass
+        return df
+
+    def _write_bucket(self, path: Path, df: pd.DataFrame):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(
+            f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp'
+        )
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        '''Removes least recently used buckets above max_bytes.'''
+        files = []
+        total = 0
+        for path in self.cache_dir.glob('*/*.parquet'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        files.sort()
+        evicted = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        self._count(evictions=evicted)
+        logger.info('Timeseries cache evicted %d buckets.', evicted)
+
+    def _missing_ranges(
+        self, buckets: List[Tuple[int, bool]], end: int
+    ) -> List[Tuple[int, int]]:
+        '''Merges adjacent missing buckets into (start, end] queries.'''
+        ranges = []
+        for bucket_start, storable in buckets:
+            bucket_end = (
+                bucket_start + self.bucket_seconds if storable
+                else min(bucket_start + self.bucket_seconds, end)
+            )
+            if ranges and ranges[-1][1] == bucket_start:
+                ranges[-1] = (ranges[-1][0], bucket_end)
+            else:
+                ranges.append((bucket_start, bucket_end))
+        return ranges
+
+    def _split_buckets(
+        self, df: pd.DataFrame, alignment_period: int
+    ) -> pd.Series:
+        '''Bucket start of every point, from the point end time.'''
+        end_seconds = _end_seconds(df, alignment_period)
+        return (end_seconds - 1) // self.bucket_seconds * self.bucket_seconds
+
+    async def fetch(
+        self,
+        query_key: str,
+        start: int,
+        end: int,
+        alignment_period: int,
+        fetch: FetchFunction,
+    ) -> pd.DataFrame:
+        '''
+        Returns the points ending in (start, end], reading stored buckets
+        and fetching the missing ones.
+
+        Args:
+            query_key (str): Identifies the query, see `query_key`.
+            start, end (int): Query interval in epoch seconds.
+            alignment_period (int): Alignment period in seconds, must
+                divide bucket_seconds.
+            fetch (FetchFunction): Queries the API for (start, end].
+
+        Returns:
+            pd.DataFrame: The points with a UTC window_begin column.
+        '''
+        if self.bucket_seconds % alignment_period:
+            logger.warning(
+                'Alignment period %ss does not divide the cache bucket, '
+                'bypassing the timeseries cache.', alignment_period
+            )
+            return await fetch(start, end)
+
+        settled = int(time.time()) - self.settle_seconds
+        first_bucket = start // self.bucket_seconds * self.bucket_seconds
+        frames = []
+        missing = []
+        for bucket_start in range(first_bucket, end, self.bucket_seconds):
+            storable = bucket_start + self.bucket_seconds <= settled
+            df = (
+                self._read_bucket(self._bucket_path(query_key, bucket_start))
+                if storable else None
+            )
+            if df is None:
+                missing.append((bucket_start, storable))
+            else:
+                frames.append(df)
+        ranges = self._missing_ranges(missing, end)
+        self._count(hits=len(frames), misses=len(missing), fetches=len(ranges))
+        logger.info(
+            'Timeseries cache: %d buckets hit, %d missed, %d queries.',
+            len(frames), len(missing), len(ranges)
+        )
+
+        stored = 0
+        for range_start, range_end in ranges:
+            df = await fetch(range_start, range_end)
+            frames.append(df)
+            point_buckets = (
+                self._split_buckets(df, alignment_period)
+                if not df.empty else None
+            )
+            for bucket_start, storable in missing:
+                if not storable or not range_start <= bucket_start < range_end:
+                    continue
+                bucket_df = (
+                    df[point_buckets == bucket_start]
+                    if point_buckets is not None else df
+                )
+                self._write_bucket(
+                    self._bucket_path(query_key, bucket_start),
+                    bucket_df.reset_index(drop=True)
+                )
+                stored += 1
+        if stored:
+            self.evict()
+
+        frames = [df for df in frames if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True)
+        end_seconds = _end_seconds(df, alignment_period)
+        df = df[(end_seconds > start) & (end_seconds <= end)].copy()
+        for col in df.columns:
+            if col.startswith(_LABEL_PREFIXES):
+                df[col] = df[col].astype('category')
+        return df.sort_values('window_begin', kind='stable').reset_index(
+            drop=True
+        )
+
+
+def query_key(
+    metric: str,
+    filter_string: str,
+    per_series_aligner: str,
+    cross_series_reducer: str,
+    alignment_period: int,
+    group_by_fields: Sequence[str] = (),
+) -> str:
+    '''Hashes the parameters that identify a Monitoring query result.'''
+    key = [
+        metric,
+        filter_string,
+        per_series_aligner,
+        cross_series_reducer,
+        alignment_period,
+    ]
+    if group_by_fields:
+        key.append(list(group_by_fields))
+    return hashlib.sha256(json.dumps(key).encode()).hexdigest()
+
+
+_timeseries_cache: Optional[TimeseriesCache] = None
+
+
+def get_timeseries_cache(config: Config) -> Optional[TimeseriesCache]:
+    '''
+    Returns the process wide cache configured by config.TIMESERIES_CACHE_*,
+    None when config.TIMESERIES_CACHE_DIR is not set.
+    '''
+    global _timeseries_cache
+    cache_dir = config.TIMESERIES_CACHE_DIR
+    if not cache_dir:
+        return None
+    settings = (
+        Path(cache_dir),
+        config.TIMESERIES_CACHE_MAX_BYTES,
+        config.TIMESERIES_CACHE_BUCKET_SECONDS,
+        config.TIMESERIES_CACHE_SETTLE_SECONDS,
+    )
+    cache = _timeseries_cache
+    if cache is None or (
+        cache.cache_dir, cache.max_bytes,
+        cache.bucket_seconds, cache.settle_seconds
+    ) != settings:
+        cache = TimeseriesCache(*settings)
+        _timeseries_cache = cache
+    return cache
@@ -0,0 +1,157 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Timeseries Decoder - Monitoring API pages into typed column arrays '''
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+CONTAINER_COLUMN = 'resource.labels.container_name'
+POD_COLUMN = 'resource.labels.pod_name'
+NAMESPACE_COLUMN = 'resource.labels.namespace_name'
+CONTROLLER_COLUMN = 'metadata.system_labels.top_level_controller_name'
+INT_VALUE_COLUMN = 'value.int64Value'
+DOUBLE_VALUE_COLUMN = 'value.doubleValue'
+
+# Label columns of a single workload query
+WORKLOAD_LABEL_COLUMNS = (CONTAINER_COLUMN, POD_COLUMN)
+
+# Where the labels of each group by field prefix are in a timeSeries entry
+_LABEL_SOURCES = (
+    ('resource.labels.', ('resource', 'labels')),
+    ('metadata.system_labels.', ('metadata', 'systemLabels')),
+    ('metadata.user_labels.', ('metadata', 'userLabels')),
+    ('metric.labels.', ('metric', 'labels')),
+)
+
+
+def _label_path(column: str) -> Tuple[str, str, str]:
+    '''Keys of a group by field in the `timeSeries` JSON.'''
+    for prefix, (section, labels) in _LABEL_SOURCES:
+        if column.startswith(prefix):
+            return section, labels, column[len(prefix):]
+    raise ValueError(f'Unsupported label column: {column}')
+
+
+class TimeseriesPageDecoder:
+    '''
+    Decodes `timeSeries` pages of the Monitoring API one at a time.
+
+    Every page is turned straight into NumPy columns: epoch seconds of the
+    point start, the value (int64 for INT64 series, float32 otherwise) and
+    label codes (the aggregation group by fields, container and pod by
+    default) into dictionaries shared by all pages. The page JSON can be
+    dropped as soon as `add_page` returns, so memory grows with the number
+    of points rather than with the raw response.
+    '''
+
+    def __init__(self, label_columns: Sequence[str] = WORKLOAD_LABEL_COLUMNS):
+        self._label_paths = {
+            column: _label_path(column) for column in label_columns
+        }
+        self._categories: Dict[str, Dict[str, int]] = {
+            column: {} for column in label_columns
+        }
+        self._label_codes: Dict[str, List[np.ndarray]] = {
+            column: [] for column in label_columns
+        }
+        self._starts: List[np.ndarray] = []
+        self._int_values: List[np.ndarray] = []
+        self._double_values: List[np.ndarray] = []
+        self._is_int: List[np.ndarray] = []
+        self.points = 0
+
+    @staticmethod
+    def _code(codes: Dict[str, int], name: str) -> int:
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(codes)
+        return code
+
+    def add_page(self, time_series: List[dict]):
+        '''Appends the points of one page of `timeSeries`.'''
+        n_points = sum(len(series.get('points', ())) for series in time_series)
+        if not n_points:
+            return
+        starts = []
+        label_codes = {
+            column: np.empty(n_points, dtype=np.int32)
+            for column in self._label_paths
+        }
+        int_values = np.zeros(n_points, dtype=np.int64)
+        double_values = np.full(n_points, np.nan, dtype=np.float32)
+        is_int = np.zeros(n_points, dtype=bool)
+        row = 0
+        for series in time_series:
+            points = series.get('points', ())
+            if not points:
+                continue
+            end = row + len(points)
+            for column, (section, labels, name) in self._label_paths.items():
+                label_codes[column][row:end] = self._code(
+                    self._categories[column],
+                    series.get(section, {}).get(labels, {}).get(name, '')
+                )
+            for point in points:
+                starts.append(point['interval']['startTime'].rstrip('Z'))
+                value = point.get('value', {})
+                if 'int64Value' in value:
+                    # INT64 values are JSON strings
+                    int_values[row] = int(value['int64Value'])
+                    is_int[row] = True
+                else:
+                    double_values[row] = value.get('doubleValue', np.nan)
+                row += 1
+        self._starts.append(
+            np.array(starts, dtype='datetime64[ns]').astype(np.int64)
+            // 10**9
+        )
+        for column, codes in label_codes.items():
+            self._label_codes[column].append(codes)
+        self._int_values.append(int_values)
+        self._double_values.append(double_values)
+        self._is_int.append(is_int)
+        self.points += n_points
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Concatenates the decoded pages.
+
+        Returns:
+            pd.DataFrame: One row per point with the value, a UTC
+                window_begin and one categorical column per label,
+                empty when no points were decoded.
+        '''
+        if not self.points:
+            return pd.DataFrame()
+        is_int = np.concatenate(self._is_int)
+        columns = {}
+        if is_int.all():
+            columns[INT_VALUE_COLUMN] = np.concatenate(self._int_values)
+        elif is_int.any():
+            # Mixed value types, missing values are NaN as with json_normalize
+            columns[INT_VALUE_COLUMN] = np.where(
+                is_int, np.concatenate(self._int_values), np.nan
+            )
+        if not is_int.all():
+            columns[DOUBLE_VALUE_COLUMN] = np.concatenate(self._double_values)
+        columns['window_begin'] = pd.to_datetime(
+            np.concatenate(self._starts), unit='s', utc=True
+        )
+        for column, codes in self._label_codes.items():
+            columns[column] = pd.Categorical.from_codes(
+                np.concatenate(codes),
+                categories=list(self._categories[column]),
+            )
+        return pd.DataFrame(columns)
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 """ Config settings for HPA, CA USER """
+import copy
+
 USER_AGENT = "cloud-solutions/gke-wa-hpa-recommender-v1"
 class Config:
     """
@@ -30,9 +32,92 @@ class Config:
     HPA_SCALE_LIMIT = 2.3
     HPA_TARGET_BUFFER = 0.10
     HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS = 10
+    # Rate limits of the replay, as the HPA behavior scaleUp / scaleDown
+    # policies, e.g. [{"type": "Percent", "value": 100,
+    # "periodSeconds": 60}]. Periods are rounded up to rows, no policies
+    # leave the direction unbounded
+    HPA_SCALE_UP_POLICIES = []
+    HPA_SCALE_DOWN_POLICIES = []
+    # "Max", "Min" or "Disabled", as the behavior selectPolicy
+    HPA_SCALE_UP_SELECT_POLICY = "Max"
+    HPA_SCALE_DOWN_SELECT_POLICY = "Max"
+    # Distance of the usage ratio to 1 within which the replay does not
+    # scale, the controller --horizontal-pod-autoscaler-tolerance (0.1 in
+    # Kubernetes)
+    HPA_TOLERANCE = 0.0
+    # Pods up and running for less than this are not ready and their CPU
+    # usage is not counted, as the controller
+    # --horizontal-pod-autoscaler-cpu-initialization-period (300 in
+    # Kubernetes)
+    HPA_CPU_INITIALIZATION_PERIOD_SECONDS = 0
+    # Metrics the replay scales on besides the CPU utilization, to the most
+    # replicas asked by any, e.g. [{"column": "pubsub_backlog",
+    # "targetType": "AverageValue", "target": 100}], see models.HPAMetric
+    HPA_METRICS = []
     EXTRA_HPA_BUFFER_FOR_MAX_REPLICAS = 1.00
     EXTRA_HPA_BUFFER_FOR_MEMORY_RECOMMENDATION = 1.05
     EXTRA_HPA_BUFFER_FOR_CPU_USAGE_CAPACITY = 1.05
+    # HPA replay backend: "python" (reference loop), "kernel" (scalar
+    # kernel), "numba" (JIT compiled kernel) or "auto" (numba if installed)
+    SIMULATION_BACKEND = "auto"
+    # "pool" simulates each plan in a process pool task, "matrix" replays
+    # all plans together in one pass over the time series (plan by plan in
+    # the current process with the "python" backend)
+    SIMULATION_MODE = "pool"
+    # Worker processes of the shared simulation pool, None uses all CPUs
+    SIMULATION_POOL_MAX_WORKERS = None
+    # Reject plans that cannot fit the usage peaks before simulating them
+    SIMULATION_PREFILTER = True
+    # Directory of the on-disk replay cache, None disables it. Replays are
+    # keyed by data, plan and simulator settings, so runs that only change
+    # the savings settings reuse them
+    SIMULATION_CACHE_DIR = None
+    SIMULATION_CACHE_MAX_BYTES = 1024**3
+    # Usage columns during planning and simulation: "fixed_point" (CPU in
+    # int32 millicores, memory in uint32 MiB or KiB) or "float16" (lossy CPU)
+    WORKLOAD_COLUMN_DTYPES = "fixed_point"
+    # Fleet runs: timeseries fetched concurrently, and fetched workloads
+    # allowed to wait for the simulation pool
+    FLEET_MAX_CONCURRENT_FETCHES = 8
+    FLEET_MAX_PENDING_SIMULATIONS = 16
+    # Fleet runs read each namespace with one batched query per metric
+    # instead of one query per metric and workload
+    FLEET_BATCHED_FETCH = False
+
+    # === Timeseries Cache ===
+    # Directory of the on-disk Monitoring query cache, None disables it
+    TIMESERIES_CACHE_DIR = None
+    TIMESERIES_CACHE_MAX_BYTES = 1024**3
+    # Cached buckets length, a multiple of DISTANCE_BETWEEN_POINTS_SECONDS
+    TIMESERIES_CACHE_BUCKET_SECONDS = 6 * 3600
+    # Recent buckets are not cached while Monitoring may still update them
+    TIMESERIES_CACHE_SETTLE_SECONDS = 15 * 60
+
+    # === Timeseries Fetch ===
+    # Long windows are fetched as concurrent shards of this length, rounded
+    # up to a multiple of DISTANCE_BETWEEN_POINTS_SECONDS
+    TIMESERIES_SHARD_SECONDS = 24 * 3600
+    TIMESERIES_MAX_CONCURRENT_SHARDS = 8
+    # Retries of a page throttled (429) or failed (5xx), with exponential
+    # backoff from TIMESERIES_FETCH_BACKOFF_SECONDS
+    TIMESERIES_FETCH_MAX_RETRIES = 5
+    TIMESERIES_FETCH_BACKOFF_SECONDS = 1.0
+    # Fetch the optional request metrics together with the required usage
+    # metrics, cancelling them when a required metric has no data
+    TIMESERIES_SPECULATIVE_FETCH = True
+    # Per window aggregation of the pod metrics: "columnar" (sorted
+    # segmented reductions) or "groupby" (reference pandas groupby/merge)
+    TIMESERIES_AGGREGATION_BACKEND = "columnar"
+
+    # === Monitoring Client ===
+    # One client per process, shared by all workloads
+    MONITORING_MAX_CONNECTIONS = 20
+    MONITORING_MAX_CONCURRENT_REQUESTS = 16
+    # HTTP/2 when the h2 package is installed (httpx[http2])
+    MONITORING_HTTP2 = True
+    MONITORING_TIMEOUT_SECONDS = 60
+    # The access token is refreshed this long before it expires
+    MONITORING_TOKEN_REFRESH_MARGIN_SECONDS = 300
     
     # === VPA Scaling ===
     EXTRA_VPA_BUFFER_FOR_MEMORY_RECOMMENDATION = 1.05
@@ -55,6 +140,23 @@ class Config:
     # === DCR (Dynamic Compute Resource) Settings ===
     MIN_DCR_PERCENTILE_VALUE = 10
     MAX_DCR_PERCENTILE_VALUE = 100
+
+    # === Plan Search ===
+    # "heuristic" simulates the DCR, DMR and VPA plans, "grid" also
+    # searches CPU request x min replicas x target CPU x scale down window
+    # and simulates the plans of the Pareto frontier without clashes
+    PLAN_SEARCH_MODE = "heuristic"
+    # Replays allowed per workload, the grid is walked until exhausted
+    PLAN_SEARCH_MAX_SIMULATIONS = 2000
+    # CPU requests at this many percentiles between the DCR bounds
+    PLAN_SEARCH_CPU_REQUEST_POINTS = 10
+    # Min replicas from MIN_REC_REPLICAS up to the max usage, this many
+    PLAN_SEARCH_MIN_REPLICAS_POINTS = 4
+    # Targets from MIN_HPA_TARGET_CPU to MAX_HPA_TARGET_CPU by this step
+    PLAN_SEARCH_TARGET_CPU_STEP = 0.05
+    PLAN_SEARCH_SCALE_DOWN_STEPS = [5, 10, 20]
+    # Share of the rows with a clash above which a point is discarded
+    PLAN_SEARCH_MAX_CLASH_RATE = 0.05
     
     # === Excluded Namespaces ===
     EXCLUDED_NAMESPACES = [
@@ -114,6 +216,31 @@ class Config:
                 constants_list.append(f"{name}: {value}")
         return "\n".join(constants_list)
 
+    @classmethod
+    def snapshot(cls) -> dict:
+        """
+        Returns a copy of all constants, e.g. to ship the current values
+        to worker processes which only import the class defaults.
+
+        Returns:
+            dict: Constant names mapped to their values.
+        """
+        return {
+            name: copy.deepcopy(getattr(cls, name))
+            for name in dir(cls) if name.isupper()
+        }
+
+    @classmethod
+    def restore(cls, values: dict):
+        """
+        Sets all constants from a `snapshot`.
+
+        Args:
+            values (dict): Constant names mapped to their values.
+        """
+        for name, value in values.items():
+            cls.set_value(name, value)
+
     @classmethod
     def add_excluded_namespaces(cls, namespaces: str):
         """
@@ -20,9 +20,10 @@ from dataclasses import dataclass, field, asdict
 import numpy as np
 import pandas as pd
 import json
-from typing import Literal, Optional, List
+from typing import Literal, Optional, List, Dict, Tuple
 from datetime import datetime
 from .config import Config
+from ..quantile_index import QuantileIndex
 
 # Helper function to handle JSON serialization
 def make_json_serializable(data):
@@ -32,7 +33,7 @@ def make_json_serializable(data):
 
     if isinstance(data, (datetime, pd.Timestamp)):
         return data.isoformat()
-    if isinstance(data, list):
+    if isinstance(data, (list, tuple)):
         return [make_json_serializable(item) for item in data]
     if isinstance(data, dict):
         return {
@@ -161,6 +162,97 @@ class MetricRequestParameter:
     cross_series_reducer: str
     latest_value: bool = False
 
+@dataclass(frozen=True)
+class HPAScalingPolicy:
+    """
+    A scaleUp or scaleDown policy of a HorizontalPodAutoscaler behavior.
+
+    Attributes:
+        type (str): "Pods" or "Percent".
+        value (int): Pods, or percent of the replicas, per period.
+        period_seconds (int): Period the value applies to.
+    """
+    type: str
+    value: int
+    period_seconds: int
+
+    @classmethod
+    def from_spec(cls, spec: Dict) -> 'HPAScalingPolicy':
+        """A policy from its spec, e.g. {"type": "Pods", "value": 4,
+        "periodSeconds": 60}."""
+        return cls(spec["type"], spec["value"], spec["periodSeconds"])
+
+@dataclass(frozen=True)
+class HPABehavior:
+    """
+    Behavior of the HPA of a plan: the autoscaling/v2 behavior policies
+    and the controller settings the replay honors. The scale down
+    stabilization window is `WorkloadPlan.hpa_scale_down_steps`.
+
+    Attributes:
+        scale_up_policies (Tuple[HPAScalingPolicy, ...]): scaleUp policies,
+            none leave scaling up unbounded.
+        scale_up_select_policy (str): "Max", "Min" or "Disabled".
+        scale_down_policies (Tuple[HPAScalingPolicy, ...]): scaleDown
+            policies, none leave scaling down unbounded.
+        scale_down_select_policy (str): "Max", "Min" or "Disabled".
+        tolerance (float): Distance of the usage ratio to 1 within which
+            the HPA does not scale.
+        cpu_initialization_period_seconds (int): Pods up and running for
+            less than this are not ready, their CPU usage is not counted.
+    """
+    scale_up_policies: Tuple[HPAScalingPolicy, ...] = ()
+    scale_up_select_policy: str = "Max"
+    scale_down_policies: Tuple[HPAScalingPolicy, ...] = ()
+    scale_down_select_policy: str = "Max"
+    tolerance: float = 0.0
+    cpu_initialization_period_seconds: int = 0
+
+    @classmethod
+    def from_config(cls, config: Config) -> 'HPABehavior':
+        """The behavior of the config.HPA_* settings."""
+        return cls(
+            scale_up_policies=tuple(
+                HPAScalingPolicy.from_spec(spec)
+                for spec in config.HPA_SCALE_UP_POLICIES
+            ),
+            scale_up_select_policy=config.HPA_SCALE_UP_SELECT_POLICY,
+            scale_down_policies=tuple(
+                HPAScalingPolicy.from_spec(spec)
+                for spec in config.HPA_SCALE_DOWN_POLICIES
+            ),
+            scale_down_select_policy=config.HPA_SCALE_DOWN_SELECT_POLICY,
+            tolerance=config.HPA_TOLERANCE,
+            cpu_initialization_period_seconds=(
+                config.HPA_CPU_INITIALIZATION_PERIOD_SECONDS
+            ),
+        )
+
+@dataclass(frozen=True)
+class HPAMetric:
+    """
+    A metric the HPA of a plan scales on besides the CPU utilization
+    target. The HPA scales to the most replicas asked by any metric.
+
+    Attributes:
+        column (str): Column of the workload frame with the metric per row,
+            summed over the replicas for Utilization and AverageValue
+            targets, e.g. the backlog of a Pub/Sub subscription for KEDA.
+        target_type (str): "Utilization" of the memory request (for
+            sum_containers_mem_usage_mi only), "AverageValue" per replica
+            or "Value".
+        target (float): The target, a ratio for Utilization.
+    """
+    column: str
+    target_type: str
+    target: float
+
+    @classmethod
+    def from_spec(cls, spec: Dict) -> 'HPAMetric':
+        """A metric from its spec, e.g. {"column": "pubsub_backlog",
+        "targetType": "AverageValue", "target": 100}."""
+        return cls(spec["column"], spec["targetType"], spec["target"])
+
 @dataclass
 class WorkloadPlan:
     """
@@ -172,6 +264,12 @@ class WorkloadPlan:
         recommended__min_replicas(int): Min replicas.
         recommended__max_replicas(int): Max replicas.
         recommended__target_cpu (float): Target CPU.
+        hpa_scale_down_steps (int): Scale down stabilization window in
+            rows, config.HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS when None.
+        hpa_behavior (HPABehavior): Behavior of the HPA,
+            `HPABehavior.from_config` when None.
+        hpa_metrics (Tuple[HPAMetric, ...]): Metrics of the HPA besides
+            the CPU utilization, config.HPA_METRICS when None.
     """
     recommended_cpu_request: float
     recommended_mem_request_and_limits_mi: float
@@ -182,10 +280,63 @@ class WorkloadPlan:
     max_usage_slope_up_ratio: float = 0.0
     workload_e2e_startup_latency_rows: int = 0
     method: str = ""
+    hpa_scale_down_steps: Optional[int] = None
+    hpa_behavior: Optional[HPABehavior] = None
+    hpa_metrics: Optional[Tuple[HPAMetric, ...]] = None
 
     def to_json(self):
         return json.dumps(make_json_serializable(asdict(self)), indent=2)
 
+@dataclass(frozen=True, eq=False)
+class PreparedWorkload:
+    """
+    Workload timeseries prepared once for planning, simulation and savings,
+    see `plan_workload_simulation.prepare_workload`. Consumers share it
+    without copying: the frame is only extended through copy on write
+    views and the arrays are read only.
+
+    Attributes:
+        frame (pd.DataFrame): Columns with the `convert_data_types` dtypes,
+            sorted by window_begin with a RangeIndex, and the startup
+            latency columns of `_calculate_max_usage_slope_up_ratio`.
+        window_index (pd.DatetimeIndex): window_begin of every row.
+        sum_cpu_usage (np.ndarray): Sum of containers CPU usage in cores.
+        sum_mem_usage_mi (np.ndarray): Sum of containers memory usage in
+            MiB.
+        sum_cpu_request (np.ndarray): Sum of containers CPU request in
+            cores.
+        sum_mem_request_mi (np.ndarray): Sum of containers memory request
+            in MiB.
+        max_cpu_usage_in_startup_latency (np.ndarray): Max average CPU
+            usage in the startup latency rows from every row on.
+        max_mem_usage_mi_in_startup_latency (np.ndarray): Max memory usage
+            in the startup latency rows from every row on.
+        max_usage_slope_up_ratio (np.ndarray): Max of the CPU and memory
+            ratios of the startup latency maxima to the usage of the row.
+        running_max_sum_cpu_usage (np.ndarray): Max sum of containers CPU
+            usage up to every row.
+        workload_e2e_startup_latency_rows (int): Window of the startup
+            latency columns.
+        quantiles (Dict[str, QuantileIndex]): Sorted samples of the
+            QUANTILE_COLUMNS, answering the planning quantiles.
+    """
+
+    frame: pd.DataFrame
+    window_index: pd.DatetimeIndex
+    sum_cpu_usage: np.ndarray
+    sum_mem_usage_mi: np.ndarray
+    sum_cpu_request: np.ndarray
+    sum_mem_request_mi: np.ndarray
+    max_cpu_usage_in_startup_latency: np.ndarray
+    max_mem_usage_mi_in_startup_latency: np.ndarray
+    max_usage_slope_up_ratio: np.ndarray
+    running_max_sum_cpu_usage: np.ndarray
+    workload_e2e_startup_latency_rows: int
+    quantiles: Dict[str, QuantileIndex]
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
 @dataclass
 class WorkloadRecommendation:
     """
@@ -201,6 +352,7 @@ class WorkloadRecommendation:
     validation_msg: str = ""
     forecast_mem_saving_mi: float = 0.0
     forecast_cpu_saving: float = 0.0
+    skipped_simulations: int = 0
     logs: List[str] = field(default_factory=list)
     def to_json(self) -> str:
         """
@@ -0,0 +1,212 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+''' Workload Dtypes - Compact storage of the workload usage columns '''
+import logging
+from typing import Iterable, Optional
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Values of config.WORKLOAD_COLUMN_DTYPES
+WORKLOAD_DTYPES = ('fixed_point', 'float16')
+
+# Fixed point units per core of the CPU columns. Sums use millicores, the
+# unit of the recommended requests, and usage sums are rounded up so a
+# clash against a request in millicores is detected exactly. Per container
+# values are far smaller and keep micro cores.
+CPU_SCALES = {
+    'avg_container_cpu_usage': 1_000_000,
+    'stddev_containers_cpu_usage': 1_000_000,
+    'sum_containers_cpu_request': 1000,
+    'sum_containers_cpu_usage': 1000,
+}
+
+CPU_COLUMNS = list(CPU_SCALES)
+
+# Fixed point units per MiB of the memory columns. The usage sum is rounded
+# up, like the CPU usage sum, to the KiB so the memory requests planned
+# from it stay within 1/1024 MiB of the usage. Memory sums are uint32,
+# uint64 from 4 TiB on.
+MEM_SCALES = {
+    'sum_containers_mem_request_mi': 1,
+    'sum_containers_mem_usage_mi': 1024,
+}
+
+MEM_MI_COLUMNS = list(MEM_SCALES)
+
+_ROUNDED_UP_COLUMNS = (
+    'sum_containers_cpu_usage',
+    'sum_containers_mem_usage_mi',
+)
+
+_FIXED_POINT_CPU_DTYPES = (np.dtype(np.int32), pd.Int32Dtype())
+
+_FIXED_POINT_MEM_DTYPES = (
+    np.dtype(np.uint32), np.dtype(np.uint64),
+    pd.UInt32Dtype(), pd.UInt64Dtype(),
+)
+
+_NULLABLE_DTYPES = {'int32': 'Int32', 'uint32': 'UInt32', 'uint64': 'UInt64'}
+
+
+def _fixed_point(
+    values: pd.Series, scale: int, dtype: str, round_up: bool
+) -> pd.Series:
+    '''
+    Rounds values to 1/scale units in an integer column, nullable only
+    when some values are missing. Values out of the dtype range are
+    clipped to it.
+    '''
+    scaled = values.astype('float64') * scale
+    # Round up from a grid of 1/1000 unit, which absorbs the float error of
+    # values already on the grid, float32 ones included
+    scaled = np.ceil(scaled.round(3)) if round_up else scaled.round()
+    info = np.iinfo(dtype)
+    scaled = scaled.clip(info.min, info.max)
+    if scaled.isna().any():
+        return scaled.astype(_NULLABLE_DTYPES[dtype])
+    return scaled.astype(dtype)
+
+
+def compact_usage_columns(
+    workload_df: pd.DataFrame, workload_dtypes: str
+) -> pd.DataFrame:
+    '''
+    Converts the CPU and memory columns of a workload frame, in place, to
+    the compact representation selected by config.WORKLOAD_COLUMN_DTYPES.
+
+    Columns already in fixed point are left as they are, so converting a
+    frame twice does not scale it twice.
+
+    Args:
+        workload_df (pd.DataFrame): Workload frame with numeric or
+            numeric-like usage columns.
+        workload_dtypes (str): One of WORKLOAD_DTYPES.
+
+    Returns:
+        pd.DataFrame: The converted frame.
+    '''
+    if workload_dtypes not in WORKLOAD_DTYPES:
+        raise ValueError(
+            f'Unknown WORKLOAD_COLUMN_DTYPES {workload_dtypes!r}, expected '
+            f'one of {", ".join(map(repr, WORKLOAD_DTYPES))}'
+        )
+    for col, scale in CPU_SCALES.items():
+        if is_fixed_point_cpu(workload_df[col]):
+            if workload_dtypes == 'fixed_point':
+                continue
+            values = usage_series(workload_df, col)
+        else:
+            values = pd.to_numeric(workload_df[col], errors='coerce')
+        if workload_dtypes == 'fixed_point':
+            workload_df[col] = _fixed_point(
+                values, scale, 'int32', col in _ROUNDED_UP_COLUMNS
+            )
+        else:
+            workload_df[col] = values.astype('float16')
+    for col, scale in MEM_SCALES.items():
+        if is_fixed_point_mem(workload_df[col]):
+            if workload_dtypes == 'fixed_point':
+                continue
+            values = usage_series(workload_df, col)
+        else:
+            values = pd.to_numeric(workload_df[col], errors='coerce')
+        if workload_dtypes == 'fixed_point':
+            dtype = (
+                'uint64' if values.max() * scale > np.iinfo('uint32').max
+                else 'uint32'
+            )
+            workload_df[col] = _fixed_point(
+                values, scale, dtype, col in _ROUNDED_UP_COLUMNS
+            )
+        else:
+            workload_df[col] = values.astype('float32')
+    return workload_df
+
+
+def is_fixed_point_cpu(values: pd.Series) -> bool:
+    '''True when a CPU column holds int32 millicores.'''
+    return values.dtype in _FIXED_POINT_CPU_DTYPES
+
+
+def is_fixed_point_mem(values: pd.Series) -> bool:
+    '''True when a memory column holds unsigned fixed point MiB.'''
+    return values.dtype in _FIXED_POINT_MEM_DTYPES
+
+
+def usage_series(workload_df: pd.DataFrame, col: str) -> pd.Series:
+    '''
+    A usage column of the workload frame in float64 physical units: cores
+    for CPU columns and MiB for memory columns, missing values as NaN.
+    '''
+    values = workload_df[col].astype('float64')
+    if col in CPU_SCALES and is_fixed_point_cpu(workload_df[col]):
+        values = values / CPU_SCALES[col]
+    elif col in MEM_SCALES and is_fixed_point_mem(workload_df[col]):
+        values = values / MEM_SCALES[col]
+    return values
+
+
+def usage_values(workload_df: pd.DataFrame, col: str) -> np.ndarray:
+    '''Same as `usage_series`, as a float64 numpy array.'''
+    return usage_series(workload_df, col).to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+
+
+def usage_matrix(
+    workload_df: pd.DataFrame, columns: Iterable[str]
+) -> np.ndarray:
+    '''`usage_values` of columns stacked as a (columns, rows) array.'''
+    columns = list(columns)
+    if not columns:
+        return np.zeros((0, len(workload_df)), dtype=np.float64)
+    return np.stack([usage_values(workload_df, col) for col in columns])
+
+
+def decode_usage_columns(
+    workload_df: pd.DataFrame, columns: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    '''
+    Replaces, in place, the compact usage columns by their float64 value
+    in physical units, e.g. before reporting the frame.
+    '''
+    for col in columns or CPU_COLUMNS + MEM_MI_COLUMNS:
+        if col in workload_df.columns:
+            workload_df[col] = usage_series(workload_df, col)
+    return workload_df
+
+
+def frame_memory_report(workload_df: pd.DataFrame, name: str) -> pd.Series:
+    '''
+    Logs and returns the memory used by each column of a frame.
+
+    Returns:
+        pd.Series: Bytes per column, with the index and a 'total' entry.
+    '''
+    usage = workload_df.memory_usage(deep=True)
+    usage['total'] = usage.sum()
+    logger.info(
+        'Memory usage of %s: %.3f MiB for %d rows (%s).',
+        name,
+        usage['total'] / 1024**2,
+        len(workload_df),
+        ', '.join(
+            f'{col}={nbytes}' for col, nbytes in usage.items()
+            if col != 'total'
+        ),
+    )
+    return usage
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the JSON serialization of the workload models """
+import json
+import unittest
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import (
+    HPABehavior,
+    HPAMetric,
+    HPAScalingPolicy,
+    WorkloadDetails,
+    WorkloadPlan,
+    WorkloadRecommendation,
+    make_json_serializable,
+)
+
+
+def _plan(**kwargs):
+    return WorkloadPlan(
+        recommended_cpu_request=0.5,
+        recommended_mem_request_and_limits_mi=256,
+        recommended_min_replicas=2,
+        recommended_max_replicas=10,
+        recommended_hpa_target_cpu=0.7,
+        method="DCR",
+        **kwargs
+    )
+
+
+class TestModelsJson(unittest.TestCase):
+    """Unit tests for `make_json_serializable` and the `to_json` methods."""
+
+    def test_tuples_are_lists(self):
+        self.assertEqual(
+            make_json_serializable((1, ("a", None))), [1.0, ["a", None]]
+        )
+
+    def test_plan_hpa_metrics(self):
+        plan = _plan(hpa_metrics=(
+            HPAMetric("pubsub_backlog", "AverageValue", 100),
+            HPAMetric("sum_containers_mem_usage_mi", "Utilization", 0.8),
+        ))
+        data = json.loads(plan.to_json())
+        self.assertEqual(data["hpa_metrics"], [
+            {"column": "pubsub_backlog", "target_type": "AverageValue",
+             "target": 100.0},
+            {"column": "sum_containers_mem_usage_mi",
+             "target_type": "Utilization", "target": 0.8},
+        ])
+        self.assertEqual(
+            _plan(hpa_metrics=tuple(
+                HPAMetric(**metric) for metric in data["hpa_metrics"]
+            )),
+            plan
+        )
+        self.assertIsNone(json.loads(_plan().to_json())["hpa_metrics"])
+
+    def test_plan_hpa_behavior(self):
+        behavior = HPABehavior(
+            scale_up_policies=(
+                HPAScalingPolicy("Pods", 4, 60),
+                HPAScalingPolicy("Percent", 100, 15),
+            ),
+            scale_down_policies=(HPAScalingPolicy("Percent", 10, 60),),
+            scale_down_select_policy="Min",
+            tolerance=0.1,
+        )
+        data = json.loads(_plan(hpa_behavior=behavior).to_json())
+        self.assertEqual(data["hpa_behavior"], {
+            "scale_up_policies": [
+                {"type": "Pods", "value": 4.0, "period_seconds": 60.0},
+                {"type": "Percent", "value": 100.0, "period_seconds": 15.0},
+            ],
+            "scale_up_select_policy": "Max",
+            "scale_down_policies": [
+                {"type": "Percent", "value": 10.0, "period_seconds": 60.0},
+            ],
+            "scale_down_select_policy": "Min",
+            "tolerance": 0.1,
+            "cpu_initialization_period_seconds": 0.0,
+        })
+
+    def test_recommendation_hpa_metrics(self):
+        rec = WorkloadRecommendation(
+            workload_details=WorkloadDetails(
+                config=Config(),
+                project_id="project",
+                cluster_name="cluster",
+                location="location",
+                namespace="namespace",
+                controller_name="controller",
+                controller_type="Deployment",
+                container_name="container",
+            ),
+            plan=_plan(hpa_metrics=(
+                HPAMetric("pubsub_backlog", "Value", 1000),
+            )),
+            valid=True,
+        )
+        data = json.loads(rec.to_json())
+        self.assertEqual(data["plan"]["hpa_metrics"], [
+            {"column": "pubsub_backlog", "target_type": "Value",
+             "target": 1000.0},
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
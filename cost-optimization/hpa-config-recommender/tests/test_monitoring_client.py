@@ -0,0 +1,157 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit test for the shared Monitoring API client"""
+import asyncio
+import datetime
+import gc
+import unittest
+from unittest.mock import patch
+import httpx
+from hpaconfigrecommender.monitoring_client import (
+    get_monitoring_client,
+    MonitoringClient,
+)
+from hpaconfigrecommender.utils.config import Config
+
+
+class _Credentials:
+    """Fake google.auth credentials, each refresh issues a new token."""
+
+    def __init__(self, lifetime_seconds):
+        self.lifetime_seconds = lifetime_seconds
+        self.token = None
+        self.expiry = None
+        self.refreshes = 0
+
+    def refresh(self, request):
+        # pylint: disable=unused-argument
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = (
+            datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            + datetime.timedelta(seconds=self.lifetime_seconds)
+        )
+
+
+class TestMonitoringClient(unittest.TestCase):
+    """Unit tests for `MonitoringClient`."""
+
+    def setUp(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.status = {}
+
+    def _client(self, lifetime_seconds=3600, **kwargs):
+        async def _handler(request):
+            self.requests.append(request)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            token = request.headers["Authorization"]
+            return httpx.Response(
+                self.status.get(token, 200), json={"token": token}
+            )
+
+        self.credentials = _Credentials(lifetime_seconds)
+        patcher = patch(
+            "hpaconfigrecommender.monitoring_client.default",
+            return_value=(self.credentials, "project")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = MonitoringClient(
+            http2=False, transport=httpx.MockTransport(_handler), **kwargs
+        )
+        self.addCleanup(client.close)
+        return client
+
+    def test_token_is_cached_across_event_loops(self):
+        client = self._client()
+        for _ in range(3):
+            response = asyncio.run(client.get("projects/p/timeSeries", {}))
+            self.assertEqual(response.json(), {"token": "Bearer token-1"})
+        self.assertEqual(self.credentials.refreshes, 1)
+        self.assertEqual(
+            str(self.requests[0].url),
+            "https://monitoring.googleapis.com/v3/projects/p/timeSeries"
+        )
+        self.assertIn("User-Agent", self.requests[0].headers)
+
+    def test_token_is_refreshed_before_expiry(self):
+        client = self._client(
+            lifetime_seconds=60, token_refresh_margin_seconds=300
+        )
+        for _ in range(2):
+            asyncio.run(client.get("projects/p/timeSeries", {}))
+        self.assertEqual(self.credentials.refreshes, 2)
+
+    def test_unauthorized_retries_with_new_token(self):
+        client = self._client()
+        self.status["Bearer token-1"] = 401
+        response = asyncio.run(client.get("projects/p/timeSeries", {}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.credentials.refreshes, 2)
+
+    def test_concurrent_requests_are_bounded(self):
+        client = self._client(max_concurrent_requests=2)
+
+        async def _gather():
+            return await asyncio.gather(*[
+                client.get("projects/p/timeSeries", {"page": i})
+                for i in range(6)
+            ])
+
+        responses = asyncio.run(_gather())
+        self.assertEqual(len(responses), 6)
+        self.assertEqual(self.max_in_flight, 2)
+        self.assertEqual(self.credentials.refreshes, 1)
+
+
+class TestGetMonitoringClient(unittest.TestCase):
+    """`get_monitoring_client` shares one client per settings."""
+
+    def tearDown(self):
+        Config.set_value("MONITORING_MAX_CONCURRENT_REQUESTS", 16)
+
+    def test_client_is_shared_until_settings_change(self):
+        config = Config()
+        client = get_monitoring_client(config)
+        self.assertIs(get_monitoring_client(config), client)
+        config.set_value("MONITORING_MAX_CONCURRENT_REQUESTS", 4)
+        other = get_monitoring_client(config)
+        self.assertIsNot(other, client)
+        self.assertEqual(other.max_concurrent_requests, 4)
+        other.close()
+        self.assertIsNot(get_monitoring_client(config), other)
+
+    def test_replaced_client_drains(self):
+        config = Config()
+        client = get_monitoring_client(config)
+        config.set_value("MONITORING_MAX_CONCURRENT_REQUESTS", 4)
+        other = get_monitoring_client(config)
+        self.addCleanup(other.close)
+        # Still open for the callers holding it, closed once unused
+        self.assertFalse(client.closed)
+        loop = client._loop
+        del client
+        gc.collect()
+        self.assertTrue(loop.is_closed())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the joint plan search """
+import unittest
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+from hpaconfigrecommender import plan_search
+from hpaconfigrecommender.plan_search import (
+    SearchPoint,
+    get_search_plans,
+    pareto_frontier,
+    search_plan_space,
+)
+from hpaconfigrecommender.plan_workload_simulation import prepare_workload
+from hpaconfigrecommender.run_workload_simulation import (
+    _analyze_configuration_plans,
+    plan_and_run_simulation,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails, WorkloadPlan
+
+TEST_DIR = Path(__file__).parent
+
+
+class TestPlanSearch(unittest.TestCase):
+    """Unit tests for `search_plan_space`."""
+
+    def setUp(self):
+        self.config = Config()
+        self.config_values = self.config.snapshot()
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+        self.workload_df = pd.read_csv(
+            TEST_DIR / "test_files" / "test_id_9_dataframe.csv"
+        )
+
+    def tearDown(self):
+        self.config.restore(self.config_values)
+
+    def test_pareto_frontier(self):
+        plan = WorkloadPlan(1.0, 100.0)
+        points = [
+            SearchPoint(plan, avg_saving_in_cpus=1.0, clash_rate=0.0,
+                        cpu_clashes=0),
+            SearchPoint(plan, avg_saving_in_cpus=0.5, clash_rate=0.1,
+                        cpu_clashes=1),
+            SearchPoint(plan, avg_saving_in_cpus=2.0, clash_rate=0.2,
+                        cpu_clashes=2),
+            SearchPoint(plan, avg_saving_in_cpus=1.5, clash_rate=0.0,
+                        cpu_clashes=0),
+        ]
+        frontier = pareto_frontier(points)
+        self.assertEqual(
+            [(p.avg_saving_in_cpus, p.clash_rate) for p in frontier],
+            [(1.5, 0.0), (2.0, 0.2)]
+        )
+
+    def test_frontier_savings_match_simulation(self):
+        result = search_plan_space(self.workload_details, self.workload_df)
+        self.assertFalse(result.budget_exhausted)
+        self.assertGreater(result.pruned, 0)
+        self.assertLessEqual(
+            result.simulations + result.pruned, result.grid_size
+        )
+        self.assertTrue(result.frontier)
+        clash_rates = [p.clash_rate for p in result.frontier]
+        savings = [p.avg_saving_in_cpus for p in result.frontier]
+        self.assertEqual(clash_rates, sorted(clash_rates))
+        self.assertEqual(savings, sorted(savings))
+
+        # The search scores a plan as the simulation does
+        best = result.frontier[0]
+        self.assertEqual(best.clash_rate, 0.0)
+        prepared = prepare_workload(self.workload_details, self.workload_df)
+        analysis_df, rec, _, _ = _analyze_configuration_plans(
+            self.config, [best.plan], self.workload_details, prepared
+        )
+        self.assertTrue(rec.valid)
+        self.assertAlmostEqual(
+            analysis_df["avg_saving_in_cpus"].mean(),
+            best.avg_saving_in_cpus
+        )
+
+    def test_pruning_keeps_the_frontier(self):
+        pruned = search_plan_space(self.workload_details, self.workload_df)
+        with mock.patch.object(
+            plan_search, "_is_dominated", return_value=False
+        ):
+            exhaustive = search_plan_space(
+                self.workload_details, self.workload_df
+            )
+        self.assertLess(pruned.simulations, exhaustive.simulations)
+        self.assertEqual(
+            [p.plan.method for p in pruned.frontier],
+            [p.plan.method for p in exhaustive.frontier]
+        )
+
+    def test_budget(self):
+        self.config.set_value("PLAN_SEARCH_MAX_SIMULATIONS", 5)
+        result = search_plan_space(self.workload_details, self.workload_df)
+        self.assertEqual(result.simulations, 5)
+        self.assertTrue(result.budget_exhausted)
+
+    def test_search_mode(self):
+        self.assertEqual(
+            get_search_plans(self.workload_details, self.workload_df), []
+        )
+        heuristic_df, _, _, _ = plan_and_run_simulation(
+            self.workload_details, self.workload_df
+        )
+
+        self.config.set_value("PLAN_SEARCH_MODE", "grid")
+        plans = get_search_plans(self.workload_details, self.workload_df)
+        self.assertTrue(plans)
+        self.assertTrue(all(
+            plan.method.startswith("GRID-")
+            and plan.hpa_scale_down_steps
+            in self.config.PLAN_SEARCH_SCALE_DOWN_STEPS
+            for plan in plans
+        ))
+        grid_df, grid_rec, _, _ = plan_and_run_simulation(
+            self.workload_details, self.workload_df
+        )
+        self.assertTrue(grid_rec.plan.method.startswith("GRID-"))
+        self.assertGreater(
+            grid_df["avg_saving_in_cpus"].mean(),
+            heuristic_df["avg_saving_in_cpus"].mean()
+        )
+
+        self.config.set_value("PLAN_SEARCH_MODE", "bayesian")
+        with self.assertRaises(ValueError):
+            get_search_plans(self.workload_details, self.workload_df)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -27,7 +27,11 @@ from hpaconfigrecommender.plan_workload_simulation import (
     _calculate_max_usage_slope_up_ratio,
     get_min_replicas,
     convert_data_types,
-    _get_proposed_memory_recommendation
+    prepare_workload,
+    SLOPE_COLUMNS,
+    _get_proposed_memory_recommendation,
+    _dynamic_min_replicas,
+    _RowsAboveRequest
 )
 from hpaconfigrecommender.utils.config import Config
 
@@ -120,6 +124,100 @@ class TestHPASimulationPlan(unittest.TestCase):
         self.assertEqual(expected_max_slope_ratio, actual_max_slope_ratio)
 
 
+    def test_prepare_workload(self):
+        """The prepared workload is sorted, typed and read only."""
+        shuffled_df = self.workload_df.sample(frac=1, random_state=0)
+        prepared = prepare_workload(self.workload_details, shuffled_df)
+        frame = prepared.frame
+
+        # The caller frame is left as it is
+        self.assertEqual(
+            list(shuffled_df.columns), list(self.workload_df.columns)
+        )
+        self.assertEqual(shuffled_df["sum_containers_cpu_usage"].dtype, float)
+
+        self.assertTrue(frame["window_begin"].is_monotonic_increasing)
+        pd.testing.assert_index_equal(frame.index, pd.RangeIndex(len(frame)))
+        self.assertEqual(frame["sum_containers_cpu_usage"].dtype, np.int32)
+        for col in SLOPE_COLUMNS:
+            self.assertIn(col, frame.columns)
+        np.testing.assert_array_equal(
+            prepared.window_index, frame["window_begin"]
+        )
+        expected_cpu = np.ceil(
+            self.workload_df["sum_containers_cpu_usage"].to_numpy() * 1000
+            - 1e-6
+        ) / 1000
+        np.testing.assert_allclose(prepared.sum_cpu_usage, expected_cpu)
+        with self.assertRaises(ValueError):
+            prepared.sum_cpu_usage[0] = 0.0
+
+        self.assertIs(
+            prepare_workload(self.workload_details, prepared), prepared
+        )
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        expected_plans, _ = get_simulation_plans(
+            self.workload_details, self.workload_df
+        )
+        self.assertEqual(plans, expected_plans)
+
+    def test_dynamic_min_replicas_sweep(self):
+        """DMR candidates go up to the max usage, for many replicas."""
+        config = Config()
+        rows = 600
+        workload_df = pd.DataFrame({
+            "avg_container_cpu_usage": np.full(rows, 0.01),
+            "sum_containers_cpu_usage": np.linspace(1.0, 6.0, rows),
+            "sum_containers_mem_usage_mi": np.full(rows, 4096.0),
+            "avg_container_mem_usage_mi": np.full(rows, 8.0),
+        })
+        plans = _dynamic_min_replicas(config, 10.0, workload_df)
+
+        cpu_request = max(0.01, config.MIN_CPU_CORE_PROPOSED_VALUE)
+        self.assertEqual(
+            [plan.recommended_min_replicas for plan in plans],
+            list(range(
+                config.MIN_REC_REPLICAS, int(6.0 / cpu_request) + 1
+            ))
+        )
+        self.assertTrue(all(
+            plan.recommended_max_replicas == int(np.ceil(10.0 / cpu_request))
+            and plan.recommended_cpu_request == cpu_request
+            for plan in plans
+        ))
+        self.assertEqual(
+            len({plan.recommended_mem_request_and_limits_mi for plan in plans}),
+            1
+        )
+
+    def test_rows_above_request(self):
+        """The maxima match the rows filtered by CPU request."""
+        rng = np.random.default_rng(5)
+        workload_df = pd.DataFrame({
+            "avg_container_cpu_usage": rng.random(200),
+            "max_usage_slope_up_ratio": rng.random(200) * 3,
+            "max_cpu_usage_in_workload_e2e_startup_latency": rng.random(200),
+        })
+        workload_df.loc[::7, "avg_container_cpu_usage"] = np.nan
+        workload_df.loc[::5, "max_cpu_usage_in_workload_e2e_startup_latency"] = (
+            np.nan
+        )
+        rows_above = _RowsAboveRequest(workload_df)
+        for request in [0.0, 0.25, 0.5, 0.99]:
+            filtered_df = workload_df[
+                workload_df["avg_container_cpu_usage"] >= request
+            ]
+            self.assertEqual(
+                rows_above.maxima(request),
+                (
+                    filtered_df["max_usage_slope_up_ratio"].max(),
+                    filtered_df[
+                        "max_cpu_usage_in_workload_e2e_startup_latency"
+                    ].max(),
+                )
+            )
+        self.assertIsNone(rows_above.maxima(1.5))
+
     def test_convert_data_types(self):
         """Test if convert_data_types correctly converts column data types."""
         sample_data = pd.DataFrame({
@@ -137,12 +235,12 @@ class TestHPASimulationPlan(unittest.TestCase):
         expected_dtypes = {
             "window_begin": "datetime64[s]",
             "num_replicas_at_usage_window": "Int16",
-            "avg_container_cpu_usage": "float16",
-            "stddev_containers_cpu_usage": "float16",
-            "sum_containers_cpu_request": "float16",
-            "sum_containers_cpu_usage": "float16",
-            "sum_containers_mem_request_mi": "float32",
-            "sum_containers_mem_usage_mi": "float32"
+            "avg_container_cpu_usage": "Int32",
+            "stddev_containers_cpu_usage": "Int32",
+            "sum_containers_cpu_request": "Int32",
+            "sum_containers_cpu_usage": "int32",
+            "sum_containers_mem_request_mi": "UInt32",
+            "sum_containers_mem_usage_mi": "UInt32"
         }
 
         # Apply the conversion function
@@ -0,0 +1,101 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the sorted quantile index """
+import pickle
+import unittest
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.quantile_index import (
+    QuantileIndex,
+    build_quantile_indexes,
+    merge_quantile_indexes,
+)
+
+
+class TestQuantileIndex(unittest.TestCase):
+    """Unit tests for `QuantileIndex`."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.floats = rng.gamma(2.0, 0.2, size=1001)
+        self.integers = rng.integers(1, 6, size=97).astype(float)
+
+    def test_matches_numpy_and_pandas(self):
+        for values in (self.floats, self.integers, self.floats[:2]):
+            index = QuantileIndex(values)
+            percentiles = np.arange(0, 101)
+            np.testing.assert_array_equal(
+                index.percentile(percentiles),
+                np.percentile(values, percentiles)
+            )
+            for q in (0.0, 0.1, 0.5, 0.9, 0.98, 1.0):
+                self.assertEqual(
+                    index.quantile(q), pd.Series(values).quantile(q)
+                )
+
+    def test_missing_values_are_skipped(self):
+        values = pd.array([3, None, 1, 2, None], dtype="Int16")
+        index = QuantileIndex(
+            pd.Series(values).to_numpy(dtype=float, na_value=np.nan)
+        )
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.quantile(0.5), pd.Series(values).quantile(0.5))
+        self.assertEqual(index.min(), 1.0)
+        self.assertEqual(index.max(), 3.0)
+        self.assertTrue(np.isnan(QuantileIndex().quantile(0.5)))
+
+    def test_counts(self):
+        index = QuantileIndex([0.0, 1.0, 1.0, 2.0, 3.0])
+        self.assertEqual(index.count_above(1.0), 2)
+        self.assertEqual(index.count_above(-1.0), 5)
+        self.assertEqual(len(index.above(0.0)), 4)
+        with self.assertRaises(ValueError):
+            index.values[0] = 5.0
+
+    def test_merge_and_remove(self):
+        old, new = self.integers[:60], self.integers[60:]
+        merged = QuantileIndex(old).merge(QuantileIndex(new))
+        np.testing.assert_array_equal(
+            merged.values, np.sort(self.integers)
+        )
+        remaining = merged.remove(QuantileIndex(old))
+        np.testing.assert_array_equal(remaining.values, np.sort(new))
+        with self.assertRaises(ValueError):
+            remaining.remove(QuantileIndex([42.0]))
+
+    def test_frame_indexes(self):
+        df = pd.DataFrame({
+            "num_replicas_at_usage_window": self.integers,
+            "sum_containers_cpu_usage": self.floats[:97],
+        })
+        columns = list(df.columns)
+        head = build_quantile_indexes(df.iloc[:40], columns)
+        tail = build_quantile_indexes(df.iloc[40:], columns)
+        merged = merge_quantile_indexes(head, added=tail)
+        for col, index in build_quantile_indexes(df, columns).items():
+            np.testing.assert_array_equal(merged[col].values, index.values)
+        sliding = merge_quantile_indexes(merged, removed=head)
+        for col, index in tail.items():
+            np.testing.assert_array_equal(sliding[col].values, index.values)
+
+    def test_pickle(self):
+        index = QuantileIndex(self.floats)
+        restored = pickle.loads(pickle.dumps(index))
+        np.testing.assert_array_equal(restored.values, index.values)
+        self.assertFalse(restored.values.flags.writeable)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -14,12 +14,20 @@
 # permissions and limitations under the License.
 
 """Unit test for reading metric timeseries"""
+import asyncio
 import unittest
-from datetime import datetime
+from datetime import datetime, timedelta
+from unittest.mock import patch
+import httpx
 import pandas as pd
 import pytz
+from hpaconfigrecommender.monitoring_client import MonitoringClient
 from hpaconfigrecommender.read_workload_timeseries import (
     _build_workload_filter_query,
+    _fetch_timeseries_data,
+    _get_latest_request_value,
+    _shard_intervals,
+    get_batched_agg_timeseries,
     get_workload_agg_timeseries,
     WorkloadDetails,
     MetricRequestParameter,
@@ -239,5 +247,420 @@ class TestUnitFunctions(unittest.TestCase):
         self.assertIsInstance(result_df, pd.DataFrame)
         self.assertTrue(result_df.empty)
 
+class _Credentials:
+    """Fake google.auth credentials with a long lived token."""
+    token = "token"
+    expiry = None
+
+    def refresh(self, request):
+        # pylint: disable=unused-argument
+        pass
+
+
+class TestShardedFetch(unittest.TestCase):
+    """`_fetch_timeseries_data` splits long windows in concurrent shards."""
+
+    def setUp(self):
+        self.config = Config()
+        self.config.set_value("TIMESERIES_SHARD_SECONDS", 3600)
+        self.config.set_value("TIMESERIES_FETCH_BACKOFF_SECONDS", 0)
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="gtools-koptimize",
+            location="us-central1",
+            cluster_name="online-boutique-cluster",
+            namespace="default",
+            controller_name="adservice",
+            controller_type="Deployment",
+            container_name="server",
+        )
+        self.metric_param = MetricRequestParameter(
+            metric="kubernetes.io/container/cpu/core_usage_time",
+            per_series_aligner="ALIGN_RATE",
+            cross_series_reducer="REDUCE_MEAN",
+        )
+        self.queries = []
+        self.throttled = set()
+
+    def tearDown(self):
+        self.config.set_value("TIMESERIES_SHARD_SECONDS", 24 * 3600)
+        self.config.set_value("TIMESERIES_FETCH_BACKOFF_SECONDS", 1.0)
+
+    def _handler(self, request):
+        """One point per minute ending in (start, end], a page per pod."""
+        params = request.url.params
+        start = datetime.fromisoformat(params["interval.startTime"])
+        end = datetime.fromisoformat(params["interval.endTime"])
+        self.queries.append((start, end, params.get("pageToken")))
+        if (start, end) not in self.throttled:
+            self.throttled.add((start, end))
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        pod = "pod-b" if params.get("pageToken") else "pod-a"
+        minutes = int((end - start).total_seconds() // 60)
+        page = {
+            "timeSeries": [{
+                "resource": {
+                    "labels": {"container_name": "server", "pod_name": pod}
+                },
+                "points": [
+                    {
+                        "interval": {
+                            "startTime": (
+                                start + timedelta(minutes=minute)
+                            ).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        },
+                        "value": {"doubleValue": minute / 100},
+                    }
+                    for minute in range(minutes)
+                ],
+            }],
+        }
+        if pod == "pod-a":
+            page["nextPageToken"] = "pod-b"
+        return httpx.Response(200, json=page)
+
+    def test_shard_intervals(self):
+        self.assertEqual(
+            _shard_intervals(1800, 9000, 3600, 60),
+            [(1800, 3600), (3600, 7200), (7200, 9000)]
+        )
+        self.assertEqual(_shard_intervals(0, 3600, 3600, 60), [(0, 3600)])
+        # Shards are rounded up to the alignment period
+        self.assertEqual(
+            _shard_intervals(0, 200, 90, 60), [(0, 120), (120, 200)]
+        )
+
+    def _fetch(self, handler, metric_param, start, end):
+        client = MonitoringClient(
+            http2=False, transport=httpx.MockTransport(handler)
+        )
+        self.addCleanup(client.close)
+        with patch(
+            "hpaconfigrecommender.monitoring_client.default",
+            return_value=(_Credentials(), "project")
+        ), patch(
+            "hpaconfigrecommender.read_workload_timeseries."
+            "get_monitoring_client",
+            return_value=client
+        ):
+            return asyncio.run(_fetch_timeseries_data(
+                self.config, metric_param, self.workload_details,
+                start, end, 60
+            ))
+
+    def test_shards_are_merged_in_order(self):
+        start = datetime(2024, 11, 5, 12, 30, tzinfo=pytz.UTC)
+        end = datetime(2024, 11, 5, 15, 0, tzinfo=pytz.UTC)
+        df = self._fetch(self._handler, self.metric_param, start, end)
+
+        # Three shards, each throttled once then read in two pages
+        self.assertEqual(len(self.throttled), 3)
+        self.assertEqual(len(self.queries), 3 * 3)
+        self.assertEqual(len(df), 2 * 150)
+        self.assertEqual(df["window_begin"].iloc[0], start)
+        self.assertTrue(
+            df.groupby("resource.labels.pod_name", observed=True)[
+                "window_begin"
+            ].apply(lambda s: s.is_monotonic_increasing).all()
+        )
+        self.assertEqual(
+            list(df["resource.labels.pod_name"].cat.categories),
+            ["pod-a", "pod-b"]
+        )
+
+    def test_latest_request_across_shards(self):
+        """The request changes in the second shard, points newest first."""
+        changed = datetime(2024, 11, 5, 13, 20, tzinfo=pytz.UTC)
+
+        def _handler(request):
+            params = request.url.params
+            start = datetime.fromisoformat(params["interval.startTime"])
+            end = datetime.fromisoformat(params["interval.endTime"])
+            minutes = int((end - start).total_seconds() // 60)
+            points = [start + timedelta(minutes=m) for m in range(minutes)]
+            return httpx.Response(200, json={"timeSeries": [{
+                "resource": {
+                    "labels": {"container_name": "server", "pod_name": "pod"}
+                },
+                "points": [
+                    {
+                        "interval": {
+                            "startTime": point.strftime("%Y-%m-%dT%H:%M:%SZ")
+                        },
+                        "value": {
+                            "doubleValue": 2.0 if point >= changed else 1.0
+                        },
+                    }
+                    for point in reversed(points)
+                ],
+            }]})
+
+        request_param = MetricRequestParameter(
+            metric="kubernetes.io/container/cpu/request_cores",
+            per_series_aligner="ALIGN_MEAN",
+            cross_series_reducer="REDUCE_MEAN",
+        )
+        df = self._fetch(
+            _handler,
+            request_param,
+            datetime(2024, 11, 5, 12, 30, tzinfo=pytz.UTC),
+            datetime(2024, 11, 5, 14, 0, tzinfo=pytz.UTC)
+        )
+        self.assertEqual(df["value.doubleValue"].iloc[0], 1.0)
+        self.assertEqual(_get_latest_request_value(df, "CPU"), 2.0)
+
+
+class TestSpeculativeFetch(unittest.TestCase):
+    """`get_workload_agg_timeseries` fetches all metrics at once."""
+
+    def setUp(self):
+        self.config = Config()
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="gtools-koptimize",
+            location="us-central1",
+            cluster_name="online-boutique-cluster",
+            namespace="default",
+            controller_name="adservice",
+            controller_type="Deployment",
+            container_name="server",
+        )
+        self.start = datetime(2024, 11, 5, 12, 0, tzinfo=pytz.UTC)
+        self.end = datetime(2024, 11, 5, 12, 10, tzinfo=pytz.UTC)
+        self.events = []
+        self.empty_metrics = set()
+
+    def _frame(self, metric):
+        window_begin = pd.date_range(self.start, self.end, freq="60s")
+        df = pd.DataFrame({
+            "window_begin": window_begin,
+            "resource.labels.container_name": "server",
+            "resource.labels.pod_name": "pod-a",
+        })
+        if metric.endswith("used_bytes"):
+            df["value.int64Value"] = 256 * 1024**2
+        else:
+            df["value.doubleValue"] = 0.5
+        return df
+
+    async def _fetch(self, config, metric_param, *args):
+        # pylint: disable=unused-argument
+        metric = metric_param.metric
+        self.events.append(("start", metric))
+        try:
+            # Request metrics are the slowest, used bytes the fastest
+            await asyncio.sleep(
+                0.2 if metric.endswith(("request_cores", "request_bytes"))
+                else 0.01 if metric.endswith("used_bytes") else 0.05
+            )
+        except asyncio.CancelledError:
+            self.events.append(("cancelled", metric))
+            raise
+        self.events.append(("end", metric))
+        if metric in self.empty_metrics:
+            return pd.DataFrame()
+        return self._frame(metric)
+
+    def _get(self):
+        with patch(
+            "hpaconfigrecommender.read_workload_timeseries."
+            "_fetch_timeseries_data",
+            side_effect=self._fetch
+        ):
+            return get_workload_agg_timeseries(
+                self.config, self.workload_details, self.start, self.end
+            )
+
+    def test_all_metrics_start_together(self):
+        df = self._get()
+        self.assertEqual(len(df), 11)
+        self.assertEqual(df["sum_containers_cpu_request"].iloc[0], 0.5)
+        self.assertEqual([event for event, _ in self.events[:4]], ["start"] * 4)
+
+    def test_optional_metrics_cancelled_when_required_missing(self):
+        self.empty_metrics.add("kubernetes.io/container/memory/used_bytes")
+        with self.assertLogs(
+            "hpaconfigrecommender.read_workload_timeseries", "INFO"
+        ) as logs:
+            df = self._get()
+        self.assertTrue(df.empty)
+        cancelled = {metric for event, metric in self.events
+                     if event == "cancelled"}
+        self.assertEqual(cancelled, {
+            "kubernetes.io/container/cpu/core_usage_time",
+            "kubernetes.io/container/cpu/request_cores",
+            "kubernetes.io/container/memory/request_bytes",
+        })
+        self.assertTrue(any(
+            "request_cores=cancelled" in line for line in logs.output
+        ))
+
+    def test_sequential_mode(self):
+        self.config.set_value("TIMESERIES_SPECULATIVE_FETCH", False)
+        self.addCleanup(
+            self.config.set_value, "TIMESERIES_SPECULATIVE_FETCH", True
+        )
+        self.assertFalse(self._get().empty)
+        started = [metric for event, metric in self.events if event == "start"]
+        first_end = [event for event, _ in self.events].index("end")
+        self.assertEqual(len(started), 4)
+        self.assertEqual(first_end, 2)
+
+
+class TestBatchedAggTimeseries(unittest.TestCase):
+    """`get_batched_agg_timeseries` splits one query per metric locally."""
+
+    def setUp(self):
+        self.config = Config()
+        self.scope = WorkloadDetails(
+            config=self.config,
+            project_id="gtools-koptimize",
+            location="us-central1",
+            cluster_name="online-boutique-cluster",
+            namespace="",
+            controller_name="",
+            controller_type="Deployment",
+            container_name="",
+        )
+        self.start = datetime(2024, 11, 5, 12, 0, tzinfo=pytz.UTC)
+        self.end = datetime(2024, 11, 5, 12, 30, tzinfo=pytz.UTC)
+        self.workloads = [
+            ("default", "adservice", "server", 2),
+            ("default", "cartservice", "server", 3),
+            ("shop", "adservice", "server", 1),
+        ]
+        self.group_by = []
+
+    def _frame(self, metric, workloads):
+        """Per pod points of the workloads, with the batch labels."""
+        frames = []
+        for n, (namespace, controller, container, pods) in enumerate(workloads):
+            for pod in range(pods):
+                window_begin = pd.date_range(self.start, self.end, freq="60s")
+                minutes = pd.Series(range(len(window_begin)))
+                df = pd.DataFrame({
+                    "window_begin": window_begin,
+                    "resource.labels.namespace_name": namespace,
+                    "metadata.system_labels.top_level_controller_name":
+                        controller,
+                    "resource.labels.container_name": container,
+                    "resource.labels.pod_name": f"{controller}-{pod}",
+                })
+                if metric.endswith("used_bytes"):
+                    df["value.int64Value"] = (
+                        (minutes + n + pod) * 1024**2
+                    ).astype("int64")
+                elif metric.endswith("core_usage_time"):
+                    df["value.doubleValue"] = (
+                        (minutes % 7 + pod) / 10 + n
+                    ).astype("float32")
+                else:
+                    # The request changes 20 minutes in
+                    df["value.doubleValue"] = n + 1.0 + (minutes >= 20)
+                frames.append(df)
+        return pd.concat(frames, ignore_index=True).astype({
+            col: "category" for col in frames[0].columns
+            if col.startswith(("resource.", "metadata."))
+        })
+
+    async def _fetch_batch(self, config, metric_param, scope, start, end,
+                           alignment_period, group_by_fields):
+        # pylint: disable=unused-argument
+        self.group_by.append(tuple(group_by_fields))
+        return self._frame(metric_param.metric, self.workloads)
+
+    def test_matches_single_workload_queries(self):
+        with patch(
+            "hpaconfigrecommender.read_workload_timeseries."
+            "_fetch_timeseries_data",
+            side_effect=self._fetch_batch
+        ):
+            batch = get_batched_agg_timeseries(
+                self.config, self.scope, self.start, self.end
+            )
+        self.assertEqual(len(self.group_by), 4)
+        self.assertIn(
+            "metadata.system_labels.top_level_controller_name",
+            self.group_by[0]
+        )
+        self.assertEqual(
+            sorted(batch), sorted(w[:3] for w in self.workloads)
+        )
+
+        for workload in self.workloads:
+            async def _fetch_one(config, metric_param, *args, **kwargs):
+                # pylint: disable=unused-argument
+                df = self._frame(metric_param.metric, self.workloads)
+                keep = (
+                    (df["resource.labels.namespace_name"] == workload[0])
+                    & (df["metadata.system_labels.top_level_controller_name"]
+                       == workload[1])
+                )
+                return df[keep].reset_index(drop=True)
+
+            with patch(
+                "hpaconfigrecommender.read_workload_timeseries."
+                "_fetch_timeseries_data",
+                side_effect=_fetch_one
+            ):
+                expected = get_workload_agg_timeseries(
+                    self.config,
+                    WorkloadDetails(
+                        config=self.config,
+                        project_id="gtools-koptimize",
+                        location="us-central1",
+                        cluster_name="online-boutique-cluster",
+                        namespace=workload[0],
+                        controller_name=workload[1],
+                        controller_type="Deployment",
+                        container_name=workload[2],
+                    ),
+                    self.start, self.end
+                )
+            pd.testing.assert_frame_equal(
+                batch[workload[:3]].reset_index(drop=True),
+                expected.reset_index(drop=True)
+            )
+
+    def test_latest_requests(self):
+        # Oldest points first as merged shards and the cache return them,
+        # or newest first as a single query does
+        for step in (1, -1):
+            async def _fetch(config, metric_param, *args, step=step, **kwargs):
+                # pylint: disable=unused-argument
+                return self._frame(
+                    metric_param.metric, self.workloads
+                ).iloc[::step].reset_index(drop=True)
+
+            with self.subTest(step=step), patch(
+                "hpaconfigrecommender.read_workload_timeseries."
+                "_fetch_timeseries_data",
+                side_effect=_fetch
+            ):
+                batch = get_batched_agg_timeseries(
+                    self.config, self.scope, self.start, self.end
+                )
+                for n, workload in enumerate(self.workloads):
+                    df = batch[workload[:3]]
+                    self.assertTrue((
+                        df["sum_containers_cpu_request"]
+                        == (n + 2.0) * df["num_replicas_at_usage_window"]
+                    ).all())
+
+    def test_scope_cannot_pin_a_workload(self):
+        scope = WorkloadDetails(
+            config=self.config,
+            project_id="gtools-koptimize",
+            location="us-central1",
+            cluster_name="online-boutique-cluster",
+            namespace="default",
+            controller_name="adservice",
+            controller_type="Deployment",
+            container_name="",
+        )
+        with self.assertRaises(ValueError):
+            get_batched_agg_timeseries(self.config, scope, self.start, self.end)
+
+
 if __name__ == "__main__":
     unittest.main(argv=[""], exit=False)
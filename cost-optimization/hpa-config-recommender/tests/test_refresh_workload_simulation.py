@@ -0,0 +1,165 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the incremental simulation refresh """
+import tempfile
+import unittest
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails
+from hpaconfigrecommender.quantile_index import build_quantile_indexes
+from hpaconfigrecommender.refresh_workload_simulation import (
+    load_refresh_state,
+    refresh_workload_simulation
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    _analyze_configuration_plans
+)
+
+TEST_DIR = Path(__file__).parent
+
+
+class TestRefreshWorkloadSimulation(unittest.TestCase):
+    """Unit tests for `refresh_workload_simulation`."""
+
+    def setUp(self):
+        self.config = Config()
+        self.config_values = self.config.snapshot()
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+        self.full_df = pd.read_csv(
+            TEST_DIR / "test_files" / "test_id_14_dataframe.csv"
+        )
+        self.full_df["window_begin"] = pd.to_datetime(
+            self.full_df["window_begin"]
+        )
+        self.t0 = self.full_df["window_begin"].iloc[0].to_pydatetime()
+        self.state_dir = tempfile.TemporaryDirectory()
+        self.fetches = []
+
+    def tearDown(self):
+        self.config.restore(self.config_values)
+        self.state_dir.cleanup()
+
+    def _fetch(self, config, workload_details, start, end):
+        # pylint: disable=unused-argument
+        self.fetches.append((start, end))
+        window_begin = self.full_df["window_begin"]
+        return self.full_df[
+            (window_begin >= start) & (window_begin <= end)
+        ].reset_index(drop=True)
+
+    def _refresh(self, start, end):
+        with patch(
+            "hpaconfigrecommender.refresh_workload_simulation."
+            "get_workload_agg_timeseries",
+            side_effect=self._fetch
+        ):
+            return refresh_workload_simulation(
+                self.workload_details, start, end, self.state_dir.name
+            )
+
+    def test_refresh_matches_full_run(self):
+        # The window starts early enough to keep every row, the traces
+        # then match a full replay of the whole series
+        start = self.t0 - timedelta(hours=5)
+        self._refresh(start, self.t0 + timedelta(hours=8))
+        step = timedelta(hours=4)
+        _, rec, _, all_simulation_df = self._refresh(
+            start + step, self.t0 + timedelta(hours=8) + step
+        )
+
+        # The refresh only fetched the points after the previous run
+        self.assertEqual(
+            self.fetches[-1][0],
+            self.t0 + timedelta(hours=8) - timedelta(
+                seconds=self.config.DISTANCE_BETWEEN_POINTS_SECONDS
+            )
+        )
+
+        state = load_refresh_state(self.state_dir.name, self.workload_details)
+        window_df = self._fetch(
+            self.config, self.workload_details,
+            start + step, self.t0 + timedelta(hours=8) + step
+        )
+        _, expected_rec, _, expected_dfs = _analyze_configuration_plans(
+            self.config, state.plans, self.workload_details, window_df
+        )
+        self.assertEqual(rec.plan, expected_rec.plan)
+        self.assertEqual(
+            rec.forecast_cpu_saving, expected_rec.forecast_cpu_saving
+        )
+        self.assertEqual(
+            rec.forecast_mem_saving_mi, expected_rec.forecast_mem_saving_mi
+        )
+        self.assertEqual(len(all_simulation_df), len(expected_dfs))
+        for actual_df, expected_df in zip(all_simulation_df, expected_dfs):
+            np.testing.assert_array_equal(
+                actual_df["forecast_replicas_up_and_running"].to_numpy(),
+                expected_df["forecast_replicas_up_and_running"].to_numpy()
+            )
+
+    def test_config_change_recomputes(self):
+        start = self.t0 - timedelta(hours=1)
+        end = self.t0 + timedelta(hours=8)
+        self._refresh(start, end)
+        self.config.set_value("HPA_TARGET_BUFFER", 0.2)
+        self._refresh(start, end)
+        self.assertEqual(self.fetches[-1], (start, end))
+
+    def test_window_slides(self):
+        start = self.t0 + timedelta(hours=1)
+        self._refresh(start, start + timedelta(hours=5))
+        self._refresh(
+            start + timedelta(hours=1), start + timedelta(hours=6)
+        )
+        state = load_refresh_state(self.state_dir.name, self.workload_details)
+        window_df = self._fetch(
+            self.config, self.workload_details,
+            start + timedelta(hours=1), start + timedelta(hours=6)
+        )
+        self.assertEqual(len(state.workload_df), len(window_df))
+        self.assertEqual(
+            state.workload_df["window_begin"].iloc[0],
+            pd.Timestamp(start + timedelta(hours=1)).tz_localize(None)
+        )
+        for replay in state.replays:
+            if replay.state is not None:
+                self.assertEqual(
+                    len(replay.forecast_replicas), len(window_df)
+                )
+        # The quantile indexes followed the rows added and dropped
+        expected = build_quantile_indexes(state.workload_df)
+        self.assertEqual(set(state.quantiles), set(expected))
+        for col, index in expected.items():
+            np.testing.assert_array_equal(
+                state.quantiles[col].values, index.values
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
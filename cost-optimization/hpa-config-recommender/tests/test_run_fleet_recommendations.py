@@ -0,0 +1,267 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the fleet recommendations run """
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch, Mock
+from dataclasses import replace
+import pandas as pd
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails
+from hpaconfigrecommender.run_fleet_recommendations import (
+    FleetRunStats,
+    _recommend_workload,
+    discover_workloads,
+    discover_workloads_from_metrics,
+    run_fleet_recommendations
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    plan_and_run_simulation
+)
+from hpaconfigrecommender.simulation_pool import shutdown_simulation_pool
+
+TEST_DIR = Path(__file__).parent
+
+
+class TestRunFleetRecommendations(unittest.TestCase):
+    """Unit tests for `run_fleet_recommendations`."""
+
+    def setUp(self):
+        self.config = Config()
+        self.config.set_value("SIMULATION_POOL_MAX_WORKERS", 2)
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+        self.frames = {
+            f"controller_{test_id}": pd.read_csv(
+                TEST_DIR / "test_files" / f"test_id_{test_id}_dataframe.csv"
+            )
+            for test_id in ["1", "3", "9"]
+        }
+        self.frames["controller_empty"] = pd.DataFrame()
+
+    def tearDown(self):
+        self.config.set_value("SIMULATION_POOL_MAX_WORKERS", None)
+        self.config.set_value("FLEET_MAX_CONCURRENT_FETCHES", 8)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_simulation_pool()
+
+    def _fetch(self, config, workload_details, start, end):
+        # pylint: disable=unused-argument
+        name = workload_details.controller_name
+        if name == "controller_broken":
+            raise RuntimeError("Monitoring unavailable")
+        return self.frames[name].copy()
+
+    def _workloads(self, names):
+        return [
+            replace(self.workload_details, controller_name=name)
+            for name in names
+        ]
+
+    def test_fleet_matches_single_workload_run(self):
+        self.config.set_value("FLEET_MAX_CONCURRENT_FETCHES", 2)
+        names = ["controller_1", "controller_3", "controller_9"]
+        stats = FleetRunStats()
+        end = datetime(2024, 9, 15)
+        with patch(
+            "hpaconfigrecommender.run_fleet_recommendations."
+            "get_workload_agg_timeseries",
+            side_effect=self._fetch
+        ):
+            results = list(run_fleet_recommendations(
+                self.config, self._workloads(names),
+                end - timedelta(days=14), end, stats=stats
+            ))
+
+        self.assertEqual(
+            sorted(r.workload_details.controller_name for r in results),
+            names
+        )
+        for result in results:
+            self.assertIsNone(result.error)
+            _, expected, _, _ = plan_and_run_simulation(
+                result.workload_details,
+                self.frames[result.workload_details.controller_name].copy()
+            )
+            actual = result.recommendation
+            self.assertEqual(actual.plan, expected.plan)
+            self.assertEqual(
+                actual.forecast_mem_saving_mi, expected.forecast_mem_saving_mi
+            )
+            self.assertEqual(
+                actual.forecast_cpu_saving, expected.forecast_cpu_saving
+            )
+        self.assertEqual(stats.workloads, 3)
+        self.assertEqual(stats.recommended, 3)
+        self.assertGreater(stats.workloads_per_minute, 0)
+
+    def test_task_restores_worker_config(self):
+        self.addCleanup(self.config.restore, self.config.snapshot())
+        self.config.set_value("SIMULATION_MODE", "pool")
+        config_values = self.config.snapshot()
+        config_values["HPA_TARGET_BUFFER"] = 0.3
+        _, rec, _ = _recommend_workload(
+            config_values, self.workload_details,
+            self.frames["controller_9"].copy()
+        )
+        self.assertIsNotNone(rec)
+        self.assertEqual(self.config.SIMULATION_MODE, "pool")
+        self.assertEqual(self.config.HPA_TARGET_BUFFER, 0.10)
+
+    def test_fleet_reports_failures(self):
+        names = ["controller_broken", "controller_empty", "controller_1"]
+        stats = FleetRunStats()
+        end = datetime(2024, 9, 15)
+        with patch(
+            "hpaconfigrecommender.run_fleet_recommendations."
+            "get_workload_agg_timeseries",
+            side_effect=self._fetch
+        ):
+            results = {
+                r.workload_details.controller_name: r
+                for r in run_fleet_recommendations(
+                    self.config, self._workloads(names),
+                    end - timedelta(days=14), end, stats=stats
+                )
+            }
+
+        self.assertIn("Monitoring unavailable", results["controller_broken"].error)
+        self.assertIsNone(results["controller_empty"].recommendation)
+        self.assertIsNone(results["controller_empty"].error)
+        self.assertIsNotNone(results["controller_1"].recommendation)
+        self.assertEqual(stats.workloads, 3)
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.recommended, 1)
+
+    def test_fleet_batched_fetch(self):
+        self.config.set_value("FLEET_BATCHED_FETCH", True)
+        self.addCleanup(self.config.set_value, "FLEET_BATCHED_FETCH", False)
+        workloads = self._workloads(["controller_1", "controller_missing"])
+        workloads.append(replace(
+            self.workload_details, namespace="other", controller_name="controller_3"
+        ))
+        calls = []
+
+        def _fetch_batch(config, scope, start, end):
+            # pylint: disable=unused-argument
+            calls.append(scope)
+            return {
+                (scope.namespace, name, "test_container"):
+                    self.frames[name].copy()
+                for name in ("controller_1", "controller_3")
+            }
+
+        end = datetime(2024, 9, 15)
+        with patch(
+            "hpaconfigrecommender.run_fleet_recommendations."
+            "get_batched_agg_timeseries",
+            side_effect=_fetch_batch
+        ):
+            results = {
+                r.workload_details.controller_name: r
+                for r in run_fleet_recommendations(
+                    self.config, workloads, end - timedelta(days=14), end
+                )
+            }
+
+        self.assertEqual(
+            sorted(scope.namespace for scope in calls),
+            ["other", "test_namespace"]
+        )
+        self.assertTrue(all(
+            scope.controller_name == "" and scope.container_name == ""
+            for scope in calls
+        ))
+        self.assertIsNotNone(results["controller_1"].recommendation)
+        self.assertIsNotNone(results["controller_3"].recommendation)
+        self.assertEqual(
+            results["controller_missing"].reasons,
+            {"general": "No timeseries data."}
+        )
+
+    def test_discover_workloads_from_metrics(self):
+        with patch(
+            "hpaconfigrecommender.run_fleet_recommendations."
+            "get_reporting_workloads",
+            return_value=[("shop", "frontend", "server")]
+        ) as mock_reporting:
+            workloads = discover_workloads_from_metrics(
+                self.config, "test_project", "us-central1", "test_cluster",
+                datetime(2024, 9, 14), datetime(2024, 9, 15), namespace="shop"
+            )
+        scope = mock_reporting.call_args.args[1]
+        self.assertEqual(
+            (scope.namespace, scope.controller_name, scope.container_name),
+            ("shop", "", "")
+        )
+        self.assertEqual(
+            [(w.namespace, w.controller_name, w.container_name)
+             for w in workloads],
+            [("shop", "frontend", "server")]
+        )
+
+    @patch("hpaconfigrecommender.run_fleet_recommendations.google.auth.default")
+    @patch("hpaconfigrecommender.run_fleet_recommendations.asset_v1.AssetServiceClient")
+    def test_discover_workloads(self, mock_client, mock_auth):
+        mock_auth.return_value = (Mock(), "test_project")
+
+        def deployment(namespace, name, containers):
+            return Mock(versioned_resources=[Mock(resource={
+                "metadata": {"namespace": namespace, "name": name},
+                "spec": {"template": {"spec": {"containers": [
+                    {"name": c} for c in containers
+                ]}}},
+            })])
+
+        mock_client.return_value.search_all_resources.return_value = [
+            deployment("shop", "frontend", ["server", "proxy"]),
+            deployment("kube-system", "kube-dns", ["dnsmasq"]),
+        ]
+        workloads = discover_workloads(
+            self.config, "test_project", "us-central1", "test_cluster"
+        )
+        self.assertEqual(
+            [(w.namespace, w.controller_name, w.container_name)
+             for w in workloads],
+            [("shop", "frontend", "server"), ("shop", "frontend", "proxy")]
+        )
+
+
+class TestConfigSnapshot(unittest.TestCase):
+    """Unit tests for `Config.snapshot` and `Config.restore`."""
+
+    def test_snapshot_roundtrip(self):
+        config = Config()
+        values = config.snapshot()
+        config.set_value("HPA_TARGET_BUFFER", 0.5)
+        self.assertEqual(values["HPA_TARGET_BUFFER"], 0.10)
+        config.restore(values)
+        self.assertEqual(config.HPA_TARGET_BUFFER, 0.10)
+
+
+if __name__ == "__main__":
+    unittest.main()
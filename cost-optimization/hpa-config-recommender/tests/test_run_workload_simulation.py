@@ -14,6 +14,7 @@
 
 """ Unit test for HPA simulation run code """
 import unittest
+from dataclasses import replace
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -24,7 +25,20 @@ from hpaconfigrecommender.utils.models import (
     WorkloadRecommendation
 )
 from hpaconfigrecommender.run_workload_simulation import (
-    plan_and_run_simulation
+    plan_and_run_simulation,
+    _analyze_configuration_plans,
+    _calculate_starting_replicas,
+    _prefilter_plan,
+    _usage_clash_bounds,
+    run_simulation_plans
+)
+from hpaconfigrecommender.plan_workload_simulation import (
+    get_simulation_plans,
+    prepare_workload
+)
+from hpaconfigrecommender.simulation_kernel import (
+    CLASH_NONE,
+    replay_hpa
 )
 
 
@@ -332,7 +346,8 @@ class TestPlanAndRunHPASimulation(unittest.TestCase):
             recommended_mem_request_and_limits_mi=13.0,
             recommended_cpu_limit_or_unbounded=1.0,
             recommended_min_replicas=30,
-            recommended_max_replicas=48,
+            # 2.2401 cores / 0.056 is just above 40, float16 rounded it below
+            recommended_max_replicas=49,
             recommended_hpa_target_cpu=0.68
         ),
         forecast_mem_saving_mi = 1518.0,
@@ -546,5 +561,197 @@ class TestPlanAndRunHPASimulation(unittest.TestCase):
         self.run_test_for_id("15", expected_rec, config)
 
 
+class TestSimulationModes(unittest.TestCase):
+    """The matrix simulation mode must match the process pool mode."""
+
+    def setUp(self):
+        self.config = Config()
+        self.config.set_value("DISTANCE_BETWEEN_POINTS_SECONDS", 30)
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+
+    def tearDown(self):
+        self.config.set_value("SIMULATION_MODE", "pool")
+
+    def _analyze(self, mode, workload_df, plans):
+        self.config.set_value("SIMULATION_MODE", mode)
+        return _analyze_configuration_plans(
+            self.config, plans, self.workload_details, workload_df.copy()
+        )
+
+    def test_matrix_matches_pool(self):
+        for test_id in ["3", "9", "11"]:
+            with self.subTest(test_id=test_id):
+                workload_df = pd.read_csv(
+                    Path(__file__).parent / "test_files"
+                    / f"test_id_{test_id}_dataframe.csv"
+                )
+                plans, _ = get_simulation_plans(
+                    self.workload_details, workload_df
+                )
+                pool_df, pool_rec, pool_reasons, pool_all = self._analyze(
+                    "pool", workload_df, plans
+                )
+                matrix_df, matrix_rec, matrix_reasons, matrix_all = (
+                    self._analyze("matrix", workload_df, plans)
+                )
+                self.assertEqual(matrix_rec.plan, pool_rec.plan)
+                self.assertEqual(
+                    matrix_rec.forecast_cpu_saving,
+                    pool_rec.forecast_cpu_saving
+                )
+                self.assertEqual(matrix_reasons, pool_reasons)
+                self.assertEqual(len(matrix_all), len(pool_all))
+                pd.testing.assert_frame_equal(matrix_df, pool_df)
+
+    def test_plan_scale_down_window(self):
+        workload_df = pd.read_csv(
+            Path(__file__).parent / "test_files" / "test_id_9_dataframe.csv"
+        )
+        prepared = prepare_workload(self.workload_details, workload_df)
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        windowed = [
+            replace(
+                plan,
+                method=f"{plan.method}-sd{steps}",
+                hpa_scale_down_steps=steps
+            )
+            for plan in plans if plan.method != "VPA"
+            for steps in (2, 30)
+        ]
+        _, _, _, pool_all = self._analyze("pool", workload_df, windowed)
+        _, _, _, matrix_all = self._analyze("matrix", workload_df, windowed)
+        self.assertEqual(len(matrix_all), len(pool_all))
+        self.assertGreater(len(matrix_all), 0)
+        by_method = {plan.method: plan for plan in windowed}
+        for matrix_df, pool_df in zip(matrix_all, pool_all):
+            pd.testing.assert_frame_equal(matrix_df, pool_df)
+            plan = by_method[matrix_df["method"].iloc[0]]
+            replay = replay_hpa(
+                "kernel",
+                prepared.sum_cpu_usage,
+                prepared.sum_mem_usage_mi,
+                plan.recommended_min_replicas,
+                plan.recommended_max_replicas,
+                plan.recommended_cpu_request,
+                plan.recommended_mem_request_and_limits_mi,
+                plan.recommended_hpa_target_cpu,
+                plan.workload_e2e_startup_latency_rows,
+                plan.hpa_scale_down_steps,
+                _calculate_starting_replicas(prepared, plan),
+                self.config.CPU_CLASH_COUNT_THRESHOLD,
+            )
+            np.testing.assert_array_equal(
+                matrix_df["forecast_replicas_up_and_running"], replay[0]
+            )
+
+    def _capped_plans(self, plans):
+        """Plans with reduced max replicas or memory, many are doomed."""
+        capped = []
+        for plan in plans:
+            if plan.method == "VPA":
+                continue
+            capped.append(replace(
+                plan,
+                method=f"{plan.method}-capped",
+                recommended_max_replicas=plan.recommended_min_replicas
+            ))
+            capped.append(replace(
+                plan,
+                method=f"{plan.method}-low-mem",
+                recommended_mem_request_and_limits_mi=(
+                    plan.recommended_mem_request_and_limits_mi / 4)
+            ))
+        return capped
+
+    def test_prefilter_only_rejects_clashing_plans(self):
+        skipped = 0
+        for test_id in ["3", "6", "9", "11"]:
+            workload_df = pd.read_csv(
+                Path(__file__).parent / "test_files"
+                / f"test_id_{test_id}_dataframe.csv"
+            )
+            prepared = prepare_workload(self.workload_details, workload_df)
+            plans, _ = get_simulation_plans(self.workload_details, prepared)
+            bounds = _usage_clash_bounds(prepared)
+            for plan in plans + self._capped_plans(plans):
+                if plan.method == "VPA":
+                    continue
+                if _prefilter_plan(self.config, plan, bounds) is None:
+                    continue
+                skipped += 1
+                replay = replay_hpa(
+                    "kernel",
+                    prepared.sum_cpu_usage,
+                    prepared.sum_mem_usage_mi,
+                    plan.recommended_min_replicas,
+                    plan.recommended_max_replicas,
+                    plan.recommended_cpu_request,
+                    plan.recommended_mem_request_and_limits_mi,
+                    plan.recommended_hpa_target_cpu,
+                    plan.workload_e2e_startup_latency_rows,
+                    self.config.HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS,
+                    _calculate_starting_replicas(prepared, plan),
+                    self.config.CPU_CLASH_COUNT_THRESHOLD,
+                )
+                self.assertNotEqual(replay[4], CLASH_NONE, plan.method)
+        self.assertGreater(skipped, 0)
+
+    def test_prefilter_keeps_best_plan(self):
+        workload_df = pd.read_csv(
+            Path(__file__).parent / "test_files" / "test_id_9_dataframe.csv"
+        )
+        plans, _ = get_simulation_plans(self.workload_details, workload_df)
+        plans = plans + self._capped_plans(plans)
+        self.config.set_value("SIMULATION_PREFILTER", False)
+        _, unfiltered_rec, _, _ = self._analyze("matrix", workload_df, plans)
+        self.config.set_value("SIMULATION_PREFILTER", True)
+        _, filtered_rec, _, _ = self._analyze("matrix", workload_df, plans)
+        self.assertEqual(filtered_rec.plan, unfiltered_rec.plan)
+        self.assertEqual(
+            filtered_rec.forecast_cpu_saving,
+            unfiltered_rec.forecast_cpu_saving
+        )
+        self.assertEqual(unfiltered_rec.skipped_simulations, 0)
+        self.assertGreater(filtered_rec.skipped_simulations, 0)
+
+    def test_returned_frames_are_decoded(self):
+        workload_df = pd.read_csv(
+            Path(__file__).parent / "test_files" / "test_id_9_dataframe.csv"
+        )
+        plans, _ = get_simulation_plans(self.workload_details, workload_df)
+        analysis_df, _, _, all_simulations_df = run_simulation_plans(
+            plans, self.workload_details, workload_df
+        )
+        self.assertGreater(len(all_simulations_df), 1)
+        for df in [analysis_df] + all_simulations_df:
+            for col in [
+                "sum_containers_cpu_usage",
+                "sum_containers_cpu_request",
+                "sum_containers_mem_usage_mi",
+            ]:
+                self.assertEqual(df[col].dtype, np.float64, col)
+
+    def test_unknown_mode(self):
+        self.config.set_value("SIMULATION_MODE", "gpu")
+        with self.assertRaises(ValueError):
+            _analyze_configuration_plans(
+                self.config, [], self.workload_details,
+                pd.read_csv(
+                    Path(__file__).parent / "test_files"
+                    / "test_id_1_dataframe.csv"
+                )
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
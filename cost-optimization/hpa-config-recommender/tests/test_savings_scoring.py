@@ -0,0 +1,145 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the savings scoring of replica traces """
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import (
+    get_simulation_plans,
+    prepare_workload,
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    _analyze_configuration_plans,
+    score_cost_models,
+)
+from hpaconfigrecommender.savings_scoring import CostModel
+from hpaconfigrecommender.simulation_cache import get_simulation_cache
+from hpaconfigrecommender.simulation_kernel import (
+    replay_hpa_matrix,
+    trace_dtype,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails
+
+
+class TestCostModel(unittest.TestCase):
+    """Unit tests for `CostModel`."""
+
+    def test_from_prices(self):
+        model = CostModel.from_prices("us-central1", 0.031611, 0.004237)
+        self.assertEqual(model.name, "us-central1")
+        self.assertAlmostEqual(model.cost_of_gb_in_cpus, 0.031611 / 0.004237)
+        self.assertEqual(
+            CostModel.from_config(Config()).cost_of_gb_in_cpus,
+            Config.COST_OF_GB_IN_CPUS
+        )
+
+
+class TestReplicaTraces(unittest.TestCase):
+    """The replay kernels emit compact replica traces."""
+
+    def test_trace_dtype(self):
+        self.assertEqual(trace_dtype(10), np.int16)
+        self.assertEqual(trace_dtype([10, 40000]), np.int32)
+
+        usage = np.linspace(1.0, 8.0, 50)
+        mem = np.full(50, 100.0)
+        for max_replicas, dtype in ((10, np.int16), (40000, np.int32)):
+            forecast, desired, _, _, _ = replay_hpa_matrix(
+                usage, mem, [1], [max_replicas], [1.0], [200.0], [0.8],
+                [0], 5, [1], 10
+            )
+            self.assertEqual(forecast.dtype, dtype)
+            self.assertEqual(desired.dtype, dtype)
+
+
+class TestScoreCostModels(unittest.TestCase):
+    """Unit tests for `score_cost_models`."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = Config()
+        self.config_values = self.config.snapshot()
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+        self.workload_df = pd.read_csv(
+            Path(__file__).parent / "test_files" / "test_id_9_dataframe.csv"
+        )
+        self.cost_models = [
+            CostModel("default", self.config.COST_OF_GB_IN_CPUS),
+            CostModel("cheap_memory", 2.0),
+            CostModel("expensive_memory", 0.5),
+        ]
+
+    def tearDown(self):
+        self.config.restore(self.config_values)
+        self.tmp_dir.cleanup()
+
+    def test_scores_match_simulation(self):
+        scores, _ = score_cost_models(
+            self.workload_details, self.workload_df, self.cost_models
+        )
+        self.assertEqual(
+            list(scores.columns), [model.name for model in self.cost_models]
+        )
+        self.assertIn("VPA", scores.index)
+
+        prepared = prepare_workload(self.workload_details, self.workload_df)
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        for model in self.cost_models:
+            self.config.set_value(
+                "COST_OF_GB_IN_CPUS", model.cost_of_gb_in_cpus
+            )
+            _, _, _, simulation_dfs = _analyze_configuration_plans(
+                self.config, plans, self.workload_details, prepared
+            )
+            self.assertEqual(len(simulation_dfs), len(scores))
+            for df in simulation_dfs:
+                method = df["method"].iloc[0]
+                self.assertAlmostEqual(
+                    scores.loc[method, model.name],
+                    df["avg_saving_in_cpus"].mean()
+                )
+
+    def test_what_if_reads_cached_traces(self):
+        self.config.set_value("SIMULATION_CACHE_DIR", self.tmp_dir.name)
+        stats = get_simulation_cache(self.config).stats
+        first, _ = score_cost_models(
+            self.workload_details, self.workload_df, self.cost_models[:1]
+        )
+        replayed = stats.misses
+        self.assertGreater(replayed, 0)
+
+        what_if, _ = score_cost_models(
+            self.workload_details, self.workload_df, self.cost_models
+        )
+        self.assertEqual(stats.misses, replayed)
+        self.assertEqual(stats.hits, replayed)
+        pd.testing.assert_series_equal(what_if["default"], first["default"])
+
+
+if __name__ == "__main__":
+    unittest.main()
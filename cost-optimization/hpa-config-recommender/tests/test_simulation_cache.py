@@ -0,0 +1,209 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the on-disk simulation cache """
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import (
+    get_simulation_plans,
+    prepare_workload,
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    _analyze_configuration_plans,
+)
+from hpaconfigrecommender.simulation_cache import (
+    SimulationCache,
+    data_fingerprint,
+    get_simulation_cache,
+    replay_key,
+)
+from hpaconfigrecommender.simulation_kernel import (
+    CLASH_CPU,
+    CLASH_NONE,
+    DEFAULT_BEHAVIOR,
+    NO_METRICS,
+    ReplayBehavior,
+    replay_metrics,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import HPAMetric, WorkloadDetails
+
+
+def _replay(n_rows, clash_kind=CLASH_NONE):
+    return (
+        np.arange(n_rows, dtype=np.int64),
+        np.arange(n_rows, dtype=np.int64)[::-1].copy(),
+        np.linspace(0, 1, n_rows),
+        -1 if clash_kind == CLASH_NONE else n_rows - 1,
+        clash_kind,
+    )
+
+
+class TestSimulationCache(unittest.TestCase):
+    """Unit tests for `SimulationCache`."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = SimulationCache(self.tmp_dir.name, 1024**2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.get("a" * 64))
+        for key, replay in (
+            ("a" * 64, _replay(50)), ("b" * 64, _replay(20, CLASH_CPU))
+        ):
+            self.cache.put(key, replay)
+            cached = self.cache.get(key)
+            for expected, value in zip(replay[:3], cached[:3]):
+                np.testing.assert_array_equal(value, expected)
+                self.assertEqual(value.dtype, expected.dtype)
+            self.assertEqual(cached[3:], replay[3:])
+        self.assertEqual(self.cache.stats.hits, 2)
+        self.assertEqual(self.cache.stats.misses, 1)
+
+    def test_unreadable_file_is_dropped(self):
+        key = "c" * 64
+        self.cache.put(key, _replay(10))
+        path = self.cache._path(key)
+        path.write_bytes(b"not a zip file")
+        self.assertIsNone(self.cache.get(key))
+        self.assertFalse(path.exists())
+
+    def test_evicts_least_recently_used(self):
+        keys = [f"{i}" * 64 for i in range(3)]
+        for age, key in enumerate(keys):
+            self.cache.put(key, _replay(1000))
+            # Oldest access first
+            os.utime(self.cache._path(key), (1000 + age, 1000 + age))
+        self.cache.get(keys[0])
+        sizes = [self.cache._path(key).stat().st_size for key in keys]
+        self.cache.max_bytes = sum(sizes) - 1
+        self.cache.evict()
+        self.assertTrue(self.cache._path(keys[0]).exists())
+        self.assertFalse(self.cache._path(keys[1]).exists())
+        self.assertTrue(self.cache._path(keys[2]).exists())
+        self.assertEqual(self.cache.stats.evictions, 1)
+
+    def test_replay_key(self):
+        config = Config()
+        fingerprint = data_fingerprint(np.ones(4), np.zeros(4))
+        values = (3, 10, 0.25, 128.0, 0.8, 2, 3)
+
+        def key(**kwargs):
+            replay = dict(
+                fingerprint=fingerprint, plan_values=values,
+                scale_down_steps=10, behavior=DEFAULT_BEHAVIOR,
+                metrics=NO_METRICS, config=config
+            )
+            replay.update(kwargs)
+            return replay_key(**replay)
+
+        self.assertEqual(key(), key(plan_values=list(values)))
+        self.assertEqual(key(), key(behavior=ReplayBehavior()))
+        self.assertNotEqual(key(), key(scale_down_steps=5))
+        self.assertNotEqual(
+            key(), key(behavior=ReplayBehavior(tolerance=0.1))
+        )
+        self.assertNotEqual(
+            key(),
+            key(metrics=replay_metrics(
+                [HPAMetric("pubsub_backlog", "AverageValue", 100)]
+            ))
+        )
+        self.assertNotEqual(
+            key(),
+            key(fingerprint=data_fingerprint(np.ones(4), np.ones(4)))
+        )
+
+
+class TestCachedSimulation(unittest.TestCase):
+    """Simulations served from the cache match simulated ones."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = Config()
+        self.config_values = self.config.snapshot()
+        self.config.set_value("SIMULATION_CACHE_DIR", self.tmp_dir.name)
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+        workload_df = pd.read_csv(
+            Path(__file__).parent / "test_files" / "test_id_9_dataframe.csv"
+        )
+        self.prepared = prepare_workload(self.workload_details, workload_df)
+        self.plans, _ = get_simulation_plans(
+            self.workload_details, self.prepared
+        )
+
+    def tearDown(self):
+        self.config.restore(self.config_values)
+        self.tmp_dir.cleanup()
+
+    def _analyze(self, mode):
+        self.config.set_value("SIMULATION_MODE", mode)
+        return _analyze_configuration_plans(
+            self.config, self.plans, self.workload_details, self.prepared
+        )
+
+    def test_rerun_reuses_replays(self):
+        stats = get_simulation_cache(self.config).stats
+        first_df, first_rec, first_reasons, _ = self._analyze("matrix")
+        simulated = stats.misses
+        self.assertGreater(simulated, 0)
+        self.assertEqual(stats.hits, 0)
+
+        # Pool and matrix replays share their entries
+        pool_df, pool_rec, pool_reasons, _ = self._analyze("pool")
+        self.assertEqual(stats.hits, simulated)
+        self.assertEqual(stats.misses, simulated)
+        pd.testing.assert_frame_equal(pool_df, first_df)
+        self.assertEqual(pool_rec.plan, first_rec.plan)
+        self.assertEqual(pool_reasons, first_reasons)
+
+        # Savings settings are applied to the cached traces
+        self.config.set_value("COST_OF_GB_IN_CPUS", 2.0)
+        cached_df, cached_rec, _, _ = self._analyze("matrix")
+        self.assertEqual(stats.misses, simulated)
+        self.config.set_value("SIMULATION_CACHE_DIR", None)
+        fresh_df, fresh_rec, _, _ = self._analyze("matrix")
+        pd.testing.assert_frame_equal(cached_df, fresh_df)
+        self.assertEqual(cached_rec.plan, fresh_rec.plan)
+        self.assertFalse(cached_df.equals(first_df))
+
+    def test_simulator_settings_miss(self):
+        stats = get_simulation_cache(self.config).stats
+        self._analyze("matrix")
+        simulated = stats.misses
+        self.config.set_value("CPU_CLASH_COUNT_THRESHOLD", 3)
+        self._analyze("matrix")
+        self.assertEqual(stats.hits, 0)
+        self.assertEqual(stats.misses, 2 * simulated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,689 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the HPA replay kernels """
+import dataclasses
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+import pandas as pd
+import numpy as np
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import (
+    HPABehavior,
+    HPAMetric,
+    HPAScalingPolicy,
+    WorkloadDetails,
+    WorkloadPlan,
+    WorkloadRecommendation
+)
+from hpaconfigrecommender.plan_workload_simulation import (
+    get_simulation_plans,
+    prepare_workload
+)
+from hpaconfigrecommender.run_workload_simulation import (
+    _analyze_configuration_plans,
+    _simulate_behaviour,
+    _simulate_behaviour_reference,
+    _calculate_starting_replicas
+)
+from hpaconfigrecommender.simulation_kernel import (
+    DEFAULT_BEHAVIOR,
+    NO_SCALING_RULES,
+    ReplayBehavior,
+    ReplayState,
+    njit,
+    replay_behavior,
+    replay_hpa,
+    replay_hpa_matrix,
+    replay_metrics,
+    resolve_backend,
+    resume_hpa,
+    scaling_rules
+)
+
+TEST_DIR = Path(__file__).parent
+
+
+def _policies(specs):
+    return tuple(HPAScalingPolicy.from_spec(spec) for spec in specs)
+FORECAST_COLUMNS = [
+    "forecast_replicas_up_and_running",
+    "forecast_replicas_desired",
+    "forecast_sum_cpu_up_and_running",
+    "forecast_sum_mem_up_and_running",
+    "scale_up_behaviour_to_x_times",
+]
+
+
+class TestSimulationKernelParity(unittest.TestCase):
+    """The kernels must reproduce the reference loop bit for bit."""
+
+    def setUp(self):
+        self.config = Config()
+        self.config.set_value("DISTANCE_BETWEEN_POINTS_SECONDS", 30)
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        self.workload_details.scheduled_to_ready_seconds = 20.0
+
+    def tearDown(self):
+        self.config.set_value("SIMULATION_BACKEND", "auto")
+
+    def _simulate(self, backend, plan, prepared):
+        self.config.set_value("SIMULATION_BACKEND", backend)
+        rec = WorkloadRecommendation(
+            workload_details=self.workload_details, plan=plan
+        )
+        rec.valid = True
+        starting_replicas = _calculate_starting_replicas(prepared, plan)
+        df = _simulate_behaviour(
+            self.config, rec, prepared, starting_replicas
+        )
+        return df, rec
+
+    def _read_workload(self, test_id):
+        return pd.read_csv(
+            TEST_DIR / "test_files" / f"test_id_{test_id}_dataframe.csv"
+        )
+
+    def _assert_parity(self, backend, test_id):
+        workload_df = self._read_workload(test_id)
+        prepared = prepare_workload(self.workload_details, workload_df)
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        self.assertTrue(plans)
+        for plan in plans:
+            expected_df, expected_rec = self._simulate(
+                "python", plan, prepared
+            )
+            actual_df, actual_rec = self._simulate(backend, plan, prepared)
+            self.assertEqual(actual_rec.valid, expected_rec.valid, plan.method)
+            self.assertEqual(
+                actual_rec.validation_msg,
+                expected_rec.validation_msg,
+                plan.method
+            )
+            self.assertEqual(actual_df.empty, expected_df.empty, plan.method)
+            if expected_df.empty:
+                continue
+            for col in FORECAST_COLUMNS:
+                np.testing.assert_array_equal(
+                    actual_df[col].to_numpy(),
+                    expected_df[col].to_numpy(),
+                    err_msg=f"{col} differs for {plan.method}"
+                )
+
+    def test_kernel_parity(self):
+        for test_id in ["1", "3", "6", "7", "9"]:
+            with self.subTest(test_id=test_id):
+                self._assert_parity("kernel", test_id)
+
+    @unittest.skipIf(njit is None, "numba is not installed")
+    def test_numba_parity(self):
+        for test_id in ["1", "3", "6", "7", "9"]:
+            with self.subTest(test_id=test_id):
+                self._assert_parity("numba", test_id)
+
+    def test_matrix_parity(self):
+        for test_id in ["1", "3", "6", "7", "9"]:
+            with self.subTest(test_id=test_id):
+                workload_df = pd.read_csv(
+                    TEST_DIR / "test_files" / f"test_id_{test_id}_dataframe.csv"
+                )
+                prepared = prepare_workload(self.workload_details, workload_df)
+                plans, _ = get_simulation_plans(
+                    self.workload_details, prepared
+                )
+                plans = [plan for plan in plans if plan.method != "VPA"]
+                cpu = prepared.sum_cpu_usage
+                mem = prepared.sum_mem_usage_mi
+                starting = [
+                    _calculate_starting_replicas(prepared, plan)
+                    for plan in plans
+                ]
+                steps = self.config.HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS
+                threshold = self.config.CPU_CLASH_COUNT_THRESHOLD
+                matrix = replay_hpa_matrix(
+                    cpu, mem,
+                    [p.recommended_min_replicas for p in plans],
+                    [p.recommended_max_replicas for p in plans],
+                    [p.recommended_cpu_request for p in plans],
+                    [p.recommended_mem_request_and_limits_mi for p in plans],
+                    [p.recommended_hpa_target_cpu for p in plans],
+                    [p.workload_e2e_startup_latency_rows for p in plans],
+                    steps, starting, threshold
+                )
+                for row, plan in enumerate(plans):
+                    single = replay_hpa(
+                        "kernel", cpu, mem,
+                        plan.recommended_min_replicas,
+                        plan.recommended_max_replicas,
+                        plan.recommended_cpu_request,
+                        plan.recommended_mem_request_and_limits_mi,
+                        plan.recommended_hpa_target_cpu,
+                        plan.workload_e2e_startup_latency_rows,
+                        steps, starting[row], threshold
+                    )
+                    for expected, actual in zip(single[:3], matrix[:3]):
+                        np.testing.assert_array_equal(actual[row], expected)
+                    self.assertEqual(matrix[3][row], single[3])
+                    self.assertEqual(matrix[4][row], single[4])
+
+    def test_resume_parity(self):
+        rng = np.random.default_rng(3)
+        cpu = 1.0 + np.abs(np.sin(np.arange(400) / 25.0)) * 3.0
+        cpu += rng.random(400) * 0.2
+        mem = np.full(400, 200.0)
+        plan = (2, 12, 1.0, 100.0, 0.7, 4)
+        expected = replay_hpa("kernel", cpu, mem, *plan, 10, 3, 1000)
+        for chunk in (1, 3, 37, 400):
+            with self.subTest(chunk=chunk):
+                state = ReplayState(starting_replica=3)
+                traces = ([], [], [])
+                for begin in range(0, 400, chunk):
+                    *replay, clash_index, clash_kind, state = resume_hpa(
+                        "kernel", cpu[begin:begin + chunk],
+                        mem[begin:begin + chunk], *plan, 10, 1000, state
+                    )
+                    self.assertEqual((clash_index, clash_kind), (-1, 0))
+                    for trace, values in zip(traces, replay):
+                        trace.append(values)
+                for trace, values in zip(traces, expected[:3]):
+                    np.testing.assert_array_equal(
+                        np.concatenate(trace), values
+                    )
+                self.assertEqual(state.rows, 400)
+
+    def test_resolve_backend(self):
+        self.assertEqual(resolve_backend("python"), "python")
+        self.assertEqual(resolve_backend("kernel"), "kernel")
+        self.assertIn(resolve_backend("auto"), ("kernel", "numba"))
+        with self.assertRaises(ValueError):
+            resolve_backend("gpu")
+
+
+class TestScalingBehaviour(TestSimulationKernelParity):
+    """Behavior policies and long scale down windows."""
+
+    SCALE_UP = [
+        {"type": "Pods", "value": 2, "periodSeconds": 120},
+        {"type": "Percent", "value": 100, "periodSeconds": 120},
+    ]
+
+    def setUp(self):
+        self.config_values = Config.snapshot()
+        super().setUp()
+
+    def tearDown(self):
+        Config.restore(self.config_values)
+
+    def _replay(self, cpu, starting, up=(), down=(), select="Max", **kwargs):
+        behavior = HPABehavior(
+            scale_up_policies=_policies(up),
+            scale_up_select_policy=select,
+            scale_down_policies=_policies(down),
+            scale_down_select_policy=select,
+            **kwargs
+        )
+        return replay_hpa(
+            "kernel", np.array(cpu, dtype=float), np.zeros(len(cpu)),
+            1, 8, 1.0, 1.0, 1.0, 1, 0, starting, 1000,
+            replay_behavior(behavior, 60)
+        )[0].tolist()
+
+    def test_hand_computed_traces(self):
+        # Desired replicas jump to 8 on row 1 and are rate limited from
+        # row 2, the changes of the last two rows count against the limit
+        cpu = [1.0] + [8.0] * 9
+        self.assertEqual(
+            self._replay(cpu, 1, self.SCALE_UP[:1]),
+            [1, 1, 3, 3, 3, 5, 5, 5, 7, 7]
+        )
+        self.assertEqual(
+            self._replay(cpu, 1, self.SCALE_UP),
+            [1, 1, 3, 3, 3, 6, 6, 6, 8, 8]
+        )
+        self.assertEqual(
+            self._replay(cpu, 1, self.SCALE_UP, select="Min"),
+            [1, 1, 2, 2, 2, 4, 4, 4, 6, 6]
+        )
+        # Desired replicas fall to 1 on row 5
+        cpu = [8.0] * 5 + [1.0] * 7
+        self.assertEqual(
+            self._replay(
+                cpu, 8, down=[{"type": "Pods", "value": 1, "periodSeconds": 60}]
+            ),
+            [8, 8, 8, 8, 8, 8, 7, 7, 6, 6, 5, 5]
+        )
+        percent = [{"type": "Percent", "value": 50, "periodSeconds": 60}]
+        self.assertEqual(
+            self._replay(cpu, 8, down=percent),
+            [8, 8, 8, 8, 8, 8, 4, 4, 2, 2, 1, 1]
+        )
+        self.assertEqual(
+            self._replay(cpu, 8, down=percent, select="Disabled"), [8] * 12
+        )
+        self.assertEqual(self._replay(cpu, 8)[6:], [1] * 6)
+
+    def test_tolerance(self):
+        # Usage ratios of 1.05 and 0.96 are within a 10% tolerance
+        cpu = [4.0, 4.2, 4.2, 4.8, 4.8, 3.8, 3.8, 3.0]
+        self.assertEqual(
+            self._replay(cpu, 4, tolerance=0.1), [4, 4, 4, 4, 5, 5, 4, 4]
+        )
+        self.assertEqual(self._replay(cpu, 4), [4, 4, 5, 5, 5, 5, 4, 4])
+
+    def test_cpu_initialization_period(self):
+        # Replicas added in the last two rows are not ready. Row 2 counts
+        # the two new replicas as idle, a ratio of 1.25 over 4 replicas.
+        # Row 3 still holds: 2 ready replicas of 5 give a ratio below 1
+        cpu = [2.0, 4.0, 10.0, 10.0, 10.0, 10.0]
+        self.assertEqual(
+            self._replay(cpu, 2, cpu_initialization_period_seconds=120),
+            [2, 2, 4, 5, 5, 8]
+        )
+        self.assertEqual(self._replay(cpu, 2), [2, 2, 4, 8, 8, 8])
+        # A ratio of 1.5 over the ready replicas is not enough
+        cpu = [2.0, 4.0, 6.0, 6.0, 6.0, 6.0, 6.0]
+        self.assertEqual(
+            self._replay(cpu, 2, cpu_initialization_period_seconds=120),
+            [2, 2, 4, 4, 4, 6, 6]
+        )
+
+    def test_scaling_rules(self):
+        rules = scaling_rules(_policies(self.SCALE_UP), "Min", 45)
+        np.testing.assert_array_equal(
+            rules.policies, [[0, 2, 3], [1, 100, 3]]
+        )
+        self.assertEqual(rules.max_period, 3)
+        self.assertEqual(NO_SCALING_RULES.max_period, 0)
+        with self.assertRaises(ValueError):
+            scaling_rules([HPAScalingPolicy("Cores", 1, 60)], "Max", 60)
+        with self.assertRaises(ValueError):
+            scaling_rules([], "Most", 60)
+
+    def _set_behaviour(self):
+        self.config.set_value("HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS", 37)
+        self.config.set_value("HPA_SCALE_UP_POLICIES", self.SCALE_UP)
+        self.config.set_value("HPA_SCALE_DOWN_POLICIES", [
+            {"type": "Pods", "value": 1, "periodSeconds": 90},
+            {"type": "Percent", "value": 10, "periodSeconds": 300},
+        ])
+        self.config.set_value("HPA_SCALE_DOWN_SELECT_POLICY", "Min")
+        self.config.set_value("HPA_TOLERANCE", 0.1)
+        self.config.set_value("HPA_CPU_INITIALIZATION_PERIOD_SECONDS", 300)
+
+    def test_kernel_parity(self):
+        self._set_behaviour()
+        super().test_kernel_parity()
+
+    @unittest.skipIf(njit is None, "numba is not installed")
+    def test_numba_parity(self):
+        self._set_behaviour()
+        super().test_numba_parity()
+
+    def test_matrix_parity(self):
+        self._set_behaviour()
+        steps = self.config.HPA_SCALE_DOWN_DEFAULT_BEHAVIOUR_STEPS
+        behavior = replay_behavior(
+            HPABehavior.from_config(self.config),
+            self.config.DISTANCE_BETWEEN_POINTS_SECONDS
+        )
+        rng = np.random.default_rng(5)
+        cpu = 2.0 + np.abs(np.sin(np.arange(600) / 40.0)) * 6.0
+        cpu += rng.random(600)
+        mem = np.full(600, 100.0)
+        plans = [
+            (1, 20, 1.0, 100.0, 0.7, 1, 2),
+            (2, 12, 0.8, 100.0, 0.6, 4, 3),
+            (3, 16, 1.5, 50.0, 0.9, 9, 3),
+        ]
+        matrix = replay_hpa_matrix(
+            cpu, mem, *[list(column) for column in zip(*plans)][:6],
+            steps, [plan[6] for plan in plans], 1000, behavior
+        )
+        for row, plan in enumerate(plans):
+            single = replay_hpa(
+                "kernel", cpu, mem, *plan[:6], steps, plan[6], 1000, behavior
+            )
+            for expected, actual in zip(single[:3], matrix[:3]):
+                np.testing.assert_array_equal(actual[row], expected)
+            self.assertEqual(matrix[4][row], single[4])
+
+    def test_resume_parity(self):
+        self._set_behaviour()
+        behavior = replay_behavior(
+            HPABehavior.from_config(self.config),
+            self.config.DISTANCE_BETWEEN_POINTS_SECONDS
+        )
+        cpu = 1.0 + np.abs(np.sin(np.arange(400) / 25.0)) * 3.0
+        mem = np.full(400, 200.0)
+        plan = (2, 12, 1.0, 100.0, 0.7, 4)
+        expected = replay_hpa(
+            "kernel", cpu, mem, *plan, 37, 3, 1000, behavior
+        )
+        for chunk in (1, 7, 400):
+            with self.subTest(chunk=chunk):
+                state = ReplayState(starting_replica=3)
+                traces = ([], [], [])
+                for begin in range(0, 400, chunk):
+                    *replay, _, clash_kind, state = resume_hpa(
+                        "kernel", cpu[begin:begin + chunk],
+                        mem[begin:begin + chunk], *plan, 37, 1000, state,
+                        behavior
+                    )
+                    self.assertEqual(clash_kind, 0)
+                    for trace, values in zip(traces, replay):
+                        trace.append(values)
+                for trace, values in zip(traces, expected[:3]):
+                    np.testing.assert_array_equal(
+                        np.concatenate(trace), values
+                    )
+
+    def _simulations(self, prepared, plans):
+        _, _, _, simulation_dfs = _analyze_configuration_plans(
+            self.config, plans, self.workload_details, prepared
+        )
+        return {df["method"].iloc[0]: df for df in simulation_dfs}
+
+    def _assert_same_simulations(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for method, expected_df in expected.items():
+            for col in FORECAST_COLUMNS:
+                np.testing.assert_array_equal(
+                    actual[method][col].to_numpy(),
+                    expected_df[col].to_numpy(),
+                    err_msg=f"{col} differs for {method}"
+                )
+
+    def test_python_backend_matrix_mode(self):
+        self._set_behaviour()
+        prepared = prepare_workload(
+            self.workload_details, self._read_workload("9")
+        )
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        self.config.set_value("SIMULATION_MODE", "matrix")
+        simulated = {}
+        for backend in ("kernel", "python"):
+            self.config.set_value("SIMULATION_BACKEND", backend)
+            with patch(
+                "hpaconfigrecommender.run_workload_simulation."
+                "_simulate_behaviour_reference",
+                wraps=_simulate_behaviour_reference
+            ) as reference:
+                simulated[backend] = self._simulations(prepared, plans)
+            self.assertEqual(reference.called, backend == "python")
+        self._assert_same_simulations(simulated["python"], simulated["kernel"])
+
+    def test_python_backend_pool_mode(self):
+        self._set_behaviour()
+        prepared = prepare_workload(
+            self.workload_details, self._read_workload("9")
+        )
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        simulated = {}
+        self.config.set_value("SIMULATION_BACKEND", "kernel")
+        self.config.set_value("SIMULATION_MODE", "matrix")
+        simulated["kernel"] = self._simulations(prepared, plans)
+        self.config.set_value("SIMULATION_BACKEND", "python")
+        self.config.set_value("SIMULATION_MODE", "pool")
+        with patch(
+            "hpaconfigrecommender.run_workload_simulation."
+            "_simulate_behaviour_reference",
+            wraps=_simulate_behaviour_reference
+        ) as reference, self.assertLogs(
+            "hpaconfigrecommender.run_workload_simulation", level="INFO"
+        ) as logs:
+            simulated["python"] = self._simulations(prepared, plans)
+        # Replayed in this process, with the behaviour settings of the test
+        self.assertTrue(reference.called)
+        self.assertTrue(any(
+            "without the prefilter and the simulation cache" in line
+            for line in logs.output
+        ))
+        self._assert_same_simulations(simulated["python"], simulated["kernel"])
+
+    def test_plan_behavior(self):
+        behavior = HPABehavior(
+            scale_up_policies=_policies(self.SCALE_UP),
+            tolerance=0.1,
+            cpu_initialization_period_seconds=300,
+        )
+        workload_df = pd.read_csv(
+            TEST_DIR / "test_files" / "test_id_9_dataframe.csv"
+        )
+        prepared = prepare_workload(self.workload_details, workload_df)
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        plans = [plan for plan in plans if plan.method != "VPA"]
+        plans += [
+            dataclasses.replace(
+                plan, method=f"{plan.method}_behavior", hpa_behavior=behavior
+            )
+            for plan in plans
+        ]
+        for mode in ("matrix", "pool"):
+            with self.subTest(mode=mode):
+                self.config.set_value("SIMULATION_MODE", mode)
+                _, _, reasons, simulation_dfs = _analyze_configuration_plans(
+                    self.config, plans, self.workload_details, prepared
+                )
+                simulated = {df["method"].iloc[0]: df for df in simulation_dfs}
+                for plan in plans:
+                    expected_df, expected_rec = self._simulate(
+                        "python", plan, prepared
+                    )
+                    if not expected_rec.valid:
+                        self.assertIn(plan.method, reasons)
+                        continue
+                    for col in FORECAST_COLUMNS:
+                        np.testing.assert_array_equal(
+                            simulated[plan.method][col].to_numpy(),
+                            expected_df[col].to_numpy(),
+                            err_msg=f"{col} differs for {plan.method}"
+                        )
+                self.assertTrue(any(
+                    method.endswith("_behavior") for method in simulated
+                ))
+
+
+class TestMetrics(TestSimulationKernelParity):
+    """Desired replicas are the most asked by any metric."""
+
+    METRICS = [
+        {"column": "sum_containers_mem_usage_mi",
+         "targetType": "Utilization", "target": 0.6},
+        {"column": "pubsub_backlog", "targetType": "AverageValue",
+         "target": 150},
+        {"column": "pubsub_backlog", "targetType": "Value", "target": 4000},
+    ]
+
+    def setUp(self):
+        self.config_values = Config.snapshot()
+        super().setUp()
+        self.config.set_value("HPA_METRICS", self.METRICS)
+
+    def tearDown(self):
+        Config.restore(self.config_values)
+
+    def _read_workload(self, test_id):
+        workload_df = super()._read_workload(test_id)
+        rows = np.arange(len(workload_df))
+        workload_df["pubsub_backlog"] = np.where(
+            rows % 17 == 5, np.nan, 400.0 + 300.0 * np.sin(rows / 9.0)
+        )
+        return workload_df
+
+    def _replay(self, metrics, values, cpu=None, mem=None):
+        n_rows = values.shape[1]
+        return replay_hpa(
+            "kernel",
+            np.ones(n_rows) if cpu is None else np.array(cpu, dtype=float),
+            np.zeros(n_rows) if mem is None else np.array(mem, dtype=float),
+            1, 8, 1.0, 400.0, 1.0, 1, 0, 1, 1000, DEFAULT_BEHAVIOR,
+            replay_metrics(metrics), values
+        )[0].tolist()
+
+    def test_hand_computed_traces(self):
+        backlog = np.array([[100.0, 250.0, 250.0, 420.0, np.nan, 90.0]])
+        average = [HPAMetric("pubsub_backlog", "AverageValue", 100)]
+        # ceil(250 / 100) replicas, a missing value leaves the CPU alone
+        self.assertEqual(self._replay(average, backlog), [1, 1, 3, 3, 5, 1])
+        # A Value target scales the current replicas by the ratio
+        value = [HPAMetric("pubsub_backlog", "Value", 2.0)]
+        self.assertEqual(
+            self._replay(value, np.array([[2.0, 4.0, 4.0, 4.0]])),
+            [1, 1, 2, 4]
+        )
+        # 250 MiB is a 0.62 then 0.31 utilization of 400 MiB requests
+        memory = [HPAMetric("sum_containers_mem_usage_mi", "Utilization", 0.5)]
+        mem = [100.0, 250.0, 250.0, 250.0]
+        self.assertEqual(
+            self._replay(memory, np.array([mem]), mem=mem), [1, 1, 2, 2]
+        )
+        # The CPU asks for 4 replicas on row 2
+        self.assertEqual(
+            self._replay(
+                average + memory,
+                np.stack([backlog[0, :4], mem]),
+                cpu=[1.0, 1.0, 4.0, 1.0],
+                mem=mem
+            ),
+            [1, 1, 3, 4]
+        )
+
+    def test_replay_metrics(self):
+        metrics = replay_metrics(
+            [HPAMetric.from_spec(spec) for spec in self.METRICS]
+        )
+        self.assertEqual(len(metrics), 3)
+        np.testing.assert_array_equal(metrics.kinds, [0, 1, 2])
+        with self.assertRaises(ValueError):
+            replay_metrics([HPAMetric("pubsub_backlog", "Utilization", 1)])
+        with self.assertRaises(ValueError):
+            replay_metrics([HPAMetric("pubsub_backlog", "Average", 1)])
+        with self.assertRaises(ValueError):
+            replay_hpa(
+                "kernel", np.ones(3), np.ones(3), 1, 2, 1.0, 1.0, 1.0, 0, 0,
+                1, 0, DEFAULT_BEHAVIOR, metrics, np.ones((2, 3))
+            )
+
+    def _synthetic_metrics(self):
+        rng = np.random.default_rng(7)
+        cpu = 1.0 + np.abs(np.sin(np.arange(500) / 30.0)) * 3.0
+        mem = 150.0 + np.abs(np.cos(np.arange(500) / 45.0)) * 600.0
+        backlog = 300.0 + rng.random(500) * 900.0
+        backlog[::23] = np.nan
+        metrics = replay_metrics(
+            [HPAMetric.from_spec(spec) for spec in self.METRICS]
+        )
+        return cpu, mem, metrics, np.stack([mem, backlog, backlog])
+
+    def test_matrix_parity(self):
+        cpu, mem, metrics, values = self._synthetic_metrics()
+        plans = [
+            (1, 20, 1.0, 400.0, 0.7, 1, 2),
+            (2, 30, 0.8, 500.0, 0.6, 4, 3),
+            (3, 16, 1.5, 0.0, 0.9, 9, 3),
+        ]
+        for rows in (0, 1, 3, 8, 40):
+            behavior = ReplayBehavior(
+                tolerance=0.1, cpu_initialization_rows=rows
+            )
+            matrix = replay_hpa_matrix(
+                cpu, mem, *[list(column) for column in zip(*plans)][:6],
+                7, [plan[6] for plan in plans], 1000, behavior, metrics,
+                values
+            )
+            for row, plan in enumerate(plans):
+                with self.subTest(cpu_initialization_rows=rows, plan=row):
+                    single = replay_hpa(
+                        "kernel", cpu, mem, *plan[:6], 7, plan[6], 1000,
+                        behavior, metrics, values
+                    )
+                    for expected, actual in zip(single[:3], matrix[:3]):
+                        np.testing.assert_array_equal(actual[row], expected)
+                    self.assertEqual(matrix[3][row], single[3])
+                    self.assertEqual(matrix[4][row], single[4])
+
+    def test_resume_parity(self):
+        cpu, mem, metrics, values = self._synthetic_metrics()
+        plan = (2, 30, 1.0, 400.0, 0.7, 4)
+        expected = replay_hpa(
+            "kernel", cpu, mem, *plan, 7, 3, 1000, DEFAULT_BEHAVIOR,
+            metrics, values
+        )
+        self.assertEqual(expected[4], 0)
+        for chunk in (1, 7, 500):
+            with self.subTest(chunk=chunk):
+                state = ReplayState(starting_replica=3)
+                traces = ([], [], [])
+                for begin in range(0, 500, chunk):
+                    *replay, _, _, state = resume_hpa(
+                        "kernel", cpu[begin:begin + chunk],
+                        mem[begin:begin + chunk], *plan, 7, 1000, state,
+                        DEFAULT_BEHAVIOR, metrics,
+                        values[:, begin:begin + chunk]
+                    )
+                    for trace, values_ in zip(traces, replay):
+                        trace.append(values_)
+                for trace, values_ in zip(traces, expected[:3]):
+                    np.testing.assert_array_equal(
+                        np.concatenate(trace), values_
+                    )
+
+    def test_plan_metrics(self):
+        workload_df = self._read_workload("9")
+        prepared = prepare_workload(self.workload_details, workload_df)
+        plans, _ = get_simulation_plans(self.workload_details, prepared)
+        plans = [
+            dataclasses.replace(plan, hpa_metrics=())
+            for plan in plans if plan.method != "VPA"
+        ] + [
+            dataclasses.replace(plan, method=f"{plan.method}_metrics")
+            for plan in plans if plan.method != "VPA"
+        ]
+        for mode in ("matrix", "pool"):
+            with self.subTest(mode=mode):
+                self.config.set_value("SIMULATION_MODE", mode)
+                _, _, reasons, simulation_dfs = _analyze_configuration_plans(
+                    self.config, plans, self.workload_details, prepared
+                )
+                simulated = {df["method"].iloc[0]: df for df in simulation_dfs}
+                for plan in plans:
+                    expected_df, expected_rec = self._simulate(
+                        "python", plan, prepared
+                    )
+                    if not expected_rec.valid:
+                        self.assertIn(plan.method, reasons)
+                        continue
+                    for col in FORECAST_COLUMNS:
+                        np.testing.assert_array_equal(
+                            simulated[plan.method][col].to_numpy(),
+                            expected_df[col].to_numpy(),
+                            err_msg=f"{col} differs for {plan.method}"
+                        )
+                self.assertTrue(any(
+                    method.endswith("_metrics") for method in simulated
+                ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the shared simulation pool """
+import unittest
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.simulation_kernel import replay_hpa
+from hpaconfigrecommender.simulation_pool import (
+    POOL_START_METHOD,
+    SIMULATION_COLUMNS,
+    SharedWorkloadFrame,
+    attach_shared_frame,
+    get_simulation_pool,
+    replay_plans_in_pool,
+    shutdown_simulation_pool
+)
+
+
+class TestSimulationPool(unittest.TestCase):
+    """Unit tests for `simulation_pool`."""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        cpu = 1.0 + np.abs(np.sin(np.arange(500) / 40.0)) * 2.0
+        self.workload_df = pd.DataFrame({
+            "sum_containers_cpu_usage": (
+                cpu + rng.random(500) * 0.1).astype("float16"),
+            "sum_containers_mem_usage_mi": np.full(500, 300.0, "float32"),
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        shutdown_simulation_pool()
+
+    def test_shared_frame_roundtrip(self):
+        with SharedWorkloadFrame(self.workload_df, SIMULATION_COLUMNS) as frame:
+            arrays = attach_shared_frame(frame.descriptor)
+            for col in SIMULATION_COLUMNS:
+                np.testing.assert_array_equal(
+                    arrays[col],
+                    self.workload_df[col].to_numpy().astype(np.float64)
+                )
+            del arrays
+
+    def test_pool_is_reused(self):
+        pool = get_simulation_pool(2)
+        self.assertIs(get_simulation_pool(2), pool)
+
+    def test_pool_workers_are_not_forked(self):
+        pool = get_simulation_pool(2)
+        # pylint: disable=protected-access
+        self.assertEqual(
+            pool._mp_context.get_start_method(), POOL_START_METHOD
+        )
+        self.assertIn(POOL_START_METHOD, ("forkserver", "spawn"))
+
+    def test_replay_plans_in_pool(self):
+        plans_values = [
+            (3, 10, 0.4, 120.0, 0.7, 4, 5),
+            (3, 6, 0.2, 120.0, 0.8, 4, 6),
+            (5, 30, 0.25, 100.0, 0.6, 4, 8),
+        ]
+        replays = replay_plans_in_pool(
+            self.workload_df, "kernel", plans_values, 10, 0, max_workers=2
+        )
+        self.assertEqual(len(replays), len(plans_values))
+        for plan_values, replay in zip(plans_values, replays):
+            (min_r, max_r, cpu_req, mem_req,
+             target, latency, starting) = plan_values
+            expected = replay_hpa(
+                "kernel",
+                self.workload_df["sum_containers_cpu_usage"].to_numpy(),
+                self.workload_df["sum_containers_mem_usage_mi"].to_numpy(),
+                min_r, max_r, cpu_req, mem_req, target, latency, 10,
+                starting, 0
+            )
+            for actual_array, expected_array in zip(replay[:3], expected[:3]):
+                np.testing.assert_array_equal(actual_array, expected_array)
+            self.assertEqual(replay[3:], expected[3:])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Unit test for the sliding window maxima """
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import prepare_workload
+from hpaconfigrecommender.sliding_window import (
+    forward_window_max,
+    running_max,
+)
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.utils.models import WorkloadDetails
+
+
+class TestSlidingWindow(unittest.TestCase):
+    """Unit tests for `forward_window_max` and `running_max`."""
+
+    def test_forward_window_max_matches_pandas(self):
+        rng = np.random.default_rng(11)
+        values = rng.gamma(2.0, 0.2, size=257)
+        values[rng.random(len(values)) < 0.05] = np.nan
+        for n_rows in (0, 1, 5, 64, 257):
+            for window in (1, 2, 3, 8, 64, 300):
+                expected = (
+                    pd.Series(values[:n_rows])
+                    .rolling(
+                        window=pd.api.indexers.FixedForwardWindowIndexer(
+                            window_size=window
+                        )
+                    )
+                    .max()
+                    .to_numpy()
+                )
+                np.testing.assert_array_equal(
+                    forward_window_max(values[:n_rows], window), expected
+                )
+        with self.assertRaises(ValueError):
+            forward_window_max(values, 0)
+
+    def test_running_max(self):
+        values = np.array([np.nan, 2.0, 1.0, np.nan, 5.0, 3.0])
+        np.testing.assert_array_equal(
+            running_max(values), [np.nan, 2.0, 2.0, 2.0, 5.0, 5.0]
+        )
+        for row in range(1, len(values)):
+            self.assertEqual(
+                running_max(values)[row], np.nanmax(values[:row + 1])
+            )
+
+    def test_prepared_workload_maxima(self):
+        workload_details = WorkloadDetails(
+            config=Config(),
+            project_id="test_project",
+            cluster_name="test_cluster",
+            location="test_location",
+            namespace="test_namespace",
+            controller_name="test_controller",
+            controller_type="Deployment",
+            container_name="test_container",
+        )
+        workload_details.scheduled_to_ready_seconds = 20.0
+        prepared = prepare_workload(
+            workload_details,
+            pd.read_csv(
+                Path(__file__).parent / "test_files"
+                / "test_id_9_dataframe.csv"
+            )
+        )
+        np.testing.assert_array_equal(
+            prepared.max_usage_slope_up_ratio,
+            prepared.frame["max_usage_slope_up_ratio"].to_numpy()
+        )
+        self.assertFalse(prepared.max_usage_slope_up_ratio.flags.writeable)
+        latency = prepared.workload_e2e_startup_latency_rows
+        self.assertEqual(
+            prepared.running_max_sum_cpu_usage[latency],
+            np.nanmax(prepared.sum_cpu_usage[:latency + 1])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
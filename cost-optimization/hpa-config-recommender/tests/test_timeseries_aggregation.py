@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit test for the columnar usage aggregation"""
+import unittest
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import convert_data_types
+from hpaconfigrecommender.read_workload_timeseries import (
+    _aggregate_usage,
+    _aggregate_usage_groupby,
+)
+from hpaconfigrecommender.timeseries_aggregation import (
+    AGGREGATED_COLUMNS,
+    aggregate_usage_columnar,
+)
+from hpaconfigrecommender.utils.config import Config
+
+
+def _pod_frames(windows=120, pods=6, containers=("server", "proxy"), seed=0):
+    """Per pod memory and CPU usage, pods come and go between windows."""
+    rng = np.random.default_rng(seed)
+    window_begin = pd.date_range(
+        "2024-11-05", periods=windows, freq="60s", tz="US/Eastern"
+    )
+    rows = pd.MultiIndex.from_product(
+        [window_begin, containers, [f"pod-{p}" for p in range(pods)]],
+        names=["window_begin", "resource.labels.container_name",
+               "resource.labels.pod_name"]
+    ).to_frame(index=False)
+    rows = rows[rng.random(len(rows)) < 0.7]
+    mem = rows[rng.random(len(rows)) < 0.95].copy()
+    mem["value.int64Value"] = rng.integers(
+        50 * 1024**2, 3 * 1024**3, size=len(mem)
+    ).astype("int64")
+    cpu = rows[rng.random(len(rows)) < 0.95].copy()
+    cpu["value.doubleValue"] = rng.gamma(2.0, 0.2, size=len(cpu)).astype(
+        "float32"
+    )
+    categories = ["resource.labels.container_name", "resource.labels.pod_name"]
+    return (
+        mem.astype({col: "category" for col in categories})
+        .sample(frac=1, random_state=1).reset_index(drop=True),
+        cpu.astype({col: "category" for col in categories})
+        .sample(frac=1, random_state=2).reset_index(drop=True),
+    )
+
+
+class TestAggregateUsageColumnar(unittest.TestCase):
+    """`aggregate_usage_columnar` matches the groupby path."""
+
+    def test_matches_groupby_path(self):
+        mem, cpu = _pod_frames()
+        expected = _aggregate_usage_groupby(mem, cpu, 0.25, 512 * 1024**2)
+        actual = aggregate_usage_columnar(mem, cpu, 0.25, 512 * 1024**2)
+
+        self.assertEqual(list(actual.columns), AGGREGATED_COLUMNS)
+        self.assertEqual(len(actual), len(expected))
+        self.assertEqual(actual["num_replicas_at_usage_window"].dtype, np.int16)
+        self.assertTrue(all(
+            actual[col].dtype == np.float64 for col in AGGREGATED_COLUMNS[2:]
+        ))
+        pd.testing.assert_series_equal(
+            actual["window_begin"], expected["window_begin"]
+        )
+        np.testing.assert_array_equal(
+            actual["num_replicas_at_usage_window"],
+            expected["num_replicas_at_usage_window"]
+        )
+        # Both backends give the same compact frame
+        pd.testing.assert_frame_equal(
+            convert_data_types(actual.copy()),
+            convert_data_types(expected.copy())
+        )
+
+    def test_single_pod_windows_have_zero_stddev(self):
+        mem, cpu = _pod_frames(pods=1, containers=("server",))
+        actual = aggregate_usage_columnar(mem, cpu, 0.25, 0.0)
+        self.assertTrue((actual["stddev_containers_cpu_usage"] == 0).all())
+        self.assertTrue((actual["num_replicas_at_usage_window"] == 1).all())
+
+    def test_backend_is_configurable(self):
+        config = Config()
+        mem, cpu = _pod_frames(windows=10)
+        config.set_value("TIMESERIES_AGGREGATION_BACKEND", "groupby")
+        try:
+            groupby_df = _aggregate_usage(config, mem, cpu, 0.25, 0.0)
+            config.set_value("TIMESERIES_AGGREGATION_BACKEND", "unknown")
+            with self.assertRaises(ValueError):
+                _aggregate_usage(config, mem, cpu, 0.25, 0.0)
+        finally:
+            config.set_value("TIMESERIES_AGGREGATION_BACKEND", "columnar")
+        self.assertEqual(
+            groupby_df["num_replicas_at_usage_window"].dtype, np.int64
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit test for the Monitoring timeseries cache"""
+import asyncio
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+import pandas as pd
+import pytz
+from hpaconfigrecommender.read_workload_timeseries import (
+    _fetch_timeseries_data,
+    _get_latest_request_value,
+    MetricRequestParameter,
+    WorkloadDetails,
+)
+from hpaconfigrecommender.timeseries_cache import TimeseriesCache
+from hpaconfigrecommender.utils.config import Config
+
+PERIOD = 60
+HOUR = 3600
+
+
+def _points(start: int, end: int) -> pd.DataFrame:
+    """Fake API result: two pods, one point per period ending in (start, end]."""
+    first = (start // PERIOD + 1) * PERIOD
+    ends = list(range(first, end + 1, PERIOD))
+    rows = len(ends)
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame({
+        "value.doubleValue": [float(e % 1000) for e in ends] * 2,
+        "window_begin": pd.to_datetime(
+            [e - PERIOD for e in ends] * 2, unit="s", utc=True
+        ),
+        "resource.labels.container_name": ["server"] * rows * 2,
+        "resource.labels.pod_name": ["pod-a"] * rows + ["pod-b"] * rows,
+    }).astype({
+        "resource.labels.container_name": "category",
+        "resource.labels.pod_name": "category",
+    })
+
+
+class TestTimeseriesCache(unittest.TestCase):
+    """Unit tests for `TimeseriesCache`."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = TimeseriesCache(
+            self.cache_dir.name, max_bytes=10**8, bucket_seconds=HOUR
+        )
+        self.calls = []
+        # A settled day, ten days ago
+        self.day = (int(time.time()) // 86400 - 10) * 86400
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    async def _fetch(self, start, end):
+        self.calls.append((start, end))
+        return _points(start, end)
+
+    def _get(self, start, end):
+        return asyncio.run(
+            self.cache.fetch("query", start, end, PERIOD, self._fetch)
+        )
+
+    def _assert_same_points(self, actual, expected):
+        sort = ["window_begin", "resource.labels.pod_name"]
+        actual = actual.astype({"resource.labels.pod_name": str})
+        expected = expected.astype({"resource.labels.pod_name": str})
+        pd.testing.assert_frame_equal(
+            actual.sort_values(sort).reset_index(drop=True)[expected.columns],
+            expected.sort_values(sort).reset_index(drop=True),
+            check_categorical=False,
+        )
+
+    def test_overlapping_windows_fetch_missing_buckets(self):
+        start, end = self.day + 30 * 60, self.day + 5 * HOUR
+        self._assert_same_points(self._get(start, end), _points(start, end))
+        self.assertEqual(self.calls, [(self.day, self.day + 5 * HOUR)])
+
+        self.calls.clear()
+        later = self.day + 8 * HOUR
+        self._assert_same_points(
+            self._get(start + HOUR, later), _points(start + HOUR, later)
+        )
+        self.assertEqual(self.calls, [(self.day + 5 * HOUR, later)])
+        self.assertEqual(self.cache.stats.hits, 4)
+        self.assertEqual(self.cache.stats.misses, 5 + 3)
+
+    def test_recent_buckets_are_not_stored(self):
+        now = int(time.time())
+        self.cache.settle_seconds = 2 * HOUR
+        start = now - 3 * HOUR
+        self._get(start, now)
+        self._get(start, now)
+        self.assertEqual(self.cache.stats.hits, 1)
+        self.assertEqual(self.calls[-1][1], now)
+
+    def test_empty_buckets_are_cached(self):
+        async def _empty(start, end):
+            self.calls.append((start, end))
+            return pd.DataFrame()
+
+        for _ in range(2):
+            df = asyncio.run(self.cache.fetch(
+                "query", self.day, self.day + HOUR, PERIOD, _empty
+            ))
+            self.assertTrue(df.empty)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_lru_eviction(self):
+        self._get(self.day, self.day + 4 * HOUR)
+        sizes = [
+            path.stat().st_size
+            for path in Path(self.cache_dir.name).glob("*/*.parquet")
+        ]
+        self.cache.max_bytes = sum(sizes) - 1
+        self._get(self.day + 4 * HOUR, self.day + 5 * HOUR)
+        self.assertEqual(self.cache.stats.evictions, 2)
+        self.assertLessEqual(
+            sum(
+                path.stat().st_size
+                for path in Path(self.cache_dir.name).glob("*/*.parquet")
+            ),
+            self.cache.max_bytes
+        )
+
+
+class TestFetchTimeseriesDataCache(unittest.TestCase):
+    """`_fetch_timeseries_data` reads through the configured cache."""
+
+    def setUp(self):
+        self.config = Config()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.config.set_value("TIMESERIES_CACHE_DIR", self.cache_dir.name)
+        self.workload_details = WorkloadDetails(
+            config=self.config,
+            project_id="gtools-koptimize",
+            location="us-central1",
+            cluster_name="online-boutique-cluster",
+            namespace="default",
+            controller_name="adservice",
+            controller_type="Deployment",
+            container_name="server",
+        )
+        self.metric_param = MetricRequestParameter(
+            metric="kubernetes.io/container/cpu/core_usage_time",
+            per_series_aligner="ALIGN_RATE",
+            cross_series_reducer="REDUCE_MEAN",
+        )
+
+    def tearDown(self):
+        self.config.set_value("TIMESERIES_CACHE_DIR", None)
+        self.cache_dir.cleanup()
+
+    def test_second_fetch_is_served_from_disk(self):
+        calls = []
+
+        async def _query(client, project_id, metric_param, filter_string,
+                         start, end, alignment_period, **kwargs):
+            # pylint: disable=unused-argument
+            calls.append((start, end))
+            return _points(int(start.timestamp()), int(end.timestamp()))
+
+        start = datetime(2024, 11, 5, 12, 0, tzinfo=pytz.UTC)
+        end = datetime(2024, 11, 5, 13, 0, tzinfo=pytz.UTC)
+        with patch(
+            "hpaconfigrecommender.read_workload_timeseries."
+            "_query_timeseries_data",
+            side_effect=_query
+        ):
+            first = asyncio.run(_fetch_timeseries_data(
+                self.config, self.metric_param, self.workload_details,
+                start, end, PERIOD
+            ))
+            second = asyncio.run(_fetch_timeseries_data(
+                self.config, self.metric_param, self.workload_details,
+                start, end, PERIOD
+            ))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(first), 2 * 60)
+        pd.testing.assert_frame_equal(first, second, check_categorical=False)
+
+    def test_cache_keeps_the_latest_request(self):
+        async def _query(client, project_id, metric_param, filter_string,
+                         start, end, alignment_period, **kwargs):
+            # pylint: disable=unused-argument
+            # Newest points first, as the Monitoring API returns them
+            return _points(
+                int(start.timestamp()), int(end.timestamp())
+            ).iloc[::-1].reset_index(drop=True)
+
+        start = datetime(2024, 11, 5, 12, 0, tzinfo=pytz.UTC)
+        end = datetime(2024, 11, 5, 13, 0, tzinfo=pytz.UTC)
+        latest = {}
+        with patch(
+            "hpaconfigrecommender.read_workload_timeseries."
+            "_query_timeseries_data",
+            side_effect=_query
+        ):
+            for cache_dir in (None, self.cache_dir.name, self.cache_dir.name):
+                self.config.set_value("TIMESERIES_CACHE_DIR", cache_dir)
+                df = asyncio.run(_fetch_timeseries_data(
+                    self.config, self.metric_param, self.workload_details,
+                    start, end, PERIOD
+                ))
+                latest[cache_dir] = _get_latest_request_value(df, "CPU")
+        self.assertEqual(latest[None], float(int(end.timestamp()) % 1000))
+        self.assertEqual(latest[self.cache_dir.name], latest[None])
+
+
+if __name__ == "__main__":
+    unittest.main()
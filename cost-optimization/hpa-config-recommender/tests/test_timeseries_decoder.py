@@ -0,0 +1,153 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit test for the Monitoring page decoder"""
+import unittest
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.timeseries_decoder import TimeseriesPageDecoder
+
+
+def _series(pod, container, points, value_key):
+    """One `timeSeries` entry of the Monitoring API JSON."""
+    return {
+        "resource": {
+            "labels": {"pod_name": pod, "container_name": container}
+        },
+        "points": [
+            {
+                "interval": {
+                    "startTime": start,
+                    "endTime": start,
+                },
+                "value": {value_key: value},
+            }
+            for start, value in points
+        ],
+    }
+
+
+class TestTimeseriesPageDecoder(unittest.TestCase):
+    """Unit tests for `TimeseriesPageDecoder`."""
+
+    def test_pages_share_category_codes(self):
+        decoder = TimeseriesPageDecoder()
+        decoder.add_page([
+            _series("pod-a", "server", [
+                ("2024-11-05T12:01:00Z", 0.5),
+                ("2024-11-05T12:00:00Z", 0.25),
+            ], "doubleValue"),
+        ])
+        decoder.add_page([])
+        decoder.add_page([
+            _series("pod-b", "server", [("2024-11-05T12:00:00Z", 1.5)],
+                    "doubleValue"),
+            _series("pod-a", "server", [("2024-11-05T12:02:00Z", 0.75)],
+                    "doubleValue"),
+        ])
+        df = decoder.to_frame()
+
+        self.assertEqual(decoder.points, 4)
+        self.assertNotIn("value.int64Value", df.columns)
+        self.assertEqual(df["value.doubleValue"].dtype, np.float32)
+        self.assertEqual(
+            df["resource.labels.pod_name"].tolist(),
+            ["pod-a", "pod-a", "pod-b", "pod-a"]
+        )
+        self.assertEqual(
+            list(df["resource.labels.pod_name"].cat.categories),
+            ["pod-a", "pod-b"]
+        )
+        self.assertEqual(str(df["window_begin"].dt.tz), "UTC")
+        self.assertEqual(
+            df["window_begin"].iloc[2],
+            pd.Timestamp("2024-11-05T12:00:00", tz="UTC")
+        )
+
+    def test_int64_values_above_int32(self):
+        decoder = TimeseriesPageDecoder()
+        decoder.add_page([
+            _series("pod-a", "server", [
+                ("2024-11-05T12:00:00Z", "3000000000"),
+                ("2024-11-05T12:01:00Z", "42"),
+            ], "int64Value"),
+        ])
+        df = decoder.to_frame()
+        self.assertNotIn("value.doubleValue", df.columns)
+        self.assertEqual(df["value.int64Value"].dtype, np.int64)
+        self.assertEqual(df["value.int64Value"].tolist(), [3000000000, 42])
+
+    def test_metadata_label_columns(self):
+        series = _series("pod-a", "server", [("2024-11-05T12:00:00Z", 1.0)],
+                         "doubleValue")
+        series["metadata"] = {
+            "systemLabels": {"top_level_controller_name": "frontend"}
+        }
+        decoder = TimeseriesPageDecoder((
+            "metadata.system_labels.top_level_controller_name",
+            "resource.labels.container_name",
+        ))
+        decoder.add_page([series])
+        df = decoder.to_frame()
+        self.assertEqual(
+            df["metadata.system_labels.top_level_controller_name"].tolist(),
+            ["frontend"]
+        )
+        self.assertNotIn("resource.labels.pod_name", df.columns)
+        with self.assertRaises(ValueError):
+            TimeseriesPageDecoder(("unknown.label",))
+
+    def test_no_points(self):
+        decoder = TimeseriesPageDecoder()
+        decoder.add_page([])
+        decoder.add_page([_series("pod-a", "server", [], "doubleValue")])
+        self.assertTrue(decoder.to_frame().empty)
+
+    def test_matches_json_normalize(self):
+        time_series = [
+            _series(f"pod-{pod}", "server", [
+                (f"2024-11-05T12:{minute:02d}:00Z", str(pod * 1000 + minute))
+                for minute in range(5)
+            ], "int64Value")
+            for pod in range(3)
+        ]
+        decoder = TimeseriesPageDecoder()
+        decoder.add_page(time_series[:2])
+        decoder.add_page(time_series[2:])
+
+        expected = pd.json_normalize(
+            time_series,
+            record_path="points",
+            meta=[
+                ["resource", "labels", "container_name"],
+                ["resource", "labels", "pod_name"],
+            ],
+        )
+        actual = decoder.to_frame()
+        pd.testing.assert_series_equal(
+            actual["value.int64Value"],
+            expected["value.int64Value"].astype("int64"),
+        )
+        pd.testing.assert_series_equal(
+            actual["window_begin"],
+            pd.to_datetime(expected["interval.startTime"], utc=True),
+            check_names=False,
+        )
+        for col in ("resource.labels.container_name",
+                    "resource.labels.pod_name"):
+            self.assertEqual(actual[col].tolist(), expected[col].tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Unit test for the compact workload column dtypes"""
+import unittest
+import numpy as np
+import pandas as pd
+from hpaconfigrecommender.plan_workload_simulation import convert_data_types
+from hpaconfigrecommender.utils.config import Config
+from hpaconfigrecommender.workload_dtypes import (
+    compact_usage_columns,
+    frame_memory_report,
+    usage_series,
+    usage_values,
+)
+
+
+def _workload_frame():
+    """Usage of a large workload, beyond float16 precision."""
+    return pd.DataFrame({
+        "window_begin": pd.date_range("2024-11-05", periods=3, freq="60s"),
+        "num_replicas_at_usage_window": [1000, 1000, 1001],
+        "avg_container_cpu_usage": [2.1234567, 0.0421234, 0.0000015],
+        "stddev_containers_cpu_usage": [0.0012345, 0.0, 0.25],
+        "sum_containers_cpu_request": [2500.0, 2500.0, 2502.5],
+        "sum_containers_cpu_usage": [2123.4567, 2049.0001, 2049.0],
+        "sum_containers_mem_request_mi": [512000.0, 512000.0, 512512.0],
+        "sum_containers_mem_usage_mi": [300000.4, 300000.6, 1.0],
+    })
+
+
+class TestWorkloadDtypes(unittest.TestCase):
+    """Unit tests for `compact_usage_columns` and the usage accessors."""
+
+    def test_fixed_point_keeps_precision(self):
+        df = compact_usage_columns(_workload_frame(), "fixed_point")
+        self.assertEqual(df["sum_containers_cpu_usage"].dtype, np.int32)
+        self.assertEqual(df["avg_container_cpu_usage"].dtype, np.int32)
+        self.assertEqual(df["sum_containers_mem_usage_mi"].dtype, np.uint32)
+
+        # Usage sums are rounded up to the millicore and the KiB, so they
+        # never fall below a capacity they exceeded
+        np.testing.assert_array_equal(
+            usage_values(df, "sum_containers_cpu_usage"),
+            [2123.457, 2049.001, 2049.0]
+        )
+        np.testing.assert_allclose(
+            usage_values(df, "avg_container_cpu_usage"),
+            [2.123457, 0.042123, 0.000002], atol=1e-12
+        )
+        np.testing.assert_array_equal(
+            usage_values(df, "sum_containers_mem_usage_mi"),
+            [300000.400390625, 300000.6005859375, 1.0]
+        )
+        np.testing.assert_array_equal(
+            usage_values(df, "sum_containers_mem_request_mi"),
+            [512000.0, 512000.0, 512512.0]
+        )
+
+    def test_memory_sums_from_4_tib_are_uint64(self):
+        df = _workload_frame()
+        df["sum_containers_mem_usage_mi"] = [4.5 * 1024**2, 1.0, 2.0]
+        df = compact_usage_columns(df, "fixed_point")
+        self.assertEqual(df["sum_containers_mem_usage_mi"].dtype, np.uint64)
+        self.assertEqual(df["sum_containers_mem_request_mi"].dtype, np.uint32)
+        np.testing.assert_array_equal(
+            usage_values(df, "sum_containers_mem_usage_mi"),
+            [4.5 * 1024**2, 1.0, 2.0]
+        )
+
+    def test_float32_values_on_the_grid_are_not_rounded_up(self):
+        df = _workload_frame()
+        df["sum_containers_cpu_usage"] = np.array(
+            [0.3, 1.7, 2.049], dtype=np.float32
+        )
+        df = compact_usage_columns(df, "fixed_point")
+        np.testing.assert_array_equal(
+            df["sum_containers_cpu_usage"], [300, 1700, 2049]
+        )
+
+    def test_conversion_is_idempotent(self):
+        df = compact_usage_columns(_workload_frame(), "fixed_point")
+        again = compact_usage_columns(df.copy(), "fixed_point")
+        pd.testing.assert_frame_equal(df, again)
+        legacy = compact_usage_columns(df.copy(), "float16")
+        self.assertEqual(legacy["sum_containers_cpu_usage"].dtype, np.float16)
+        self.assertAlmostEqual(
+            usage_series(legacy, "avg_container_cpu_usage").iloc[0],
+            2.123, places=2
+        )
+
+    def test_missing_values_use_nullable_dtypes(self):
+        df = _workload_frame()
+        df.loc[1, "sum_containers_cpu_request"] = np.nan
+        df = compact_usage_columns(df, "fixed_point")
+        self.assertEqual(df["sum_containers_cpu_request"].dtype, "Int32")
+        values = usage_values(df, "sum_containers_cpu_request")
+        self.assertTrue(np.isnan(values[1]))
+        self.assertEqual(values[2], 2502.5)
+
+    def test_convert_data_types_uses_config(self):
+        config = Config()
+        config.set_value("WORKLOAD_COLUMN_DTYPES", "float16")
+        try:
+            df = convert_data_types(_workload_frame(), config)
+            self.assertEqual(
+                df["sum_containers_cpu_usage"].dtype, np.float16
+            )
+            config.set_value("WORKLOAD_COLUMN_DTYPES", "float64")
+            with self.assertRaises(ValueError):
+                convert_data_types(_workload_frame(), config)
+        finally:
+            config.set_value("WORKLOAD_COLUMN_DTYPES", "fixed_point")
+
+    def test_frame_memory_report(self):
+        df = convert_data_types(_workload_frame())
+        with self.assertLogs(
+            "hpaconfigrecommender.workload_dtypes", level="INFO"
+        ) as logs:
+            report = frame_memory_report(df, "test frame")
+        self.assertEqual(
+            report["total"], df.memory_usage(deep=True).sum()
+        )
+        self.assertEqual(report["sum_containers_cpu_usage"], 3 * 4)
+        self.assertIn("Memory usage of test frame", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()